@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Click-Redirect Benchmark
+Every link in a campaign goes through GET /api/email/tracking/click before it
+reaches its destination, so the time to the 302 is added to every click.
+Drives the route with the links send-campaign actually builds (long UTM-laden
+Steinway pages, videos, buttons, footer socials) and measures:
+
+  - redirect latency percentiles (request sent -> 302 received), per link type
+  - email_tracking insert throughput in steps as the table grows (--prefill
+    starts the table large; the row count comes from the stand-in's
+    X-Tracking-Rows)
+  - that every Location is the link that was wrapped (compared after URL
+    serialisation, which NextResponse.redirect applies) - the route decodes
+    the url parameter twice, so a literal %25 in a target comes back as a
+    bare % and the link is altered
+
+By default it starts the stand-in in-process (on a SQLite file with
+--tracking-db). --record deferred (the default) is the route's current
+behaviour: the 302 goes out first and a setImmediate callback inserts the
+email_tracking row and broadcasts to Pusher; the report includes the peak
+number of pending callbacks and how long they take to drain. --record sync is
+a hypothetical for comparison: the same work awaited before the 302.
+--external benchmarks CRM_BASE_URL instead (run standin-server.py in another
+process for numbers the client's own CPU use does not share).
+
+Usage: python3 scripts/bench-click-redirect.py [--record deferred|sync] [--steps 5 --clicks-per-step 2000]
+                                               [--prefill 1000000 --tracking-db clicks.sqlite] [--output click-bench.json]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import urllib.parse
+from collections import Counter
+from datetime import datetime
+
+from crm_config import BASE_URL
+from crm_probe import ProbeEngine
+from crm_pusher import PusherClient, PusherStandin
+from crm_standin import StandinServer, TrackingStore, serialize_url
+from crm_stats import LatencyHistogram, format_summary
+
+CLICK_PATH = '/api/email/tracking/click'
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+STEINWAY_PAGES = [
+    'https://www.steinway.com.au/pianos/steinway/grand/model-b',
+    'https://www.steinway.com.au/pianos/steinway/grand/model-d',
+    'https://www.steinway.com.au/spirio/spirio-r',
+    'https://www.steinway.com.au/pianos/boston/upright/up-126e-performance-edition',
+    'https://www.steinway.com.au/events/steinway-piano-gallery-sydney-open-weekend',
+    'https://www.steinway.com.au/piano-finance/interest-free-24-months',
+    'https://crm.steinway.com.au',
+]
+VIDEOS = [
+    'https://www.youtube.com/watch?v=Z8bE3zK9f1c',
+    'https://youtu.be/Q3xvT8b2mLk?si=G7YpZ1mN0qRs2TuV',
+    'https://vimeo.com/812345678',
+]
+SOCIALS = [
+    ('social-facebook', 'https://www.facebook.com/steinwayaustralia'),
+    ('social-instagram', 'https://www.instagram.com/steinwaygalleriesaustralia/?hl=en'),
+    ('social-youtube', 'https://www.youtube.com/@steinwaygalleriesaustralia8733/featured'),
+]
+CONTENT_BLOCKS = ['hero-image', 'cta-book-a-private-viewing', 'model-b-feature', 'spirio-video', 'footer-links']
+
+
+def utm_link(base, rng, campaign_slug, escaped_share=0.05):
+    """A template link with the UTM block appended; escaped_share of them spell spaces %20 instead of +"""
+    params = [
+        ('utm_source', 'epg-crm'),
+        ('utm_medium', 'email'),
+        ('utm_campaign', campaign_slug),
+        ('utm_content', rng.choice(CONTENT_BLOCKS)),
+        ('utm_term', rng.choice(['grand piano', 'spirio r', 'trade-in offer', 'model b'])),
+        ('utm_id', f"cmp_{rng.getrandbits(48):012x}"),
+    ]
+    if rng.random() < 0.01:
+        params.append(('offer', '0% p.a. finance'))
+    quote = urllib.parse.quote if rng.random() < escaped_share else urllib.parse.quote_plus
+    separator = '&' if '?' in base else '?'
+    link = base + separator + urllib.parse.urlencode(params, quote_via=quote)
+    return link + ('#book-a-viewing' if rng.random() < 0.2 else '')
+
+
+def link_mix(count, rng, campaign_slug):
+    """[(link_type, target_url)] in roughly the proportions a newsletter's clicks arrive in"""
+    links = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            links.append(('website', utm_link(rng.choice(STEINWAY_PAGES), rng, campaign_slug)))
+        elif roll < 0.75:
+            links.append(('button', utm_link(STEINWAY_PAGES[4], rng, campaign_slug)))
+        elif roll < 0.87:
+            links.append(('video', rng.choice(VIDEOS)))
+        else:
+            links.append(rng.choice(SOCIALS))
+    return links
+
+
+def encode_component(value):
+    """JavaScript's encodeURIComponent, as send-campaign uses to build tracked links"""
+    return urllib.parse.quote(value, safe="-_.!~*'()")
+
+
+def normalized_url(url):
+    """The target as a browser would serialise it, or the text itself if URL() would reject it"""
+    try:
+        return serialize_url(url)
+    except ValueError:
+        return url
+
+
+def tracked_path(campaign_id, email, link_type, url):
+    return f"{CLICK_PATH}?c={campaign_id}&e={encode_component(email)}&url={encode_component(url)}&type={link_type}"
+
+
+class StepStats:
+    """One growth step: redirect latency, outcomes and the table size after it"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.by_type = {}
+        self.statuses = Counter()
+        self.results = Counter()
+        self.errors = Counter()
+        self.mismatches = 0
+        self.mismatch_sample = None
+        self.rows_after = None
+        self.backlog_max = 0
+
+    def record(self, link_type, ms, response, target):
+        self.latency.record(ms)
+        self.by_type.setdefault(link_type, LatencyHistogram()).record(ms)
+        self.statuses[str(response['status'])] += 1
+        headers = response['headers']
+        self.results[headers.get('x-tracking-result', 'unreported')] += 1
+        # The route answers with new URL(target).href, so compare serialised forms
+        if headers.get('location') != normalized_url(target):
+            self.mismatches += 1
+            self.mismatch_sample = self.mismatch_sample or {'sent': target, 'location': headers.get('location')}
+        if 'x-tracking-rows' in headers:
+            self.rows_after = max(self.rows_after or 0, int(headers['x-tracking-rows']))
+        self.backlog_max = max(self.backlog_max, int(headers.get('x-tracking-backlog', 0)))
+
+
+async def run_step(engine, links, campaign_id, emails, concurrency, rows_before, server=None):
+    """Click every link with `concurrency` clients in a closed loop; returns the step report"""
+    stats = StepStats()
+    queue = list(enumerate(links))
+    queue.reverse()
+
+    async def client():
+        while queue:
+            i, (link_type, url) = queue.pop()
+            path = tracked_path(campaign_id, emails[i % len(emails)], link_type, url)
+            started = time.perf_counter()
+            try:
+                response = await engine.request('GET', path, {'User-Agent': 'Mozilla/5.0 (Macintosh)',
+                                                              'X-Forwarded-For': f"203.0.113.{i % 254 + 1}"})
+            except Exception as e:
+                stats.errors[type(e).__name__] += 1
+                continue
+            stats.record(link_type, (time.perf_counter() - started) * 1000, response, url)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    drain_ms = None
+    if server and server.click_record == 'deferred':
+        drained_from = time.perf_counter()
+        await server.drain_clicks()
+        drain_ms = round((time.perf_counter() - drained_from) * 1000, 1)
+        stats.backlog_max = max(stats.backlog_max, server.click_backlog_max)
+        server.click_backlog_max = 0
+    rows_after = server.tracking.click_count if server else stats.rows_after
+    write_s = elapsed + (drain_ms or 0) / 1000
+    completed = sum(stats.statuses.values())
+    return {
+        'rows_before': rows_before,
+        'rows_after': rows_after,
+        'clicks': len(links),
+        'redirected': stats.statuses.get('302', 0),
+        'elapsed_s': round(elapsed, 3),
+        'redirects_per_s': round(completed / elapsed, 1) if elapsed else 0,
+        # Rows written per second, counting the deferred backlog's drain
+        'inserts_per_s': round((rows_after - rows_before) / write_s, 1) if rows_after is not None and rows_before is not None and write_s else None,
+        'drain_ms': drain_ms,
+        'backlog_max': stats.backlog_max,
+        'latency_ms': stats.latency.summary(),
+        'latency_by_type_ms': {t: h.summary() for t, h in sorted(stats.by_type.items())},
+        'results': dict(stats.results),
+        'status_counts': dict(sorted(stats.statuses.items())),
+        'errors': dict(stats.errors),
+        'location_mismatches': stats.mismatches,
+        'mismatch_sample': stats.mismatch_sample,
+    }
+
+
+def throughput_trend(steps):
+    """Relative change in insert throughput from the first to the last step"""
+    rates = [s['inserts_per_s'] for s in steps if s['inserts_per_s']]
+    if len(rates) < 2:
+        return None
+    return round(rates[-1] / rates[0] - 1, 4)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the click-tracking redirect and email_tracking inserts")
+    parser.add_argument('--steps', type=int, default=5, help="growth steps")
+    parser.add_argument('--clicks-per-step', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32, help="concurrent clickers (closed loop)")
+    parser.add_argument('--recipients', type=int, default=5000, help="distinct recipient emails to spread clicks over")
+    parser.add_argument('--campaign', default='cmloadtest000000000000000', help="campaign id sent as ?c=")
+    parser.add_argument('--record', choices=('deferred', 'sync'), default='deferred',
+                        help="in-process stand-in: redirect now and record later (the route today), "
+                             "or record before the 302 (hypothetical)")
+    parser.add_argument('--tracking-db', default='', help="in-process stand-in: SQLite file for the rows (default: memory)")
+    parser.add_argument('--prefill', type=int, default=0, help="in-process stand-in: click rows to put in email_tracking first")
+    parser.add_argument('--row-cost-ms', type=float, default=0, help="in-process stand-in: simulated cost per insert")
+    parser.add_argument('--pusher-latency-ms', type=float, default=0,
+                        help="in-process stand-in: added to every broadcast (the round trip to the Pusher cluster)")
+    parser.add_argument('--no-pusher', action='store_true', help="in-process stand-in: skip the broadcasts")
+    parser.add_argument('--external', action='store_true', help="benchmark CRM_BASE_URL instead of an in-process stand-in")
+    parser.add_argument('--allow-remote', action='store_true', help="permit a non-local --external target (writes real rows)")
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='', help="write the JSON report here")
+    args = parser.parse_args()
+
+    server = pusher_server = pusher = None
+    if args.external:
+        base_url = BASE_URL
+        host = urllib.parse.urlparse(base_url).hostname
+        if host not in LOCAL_HOSTS and not args.allow_remote:
+            print(f"❌ {base_url} is not local and every click inserts an email_tracking row. Use the stand-in "
+                  f"(scripts/standin-server.py) or pass --allow-remote.", file=sys.stderr)
+            return None
+    else:
+        tracking = TrackingStore(args.tracking_db or None)
+        if args.prefill:
+            prefill_started = time.perf_counter()
+            tracking.prefill_clicks(args.prefill)
+            print(f"🧱 Prefilled {args.prefill:,} clicks in {time.perf_counter() - prefill_started:.1f}s "
+                  f"(table now {tracking.click_count:,} rows)")
+        if not args.no_pusher:
+            pusher_server = await PusherStandin(port=0).start()
+            pusher = PusherClient(pusher_server.base_url, latency_ms=args.pusher_latency_ms)
+        server = await StandinServer(port=0, row_cost_ms=args.row_cost_ms, tracking=tracking,
+                                     click_record=args.record, pusher=pusher).start()
+        base_url = server.base_url
+
+    rng = random.Random(args.seed)
+    emails = [f"loadtest+{i:06d}@example.com" for i in range(args.recipients)]
+    mode = 'external' if args.external else \
+        f"stand-in, record {args.record}{' (current behaviour)' if args.record == 'deferred' else ' (hypothetical)'}"
+    print("🚀 Click-Redirect Benchmark")
+    print("=" * 96)
+    print(f"🌐 Target: {base_url}{CLICK_PATH} ({mode})")
+    print(f"{'rows before':>12} {'clicks':>7} {'redir/s':>9} {'inserts/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'drain ms':>9} {'backlog':>8} {'mismatch':>9}")
+
+    steps = []
+    rows = server.tracking.click_count if server else None
+    try:
+        async with ProbeEngine(base_url, concurrency=args.connections, timeout=args.timeout) as engine:
+            for _ in range(args.steps):
+                links = link_mix(args.clicks_per_step, rng, 'steinway-spring-showcase-2025')
+                step = await run_step(engine, links, args.campaign, emails, args.concurrency, rows, server)
+                steps.append(step)
+                rows = step['rows_after']
+                fmt = lambda v, spec: format(v, spec) if v is not None else '-'
+                latency = step['latency_ms']
+                print(f"{fmt(step['rows_before'], '>12,')} {step['clicks']:>7,} {step['redirects_per_s']:>9,.0f} "
+                      f"{fmt(step['inserts_per_s'], '>10,.0f')} {fmt(latency.get('p50_ms'), '>8.1f')} "
+                      f"{fmt(latency.get('p99_ms'), '>8.1f')} {fmt(step['drain_ms'], '>9.0f')} "
+                      f"{step['backlog_max']:>8,} {step['location_mismatches']:>9,}")
+    finally:
+        if server:
+            await server.close()
+        if pusher:
+            await pusher.close()
+        if pusher_server:
+            await pusher_server.close()
+
+    print("\n📊 REDIRECT LATENCY BY LINK TYPE (last step)")
+    print("=" * 96)
+    for link_type, summary in steps[-1]['latency_by_type_ms'].items() if steps else []:
+        print(f"   {link_type:<17} {format_summary(summary)}")
+
+    trend = throughput_trend(steps)
+    if trend is not None:
+        print(f"\n📈 Insert throughput {trend:+.1%} from {steps[0]['rows_before'] or 0:,} to {steps[-1]['rows_after']:,} rows")
+    mismatches = sum(s['location_mismatches'] for s in steps)
+    if mismatches:
+        sample = next(s['mismatch_sample'] for s in steps if s['mismatch_sample'])
+        print(f"⚠️ {mismatches:,} redirects did not land on the wrapped link, e.g.\n"
+              f"   sent     {sample['sent']}\n   location {sample['location']}")
+    errors = sum(sum(s['errors'].values()) + s['clicks'] - s['redirected'] for s in steps)
+    if errors:
+        print(f"❌ {errors:,} clicks were not redirected")
+
+    report = {
+        'target': f"{base_url}{CLICK_PATH}",
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'mode': mode,
+            'record': None if args.external else args.record,
+            'tracking_db': None if args.external else (args.tracking_db or 'memory'),
+            'prefill': args.prefill,
+            'steps': args.steps,
+            'clicks_per_step': args.clicks_per_step,
+            'concurrency': args.concurrency,
+            'row_cost_ms': args.row_cost_ms,
+            'pusher_latency_ms': None if args.external or args.no_pusher else args.pusher_latency_ms,
+        },
+        'steps': steps,
+        'insert_throughput_change': trend,
+        'location_mismatches': mismatches,
+        'not_redirected': errors,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    try:
+        report = asyncio.run(main())
+        sys.exit(0 if report and not report['not_redirected'] else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Benchmark interrupted by user")
+        sys.exit(1)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Concurrent Admin Section Crawler
+Visits every admin section (the static pages under src/app/admin plus any
+admin links found on the way) over a pool of logged-in pages, and records
+per route: navigation time, time for the page's API calls to settle,
+Navigation Timing marks, DOM size and table row counts.
+
+Links are normalised (resolved, fragment and tracking parameters dropped,
+query sorted, trailing slash removed) and each URL is visited once, however
+many pages link to it. --max-depth limits how many link hops the crawl
+follows from the seed pages.
+
+Usage: python3 scripts/crawl-admin.py [--concurrency 4] [--max-depth 2] [--json crawl.json] [--fast]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+import urllib.parse
+
+from playwright.async_api import async_playwright
+
+from crm_config import BASE_URL
+from crm_pool import ContextPool
+from crm_probe import discover_routes
+from crm_session import ensure_storage_state
+from crm_vitals import capture_vitals
+from crm_waits import ScopedNetworkIdle, launch_options
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Resolved from this file so the crawl seeds the same routes from any working directory
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'app')
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid)$')
+
+# Everything the report needs from a rendered page, in one round trip
+MEASURE_JS = """
+() => {
+  const nav = performance.getEntriesByType('navigation')[0]
+  return {
+    title: document.title,
+    ttfb_ms: nav ? nav.responseStart : null,
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : null,
+    load_ms: nav ? nav.loadEventEnd : null,
+    transfer_bytes: nav ? nav.transferSize : null,
+    dom_nodes: document.getElementsByTagName('*').length,
+    html_bytes: document.documentElement.outerHTML.length,
+    table_rows: [...document.querySelectorAll('table')].map(t =>
+      t.tBodies.length ? [...t.tBodies].reduce((n, b) => n + b.rows.length, 0) : t.rows.length),
+    links: [...document.querySelectorAll('a[href]')].map(a => a.href)
+  }
+}
+"""
+
+
+def normalize_url(href, base):
+    """Canonical absolute form of a link, or None for non-HTTP links"""
+    parts = urllib.parse.urlsplit(urllib.parse.urljoin(base, href))
+    if parts.scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    netloc = parts.hostname.lower()
+    if parts.port and parts.port != DEFAULT_PORTS[parts.scheme]:
+        netloc = f"{netloc}:{parts.port}"
+    path = re.sub(r'/{2,}', '/', parts.path or '/')
+    if len(path) > 1:
+        path = path.rstrip('/')
+    query = urllib.parse.urlencode(sorted(
+        (key, value) for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(key)
+    ))
+    return urllib.parse.urlunsplit((parts.scheme, netloc, path, query, ''))
+
+
+class AdminCrawler:
+    """Breadth-first crawl of one origin's admin pages over a fixed set of workers"""
+
+    def __init__(self, pool, base_url, scope=('/admin',), max_depth=2, exclude=None,
+                 settle_ms=250, timeout=30000):
+        self.pool = pool
+        self.origin = normalize_url('/', base_url)[:-1]
+        self.scope = scope
+        self.max_depth = max_depth
+        self.exclude = re.compile(exclude) if exclude else None
+        self.settle_ms = settle_ms
+        self.timeout = timeout
+        self.queue = asyncio.Queue()
+        self.seen = set()
+        self.results = []
+        self.links = {'found': 0, 'duplicate': 0, 'out_of_scope': 0, 'too_deep': 0}
+
+    def in_scope(self, url):
+        if not url.startswith(self.origin + '/'):
+            return False
+        path = urllib.parse.urlsplit(url).path
+        if path.startswith('/api/') or (self.exclude and self.exclude.search(path)):
+            return False
+        return any(path == prefix or path.startswith(prefix + '/') for prefix in self.scope)
+
+    def enqueue(self, href, depth, source):
+        """Queue a link unless it is out of scope, too deep or already queued"""
+        url = normalize_url(href, self.origin + '/')
+        if url is None or not self.in_scope(url):
+            self.links['out_of_scope'] += 1
+            return
+        if url in self.seen:
+            self.links['duplicate'] += 1
+            return
+        if depth > self.max_depth:
+            self.links['too_deep'] += 1
+            return
+        self.seen.add(url)
+        self.queue.put_nowait({'url': url, 'depth': depth, 'source': source})
+
+    async def visit(self, page, job):
+        result = {'url': job['url'], 'path': urllib.parse.urlsplit(job['url']).path,
+                  'depth': job['depth'], 'source': job['source'], 'error': None}
+        async with ScopedNetworkIdle(page, ['/api/']) as api:
+            started = time.perf_counter()
+            try:
+                response = await page.goto(job['url'], wait_until='load', timeout=self.timeout)
+                result['nav_ms'] = (time.perf_counter() - started) * 1000
+                result['status'] = response.status if response else None
+                # Client-rendered sections fill their tables from /api/ calls after load
+                if api.seen:
+                    await api.wait(idle_ms=self.settle_ms, timeout=self.timeout)
+                result['settled_ms'] = (time.perf_counter() - started) * 1000
+                result['api_calls'] = api.seen
+                metrics = await page.evaluate(MEASURE_JS)
+                result['vitals'] = await capture_vitals(page, result['path'])
+            except Exception as e:
+                result['error'] = str(e).splitlines()[0] if str(e) else type(e).__name__
+                return result
+
+        final = normalize_url(page.url, self.origin + '/')
+        if final != job['url']:
+            result['redirected_to'] = urllib.parse.urlsplit(final).path
+            if result['redirected_to'] == '/login':
+                result['error'] = 'redirected to /login - session rejected'
+            # Later links to the redirect target need no visit of their own
+            self.seen.add(final)
+        links = metrics.pop('links')
+        result.update(metrics)
+        result['links'] = len(links)
+        if result['status'] and result['status'] >= 400:
+            result['error'] = f"HTTP {result['status']}"
+        for href in links:
+            self.links['found'] += 1
+            self.enqueue(href, job['depth'] + 1, result['path'])
+        return result
+
+    async def worker(self):
+        # One page per worker for the whole crawl: no per-URL context reset
+        async with self.pool.page() as page:
+            while True:
+                job = await self.queue.get()
+                try:
+                    try:
+                        result = await self.visit(page, job)
+                    except Exception as e:
+                        result = {'url': job['url'], 'path': urllib.parse.urlsplit(job['url']).path,
+                                  'depth': job['depth'], 'source': job['source'], 'error': str(e) or type(e).__name__}
+                    self.results.append(result)
+                    status = '⚠️' if result['error'] else '✅'
+                    print(f"   {status} {result['path']} ({result.get('nav_ms', 0):.0f}ms)", file=sys.stderr)
+                finally:
+                    self.queue.task_done()
+
+    async def crawl(self, seeds):
+        for path in seeds:
+            self.enqueue(path, 0, 'seed')
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.pool.size)]
+        try:
+            await self.queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return sorted(self.results, key=lambda r: r['path'])
+
+
+def seed_paths(scope, discover=True):
+    """The scope roots plus every static page route under them in src/app"""
+    seeds = list(scope)
+    if discover:
+        if not os.path.isdir(APP_DIR):
+            raise SystemExit(f"❌ {os.path.normpath(APP_DIR)} not found - run from a CRM checkout or pass --no-discover")
+        seeds += [check['path'] for check in discover_routes(APP_DIR)
+                  if any(check['path'].startswith(prefix + '/') for prefix in scope)]
+    return seeds
+
+
+def print_report(results, links, wall):
+    print("\n📊 ADMIN CRAWL REPORT")
+    print("=" * 60)
+    print(f"{'route':<36} {'nav':>7} {'settled':>8} {'LCP':>7} {'CLS':>6} {'nodes':>6} {'rows':>6}")
+    for r in sorted(results, key=lambda r: -(r.get('settled_ms') or 0)):
+        if r['error'] and 'nav_ms' not in r:
+            print(f"{r['path']:<36} ❌ {r['error']}")
+            continue
+        rows = sum(r.get('table_rows') or [])
+        note = f"  ⚠️ {r['error']}" if r['error'] else ''
+        if r.get('redirected_to') and not r['error']:
+            note = f"  → {r['redirected_to']}"
+        vitals = r.get('vitals') or {}
+        lcp = f"{vitals['lcp_ms']:>5.0f}ms" if vitals.get('lcp_ms') is not None else f"{'-':>7}"
+        cls = f"{vitals['cls']:>6.3f}" if vitals.get('cls') is not None else f"{'-':>6}"
+        print(f"{r['path']:<36} {r['nav_ms']:>5.0f}ms {r['settled_ms']:>6.0f}ms {lcp} {cls} "
+              f"{r['dom_nodes']:>6,} {rows:>6,}{note}")
+
+    visited = [r for r in results if 'nav_ms' in r]
+    serial = sum(r['settled_ms'] for r in visited) / 1000
+    print(f"\n🔗 Links: {links['found']:,} found, {links['duplicate']:,} duplicates skipped, "
+          f"{links['out_of_scope']:,} out of scope, {links['too_deep']:,} past the depth limit")
+    print(f"⏱️ {len(results)} routes in {wall:.1f}s wall time (serial sum {serial:.1f}s)")
+    failed = [r for r in results if r['error']]
+    if failed:
+        print(f"❌ {len(failed)} routes failed: {', '.join(r['path'] for r in failed)}")
+    else:
+        print("✅ Every admin route loaded")
+    return not failed
+
+
+async def run(args):
+    print("🕷️ Concurrent Admin Section Crawler")
+    print("=" * 60)
+    storage_state = await ensure_storage_state(base_url=BASE_URL)
+    scope = tuple(args.scope)
+    seeds = seed_paths(scope, discover=not args.no_discover)
+    print(f"🌱 {len(seeds)} seed routes, {args.concurrency} pages, max depth {args.max_depth}")
+
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(**launch_options(slow_mo=0))
+    pool = await ContextPool(browser, args.concurrency, storage_state,
+                             viewport={'width': 1280, 'height': 720}).start()
+    started = time.perf_counter()
+    try:
+        crawler = AdminCrawler(pool, BASE_URL, scope, args.max_depth, args.exclude, args.settle_ms, args.timeout)
+        results = await crawler.crawl(seeds)
+    finally:
+        await pool.close()
+        await browser.close()
+        await playwright.stop()
+    wall = time.perf_counter() - started
+
+    ok = print_report(results, crawler.links, wall)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'base_url': BASE_URL, 'wall_seconds': round(wall, 2), 'links': crawler.links,
+                       'routes': results}, f, indent=2)
+        print(f"💾 Results saved to {args.json}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl the CRM's admin sections concurrently and time each route")
+    parser.add_argument('--concurrency', type=int, default=4, help="pages crawling in parallel")
+    parser.add_argument('--max-depth', type=int, default=2, help="link hops to follow from the seed routes")
+    parser.add_argument('--scope', action='append', default=None, metavar='PREFIX',
+                        help="path prefix to stay within (repeatable, default /admin)")
+    parser.add_argument('--exclude', default='', help="regex of paths never to visit")
+    parser.add_argument('--no-discover', action='store_true', help="seed only the scope roots, not src/app's pages")
+    parser.add_argument('--settle-ms', type=int, default=250, help="quiet time after the last /api/ call")
+    parser.add_argument('--timeout', type=int, default=30000, help="ms per navigation")
+    parser.add_argument('--json', default='', help="write per-route results to this file")
+    parser.add_argument('--fast', action='store_true', help="headless, no slow_mo")
+    args = parser.parse_args()
+    args.scope = args.scope or ['/admin']
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(0 if main() else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Crawl interrupted by user")
+        sys.exit(1)
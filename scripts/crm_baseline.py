@@ -0,0 +1,405 @@
+"""
+Performance Baseline Store
+Keeps every run's timings in an on-disk SQLite file, tagged with the git SHA
+and the environment, and compares a run against a rolling baseline of the
+previous runs of the same suite in the same environment.
+
+A metric counts as slower only when the difference is both statistically
+clear and big enough to matter:
+
+  - one sample per run (step times, page vitals): the run's value is tested
+    against a prediction band of the baseline runs' own values - their median
+    and MAD (on a log scale for positive timings) with a Student-t tail
+  - repeated samples in the run: a one-sided Mann-Whitney U test against the
+    baseline samples
+  - the p-values of all the run's metrics are Holm-corrected together, so a
+    suite with many metrics is not flagged by noise in one of them
+  - and in both cases the median moved by at least min_ratio and min_delta
+
+Every earlier run, flagged or not, is part of the baseline: the median and
+MAD already shrug off a few slow runs, and an accepted slowdown becomes the
+new normal once it makes up half of the window.
+
+Set CRM_BASELINE=off to disable recording, CRM_BASELINE_DB to move the file.
+"""
+
+import json
+import math
+import os
+import platform
+import sqlite3
+import subprocess
+import urllib.parse
+from datetime import datetime, timezone
+
+from crm_config import BASE_URL
+from crm_waits import RUN_MODE
+
+DEFAULT_PATH = os.environ.get('CRM_BASELINE_DB', '.crm-perf/baseline.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    suite TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    git_sha TEXT,
+    git_dirty INTEGER,
+    started_at TEXT NOT NULL,
+    host TEXT,
+    status TEXT NOT NULL DEFAULT 'recorded',
+    meta TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_suite ON runs (suite, environment, id);
+CREATE INDEX IF NOT EXISTS samples_run ON samples (run_id, metric);
+"""
+
+# Earlier runs of the same suite and environment needed before comparing
+MIN_RUNS = 5
+# Smallest change worth reporting, by metric unit
+MIN_DELTA = {'_ms': 20.0, '_mb': 2.0, 'cls': 0.02}
+VITALS_METRICS = ('ttfb_ms', 'fcp_ms', 'lcp_ms', 'tbt_ms', 'cls', 'js_heap_used_mb')
+# The MAD is a noisier spread estimate than the standard deviation; counting it as
+# half the runs keeps noise-only suites near the nominal false alarm rate
+MAD_DF_SHARE = 0.5
+
+
+def git_revision():
+    """(short SHA, dirty) of the working tree, or (None, None) outside git"""
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short=12', 'HEAD'], capture_output=True, text=True,
+                             check=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                               text=True, check=True, timeout=30).stdout.strip()
+        return sha, bool(dirty)
+    except (OSError, subprocess.SubprocessError):
+        return None, None
+
+
+def environment_name():
+    """CRM_ENV if set, otherwise the target host, plus the run mode
+
+    Production and a local stand-in never share a baseline, and neither do
+    fast runs (headless, no slow_mo) and headed ones.
+    """
+    return f"{os.environ.get('CRM_ENV') or urllib.parse.urlsplit(BASE_URL).netloc} ({RUN_MODE})"
+
+
+def min_delta(metric):
+    return next((delta for suffix, delta in MIN_DELTA.items() if metric.endswith(suffix)), 0.0)
+
+
+def result_samples(results, steps=()):
+    """{metric: [values]} from generate_summary-style result dicts and StepTimer steps"""
+    samples = {}
+
+    def add(metric, value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            samples.setdefault(metric, []).append(float(value))
+
+    jobs_seen = set()
+    for result in results:
+        name = urllib.parse.urlsplit(result['url']).path if result.get('url') else result.get('page', '?')
+        timing = result.get('timing') or {}
+        add(f"{name} ttfb_ms", timing.get('ttfb_ms'))
+        add(f"{name} total_ms", timing.get('total_ms'))
+        vitals = result.get('vitals') or []
+        for snapshot in vitals if isinstance(vitals, list) else [vitals]:
+            for metric in VITALS_METRICS:
+                add(f"{snapshot.get('route', name)} {metric}", snapshot.get(metric))
+        if result.get('job') and result['job'] not in jobs_seen:
+            jobs_seen.add(result['job'])
+            add(f"job {result['job']} total_ms", result.get('job_seconds', 0) * 1000)
+    for step in steps:
+        add(f"step {step['step']} actual_ms", step['actual_ms'])
+    return samples
+
+
+def median(values):
+    ordered = sorted(values)
+    n = len(ordered)
+    mid = n // 2
+    return ordered[mid] if n % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def mad_scale(values):
+    """Median absolute deviation scaled to a normal standard deviation"""
+    center = median(values)
+    return 1.4826 * median([abs(v - center) for v in values])
+
+
+def student_t_sf(t, df):
+    """P(T > t) for Student's t with integer df (Abramowitz & Stegun 26.7.3-4)"""
+    theta = math.atan(abs(t) / math.sqrt(df))
+    sin, cos = math.sin(theta), math.cos(theta)
+    if df % 2:
+        term = total = cos if df > 1 else 0.0
+        for k in range(3, df - 1, 2):
+            term *= cos * cos * (k - 1) / k
+            total += term
+        inside = 2 / math.pi * (theta + sin * total)
+    else:
+        term = total = 1.0
+        for k in range(2, df - 1, 2):
+            term *= cos * cos * (k - 1) / k
+            total += term
+        inside = sin * total
+    p = (1 - inside) / 2
+    return p if t >= 0 else 1 - p
+
+
+def prediction_model(values, floor=0.0):
+    """(center, spread, df) for where the next run's value lands, from earlier runs' values
+
+    The spread is the MAD of the earlier runs widened by the uncertainty of
+    their median; the Student-t tail with MAD_DF_SHARE of the usual degrees
+    of freedom accounts for estimating that spread from a handful of runs.
+    floor keeps a dead-steady baseline from turning jitter into certainty.
+    """
+    n = len(values)
+    spread = max(mad_scale(values), floor) * math.sqrt(1 + math.pi / (2 * n))
+    return median(values), spread, max(1, round(MAD_DF_SHARE * (n - 1)))
+
+
+def prediction_p_values(value, values, floor=0.0):
+    """One-sided p-values (slower, faster) of a new run's value against earlier runs' values"""
+    center, spread, df = prediction_model(values, floor)
+    if spread <= 0:
+        return (0.0 if value > center else 1.0), (0.0 if value < center else 1.0)
+    t = (value - center) / spread
+    return student_t_sf(t, df), student_t_sf(-t, df)
+
+
+def prediction_band(values, alpha, floor=0.0):
+    """(low, high) a new run's value stays inside, each tail alpha, under the same model"""
+    center, spread, df = prediction_model(values, floor)
+    low, high = 0.0, 1.0
+    while student_t_sf(high, df) > alpha:
+        high *= 2
+    for _ in range(50):
+        mid = (low + high) / 2
+        low, high = (mid, high) if student_t_sf(mid, df) > alpha else (low, mid)
+    return center - high * spread, center + high * spread
+
+
+def holm(p_values, alpha):
+    """Indexes of the p-values rejected by Holm's step-down procedure at family-wise alpha"""
+    order = sorted(range(len(p_values)), key=lambda i: p_values[i])
+    rejected = set()
+    for rank, i in enumerate(order):
+        if p_values[i] > alpha / (len(p_values) - rank):
+            break
+        rejected.add(i)
+    return rejected
+
+
+def mann_whitney_greater(current, baseline):
+    """One-sided p-value that current tends to be larger than baseline (normal approximation, tie-corrected)"""
+    combined = sorted([(v, 0) for v in current] + [(v, 1) for v in baseline])
+    ranks = [0.0] * len(combined)
+    ties = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    n1, n2 = len(current), len(baseline)
+    u = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0) - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare_metric(metric, current, baseline_runs, alpha=0.01, min_runs=MIN_RUNS):
+    """Uncorrected comparison of one metric: current values vs a list of per-run value lists
+
+    Fills in the p-values; the verdict stays 'pending' until judge() has
+    corrected them across the run's metrics.
+    """
+    row = {'metric': metric, 'current': median(current), 'n_current': len(current),
+           'baseline_runs': len(baseline_runs), 'verdict': 'insufficient', 'method': None,
+           'p_value': None, 'p_faster': None}
+    if len(baseline_runs) < min_runs:
+        return row
+    run_medians = [median(values) for values in baseline_runs]
+    base = median(run_medians)
+    row.update({'baseline': base, 'ratio': row['current'] / base if base else math.inf,
+                'delta': row['current'] - base, 'verdict': 'pending'})
+
+    if len(current) >= 5:
+        pooled = [v for values in baseline_runs for v in values]
+        row['method'] = 'mann-whitney'
+        row['p_value'] = mann_whitney_greater(current, pooled)
+        row['p_faster'] = mann_whitney_greater(pooled, current)
+    else:
+        # A third of the smallest meaningful change keeps a dead-steady metric from flagging on jitter
+        floor = min_delta(metric) / 3
+        row['method'] = 'prediction'
+        if base > 0 and row['current'] > 0 and min(run_medians) > 0:
+            # Timings skew right and change by factors, so compare them on a log scale
+            logs = [math.log(v) for v in run_medians]
+            floor = math.log1p(floor / base)
+            row['p_value'], row['p_faster'] = prediction_p_values(math.log(row['current']), logs, floor)
+            row['band_low'], row['band_high'] = (math.exp(v) for v in prediction_band(logs, alpha, floor))
+        else:
+            row['p_value'], row['p_faster'] = prediction_p_values(row['current'], run_medians, floor)
+            row['band_low'], row['band_high'] = prediction_band(run_medians, alpha, floor)
+    return row
+
+
+def judge(rows, alpha=0.01, min_ratio=1.10):
+    """Holm-correct the slower and faster p-values across all rows, then set each verdict"""
+    tested = [row for row in rows if row['verdict'] == 'pending']
+    slower = holm([row['p_value'] for row in tested], alpha)
+    faster = holm([row['p_faster'] for row in tested], alpha)
+    for i, row in enumerate(tested):
+        meaningful = abs(row['delta']) >= min_delta(row['metric'])
+        if i in slower and meaningful and row['ratio'] >= min_ratio:
+            row['verdict'] = 'slower'
+        elif i in faster and meaningful and row['ratio'] <= 1 / min_ratio:
+            row['verdict'] = 'faster'
+        else:
+            row['verdict'] = 'same'
+    return rows
+
+
+class BaselineStore:
+    """SQLite file of runs and their samples"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def record_run(self, suite, samples, environment=None, meta=None):
+        sha, dirty = git_revision()
+        with self.db:
+            run_id = self.db.execute(
+                'INSERT INTO runs (suite, environment, git_sha, git_dirty, started_at, host, meta) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (suite, environment or environment_name(), sha, None if dirty is None else int(dirty),
+                 datetime.now(timezone.utc).isoformat(timespec='seconds'), platform.node(), json.dumps(meta or {}))
+            ).lastrowid
+            self.db.executemany('INSERT INTO samples (run_id, metric, value) VALUES (?, ?, ?)',
+                                [(run_id, metric, v) for metric, values in samples.items() for v in values])
+        return run_id
+
+    def set_status(self, run_id, status):
+        with self.db:
+            self.db.execute('UPDATE runs SET status = ? WHERE id = ?', (status, run_id))
+
+    def run(self, run_id=None, suite=None):
+        """One run as a dict (the latest, optionally of one suite, when run_id is None)"""
+        query = 'SELECT id, suite, environment, git_sha, git_dirty, started_at, status FROM runs'
+        if run_id is not None:
+            row = self.db.execute(query + ' WHERE id = ?', (run_id,)).fetchone()
+        elif suite:
+            row = self.db.execute(query + ' WHERE suite = ? ORDER BY id DESC LIMIT 1', (suite,)).fetchone()
+        else:
+            row = self.db.execute(query + ' ORDER BY id DESC LIMIT 1').fetchone()
+        if row is None:
+            return None
+        return dict(zip(('id', 'suite', 'environment', 'git_sha', 'git_dirty', 'started_at', 'status'), row))
+
+    def runs(self, suite=None, limit=20):
+        query = 'SELECT id FROM runs' + (' WHERE suite = ?' if suite else '') + ' ORDER BY id DESC LIMIT ?'
+        ids = self.db.execute(query, (suite, limit) if suite else (limit,)).fetchall()
+        return [self.run(run_id) for (run_id,) in ids]
+
+    def samples(self, run_id):
+        samples = {}
+        for metric, value in self.db.execute('SELECT metric, value FROM samples WHERE run_id = ?', (run_id,)):
+            samples.setdefault(metric, []).append(value)
+        return samples
+
+    def baseline(self, run, window=20):
+        """{metric: [per-run value lists]} from the last window runs before run"""
+        ids = [row[0] for row in self.db.execute(
+            "SELECT id FROM runs WHERE suite = ? AND environment = ? AND id < ? "
+            "ORDER BY id DESC LIMIT ?", (run['suite'], run['environment'], run['id'], window))]
+        by_metric = {}
+        if not ids:
+            return by_metric
+        marks = ','.join('?' * len(ids))
+        per_run = {}
+        for run_id, metric, value in self.db.execute(
+                f'SELECT run_id, metric, value FROM samples WHERE run_id IN ({marks})', ids):
+            per_run.setdefault((metric, run_id), []).append(value)
+        for (metric, _), values in per_run.items():
+            by_metric.setdefault(metric, []).append(values)
+        return by_metric
+
+    def history(self, metric, suite=None, limit=30):
+        query = ('SELECT r.id, r.git_sha, r.started_at, r.status, s.value FROM samples s JOIN runs r ON r.id = s.run_id '
+                 'WHERE s.metric = ?' + (' AND r.suite = ?' if suite else '') + ' ORDER BY r.id DESC LIMIT ?')
+        return self.db.execute(query, (metric, suite, limit) if suite else (metric, limit)).fetchall()
+
+    def compare(self, run_id, window=20, alpha=0.01, min_ratio=1.10, min_runs=MIN_RUNS):
+        """Comparison rows for every metric of a run (multiple-comparison corrected), slowest ratio first"""
+        run = self.run(run_id)
+        baseline = self.baseline(run, window)
+        rows = [compare_metric(metric, values, baseline.get(metric, []), alpha, min_runs)
+                for metric, values in self.samples(run_id).items()]
+        return sorted(judge(rows, alpha, min_ratio), key=lambda r: -(r.get('ratio') or 0))
+
+
+def print_comparison(run, rows, show=10, min_runs=MIN_RUNS):
+    """Print the verdicts; returns the slower rows"""
+    slower = [r for r in rows if r['verdict'] == 'slower']
+    faster = [r for r in rows if r['verdict'] == 'faster']
+    insufficient = [r for r in rows if r['verdict'] == 'insufficient']
+    print(f"\n📈 PERFORMANCE BASELINE ({run['suite']} @ {run['environment']}, run {run['id']}, "
+          f"{run['git_sha'] or 'no git'}{' dirty' if run['git_dirty'] else ''})")
+    print("=" * 60)
+    if len(insufficient) == len(rows):
+        print(f"   Collecting baseline: {len(rows)} metrics recorded, "
+              f"comparisons start after {min_runs - min((r['baseline_runs'] for r in rows), default=0)} more runs")
+        return slower
+    for r in slower[:show]:
+        detail = (f"p={r['p_value']:.4f}" if r['method'] == 'mann-whitney'
+                  else f"band {r['band_low']:,.1f}-{r['band_high']:,.1f}, p={r['p_value']:.2g}")
+        print(f"   🐢 {r['metric']}: {r['baseline']:,.1f} → {r['current']:,.1f} (×{r['ratio']:.2f}, {detail})")
+    for r in faster[:show]:
+        print(f"   🚀 {r['metric']}: {r['baseline']:,.1f} → {r['current']:,.1f} (×{r['ratio']:.2f})")
+    print(f"   {len(slower)} slower, {len(faster)} faster, "
+          f"{len(rows) - len(slower) - len(faster) - len(insufficient)} unchanged, {len(insufficient)} without a baseline")
+    return slower
+
+
+def record_and_compare(suite, samples, window=20, path=None):
+    """Store a run, compare it with the rolling baseline and print the verdicts.
+
+    Returns the slower rows (empty when recording is disabled or fails, so a
+    broken store never fails the tests themselves).
+    """
+    if os.environ.get('CRM_BASELINE', '').lower() in ('0', 'off', 'false', 'no') or not samples:
+        return []
+    try:
+        store = BaselineStore(path or DEFAULT_PATH)
+        try:
+            run_id = store.record_run(suite, samples)
+            slower = print_comparison(store.run(run_id), store.compare(run_id, window))
+            store.set_status(run_id, 'regressed' if slower else 'ok')
+        finally:
+            store.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not update the performance baseline: {e}")
+        return []
+    return slower
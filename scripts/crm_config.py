@@ -0,0 +1,11 @@
+"""
+Shared CRM Script Configuration
+Target deployment and admin credentials used by the automation scripts.
+Every value can be overridden through the environment.
+"""
+
+import os
+
+BASE_URL = os.environ.get('CRM_BASE_URL', 'https://epg-crm.vercel.app').rstrip('/')
+USERNAME = os.environ.get('CRM_USERNAME', 'MarkandLouie2025@')
+PASSWORD = os.environ.get('CRM_PASSWORD', 'ySz7JY^4tj@GmUqK')
@@ -0,0 +1,269 @@
+"""
+Import Route CSV Dialect
+Record boundaries and a streaming parser for the CSV dialect of the import
+route's parseCSV: every field is trimmed, CR, LF and CRLF each end a row
+outside quotes, "" is an escaped quote inside quotes, a quote anywhere
+else toggles quoting (even mid-field), and rows whose fields are all empty
+are dropped. Multi-line values like the "comment" column in "10 rows.csv"
+stay whole.
+"""
+
+import contextlib
+import csv
+import io
+import mmap
+import re
+
+from crm_import import JS_WHITESPACE, js_trim
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+PARSE_BLOCK_SIZE = 8 << 20
+UTF8_BOM = b'\xef\xbb\xbf'
+_NOT_STRUCTURAL = bytes(b for b in range(256) if b not in b'"\r\n')
+_NOT_QUOTE_OR_LF = bytes(b for b in range(256) if b not in b'"\n')
+
+# One field and what ends it. Possessive quantifiers mirror the parser's greedy
+# look-ahead for "" and stop the engine re-pairing quotes by backtracking; an
+# unterminated quoted segment runs to the end of the input, as in parseCSV.
+_FIELD = re.compile(r'((?:[^",\r\n]++|"(?:[^"]++|"")*+(?:"|\Z))*+)(,|\r\n|\r|\n|\Z)')
+_QUOTED = re.compile(r'"((?:[^"]++|"")*+)(?:"|\Z)')
+_ROW_END = re.compile(rb'\r\n|\r|\n')
+
+
+def iter_records(f, block_size=DEFAULT_BLOCK_SIZE):
+    """Yield (offset, record_bytes) for each record of a binary file, row end included.
+
+    Every '"' toggles parseCSV's in-quotes state (an escaped "" toggles it
+    twice), so a CR, LF or CRLF ends a record exactly when the quotes seen
+    before it are even. Raises ValueError if the file ends inside a quoted field.
+    """
+    offset = 0
+    pending = b''
+    scanned = 0
+    in_quotes = False
+    while True:
+        block = f.read(block_size)
+        if not block:
+            break
+        pending = pending + block if pending else block
+        start, pos = 0, scanned
+        while True:
+            row_end = _ROW_END.search(pending, pos)
+            if row_end is None or row_end.end() == len(pending) and row_end.group() == b'\r':
+                # None left, or a CR whose LF may start the next block
+                break
+            if pending.count(b'"', pos, row_end.start()) & 1:
+                in_quotes = not in_quotes
+            pos = row_end.end()
+            if not in_quotes:
+                yield offset, pending[start:pos]
+                offset += pos - start
+                start = pos
+        pending = pending[start:]
+        scanned = pos - start
+
+    if pending:
+        if in_quotes != bool(pending.count(b'"', scanned) & 1):
+            raise ValueError(f"unterminated quoted field in the record starting at byte {offset}")
+        yield offset, pending
+
+
+def header_fields(record):
+    """Column names from a header record, trimmed like parseCSV does"""
+    text = record.decode('utf-8-sig', 'replace')
+    return [js_trim(name) for name in next(csv.reader(io.StringIO(text)), [])]
+
+
+def plan_chunks(f, rows_per_chunk=500, max_bytes=None, block_size=DEFAULT_BLOCK_SIZE):
+    """Split a CSV into row-safe chunks without holding it in memory.
+
+    Returns (header_bytes, chunks) where each chunk is a dict with its byte
+    offset and length in the file, the 1-based number of its first data
+    record and its record count. Prepend header_bytes to a chunk's bytes to
+    get a standalone CSV.
+    """
+    records = iter_records(f, block_size)
+    first = next(records, None)
+    if first is None:
+        return b'', []
+    header = first[1] if first[1].endswith(b'\n') else first[1] + b'\n'
+
+    chunks = []
+    current = None
+    row = 0
+    for offset, record in records:
+        row += 1
+        if current and (current['rows'] >= rows_per_chunk or
+                        (max_bytes and current['length'] + len(record) > max_bytes)):
+            chunks.append(current)
+            current = None
+        if current is None:
+            current = {'index': len(chunks), 'offset': offset, 'length': 0, 'first_row': row, 'rows': 0}
+        current['length'] += len(record)
+        current['rows'] += 1
+    if current:
+        chunks.append(current)
+    return header, chunks
+
+
+def _unquote(raw):
+    """Field value of raw field text that contains quotes"""
+    inner = raw[1:-1]
+    if len(raw) > 1 and raw[0] == '"' and raw[-1] == '"' and '"' not in inner.replace('""', ''):
+        # The common case: one quoted segment spanning the whole field
+        return inner.replace('""', '"')
+    return _QUOTED.sub(lambda m: m.group(1).replace('""', '"'), raw)
+
+
+def _parse_rows_regex(text):
+    rows = []
+    row = []
+    for raw, end in _FIELD.findall(text):
+        row.append(js_trim(_unquote(raw) if '"' in raw else raw))
+        if end != ',':
+            if any(row):
+                rows.append(row)
+            row = []
+    return rows
+
+
+def parse_rows(text):
+    """parseCSV's intermediate rows (lists of trimmed values) for one string.
+
+    Splitting on '"' alternates outside/inside-quote segments, and an empty
+    outside segment between two inside ones is exactly an escaped "". The
+    outside segments' separators become control-character sentinels, so
+    rows and fields come out of str.split() instead of a per-character loop.
+    """
+    if '\x00' in text or '\x01' in text or '\x02' in text:
+        return _parse_rows_regex(text)
+    segments = text.split('"')
+    outside = ('\x02'.join(segments[0::2])
+               .replace('\r\n', '\x01').replace('\r', '\x01').replace('\n', '\x01').replace(',', '\x00')
+               # Twice, because str.replace() does not revisit the separator it just matched
+               .replace('\x02\x02', '\x02"\x02').replace('\x02\x02', '\x02"\x02')
+               .split('\x02'))
+    if len(segments) % 2 == 0 and len(outside) > 1 and not outside[-1]:
+        # Unterminated quote: the last outside segment is still followed by an inside one
+        outside[-1] = '"'
+    segments[0::2] = outside
+    rows = ([value.strip(JS_WHITESPACE) for value in row.split('\x00')] for row in ''.join(segments).split('\x01'))
+    return [row for row in rows if any(row)]
+
+
+def _blocks(buf, block_size, start=0, end=None):
+    """Slices of buf[start:end] (bytes or mmap) that each end outside quotes on a row end"""
+    pos = start + 3 if start == 0 and buf[:3] == UTF8_BOM else start
+    size = len(buf) if end is None else end
+    while pos < size:
+        end = min(pos + block_size, size)
+        block = buf[pos:end]
+        if end < size:
+            cut = len(block)
+            while cut > 0:
+                # The last LF or CR, but not a final CR whose LF is in the next block
+                cut = max(block.rfind(b'\n', 0, cut), block.rfind(b'\r', 0, min(cut, len(block) - 1)))
+                if cut < 0 or not block.count(b'"', 0, cut) & 1:
+                    break
+            if cut < 0:
+                # A single record longer than the block
+                block_size *= 2
+                continue
+            block = block[:cut + 1]
+        yield block
+        pos += len(block)
+
+
+def iter_rows(buf, block_size=PARSE_BLOCK_SIZE, start=0, end=None):
+    """Stream parseCSV's rows from bytes or an mmap without decoding it whole.
+
+    Blocks always end on a record boundary, so each one is decoded
+    (File.text() semantics: UTF-8, invalid bytes replaced, leading BOM
+    dropped) and parsed independently. start and end must be record
+    boundaries, such as the ones shard_ranges() returns.
+    """
+    for block in _blocks(buf, block_size, start, end):
+        yield from parse_rows(block.decode('utf-8', 'replace'))
+
+
+def count_records(buf, block_size=PARSE_BLOCK_SIZE):
+    """Row ends parseCSV sees (CR, LF or CRLF outside quotes), at memory-scan speed.
+
+    Each block is reduced to its quotes and line breaks, and adjacent quote
+    pairs cancel out, which keeps every line break's quote parity. An upper
+    bound on the parser's row count: all-empty rows are counted here but
+    dropped by the parser.
+    """
+    records = 0
+    closed = True
+    for block in _blocks(buf, block_size):
+        if block.count(b'\r') == block.count(b'\r\n'):
+            # Every CR belongs to a CRLF, so the LFs alone mark the row ends
+            reduced = block.translate(None, _NOT_QUOTE_OR_LF)
+        else:
+            reduced = block.replace(b'\r\n', b'\n').translate(None, _NOT_STRUCTURAL)
+        segments = reduced.replace(b'""', b'').split(b'"')
+        outside = b''.join(segments[0::2])
+        records += len(outside)
+        # Balanced quotes and a trailing row end mean no unterminated last row
+        closed = len(segments) % 2 == 1 and block.endswith((b'\n', b'\r'))
+    return records if closed else records + 1
+
+
+def _count_quotes(buf, start, end, step=PARSE_BLOCK_SIZE):
+    return sum(buf[pos:min(pos + step, end)].count(b'"') for pos in range(start, end, step))
+
+
+def shard_ranges(buf, count):
+    """Split buf into about count (start, end) byte ranges that begin and end on record boundaries.
+
+    One pass of quote counting (memory speed) tracks the in-quotes state up to
+    each cut, then the cut moves forward to the first '\\n' outside quotes.
+    """
+    size = len(buf)
+    cuts = [0]
+    scanned, parity = 0, 0
+    for k in range(1, count):
+        target = size * k // count
+        if target <= scanned:
+            continue
+        parity ^= _count_quotes(buf, scanned, target) & 1
+        scanned = target
+        while True:
+            newline = buf.find(b'\n', scanned)
+            if newline < 0:
+                scanned = size
+                break
+            parity ^= _count_quotes(buf, scanned, newline) & 1
+            scanned = newline + 1
+            if not parity:
+                cuts.append(scanned)
+                break
+        if scanned >= size:
+            break
+    cuts.append(size)
+    return [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+def as_records(rows):
+    """parseCSV's final step: key each row by the header row, '' for missing values"""
+    rows = iter(rows)
+    headers = next(rows, None)
+    if headers is None:
+        return
+    for values in rows:
+        yield {header: values[index] if index < len(values) and values[index] else ''
+               for index, header in enumerate(headers)}
+
+
+@contextlib.contextmanager
+def open_mapped(path):
+    """Read-only mmap of a file (b'' when it is empty, which mmap cannot map)"""
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b''
+            return
+        with mapped:
+            yield mapped
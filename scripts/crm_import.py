@@ -0,0 +1,441 @@
+"""
+Import Route Port
+Python port of the parsing and validation in src/app/api/admin/import/route.ts
+(parseCSV, processFieldValue and the per-row mapping loop) and of the header
+auto-mapping in src/app/admin/import/page.tsx. Used by the local stand-in
+server and the import tooling so both agree with the real route row for row.
+
+Dates are converted as the route would on a server running with TZ=UTC.
+"""
+
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+# Valid product IDs from the enquiry form
+VALID_PRODUCTS = ['steinway', 'boston', 'essex', 'kawai', 'yamaha', 'usedpiano', 'roland', 'ritmuller', 'ronisch', 'kurzweil', 'other']
+
+VALID_NATIONALITIES = ['English', 'Chinese', 'Korean', 'Japanese', 'Indian', 'Other']
+
+VALID_STATES = [
+    "Australian Capital Territory", "New South Wales", "Northern Territory",
+    "Queensland", "South Australia", "Tasmania", "Victoria", "Western Australia"
+]
+
+# State abbreviation mapping for legacy data
+STATE_ABBREVIATIONS = {
+    'ACT': 'Australian Capital Territory',
+    'NSW': 'New South Wales',
+    'NT': 'Northern Territory',
+    'QLD': 'Queensland',
+    'SA': 'South Australia',
+    'TAS': 'Tasmania',
+    'VIC': 'Victoria',
+    'WA': 'Western Australia',
+}
+
+VALID_RATINGS = [
+    "N/A", "Ready to buy", "High Priority", "After Sale Follow Up",
+    "Very interested but not ready to buy", "Looking for information",
+    "Just browsing for now", "Cold", "Events", "Unknown"
+]
+
+VALID_CLASSIFICATIONS = list(VALID_RATINGS)
+
+VALID_STATUSES = ['New', 'Sold', 'Finalised', 'Finalized']
+
+# FORM_FIELDS keys marked required on the import page
+REQUIRED_FORM_FIELDS = {'firstName', 'lastName', 'email'}
+
+# Non-nullable String columns on the Prisma Enquiry model - create() rejects rows without them
+PRISMA_REQUIRED = ('firstName', 'lastName', 'email', 'state')
+
+# String.prototype.trim() strips ECMAScript WhiteSpace and LineTerminator, which
+# differs from str.strip() (JS also strips U+FEFF; Python also strips \x1c-\x1f and \x85)
+JS_WHITESPACE = (
+    '\t\n\v\f\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006'
+    '\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff'
+)
+
+DATE_FIELDS = ('createdAt', 'bestTimeToFollowUp', 'inputDate', 'lastUpdate', 'originalFupDate')
+
+
+def js_trim(value):
+    return value.strip(JS_WHITESPACE)
+
+
+def _js_string(value):
+    """String(value) for the JSON scalar types an import row can hold"""
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value is None:
+        return 'null'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def parse_csv(text):
+    """parseCSV: quote-aware rows -> list of dicts keyed by the header row"""
+    rows = []
+    current_row = []
+    field = []
+    in_quotes = False
+    i = 0
+    n = len(text)
+
+    while i < n:
+        char = text[i]
+        if char == '"':
+            if in_quotes and i + 1 < n and text[i + 1] == '"':
+                # Escaped quote within quoted field
+                field.append('"')
+                i += 2
+            else:
+                in_quotes = not in_quotes
+                i += 1
+        elif char == ',' and not in_quotes:
+            current_row.append(js_trim(''.join(field)))
+            field = []
+            i += 1
+        elif (char == '\n' or char == '\r') and not in_quotes:
+            current_row.append(js_trim(''.join(field)))
+            if any(value != '' for value in current_row):
+                rows.append(current_row)
+            current_row = []
+            field = []
+            i += 2 if char == '\r' and i + 1 < n and text[i + 1] == '\n' else 1
+        else:
+            field.append(char)
+            i += 1
+
+    # Add the last field and row if not empty
+    if field or current_row:
+        current_row.append(js_trim(''.join(field)))
+        if any(value != '' for value in current_row):
+            rows.append(current_row)
+
+    if len(rows) < 2:
+        return []
+
+    headers = rows[0]
+    data = []
+    for values in rows[1:]:
+        row = {}
+        for index, header in enumerate(headers):
+            row[header] = values[index] if index < len(values) and values[index] else ''
+        data.append(row)
+    return data
+
+
+def _iso(dt):
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.') + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _date_from_parts(year, month, day, hour=0, minute=0, second=0):
+    """new Date(y, m - 1, d, ...) - out-of-range parts roll over instead of failing"""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    base = datetime(year, month, 1, tzinfo=timezone.utc)
+    return base + timedelta(days=day - 1, hours=hour, minutes=minute, seconds=second)
+
+
+_DMY = re.compile(r'^\d{1,2}/\d{1,2}/\d{4}')
+_YMD = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2})(?:\.(\d{1,3}))?)?)?(Z)?$')
+
+
+def _parse_date(value):
+    if '0000-00-00' in value or '1000-01-01' in value:
+        return None
+    try:
+        if _DMY.match(value):
+            day, month, year = value.split('/')[:3]
+            # parseInt reads the leading digits and ignores the rest ("2019 10:00")
+            year = int(re.match(r'\d+', year).group())
+            return _iso(_date_from_parts(year, int(month), int(day)))
+        match = _YMD.match(value)
+        if match:
+            year, month, day, hour, minute, second, millis, _ = match.groups()
+            if not 1 <= int(month) <= 12 or not 1 <= int(day) <= 31:
+                return None
+            dt = datetime(int(year), int(month), 1, tzinfo=timezone.utc) + timedelta(
+                days=int(day) - 1, hours=int(hour or 0), minutes=int(minute or 0),
+                seconds=int(second or 0), milliseconds=int((millis or '0').ljust(3, '0'))
+            )
+            return _iso(dt)
+        # General date strings: the common shapes V8's fallback parser accepts
+        for fmt in ('%Y-%m-%dT%H:%M:%S%z', '%d %B %Y', '%d %b %Y', '%B %d, %Y', '%b %d, %Y', '%Y/%m/%d'):
+            try:
+                dt = datetime.strptime(value, fmt)
+                return _iso(dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc))
+            except ValueError:
+                continue
+    except (ValueError, OverflowError):
+        return None
+    return None
+
+
+def process_field_value(field_name, value):
+    """processFieldValue: normalise one mapped value, or None to leave the field unset"""
+    if not value or _js_string(value) == '' or js_trim(_js_string(value)) == '' or _js_string(value).upper() == 'NULL':
+        return None
+
+    string_value = js_trim(_js_string(value))
+
+    if field_name == 'productInterest':
+        if string_value.startswith('[') and string_value.endswith(']'):
+            try:
+                parsed = json.loads(string_value)
+                products = [p for p in parsed if p.lower() in VALID_PRODUCTS] if isinstance(parsed, list) else []
+            except (ValueError, AttributeError):
+                products = []
+        else:
+            split_products = [js_trim(p).lower() for p in string_value.split(',')]
+            valid = [p for p in split_products if p in VALID_PRODUCTS]
+            products = valid if valid else [string_value.lower()]
+        return ', '.join(products) if products else None
+
+    if field_name == 'doNotEmail':
+        return string_value.lower() in ('true', '1', 'yes')
+
+    if field_name in DATE_FIELDS:
+        return _parse_date(string_value)
+
+    if field_name == 'nationality':
+        found = next((n for n in VALID_NATIONALITIES if n.lower() == string_value.lower()), None)
+        return found or string_value
+
+    if field_name == 'state':
+        upper = string_value.upper()
+        if upper in STATE_ABBREVIATIONS:
+            return STATE_ABBREVIATIONS[upper]
+        lower = string_value.lower()
+        found = next((s for s in VALID_STATES if s.lower() == lower or lower in s.lower()), None)
+        return found or string_value
+
+    if field_name == 'customerRating':
+        found = next((r for r in VALID_RATINGS if r.lower() == string_value.lower()), None)
+        return found or 'N/A'
+
+    if field_name == 'classification':
+        found = next((c for c in VALID_CLASSIFICATIONS if c.lower() == string_value.lower()), None)
+        return found or string_value or 'N/A'
+
+    if field_name == 'status':
+        found = next((s for s in VALID_STATUSES if s.lower() == string_value.lower()), None)
+        if found == 'Finalized':
+            return 'Finalised'
+        return found or 'New'
+
+    return string_value
+
+
+# Optional Prisma columns copied across when the mapping produced a value
+_OPTIONAL_FIELDS = (
+    'status', 'institutionName', 'phone', 'nationality', 'suburb', 'productInterest',
+    'source', 'eventSource', 'comments', 'others', 'submittedBy', 'customerRating',
+    'stepProgram', 'salesManagerInvolved', 'salesManagerExplanation', 'followUpNotes',
+)
+_OPTIONAL_DATES = ('bestTimeToFollowUp', 'inputDate', 'lastUpdate', 'originalFupDate')
+
+
+def build_record(row, index, mappings, custom_field_map, file_name, now=None):
+    """Map one parsed row to the prismaData object, or raise ValueError with the route's error text"""
+    mapped, custom_data, missing = {}, {}, []
+
+    for mapping in mappings:
+        target = mapping.get('targetField')
+        if not target:
+            continue
+        source_value = row.get(mapping.get('sourceField'))
+        if mapping.get('isRequired') and not source_value:
+            missing.append(target)
+            continue
+        if target in custom_field_map:
+            custom_data[target] = {'label': custom_field_map[target].get('label'), 'value': source_value or None}
+        else:
+            processed = process_field_value(target, source_value)
+            if processed is not None:
+                mapped[target] = processed
+
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+    mapped.setdefault('status', 'New')
+    mapped.setdefault('customerRating', 'N/A')
+    mapped.setdefault('stepProgram', 'N/A')
+    mapped.setdefault('salesManagerInvolved', 'No')
+    mapped.setdefault('doNotEmail', False)
+
+    now = now or datetime.now(timezone.utc)
+    record = {
+        'createdAt': mapped.get('createdAt') or _iso(now),
+        'updatedAt': _iso(now),
+        'importSource': mapped.get('importSource') or f"Import from {file_name}",
+        'originalId': mapped.get('originalId') or row.get('id') or row.get('ID') or f"import_{int(time.time() * 1000)}_{index}",
+    }
+    for field in PRISMA_REQUIRED:
+        record[field] = mapped.get(field)
+    for field in _OPTIONAL_FIELDS:
+        if mapped.get(field):
+            record[field] = mapped[field]
+    for field in _OPTIONAL_DATES:
+        if mapped.get(field):
+            record[field] = mapped[field]
+    for field in ('fupStatus', 'enquiryUpdatedBy'):
+        if mapped.get(field):
+            record[field] = mapped[field]
+    record['doNotEmail'] = mapped['doNotEmail']
+    if custom_data:
+        record['followUpInfo'] = json.dumps(custom_data, separators=(',', ':'))
+    return record
+
+
+class UniqueConstraintError(Exception):
+    """Prisma P2002: a row with the same (importKey, originalId) already exists"""
+
+
+def import_key(import_id, text):
+    """The route's idempotency key: the client's importId, else a SHA-256 of the uploaded text"""
+    return import_id or hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _is_empty_row(row):
+    return not row or all(not value for value in row.values())
+
+
+def prefetch_original_ids(raw_rows, mappings, custom_fields):
+    """originalIds the route's idempotent pre-fetch looks up: the mapped originalId column first, then id/ID"""
+    custom_field_map = {field['key']: field for field in custom_fields}
+    mapping = None if 'originalId' in custom_field_map else next(
+        (m for m in reversed(mappings) if m.get('targetField') == 'originalId'), None)
+    ids = set()
+    for row in raw_rows:
+        if not row:
+            continue
+        value = (mapping and process_field_value('originalId', row.get(mapping.get('sourceField')))) \
+            or row.get('id') or row.get('ID')
+        if value:
+            ids.add(_js_string(value))
+    return ids
+
+
+def import_rows(raw_rows, mappings, custom_fields, file_name, create, imported_ids=None, key=None):
+    """The route's per-row loop; create(record) persists one row or raises.
+
+    key enables the route's idempotent mode: rows are tagged with it as
+    importKey, rows whose originalId is in imported_ids (already stored under
+    that key) are skipped, and so are rows create() rejects with
+    UniqueConstraintError. The set grows as rows are created.
+
+    Returns the route's results dict (imported, skipped, errors, errorDetails,
+    plus alreadyImported in idempotent mode).
+    """
+    active = [m for m in mappings if m.get('targetField') != '']
+    custom_field_map = {field['key']: field for field in custom_fields}
+    if key is not None and imported_ids is None:
+        imported_ids = set()
+    results = {'imported': 0, 'skipped': 0, 'errors': 0, 'errorDetails': []}
+    already_imported = 0
+
+    for i, row in enumerate(raw_rows):
+        row_index = i + 1
+        if _is_empty_row(row):
+            results['skipped'] += 1
+            continue
+        try:
+            record = build_record(row, i, active, custom_field_map, file_name)
+        except ValueError as e:
+            results['errors'] += 1
+            results['errorDetails'].append(f"Row {row_index}: {e}")
+            continue
+        try:
+            missing = [field for field in PRISMA_REQUIRED if record.get(field) is None]
+            if missing:
+                raise ValueError(f"Argument `{missing[0]}` is missing.")
+            if key is not None:
+                if _js_string(record['originalId']) in imported_ids:
+                    results['skipped'] += 1
+                    already_imported += 1
+                    continue
+                record['importKey'] = key
+            create(record)
+            results['imported'] += 1
+            if key is not None:
+                imported_ids.add(_js_string(record['originalId']))
+        except UniqueConstraintError:
+            # Written since the lookup by a concurrent attempt at the same rows
+            results['skipped'] += 1
+            already_imported += 1
+        except Exception as e:
+            results['errors'] += 1
+            results['errorDetails'].append(f"Row {row_index}: Database error - {e}")
+
+    if key is not None:
+        results['alreadyImported'] = already_imported
+    return results
+
+
+def import_message(results, custom_fields):
+    suffix = f" Custom fields: {', '.join(f.get('label', '') for f in custom_fields)}" if custom_fields else ''
+    return f"Import completed. {results['imported']} records imported successfully.{suffix}"
+
+
+def auto_map(headers):
+    """The import page's auto-suggested mappings for a list of CSV headers"""
+    mappings = []
+    for source in headers:
+        normalized = re.sub(r'[_-]', '', re.sub(r'\s+', '', source.lower()))
+        exact = {
+            'firstname': 'firstName', 'surname': 'lastName', 'email': 'email', 'phone': 'phone',
+            'state': 'state', 'suburb': 'suburb', 'source': 'source', 'interest': 'productInterest',
+            'others': 'others', 'comment': 'comments', 'fup': 'followUpNotes',
+            'calltakenby': 'submittedBy', 'enquirysource': 'eventSource', 'inputdate': 'createdAt',
+            'status': 'status', 'classification': 'customerRating', 'newsletter': 'doNotEmail',
+            'institutionname': 'institutionName', 'nationality': 'nationality',
+        }
+        has = lambda *words: any(w in normalized for w in words)
+        if normalized in exact:
+            target = exact[normalized]
+        elif 'first' in normalized and 'name' in normalized:
+            target = 'firstName'
+        elif 'last' in normalized and 'name' in normalized:
+            target = 'lastName'
+        elif normalized == 'lastname':
+            target = 'lastName'
+        elif has('email'):
+            target = 'email'
+        elif has('phone', 'mobile'):
+            target = 'phone'
+        elif has('state'):
+            target = 'state'
+        elif has('suburb', 'city'):
+            target = 'suburb'
+        elif has('nationality', 'country'):
+            target = 'nationality'
+        elif has('institution', 'company'):
+            target = 'institutionName'
+        elif has('product', 'piano', 'interest'):
+            target = 'productInterest'
+        elif has('source'):
+            target = 'source'
+        elif has('comment', 'note'):
+            target = 'comments'
+        elif has('status'):
+            target = 'status'
+        elif has('rating'):
+            target = 'customerRating'
+        elif has('classification', 'class'):
+            target = 'customerRating'
+        elif has('date', 'created'):
+            target = 'createdAt'
+        elif has('staff', 'submitt'):
+            target = 'submittedBy'
+        else:
+            target = ''
+        mappings.append({'sourceField': source, 'targetField': target, 'isRequired': target in REQUIRED_FORM_FIELDS})
+    return mappings
@@ -0,0 +1,186 @@
+"""
+Request-Interception Profiles
+Named page/context routing profiles that keep functional runs from loading
+what their assertions never look at:
+
+  full      - everything loads (the reference the savings are measured against)
+  no-media  - images, video, fonts and analytics beacons are aborted; the
+              Pusher realtime socket (src/lib/useRealTimeAnalytics.ts) is
+              answered by a local stub instead of connecting to ws-ap1.pusher.com
+  api-only  - as no-media, plus stylesheets and other non-script assets, so
+              only documents, scripts and fetch/XHR calls reach the network
+
+Bytes saved are estimated from the sizes a 'full' run observed for the same
+URLs, and time saved from that flow's last 'full' timings; both are kept in
+.crm-intercept.json so any run can report its savings.
+"""
+
+import asyncio
+import json
+import os
+import re
+import statistics
+from collections import Counter
+
+CACHE_PATH = '.crm-intercept.json'
+MAX_CACHED_URLS = 5000
+
+# Third-party endpoints that never affect what the flows assert
+BEACON_URLS = re.compile(r'^https?://([\w-]+\.)*(pusher\.com|pusherapp\.com|vercel-insights\.com|'
+                         r'google-analytics\.com|googletagmanager\.com)/|/_vercel/(insights|speed-insights)/')
+PUSHER_SOCKET = re.compile(r'^wss?://ws[\w-]*\.pusher(app)?\.com/')
+
+PROFILES = {
+    'full': {'types': frozenset(), 'beacons': False, 'stub_pusher': False},
+    'no-media': {'types': frozenset({'image', 'media', 'font'}), 'beacons': True, 'stub_pusher': True},
+    'api-only': {'types': frozenset({'image', 'media', 'font', 'stylesheet', 'manifest', 'texttrack', 'other'}),
+                 'beacons': True, 'stub_pusher': True},
+}
+LEARNED_TYPES = PROFILES['api-only']['types']
+
+
+def _load_cache(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cache.setdefault('sizes', {})
+    cache.setdefault('timings', {})
+    return cache
+
+
+class InterceptionProfile:
+    """Applies one profile to a page or context and counts what it kept off the network"""
+
+    def __init__(self, name=None, cache_path=CACHE_PATH):
+        self.name = name or os.environ.get('CRM_PROFILE', 'full')
+        if self.name not in PROFILES:
+            raise SystemExit(f"❌ Unknown interception profile {self.name!r} ({', '.join(PROFILES)})")
+        self.rules = PROFILES[self.name]
+        self.cache_path = cache_path
+        self.cache = _load_cache(cache_path)
+        self.blocked = Counter()
+        self.blocked_bytes = 0
+        self.unknown_size = 0
+        self.sockets_stubbed = 0
+        self._pending = set()
+
+    @property
+    def suffix(self):
+        """'' for the full profile, '-<name>' otherwise (keeps perf baselines per profile)"""
+        return '' if self.name == 'full' else f'-{self.name}'
+
+    async def apply(self, target):
+        """Install the profile on a Page or BrowserContext; returns self"""
+        if self.rules['types'] or self.rules['beacons']:
+            await target.route('**/*', self._handle)
+        if self.rules['stub_pusher']:
+            if hasattr(target, 'route_web_socket'):
+                await target.route_web_socket(PUSHER_SOCKET, self._stub_pusher)
+            else:
+                print("⚠️ This Playwright has no route_web_socket (needs 1.48+); the Pusher socket still connects")
+        if self.name == 'full':
+            # The reference run learns what each blockable asset weighs
+            target.on('requestfinished', self._learn_size)
+        return self
+
+    def _should_block(self, request):
+        if request.resource_type in self.rules['types']:
+            return True
+        return self.rules['beacons'] and bool(BEACON_URLS.search(request.url))
+
+    async def _handle(self, route):
+        request = route.request
+        if not self._should_block(request):
+            await route.fallback()
+            return
+        self.blocked[request.resource_type] += 1
+        size = self.cache['sizes'].get(request.url.split('#')[0])
+        if size is None:
+            self.unknown_size += 1
+        else:
+            self.blocked_bytes += size
+        await route.abort('blockedbyclient')
+
+    def _stub_pusher(self, ws):
+        """Speak just enough of the Pusher protocol that the client settles as connected"""
+        self.sockets_stubbed += 1
+        ws.send(json.dumps({'event': 'pusher:connection_established',
+                            'data': json.dumps({'socket_id': '0.0', 'activity_timeout': 120})}))
+
+        def on_message(message):
+            try:
+                event = json.loads(message)
+            except (TypeError, ValueError):
+                return
+            if event.get('event') == 'pusher:subscribe':
+                ws.send(json.dumps({'event': 'pusher_internal:subscription_succeeded',
+                                    'channel': (event.get('data') or {}).get('channel'), 'data': '{}'}))
+            elif event.get('event') == 'pusher:ping':
+                ws.send(json.dumps({'event': 'pusher:pong', 'data': {}}))
+
+        ws.on_message(on_message)
+
+    def _learn_size(self, request):
+        if request.resource_type in LEARNED_TYPES or BEACON_URLS.search(request.url):
+            task = asyncio.ensure_future(self._read_size(request))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _read_size(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self.cache['sizes'][request.url.split('#')[0]] = sizes['responseBodySize'] + sizes['responseHeadersSize']
+
+    def record_timing(self, flow, seconds):
+        """Keep the last five run times of a flow under this profile"""
+        runs = self.cache['timings'].setdefault(flow, {}).setdefault(self.name, [])
+        runs.append(round(seconds, 3))
+        del runs[:-5]
+
+    def time_saved(self, flow, seconds):
+        """Seconds saved against the flow's median 'full' time, or None without one"""
+        reference = self.cache['timings'].get(flow, {}).get('full')
+        if self.name == 'full' or not reference:
+            return None
+        return statistics.median(reference) - seconds
+
+    async def save(self):
+        """Persist learned sizes and timings (atomic replace)"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        sizes = self.cache['sizes']
+        if len(sizes) > MAX_CACHED_URLS:
+            self.cache['sizes'] = dict(list(sizes.items())[-MAX_CACHED_URLS:])
+        tmp = self.cache_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f)
+        os.replace(tmp, self.cache_path)
+
+    async def report(self, timings):
+        """Print what the profile saved for each {flow: seconds}; also records the timings"""
+        for flow, seconds in timings.items():
+            self.record_timing(flow, seconds)
+        await self.save()
+
+        print(f"\n🚧 INTERCEPTION PROFILE: {self.name}")
+        print("=" * 60)
+        if self.name == 'full':
+            print(f"   Nothing blocked (reference run: {len(self.cache['sizes']):,} asset sizes known)")
+            return
+        blocked = sum(self.blocked.values())
+        by_type = ', '.join(f"{count} {kind}" for kind, count in self.blocked.most_common())
+        print(f"   🚫 {blocked} requests blocked{f' ({by_type})' if by_type else ''}")
+        if self.sockets_stubbed:
+            print(f"   🔌 {self.sockets_stubbed} Pusher socket(s) answered by the local stub")
+        unknown = f", {self.unknown_size} of unknown size (run once with --profile full)" if self.unknown_size else ''
+        print(f"   📦 ~{self.blocked_bytes / 1024:,.0f} KB not downloaded{unknown}")
+        for flow, seconds in timings.items():
+            saved = self.time_saved(flow, seconds)
+            if saved is None:
+                print(f"   ⏱️ {flow}: {seconds:.1f}s (no 'full' reference run yet)")
+            else:
+                print(f"   ⏱️ {flow}: {seconds:.1f}s, {saved * 1000:,.0f}ms saved against 'full'")
@@ -0,0 +1,223 @@
+"""
+Synthetic Legacy Enquiry CSV
+Seeded, constant-memory generator for files shaped like "10 rows.csv" (the old
+system's enquiry export): the same 28 columns and quoting style, multi-line
+quoted comments, HTML follow-up notes, state abbreviations, blank suburbs,
+placeholder dates, unquoted NULLs and a controllable share of duplicates
+matching what /api/admin/duplicates looks for (email, or name + phone).
+"""
+
+import random
+import time
+
+LEGACY_COLUMNS = [
+    'id', 'firstname', 'surname', 'email', 'phone', 'state', 'suburb', 'source', 'interest', 'others',
+    'comment', 'fup', 'calltakenby', 'enquirysource', 'inputdate', 'lastupdate', 'fupdate', 'status',
+    'classification', 'newsletter', 'institutionname', 'originalfupdate', 'fupstatus', 'nationality',
+    'stepprogram', 'involving', 'notinvolvingreason', 'enqupdatedby',
+]
+
+# Written unquoted, like the export does for SQL NULLs
+NULL = object()
+
+FIRST_NAMES = ['Ivan', 'Catherine', 'Cameron', 'Lisa', 'Samiul', 'David', 'Reuben', 'Mei', 'Hiroshi', 'Priya',
+               'Olivia', 'Jin', 'Grace', 'Tom', 'Sophie', 'Daniel', 'Emma', 'Wei', 'Anh', 'Rachel', 'Michael', 'Yuki']
+LAST_NAMES = ['Chan', 'Dillon', 'Soleimani', 'Truong', 'Amin', 'Logan', 'Nguyen', 'Smith', 'Tanaka', 'Patel',
+              'Wilson', 'Kim', 'Lee', 'Taylor', 'Wong', 'Brown', 'Singh', 'Zhang', 'Martin', 'Kelly']
+EMAIL_DOMAINS = ['live.com.au', 'hotmail.com', 'gmail.com', 'bigpond.com', 'outlook.com', 'yahoo.com.au', 'optusnet.com.au']
+
+# Mostly abbreviations (mapped via STATE_ABBREVIATIONS on import), with a tail of spelled-out and odd casings
+STATES = ['VIC', 'NSW', 'QLD', 'WA', 'SA', 'TAS', 'ACT', 'NT']
+STATE_VARIANTS = ['Victoria', 'New South Wales', 'vic', 'nsw', 'Qld', 'Queensland', 'Sydney']
+SUBURBS = ['St Leonards', 'Chatswood', 'Richmond', 'Box Hill', 'Parramatta', 'Carlton', 'Brisbane', 'Subiaco']
+
+SOURCES = ['Recommended by a friend', 'Google', 'Other : Walking by', 'EPG Pianos Website', 'YouTube',
+           'Teacher', 'Facebook', 'Steinway Website', 'Radio', 'Magazine/Newspaper']
+INTERESTS = ['Roland', 'Other', 'Steinway', 'Ritmuller', 'Boston', 'Essex', 'Kawai', 'Yamaha', 'Used Piano',
+             'Steinway,Boston', 'Roland, Kawai']
+STAFF = ['Rick', 'Careina', 'Chris', 'Alison', 'Mark', 'June', 'Louie', 'Hendra']
+ENQUIRY_SOURCES = ['Phone Enquiry - Steinway National Information Line', 'Other : Steinway Info Line',
+                   'In-store Enquiry - EPG Piano Warehouse', 'Events - Steinway Gallery St Leonards',
+                   'Events - Steinway Gallery Melbourne', 'Online Form']
+STATUSES = ['New', 'Sold', 'Finalized', 'Finalised', 'New', 'New']
+CLASSIFICATIONS = ['Unknown', 'Very interested but not ready to buy', 'Looking for information', 'Ready to buy',
+                   'Just browsing for now', 'Cold', 'High Priority']
+
+COMMENT_LINES = [
+    'Looking at HP603 for children', 'In store Inquiry', 'Dropped in didn\'t know about use.',
+    'Interested in the Model B S/H ', 'Needed to talk to someone about it and finances then will come back ',
+    'have invited to the CNY event and will send him email.', 'Looking at a grand Between 10-15K  Needs to go upstairs in house ',
+    'For 6year old son .', 'Called and inquired about F140R', 'Wants a "quiet" upright for an apartment, budget ~$8k',
+    'Teacher recommended a 5\'7" grand', 'Asked about hire, tuning, and delivery costs',
+]
+FUP_SENTENCES = [
+    'will bring Children in on weekend add to CNY invite list, will pass onto others in community.',
+    'Invite sent', 'Rick (09/06/16) made follow up call, only has a budget of $50k',
+    'Essex EGP183 &amp; Ritmuller GP188 compared', 'Customer went ahead and placed a phone order',
+    'Left voicemail, will try again Monday', 'Emailed brochure &amp; price list',
+]
+
+
+# inputdate runs from the old system's first export to the end of 2024, however many rows
+FIRST_ENTERED = 1_454_000_000
+LAST_ENTERED = 1_735_689_600
+# Gaps between consecutive ids (deleted records)
+ID_STEPS = (1, 1, 1, 2, 3, 5)
+
+
+def _timestamp(epoch):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(epoch))
+
+
+class LegacyRowGenerator:
+    """Yields legacy export rows (lists of str, with NULL for SQL nulls) from a seed"""
+
+    def __init__(self, seed=0, duplicate_rate=0.02, multiline_rate=0.4, html_fup_rate=0.6, blank_suburb_rate=0.85,
+                 abbreviation_rate=0.9, missing_email_rate=0.02, identity_pool=50_000, start_id=1):
+        self.rng = random.Random(seed)
+        self.duplicate_rate = duplicate_rate
+        self.multiline_rate = multiline_rate
+        self.html_fup_rate = html_fup_rate
+        self.blank_suburb_rate = blank_suburb_rate
+        self.abbreviation_rate = abbreviation_rate
+        self.missing_email_rate = missing_email_rate
+        self.identity_pool = identity_pool
+        self.start_id = start_id
+        self.next_id = start_id
+        # One hour per id until rows() knows how many rows it has to fit into the span
+        self.seconds_per_id = 3_600
+        # Bounded reservoir of earlier identities, so duplicates stay constant-memory
+        self._identities = []
+        self._seen = 0
+        self.duplicates = 0
+
+    def _new_identity(self):
+        rng = self.rng
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        email = f"{first}.{last}{rng.randrange(10_000)}@{rng.choice(EMAIL_DOMAINS)}".lower()
+        digits = f"04{rng.randrange(10 ** 8):08d}"
+        phone = digits if rng.random() < 0.6 else f"{digits[:4]} {digits[4:7]} {digits[7:]}"
+        return first, last, email, phone
+
+    def _remember(self, identity):
+        self._seen += 1
+        if len(self._identities) < self.identity_pool:
+            self._identities.append(identity)
+        else:
+            slot = self.rng.randrange(self._seen)
+            if slot < self.identity_pool:
+                self._identities[slot] = identity
+
+    def _duplicate_of(self, identity):
+        """Re-enquiry by the same person: email differs only in case/whitespace, or name + phone match"""
+        first, last, email, phone = identity
+        if self.rng.random() < 0.7:
+            return first, last, email.upper() if self.rng.random() < 0.3 else f" {email}", phone
+        return first, last, '', phone.replace(' ', '')
+
+    def _comment(self):
+        rng = self.rng
+        lines = rng.sample(COMMENT_LINES, rng.randint(1, 4))
+        if rng.random() >= self.multiline_rate:
+            return ' '.join(lines)
+        newline = '\r\n' if rng.random() < 0.3 else '\n'
+        return newline.join(lines) + (newline if rng.random() < 0.5 else '')
+
+    def _fup(self):
+        rng = self.rng
+        sentences = rng.sample(FUP_SENTENCES, rng.randint(1, 3))
+        if rng.random() >= self.html_fup_rate:
+            return ' '.join(sentences) + ('\n' if rng.random() < 0.2 else '')
+        paragraphs = [f"<p>{s}</p>" for s in sentences]
+        if rng.random() < 0.4:
+            paragraphs.insert(1, '<p>&nbsp;</p>')
+        return ('\r\n' if rng.random() < 0.2 else '\n').join(paragraphs)
+
+    def row(self):
+        rng = self.rng
+        if self._identities and rng.random() < self.duplicate_rate:
+            first, last, email, phone = self._duplicate_of(rng.choice(self._identities))
+            self.duplicates += 1
+        else:
+            first, last, email, phone = self._new_identity()
+            self._remember((first, last, email, phone))
+            if rng.random() < self.missing_email_rate:
+                email = ''
+
+        record_id = self.next_id
+        self.next_id += rng.choice(ID_STEPS)
+        offset = (record_id - self.start_id) * self.seconds_per_id
+        entered = min(FIRST_ENTERED + int(offset + rng.random() * self.seconds_per_id), LAST_ENTERED)
+        state = rng.choice(STATES) if rng.random() < self.abbreviation_rate else rng.choice(STATE_VARIANTS)
+        fupdate = rng.choice(['0000-00-00 00:00:00', '1000-01-01 00:00:00', _timestamp(entered + 86_400 * rng.randrange(1, 30))])
+
+        return [
+            str(record_id),
+            first + (' ' if rng.random() < 0.2 else ''),
+            last,
+            email,
+            phone,
+            state,
+            '' if rng.random() < self.blank_suburb_rate else rng.choice(SUBURBS),
+            rng.choice(SOURCES),
+            rng.choice(INTERESTS),
+            '' if rng.random() < 0.85 else 'Hire / Access to Steinway Piano for recording',
+            self._comment(),
+            self._fup() if rng.random() < 0.9 else '',
+            rng.choice(STAFF),
+            rng.choice(ENQUIRY_SOURCES),
+            _timestamp(entered),
+            _timestamp(min(entered + 86_400 * rng.randrange(30, 2_000), LAST_ENTERED)),
+            fupdate,
+            rng.choice(STATUSES),
+            rng.choice(CLASSIFICATIONS),
+            'Yes' if rng.random() < 0.85 else 'No',
+            '',
+            '1000-01-01 00:00:00',
+            '',
+            NULL,
+            '', '', '', '',
+        ]
+
+    def rows(self, count):
+        # Spread inputdate over FIRST_ENTERED..LAST_ENTERED (at most an hour apart), so large files stay in
+        # range; 1% headroom absorbs the random id gaps running above their mean
+        expected_ids = (self.next_id - self.start_id) + count * sum(ID_STEPS) / len(ID_STEPS) * 1.01
+        self.seconds_per_id = min(3_600, (LAST_ENTERED - FIRST_ENTERED) / expected_ids)
+        for _ in range(count):
+            yield self.row()
+
+
+def format_value(value):
+    if value is NULL:
+        return 'NULL'
+    if not value:
+        return ''
+    return '"' + value.replace('"', '""') + '"'
+
+
+def format_row(values):
+    return ','.join(format_value(v) for v in values) + '\n'
+
+
+def write_legacy_csv(out, count, generator=None, batch_rows=5_000):
+    """Stream count rows (plus the header) to a text file object; returns run stats"""
+    generator = generator or LegacyRowGenerator()
+    started = time.perf_counter()
+    written = out.write(','.join(f'"{c}"' for c in LEGACY_COLUMNS) + '\n')
+    batch = []
+    for values in generator.rows(count):
+        batch.append(format_row(values))
+        if len(batch) >= batch_rows:
+            written += out.write(''.join(batch))
+            batch = []
+    if batch:
+        written += out.write(''.join(batch))
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': count,
+        'duplicates': generator.duplicates,
+        'chars': written,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(count / elapsed) if elapsed else None,
+    }
@@ -0,0 +1,397 @@
+"""
+Structured Network Recorder
+Records every request a page makes (timing phases, transfer sizes, cache
+status, initiator) from Playwright's request events, groups them per
+main-frame navigation, and turns each navigation into a text waterfall and a
+critical-path summary: the chain of requests - and the client-side gaps
+between them - that ends when the page became usable.
+
+On Chromium an optional CDP session adds what Playwright does not expose:
+the initiator (parser, script stack, redirect) and memory/disk cache hits.
+Results can be saved as a compact HAR-like file (no headers or bodies).
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+# Response headers that report a CDN or framework cache verdict
+CACHE_HEADERS = ('x-vercel-cache', 'x-nextjs-cache', 'cf-cache-status', 'x-cache')
+# Request types that can hold up rendering; images and fonts rarely gate a client-rendered page
+BLOCKING_TYPES = {'document', 'script', 'stylesheet', 'fetch', 'xhr'}
+API_TYPES = {'fetch', 'xhr'}
+
+
+def _now_ms():
+    return time.time() * 1000
+
+
+def timing_phases(timing):
+    """HAR-style phases in ms from a Playwright request.timing dict (-1 means "not applicable")"""
+    if not timing or timing.get('responseEnd', -1) < 0:
+        return None
+
+    def span(start, end):
+        a, b = timing.get(start, -1), timing.get(end, -1)
+        return max(0.0, b - a) if a >= 0 and b >= 0 else 0.0
+
+    first = next((timing[k] for k in ('domainLookupStart', 'connectStart', 'requestStart') if timing.get(k, -1) >= 0), 0)
+    ssl = span('secureConnectionStart', 'connectEnd')
+    return {
+        'blocked': max(0.0, first),
+        'dns': span('domainLookupStart', 'domainLookupEnd'),
+        'connect': span('connectStart', 'connectEnd') - ssl,
+        'ssl': ssl,
+        'send': 0.0,
+        'wait': span('requestStart', 'responseStart'),
+        'receive': span('responseStart', 'responseEnd'),
+    }
+
+
+def cache_status(entry):
+    """Where a response came from: memory, disk, service-worker, revalidated, cdn-hit/miss or network"""
+    cdp = entry.get('cdp') or {}
+    if entry.get('from_service_worker') or cdp.get('from_service_worker'):
+        return 'service-worker'
+    if cdp.get('from_disk_cache'):
+        return 'disk'
+    if cdp.get('from_prefetch_cache'):
+        return 'prefetch'
+    if cdp.get('served_from_cache'):
+        return 'memory'
+    if entry.get('status') == 304:
+        return 'revalidated'
+    verdict = entry.get('cdn_cache')
+    if verdict:
+        return f"cdn-{verdict.lower()}"
+    return 'network' if entry.get('status') else None
+
+
+def short_url(url, width=60):
+    parts = urlsplit(url)
+    text = parts.path + (f"?{parts.query}" if parts.query else '')
+    return text if len(text) <= width else text[:width - 1] + '…'
+
+
+class NetworkRecorder:
+    """Attach to a page and keep one structured entry per request, grouped by navigation"""
+
+    def __init__(self, page, max_entries=5000):
+        self.page = page
+        self.entries = deque(maxlen=max_entries)
+        self.dropped = 0
+        self.navigations = []
+        self._open = {}
+        self._pending = set()
+        self._next_id = 0
+        self._cdp = None
+        self._cdp_by_id = {}
+        self._cdp_queue = {}
+
+    # --- Playwright events --------------------------------------------------
+
+    def attach(self):
+        self.page.on('request', self._on_request)
+        self.page.on('response', self._on_response)
+        self.page.on('requestfinished', self._on_finished)
+        self.page.on('requestfailed', self._on_failed)
+        self.page.on('domcontentloaded', lambda _: self.mark('domcontentloaded'))
+        self.page.on('load', lambda _: self.mark('load'))
+        return self
+
+    def _on_request(self, request):
+        if request.is_navigation_request() and request.frame == self.page.main_frame and not request.redirected_from:
+            self.navigations.append({'index': len(self.navigations), 'url': request.url,
+                                     'started': _now_ms(), 'marks': {}})
+        if len(self.entries) == self.entries.maxlen:
+            self.dropped += 1
+        entry = {
+            'id': self._next_id,
+            'navigation': len(self.navigations) - 1,
+            'method': request.method,
+            'url': request.url,
+            'resource_type': request.resource_type,
+            'redirected_from': request.redirected_from.url if request.redirected_from else None,
+            'wall_start': _now_ms(),
+            'status': None,
+            'failure': None,
+        }
+        self._next_id += 1
+        self.entries.append(entry)
+        self._open[request] = entry
+
+    def _on_response(self, response):
+        entry = self._open.get(response.request)
+        if entry is None:
+            return
+        headers = response.headers
+        entry['status'] = response.status
+        entry['from_service_worker'] = response.from_service_worker
+        entry['mime_type'] = headers.get('content-type', '').split(';')[0]
+        entry['cache_control'] = headers.get('cache-control')
+        entry['cdn_cache'] = next((headers[h] for h in CACHE_HEADERS if h in headers), None)
+
+    def _close(self, request):
+        entry = self._open.pop(request, None)
+        if entry is not None:
+            entry['wall_end'] = _now_ms()
+            entry['timing'] = request.timing
+        return entry
+
+    def _on_finished(self, request):
+        entry = self._close(request)
+        if entry is not None:
+            task = asyncio.ensure_future(self._read_sizes(request, entry))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def _on_failed(self, request):
+        entry = self._close(request)
+        if entry is not None:
+            entry['failure'] = request.failure
+
+    async def _read_sizes(self, request, entry):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        entry['request_bytes'] = sizes['requestHeadersSize'] + sizes['requestBodySize']
+        entry['response_headers_bytes'] = sizes['responseHeadersSize']
+        entry['response_body_bytes'] = sizes['responseBodySize']
+
+    def mark(self, name, at_ms=None):
+        """Record a named moment (epoch ms, default now) on the current navigation"""
+        if self.navigations:
+            self.navigations[-1]['marks'][name] = at_ms if at_ms is not None else _now_ms()
+
+    # --- CDP enrichment (Chromium only) -------------------------------------
+
+    async def attach_cdp(self):
+        """Add initiators and cache hits from the DevTools protocol; returns False off Chromium"""
+        try:
+            self._cdp = await self.page.context.new_cdp_session(self.page)
+            await self._cdp.send('Network.enable')
+        except Exception:
+            self._cdp = None
+            return False
+        self._cdp.on('Network.requestWillBeSent', self._on_cdp_request)
+        self._cdp.on('Network.requestServedFromCache', self._on_cdp_cached)
+        self._cdp.on('Network.responseReceived', self._on_cdp_response)
+        return True
+
+    def _on_cdp_request(self, params):
+        initiator = params.get('initiator') or {}
+        stack = initiator.get('stack')
+        frame = None
+        while stack and frame is None:
+            frame = next(iter(stack.get('callFrames') or []), None)
+            stack = stack.get('parent')
+        info = {
+            'initiator': {
+                'type': 'redirect' if params.get('redirectResponse') else initiator.get('type'),
+                'url': initiator.get('url') or (frame or {}).get('url') or None,
+                'line': initiator.get('lineNumber', (frame or {}).get('lineNumber')),
+            },
+        }
+        self._cdp_by_id[params['requestId']] = info
+        key = (params['request']['method'], params['request']['url'])
+        self._cdp_queue.setdefault(key, deque()).append(info)
+
+    def _on_cdp_cached(self, params):
+        info = self._cdp_by_id.get(params['requestId'])
+        if info is not None:
+            info['served_from_cache'] = True
+
+    def _on_cdp_response(self, params):
+        info = self._cdp_by_id.get(params['requestId'])
+        if info is not None:
+            response = params.get('response') or {}
+            info['from_disk_cache'] = bool(response.get('fromDiskCache'))
+            info['from_prefetch_cache'] = bool(response.get('fromPrefetchCache'))
+            info['from_service_worker'] = bool(response.get('fromServiceWorker'))
+
+    # --- aggregation --------------------------------------------------------
+
+    async def settle(self):
+        """Wait for outstanding size lookups, then pair entries with their CDP records"""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+        # Both streams see requests in the browser's order, so FIFO per (method, url) pairs them up
+        for entry in sorted(self.entries, key=lambda e: e['id']):
+            if 'cdp' not in entry:
+                queue = self._cdp_queue.get((entry['method'], entry['url']))
+                if queue:
+                    entry['cdp'] = queue.popleft()
+        self._cdp_queue.clear()
+        self._cdp_by_id.clear()
+        return self
+
+    def _resolved(self, entry):
+        """entry plus absolute start/end (epoch ms), phases, cache status and initiator"""
+        timing = entry.get('timing') or {}
+        start = timing['startTime'] if timing.get('startTime', 0) > 0 else entry['wall_start']
+        phases = timing_phases(timing)
+        if phases:
+            end = start + timing['responseEnd']
+        else:
+            end = entry.get('wall_end', start)
+        initiator = (entry.get('cdp') or {}).get('initiator')
+        if initiator is None:
+            initiator = {'type': 'redirect' if entry['redirected_from'] else
+                         'navigation' if entry['resource_type'] == 'document' else 'other',
+                         'url': entry['redirected_from'], 'line': None}
+        return {**entry, 'start': start, 'end': end, 'duration': end - start, 'phases': phases,
+                'cache': cache_status(entry), 'initiator': initiator,
+                'transfer_bytes': (entry.get('response_headers_bytes') or 0) + (entry.get('response_body_bytes') or 0)}
+
+    def navigation_report(self, index):
+        """One navigation with its resolved entries in start order"""
+        navigation = self.navigations[index]
+        entries = sorted((self._resolved(e) for e in self.entries if e['navigation'] == index),
+                         key=lambda e: (e['start'], e['id']))
+        origin = entries[0]['start'] if entries else navigation['started']
+        return {**navigation, 'origin': origin, 'entries': entries}
+
+
+def _parent(entry, earlier):
+    """The request entry most plausibly waited on: its initiator, else the last render-blocking one to finish before it"""
+    initiator_url = entry['initiator'].get('url')
+    if initiator_url:
+        matches = [e for e in earlier if e['url'] == initiator_url and e['start'] <= entry['start']]
+        if matches:
+            return matches[-1]
+    finished = [e for e in earlier if e['resource_type'] in BLOCKING_TYPES and e['end'] <= entry['start']]
+    if finished:
+        return max(finished, key=lambda e: e['end'])
+    return next((e for e in earlier if e['resource_type'] == 'document'), None)
+
+
+def critical_path(report, ready_at=None):
+    """The chain of requests ending at the one the page waited on last before ready_at.
+
+    ready_at defaults to the navigation's 'usable' mark, then its load mark.
+    Returns {'ready_ms', 'segments', 'network_ms', 'client_ms', 'blocking'} with
+    times relative to the navigation's first request.
+    """
+    entries = [e for e in report['entries'] if not e['failure']]
+    if not entries:
+        return None
+    ready_at = ready_at or report['marks'].get('usable') or report['marks'].get('load') or max(e['end'] for e in entries)
+    done = [e for e in entries if e['end'] <= ready_at + 1]
+    target = (max((e for e in done if e['resource_type'] in API_TYPES), key=lambda e: e['end'], default=None)
+              or max((e for e in done if e['resource_type'] in BLOCKING_TYPES), key=lambda e: e['end'], default=None)
+              or entries[0])
+
+    chain = [target]
+    while True:
+        earlier = [e for e in entries if e['id'] != chain[-1]['id'] and e['start'] <= chain[-1]['start']
+                   and e not in chain]
+        parent = _parent(chain[-1], earlier) if chain[-1]['resource_type'] != 'document' else None
+        if parent is None:
+            break
+        chain.append(parent)
+    chain.reverse()
+
+    origin = report['origin']
+    segments, client, previous_end = [], 0.0, None
+    for e in chain:
+        gap = max(0.0, e['start'] - previous_end) if previous_end is not None else 0.0
+        client += gap
+        segments.append({'start_ms': e['start'] - origin, 'end_ms': e['end'] - origin, 'gap_ms': gap,
+                         'duration_ms': e['duration'], 'type': e['resource_type'], 'url': e['url'],
+                         'status': e['status'], 'phases': e['phases'], 'cache': e['cache']})
+        previous_end = e['end']
+    tail = max(0.0, ready_at - chain[-1]['end'])
+    api = [s for s in segments if s['type'] in API_TYPES]
+    return {
+        'ready_ms': ready_at - origin,
+        'segments': segments,
+        'network_ms': sum(s['duration_ms'] for s in segments),
+        'client_ms': client + tail,
+        'tail_ms': tail,
+        'blocking': max(api, key=lambda s: s['duration_ms']) if api else None,
+    }
+
+
+def format_waterfall(report, width=40, limit=None):
+    """Text waterfall lines for one navigation report"""
+    entries = report['entries'][:limit] if limit else report['entries']
+    if not entries:
+        return ["   (no requests)"]
+    origin = report['origin']
+    span = max(max(e['end'] for e in entries) - origin, *(m - origin for m in report['marks'].values()), 1)
+    lines = []
+    for e in entries:
+        left = int((e['start'] - origin) / span * width)
+        bar = max(1, int(e['duration'] / span * width))
+        status = e['status'] or ('ERR' if e['failure'] else '...')
+        size = f"{e['transfer_bytes'] / 1024:.1f}K" if e['transfer_bytes'] else '-'
+        lines.append(f"   {e['start'] - origin:>6.0f}ms {' ' * left}{'█' * bar}{' ' * max(0, width - left - bar)} "
+                     f"{e['duration']:>6.0f}ms {status:>3} {size:>7} {e['cache'] or '-':<12} "
+                     f"{e['resource_type']:<10} {short_url(e['url'])}")
+    for name, at in sorted(report['marks'].items(), key=lambda item: item[1]):
+        lines.append(f"   {at - origin:>6.0f}ms {' ' * min(width - 1, int((at - origin) / span * width))}▲ {name}")
+    return lines
+
+
+def format_critical_path(path):
+    if path is None:
+        return ["   (no completed requests)"]
+    lines = []
+    for s in path['segments']:
+        if s['gap_ms'] >= 1:
+            lines.append(f"      ⋯ {s['gap_ms']:,.0f}ms client-side (parse, execute, render)")
+        phases = s['phases'] or {}
+        detail = ', '.join(f"{k} {v:,.0f}" for k, v in phases.items() if v >= 1)
+        lines.append(f"   {s['start_ms']:>6,.0f} → {s['end_ms']:>6,.0f}ms  {s['type']:<9} {short_url(s['url'])}"
+                     f"  ({s['duration_ms']:,.0f}ms{': ' + detail if detail else ''})")
+    if path['tail_ms'] >= 1:
+        lines.append(f"      ⋯ {path['tail_ms']:,.0f}ms client-side after the last request (timers, render)")
+    total = max(path['ready_ms'], 1)
+    lines.append(f"   Usable at {path['ready_ms']:,.0f}ms: network {path['network_ms']:,.0f}ms "
+                 f"({path['network_ms'] / total:.0%}), client {path['client_ms']:,.0f}ms ({path['client_ms'] / total:.0%})")
+    if path['blocking']:
+        b = path['blocking']
+        lines.append(f"   🚧 Blocking API call: {b['url']} ({b['duration_ms']:,.0f}ms, status {b['status']})")
+    else:
+        lines.append("   🚧 No API call on the critical path")
+    return lines
+
+
+def _iso(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def to_har(recorder, creator='crm_netrec'):
+    """A compact HAR 1.2-shaped dict: pages, entries, timings, sizes - no headers or bodies"""
+    pages, entries = [], []
+    for navigation in recorder.navigations:
+        report = recorder.navigation_report(navigation['index'])
+        path = critical_path(report)
+        pages.append({
+            'id': f"page_{navigation['index']}",
+            'title': navigation['url'],
+            'startedDateTime': _iso(report['origin']),
+            'pageTimings': {name: round(at - report['origin'], 1) for name, at in navigation['marks'].items()},
+            '_criticalPath': path,
+        })
+        for e in report['entries']:
+            entries.append({
+                'pageref': f"page_{navigation['index']}",
+                'startedDateTime': _iso(e['start']),
+                'time': round(e['duration'], 1),
+                'request': {'method': e['method'], 'url': e['url'], 'bodySize': e.get('request_bytes', -1)},
+                'response': {'status': e['status'] or 0, 'mimeType': e.get('mime_type', ''),
+                             'headersSize': e.get('response_headers_bytes', -1),
+                             'bodySize': e.get('response_body_bytes', -1),
+                             '_error': e['failure']},
+                'cache': {'_status': e['cache'], '_cacheControl': e.get('cache_control')},
+                'timings': {k: round(v, 1) for k, v in (e['phases'] or {}).items()} or
+                           {'send': 0, 'wait': round(e['duration'], 1), 'receive': 0},
+                '_resourceType': e['resource_type'],
+                '_initiator': e['initiator'],
+            })
+    return {'log': {'version': '1.2', 'creator': {'name': creator, 'version': '1'},
+                    'pages': pages, 'entries': entries, '_dropped': recorder.dropped}}
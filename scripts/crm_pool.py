@@ -0,0 +1,129 @@
+"""
+Parallel Browser-Context Worker Pool
+Runs scenario jobs concurrently over N isolated BrowserContexts that share one
+Chromium process. Each context has its own cookie jar, reset between jobs.
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from crm_trace import TRACER, span
+from crm_vitals import install_vitals
+from crm_waits import launch_options
+
+
+class ContextPool:
+    """Fixed-size pool of BrowserContexts handed out one job at a time"""
+
+    def __init__(self, browser, size, storage_state=None, profile=None, **context_options):
+        self.browser = browser
+        self.size = size
+        self.profile = profile
+        self.context_options = context_options
+        self.cookies = []
+        if storage_state:
+            with open(storage_state, 'r', encoding='utf-8') as f:
+                self.cookies = json.load(f).get('cookies', [])
+        self._idle = asyncio.Queue()
+        self._contexts = []
+
+    async def start(self):
+        for _ in range(self.size):
+            context = await self.browser.new_context(**self.context_options)
+            if self.profile:
+                # Routes live on the context, so they survive the per-job reset
+                await self.profile.apply(context)
+            self._contexts.append(context)
+            await self._idle.put(context)
+        return self
+
+    async def close(self):
+        for context in self._contexts:
+            await context.close()
+
+    async def _reset(self, context, authenticated):
+        """Give the next job a clean cookie jar (optionally pre-seeded with the session)"""
+        for page in context.pages:
+            await page.close()
+        await context.clear_cookies()
+        if authenticated and self.cookies:
+            await context.add_cookies(self.cookies)
+
+    @asynccontextmanager
+    async def page(self, authenticated=True):
+        """Borrow a context from the pool and yield a fresh page in it"""
+        context = await self._idle.get()
+        try:
+            await self._reset(context, authenticated)
+            page = await context.new_page()
+            # Web vitals observers ride along on every navigation the job makes
+            await install_vitals(page)
+            yield page
+        finally:
+            await self._idle.put(context)
+
+
+async def run_jobs(jobs, concurrency=3, storage_state=None, slow_mo=0, profile=None):
+    """Run jobs over a context pool; returns one timing/result record per job.
+
+    Each job is a dict with 'name', 'run' (async fn(page) -> list of result dicts)
+    and optionally 'authenticated' (False to start from an empty cookie jar).
+    profile is an optional crm_intercept.InterceptionProfile for every context.
+    """
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(**launch_options(slow_mo=slow_mo))
+    pool = await ContextPool(browser, concurrency, storage_state, profile=profile,
+                             viewport={'width': 1280, 'height': 720}).start()
+
+    async def run_one(job):
+        TRACER.rename_lane(job['name'])
+        async with pool.page(authenticated=job.get('authenticated', True)) as page:
+            started = time.perf_counter()
+            print(f"▶️ {job['name']} started")
+            try:
+                async with span(job['name'], cat='job'):
+                    results = await job['run'](page)
+                error = None
+            except Exception as e:
+                results = [{'page': job['name'], 'accessible': False, 'error': str(e), 'success': False}]
+                error = str(e)
+            elapsed = time.perf_counter() - started
+            print(f"⏹️ {job['name']} finished in {elapsed:.1f}s")
+            return {'job': job['name'], 'seconds': round(elapsed, 2), 'error': error, 'results': results}
+
+    started = time.perf_counter()
+    try:
+        records = await asyncio.gather(*(run_one(job) for job in jobs))
+    finally:
+        await pool.close()
+        await browser.close()
+        await playwright.stop()
+
+    wall = time.perf_counter() - started
+    return {'wall_seconds': round(wall, 2), 'jobs': records}
+
+
+def merge_results(run):
+    """Flatten every job's result dicts into one generate_summary-style list"""
+    merged = []
+    for record in run['jobs']:
+        for result in record['results']:
+            merged.append({**result, 'job': record['job'], 'job_seconds': record['seconds']})
+    return merged
+
+
+def print_timing(run):
+    """Show per-job wall time next to the suite's wall time"""
+    serial = sum(r['seconds'] for r in run['jobs'])
+    slowest = max((r['seconds'] for r in run['jobs']), default=0)
+
+    print("\n⏱️ SCENARIO TIMING")
+    print("=" * 60)
+    for record in sorted(run['jobs'], key=lambda r: -r['seconds']):
+        status = "⚠️" if record['error'] else "✅"
+        print(f"   {status} {record['job']:<28} {record['seconds']:>7.1f}s")
+    print(f"   Suite wall time: {run['wall_seconds']:.1f}s (slowest job {slowest:.1f}s, serial sum {serial:.1f}s)")
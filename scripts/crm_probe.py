@@ -0,0 +1,483 @@
+"""
+Async Pooled HTTP Probe Engine
+Keep-alive HTTP/1.1 client on asyncio streams with bounded concurrency and
+per-request timing (DNS, TCP connect, TLS, TTFB, total). Builds the same result
+dicts as CRMTester in test-browser-automation.py.
+"""
+
+import asyncio
+import json
+import os
+import re
+import socket
+import ssl
+import time
+import urllib.parse
+
+# Prefixes guarded by src/middleware.ts - unauthenticated requests redirect to /login
+PROTECTED_PREFIXES = ('/admin', '/dashboard', '/submitted-forms')
+
+# GET handlers with side effects (backups, emails, tracking rows) - never swept
+UNSAFE_GET_ROUTES = {
+    '/api/admin/backup/scheduled',
+    '/api/reminders/check',
+    '/api/debug/test-open-async',
+    '/api/email/send-campaign',
+    '/api/email/unsubscribe',
+    '/api/email/tracking/open',
+    '/api/email/tracking/click',
+}
+
+# Bodies up to this size are drained so the connection can go back to the pool
+DRAIN_LIMIT = 256 * 1024
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.requests = 0
+
+    def close(self):
+        self.writer.close()
+
+
+class ProbeEngine:
+    """Keep-alive connection pool for a single origin"""
+
+    def __init__(self, base_url, concurrency=20, timeout=15.0, cookies=None, drain_limit=DRAIN_LIMIT):
+        parsed = urllib.parse.urlparse(base_url)
+        self.base_url = base_url.rstrip('/')
+        self.host = parsed.hostname
+        self.tls = parsed.scheme == 'https'
+        self.port = parsed.port or (443 if self.tls else 80)
+        self.host_header = parsed.netloc
+        self.timeout = timeout
+        self.cookies = dict(cookies or {})
+        self.drain_limit = drain_limit
+        self.ssl_context = ssl.create_default_context() if self.tls else None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._idle = []
+        self.connections_opened = 0
+        # HTTP bytes written and read; TLS records and handshakes are not included
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        # Bodies abandoned past drain_limit, and how much of their Content-Length went unread
+        # (the server was already sending it, so most of it still crossed the wire)
+        self.bodies_cut_off = 0
+        self.bytes_unread = 0
+
+    async def _connect(self):
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        infos = await loop.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        t1 = time.perf_counter()
+
+        family, sock_type, proto, _, address = infos[0]
+        sock = socket.socket(family, sock_type, proto)
+        sock.setblocking(False)
+        try:
+            await loop.sock_connect(sock, address)
+            t2 = time.perf_counter()
+
+            reader, writer = await asyncio.open_connection(
+                sock=sock, ssl=self.ssl_context,
+                server_hostname=self.host if self.tls else None
+            )
+        except BaseException:
+            # Includes the cancellation when the request's timeout fires mid-connect
+            sock.close()
+            raise
+        t3 = time.perf_counter()
+
+        self.connections_opened += 1
+        timing = {
+            'dns_ms': round((t1 - t0) * 1000, 2),
+            'connect_ms': round((t2 - t1) * 1000, 2),
+            'tls_ms': round((t3 - t2) * 1000, 2),
+        }
+        return _Connection(reader, writer), timing
+
+    async def _acquire(self):
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.reader.at_eof() and not conn.writer.is_closing():
+                return conn, {'dns_ms': 0.0, 'connect_ms': 0.0, 'tls_ms': 0.0}, True
+            conn.close()
+        conn, timing = await self._connect()
+        return conn, timing, False
+
+    def _release(self, conn, keep_alive):
+        if keep_alive and not conn.writer.is_closing():
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    def _build_request(self, method, path, headers, body):
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host_header}",
+            "User-Agent: crm-probe/1.0",
+            "Accept: */*",
+            "Accept-Encoding: identity",
+            "Connection: keep-alive",
+        ]
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        for key, value in (headers or {}).items():
+            lines.append(f"{key}: {value}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + (body or b'')
+
+    async def _read_body(self, reader, method, status, headers, read_limit):
+        """Return (body, received_bytes, reusable)"""
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            return b'', 0, True
+
+        limit = DRAIN_LIMIT if read_limit is None else read_limit
+        length = headers.get('content-length')
+
+        if length is not None:
+            length = int(length)
+            if read_limit is None or length <= max(limit, self.drain_limit):
+                data = await reader.readexactly(length)
+                return data[:limit] if read_limit is not None else data, length, True
+            data = await reader.readexactly(limit)
+            self.bodies_cut_off += 1
+            self.bytes_unread += length - limit
+            return data, limit, False
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks, received = [], 0
+            while True:
+                size_line = await reader.readuntil(b'\r\n')
+                received += len(size_line)
+                size = int(size_line.split(b';')[0].strip(), 16)
+                if size == 0:
+                    trailer = await reader.readuntil(b'\r\n')
+                    received += len(trailer)
+                    while trailer != b'\r\n':
+                        trailer = await reader.readuntil(b'\r\n')
+                        received += len(trailer)
+                    return b''.join(chunks), received, True
+                chunk = await reader.readexactly(size + 2)
+                received += len(chunk)
+                chunks.append(chunk[:-2])
+                if read_limit is not None and sum(len(c) for c in chunks) >= read_limit and received > self.drain_limit:
+                    self.bodies_cut_off += 1
+                    return b''.join(chunks)[:read_limit], received, False
+
+        # No length and not chunked: body runs until the server closes
+        data = await reader.read(limit) if read_limit is not None else await reader.read()
+        if read_limit is not None and not reader.at_eof():
+            self.bodies_cut_off += 1
+        return data, len(data), False
+
+    async def _exchange(self, conn, method, path, headers, body, read_limit, timing, started):
+        request = self._build_request(method, path, headers, body)
+        conn.writer.write(request)
+        await conn.writer.drain()
+        sent_at = time.perf_counter()
+
+        head = await conn.reader.readuntil(b'\r\n\r\n')
+        first_byte_at = time.perf_counter()
+
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        _, status, *reason = status_line.split(' ', 2)
+        status = int(status)
+        response_headers, set_cookies = {}, []
+        for line in header_lines:
+            if not line:
+                continue
+            key, _, value = line.partition(':')
+            key = key.strip().lower()
+            value = value.strip()
+            if key == 'set-cookie':
+                set_cookies.append(value)
+            response_headers[key] = value
+
+        data, body_bytes, reusable = await self._read_body(conn.reader, method, status, response_headers, read_limit)
+        finished = time.perf_counter()
+        conn.requests += 1
+
+        self.bytes_sent += len(request)
+        self.bytes_received += len(head) + body_bytes
+        keep_alive = reusable and response_headers.get('connection', '').lower() != 'close'
+
+        timing.update({
+            'send_ms': round((sent_at - started) * 1000, 2),
+            'ttfb_ms': round((first_byte_at - started) * 1000, 2),
+            'total_ms': round((finished - started) * 1000, 2),
+        })
+        return {
+            'status': status,
+            'reason': reason[0] if reason else '',
+            'headers': response_headers,
+            'set_cookies': set_cookies,
+            'body': data,
+            'timing': timing,
+            'bytes_sent': len(request),
+            'bytes_received': len(head) + body_bytes,
+        }, keep_alive
+
+    async def _attempt(self, state, method, path, headers, body, read_limit):
+        """Acquire a connection (DNS/connect/TLS when it is new) and run one exchange on it"""
+        started = time.perf_counter()
+        conn, timing, reused = await self._acquire()
+        state['reused'] = timing['reused'] = reused
+        try:
+            response, keep_alive = await self._exchange(conn, method, path, headers, body, read_limit, timing, started)
+        except BaseException:
+            conn.close()
+            raise
+        self._release(conn, keep_alive)
+        return response
+
+    async def request(self, method, path, headers=None, body=None, read_limit=None):
+        """Send one request; returns a response dict with a 'timing' breakdown
+
+        The timeout covers each attempt whole: connecting as well as the exchange.
+        """
+        async with self._slots:
+            for attempt in (1, 2):
+                state = {}
+                try:
+                    return await asyncio.wait_for(
+                        self._attempt(state, method, path, headers, body, read_limit), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # A pooled keep-alive socket may have been closed by the server - retry once fresh
+                    if state.get('reused') and attempt == 1:
+                        continue
+                    raise
+
+    async def close(self):
+        for conn in self._idle:
+            conn.close()
+        self._idle = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+def multipart_body(fields, boundary=None):
+    """Encode {name: str | (filename, bytes, content_type)} as multipart/form-data"""
+    boundary = boundary or f"----crm-probe-{os.urandom(12).hex()}"
+    parts = []
+    for name, value in fields.items():
+        if isinstance(value, tuple):
+            filename, content, content_type = value
+            head = (f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                    f'Content-Type: {content_type}\r\n\r\n')
+        else:
+            head = f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            content = value.encode('utf-8')
+        parts.append(f"--{boundary}\r\n{head}".encode('utf-8') + content + b"\r\n")
+    body = b''.join(parts) + f"--{boundary}--\r\n".encode('latin-1')
+    return f"multipart/form-data; boundary={boundary}", body
+
+
+def parse_server_timing(header):
+    """'parse;dur=1.2, rows;dur=30' -> {'parse': 1.2, 'rows': 30.0} (ms)"""
+    phases = {}
+    for entry in (header or '').split(','):
+        name, *params = [p.strip() for p in entry.split(';')]
+        for param in params:
+            key, _, value = param.partition('=')
+            if name and key == 'dur':
+                phases[name] = float(value)
+    return phases
+
+
+def _preview(body):
+    content = body.decode('utf-8', errors='ignore')
+    return content, (content[:200] + "..." if len(content) > 200 else content)
+
+
+def url_result(response, full_url, expected_status=200, description=""):
+    """Same dict as CRMTester.test_url, plus a timing breakdown"""
+    content, preview = _preview(response['body'][:1000])
+    status = response['status']
+    is_404_page = status == 404 or any(indicator in content.lower() for indicator in [
+        'not found', '404', 'page not found', 'does not exist'
+    ])
+    return {
+        'url': full_url,
+        'status': status,
+        'content_type': response['headers'].get('content-type', 'unknown') if status < 400 else 'error',
+        'is_404_page': is_404_page,
+        'content_preview': preview,
+        'success': status == expected_status and not is_404_page,
+        'description': description,
+        'timing': response['timing'],
+    }
+
+
+def redirect_result(response, full_url):
+    """Same dict as CRMTester.test_admin_redirect, plus a timing breakdown"""
+    status = response['status']
+    timing = response['timing']
+    if status in (301, 302, 307, 308):
+        location = response['headers'].get('location', 'unknown')
+        return {
+            'url': full_url,
+            'status': status,
+            'redirect': True,
+            'redirect_location': location,
+            'content_preview': f"Redirect to: {location}",
+            'success': True,
+            'description': f"Admin page - redirects to login (status: {status})",
+            'timing': timing,
+        }
+
+    _, preview = _preview(response['body'][:1000])
+    return {
+        'url': full_url,
+        'status': status,
+        'redirect': False,
+        'content_preview': preview,
+        'success': status == 200,
+        'description': f"Admin page - no redirect (status: {status})" if status == 200 else f"Admin page - error (status: {status})",
+        'timing': timing,
+    }
+
+
+def error_result(full_url, error, kind='url', description=""):
+    result = {
+        'url': full_url,
+        'status': 'ERROR',
+        'content_preview': str(error),
+        'success': False,
+    }
+    if kind == 'redirect':
+        result.update({'redirect': False, 'description': f"Admin page - error: {error}"})
+    else:
+        result.update({'content_type': 'error', 'is_404_page': False, 'description': description})
+    return result
+
+
+def discover_routes(app_dir='src/app'):
+    """List static routes under src/app as probe checks (dynamic [segments] are skipped)"""
+    checks = []
+    for root, _, files in os.walk(app_dir):
+        rel = os.path.relpath(root, app_dir).replace(os.sep, '/')
+        path = '/' if rel == '.' else '/' + rel
+        if '[' in path:
+            continue
+
+        if 'page.tsx' in files:
+            if path.startswith(PROTECTED_PREFIXES):
+                checks.append({'path': path, 'kind': 'redirect'})
+            else:
+                checks.append({'path': path, 'kind': 'url', 'expected_status': 200, 'description': f"Page {path}"})
+
+        if 'route.ts' in files and path not in UNSAFE_GET_ROUTES:
+            with open(os.path.join(root, 'route.ts'), 'r', encoding='utf-8') as f:
+                if re.search(r'export\s+async\s+function\s+GET\b', f.read()):
+                    checks.append({'path': path, 'kind': 'url', 'expected_status': 200, 'description': f"API GET {path}"})
+
+    return sorted(checks, key=lambda c: c['path'])
+
+
+async def run_checks(engine, checks):
+    """Probe every check concurrently; results come back in input order"""
+    async def probe(check):
+        full_url = f"{engine.base_url}{check['path']}"
+        kind = check.get('kind', 'url')
+        try:
+            response = await engine.request('GET', check['path'], read_limit=1000)
+        except Exception as e:
+            return error_result(full_url, str(e) or type(e).__name__, kind, check.get('description', ''))
+        if kind == 'redirect':
+            return redirect_result(response, full_url)
+        return url_result(response, full_url, check.get('expected_status', 200), check.get('description', ''))
+
+    return await asyncio.gather(*(probe(check) for check in checks))
+
+
+class ValidatorCache:
+    """On-disk ETag/Last-Modified cache with the last verdict for each URL"""
+
+    def __init__(self, path='.crm-probe-cache.json'):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def conditional_headers(self, url):
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response, result):
+        etag = response['headers'].get('etag')
+        last_modified = response['headers'].get('last-modified')
+        if not (etag or last_modified):
+            self.entries.pop(url, None)
+            return
+        self.entries[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'result': {k: v for k, v in result.items() if k != 'timing'},
+        }
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+# First 1000 bytes are enough for the 404 sniff in url_result
+LEAN_RANGE = 'bytes=0-999'
+
+
+async def run_lean_checks(engine, checks, cache):
+    """Bandwidth-minimal variant of run_checks.
+
+    Redirect checks use HEAD (the engine never follows redirects). URL checks use
+    a ranged GET, made conditional when the cache holds validators, so unchanged
+    pages cost a 304 with no body. Only 206 and 304 answers save anything: a
+    page that ignores Range (Next.js pages do) sends its whole body regardless,
+    so the engine drains it as usual and keeps the connection (cutting it off
+    would not stop the bytes already in flight and would cost a new TLS
+    handshake). Such results are marked range_ignored.
+    """
+    async def probe(check):
+        path = check['path']
+        full_url = f"{engine.base_url}{path}"
+        kind = check.get('kind', 'url')
+        try:
+            if kind == 'redirect':
+                response = await engine.request('HEAD', path)
+                if response['status'] in (405, 501):
+                    response = await engine.request('GET', path, headers={'Range': LEAN_RANGE}, read_limit=1000)
+                result = redirect_result(response, full_url)
+            else:
+                headers = {'Range': LEAN_RANGE, **cache.conditional_headers(full_url)}
+                response = await engine.request('GET', path, headers=headers, read_limit=1000)
+                if response['status'] == 304 and full_url in cache.entries:
+                    result = {**cache.entries[full_url]['result'], 'timing': response['timing'], 'not_modified': True}
+                else:
+                    range_ignored = response['status'] == 200
+                    if response['status'] == 206:
+                        response = {**response, 'status': 200}
+                    result = url_result(response, full_url, check.get('expected_status', 200), check.get('description', ''))
+                    cache.store(full_url, response, result)
+                    result['range_ignored'] = range_ignored
+        except Exception as e:
+            return error_result(full_url, str(e) or type(e).__name__, kind, check.get('description', ''))
+
+        result['bytes'] = response['bytes_sent'] + response['bytes_received']
+        return result
+
+    return await asyncio.gather(*(probe(check) for check in checks))
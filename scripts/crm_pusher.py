@@ -0,0 +1,474 @@
+"""
+Local Pusher Stand-in
+Asyncio server speaking the parts of the Pusher protocol the CRM uses:
+the REST trigger API that src/lib/pusher.ts calls (POST /apps/{id}/events
+and /batch_events, signed like the pusher npm package signs them) and the
+websocket protocol (version 7) that pusher-js in useRealTimeAnalytics
+subscribes over: connection_established, subscribe, ping/pong and events.
+
+Each connection has a bounded send queue; an event that finds it full is
+dropped for that subscriber and counted, the way a slow dashboard on a
+congested link would miss updates. The queue only fills once the bytes below
+it are full too, so socket_buffer caps the socket's kernel send buffer and the
+transport's write buffer; left at None, loopback buffers absorb megabytes and
+nothing is ever dropped. Also holds the server-side trigger client
+(PusherClient, what src/lib/pusher.ts does) and a minimal websocket client
+(PusherSubscriber) for the load simulator.
+
+Standard library only: RFC 6455 framing is implemented here.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import re
+import socket
+import struct
+import time
+import urllib.parse
+from collections import Counter
+from http import HTTPStatus
+
+from crm_probe import ProbeEngine
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+TRIGGER_PATH = re.compile(r'^/apps/([^/]+)/(events|batch_events)$')
+SOCKET_PATH = re.compile(r'^/app/([^/]+)$')
+# Pusher rejects event payloads above 10 KB
+MAX_EVENT_BYTES = 10240
+
+
+# --- websocket framing -----------------------------------------------------
+
+def _xor(payload, mask):
+    n = len(payload)
+    if not n:
+        return payload
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')).to_bytes(n, 'big')
+
+
+def encode_frame(payload, opcode=OP_TEXT, mask=False):
+    """One final frame; clients must mask, servers must not"""
+    if isinstance(payload, str):
+        payload = payload.encode()
+    n = len(payload)
+    head = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    if n < 126:
+        head += bytes([mask_bit | n])
+    elif n < 2 ** 16:
+        head += bytes([mask_bit | 126]) + struct.pack('!H', n)
+    else:
+        head += bytes([mask_bit | 127]) + struct.pack('!Q', n)
+    if mask:
+        key = os.urandom(4)
+        return head + key + _xor(payload, key)
+    return head + payload
+
+
+async def read_message(reader):
+    """(opcode, payload) of the next message, reassembling fragments"""
+    message, message_opcode = b'', None
+    while True:
+        b0, b1 = await reader.readexactly(2)
+        opcode, n = b0 & 0x0F, b1 & 0x7F
+        if n == 126:
+            n = struct.unpack('!H', await reader.readexactly(2))[0]
+        elif n == 127:
+            n = struct.unpack('!Q', await reader.readexactly(8))[0]
+        key = await reader.readexactly(4) if b1 & 0x80 else None
+        payload = await reader.readexactly(n)
+        if key:
+            payload = _xor(payload, key)
+        if opcode >= OP_CLOSE:
+            # Control frames may arrive between fragments
+            return opcode, payload
+        if opcode != OP_CONT:
+            message_opcode = opcode
+        message += payload
+        if b0 & 0x80:
+            return message_opcode, message
+
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+async def _read_head(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    first, *lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines:
+        if line:
+            key, _, value = line.partition(':')
+            headers[key.strip().lower()] = value.strip()
+    return first, headers
+
+
+def limit_buffers(writer, size, option):
+    """Cap a stream's kernel buffer (SO_SNDBUF / SO_RCVBUF) and its asyncio write buffer at about size bytes"""
+    sock = writer.get_extra_info('socket')
+    if sock is not None:
+        sock.setsockopt(socket.SOL_SOCKET, option, size)
+    writer.transport.set_write_buffer_limits(high=size)
+
+
+# --- REST signing (pusher npm package, auth_version 1.0) ---------------------
+
+def sign_query(key, secret, method, path, body, timestamp=None):
+    """Query string for a signed Pusher REST request"""
+    params = {
+        'auth_key': key,
+        'auth_timestamp': str(int(timestamp or time.time())),
+        'auth_version': '1.0',
+        'body_md5': hashlib.md5(body).hexdigest(),
+    }
+    to_sign = '\n'.join([method, path, '&'.join(f"{k}={v}" for k, v in sorted(params.items()))])
+    params['auth_signature'] = hmac.new(secret.encode(), to_sign.encode(), hashlib.sha256).hexdigest()
+    return urllib.parse.urlencode(params)
+
+
+def _signature_ok(secret, method, path, query, body):
+    params = dict(urllib.parse.parse_qsl(query))
+    signature = params.pop('auth_signature', '')
+    if params.get('body_md5') != hashlib.md5(body).hexdigest():
+        return False
+    to_sign = '\n'.join([method, path, '&'.join(f"{k}={v}" for k, v in sorted(params.items()))])
+    expected = hmac.new(secret.encode(), to_sign.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
+
+# --- server --------------------------------------------------------------------
+
+class _Connection:
+    def __init__(self, server, writer, socket_id, send_queue):
+        self.server = server
+        self.writer = writer
+        self.socket_id = socket_id
+        self.channels = set()
+        self.queue = asyncio.Queue(maxsize=send_queue)
+        self.dropped = 0
+        self.sender = asyncio.ensure_future(self._send_loop())
+
+    def offer(self, frame):
+        """Queue a frame unless the subscriber is too far behind"""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def _send_loop(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                self.writer.write(frame)
+                await self.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def send_event(self, event, data=None, channel=None):
+        message = {'event': event, 'data': data if isinstance(data, str) else json.dumps(data or {})}
+        if channel:
+            message['channel'] = channel
+        self.offer(encode_frame(json.dumps(message)))
+
+
+class PusherStandin:
+    """Pusher-compatible REST + websocket endpoint on one port"""
+
+    def __init__(self, host='127.0.0.1', port=6001, app_id='standin', key='standin-key', secret='standin-secret',
+                 verify=True, send_queue=100, activity_timeout=120, socket_buffer=None):
+        self.host = host
+        self.port = port
+        self.app_id = app_id
+        self.key = key
+        self.secret = secret
+        self.verify = verify
+        self.send_queue = send_queue
+        self.activity_timeout = activity_timeout
+        self.socket_buffer = socket_buffer
+        self.channels = {}
+        self.connections = set()
+        self.stats = Counter()
+        self._next_socket = 0
+        self._server = None
+        self._handlers = {}
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def socket_url(self):
+        return f"ws://{self.host}:{self.port}/app/{self.key}"
+
+    def publish(self, channel, event, data, exclude=None):
+        """Fan one event out to a channel's subscribers; returns how many it was queued for"""
+        frame = encode_frame(json.dumps({'event': event, 'channel': channel, 'data': data}))
+        queued = 0
+        for conn in list(self.channels.get(channel, ())):
+            if conn.socket_id == exclude:
+                continue
+            if conn.offer(frame):
+                queued += 1
+            else:
+                self.stats['dropped_slow_subscriber'] += 1
+        self.stats['events'] += 1
+        self.stats['deliveries_queued'] += queued
+        return queued
+
+    # --- REST -------------------------------------------------------------------
+
+    def _trigger(self, path, query, body):
+        match = TRIGGER_PATH.match(path)
+        if match.group(1) != self.app_id:
+            return 404, {'error': f"Unknown app {match.group(1)}"}
+        if self.verify and not _signature_ok(self.secret, 'POST', path, query, body):
+            self.stats['rejected_signature'] += 1
+            return 401, {'error': 'Invalid signature'}
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'error': 'Invalid JSON'}
+        batch = payload.get('batch', []) if match.group(2) == 'batch_events' else [payload]
+        for item in batch:
+            channels = item.get('channels') or [item.get('channel')]
+            data = item.get('data', '')
+            data = data if isinstance(data, str) else json.dumps(data)
+            if len(data.encode()) > MAX_EVENT_BYTES:
+                return 413, {'error': f"Event data is larger than {MAX_EVENT_BYTES} bytes"}
+            for channel in channels:
+                self.publish(channel, item['name'], data, exclude=item.get('socket_id'))
+        return 200, {}
+
+    async def _http(self, reader, writer, first, headers):
+        method, target, _ = first.split(' ', 2)
+        parts = urllib.parse.urlsplit(target)
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+        if method == 'POST' and TRIGGER_PATH.match(parts.path):
+            status, data = self._trigger(parts.path, parts.query, body)
+        elif method == 'GET' and parts.path == f"/apps/{self.app_id}/channels":
+            status, data = 200, {'channels': {name: {'subscription_count': len(subs)}
+                                              for name, subs in self.channels.items() if subs}}
+        else:
+            status, data = 404, {'error': 'Not found'}
+        payload = json.dumps(data).encode()
+        writer.write((f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\n"
+                      f"Content-Length: {len(payload)}\r\nConnection: keep-alive\r\n\r\n").encode() + payload)
+        await writer.drain()
+
+    # --- websocket ----------------------------------------------------------------
+
+    async def _socket(self, reader, writer, headers):
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept_key(headers['sec-websocket-key'])}\r\n\r\n").encode())
+        if self.socket_buffer:
+            limit_buffers(writer, self.socket_buffer, socket.SO_SNDBUF)
+        self._next_socket += 1
+        conn = _Connection(self, writer, f"{self._next_socket}.{os.getpid()}", self.send_queue)
+        self.connections.add(conn)
+        self.stats['connections'] += 1
+        conn.send_event('pusher:connection_established',
+                        json.dumps({'socket_id': conn.socket_id, 'activity_timeout': self.activity_timeout}))
+        try:
+            while True:
+                opcode, payload = await read_message(reader)
+                if opcode == OP_CLOSE:
+                    conn.offer(encode_frame(payload[:2], OP_CLOSE))
+                    break
+                if opcode == OP_PING:
+                    conn.offer(encode_frame(payload, OP_PONG))
+                    continue
+                if opcode != OP_TEXT:
+                    continue
+                self._client_event(conn, payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for channel in conn.channels:
+                self.channels.get(channel, set()).discard(conn)
+            self.connections.discard(conn)
+            # Let queued frames (e.g. the close reply) go out before the socket closes
+            await asyncio.sleep(0)
+            conn.sender.cancel()
+            writer.close()
+
+    def _client_event(self, conn, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        event = message.get('event')
+        data = message.get('data') or {}
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                data = {}
+        if event == 'pusher:subscribe':
+            channel = data.get('channel')
+            if channel.startswith(('private-', 'presence-')):
+                # Auth endpoints are out of scope; the CRM only uses public channels
+                conn.send_event('pusher:subscription_error', {'type': 'AuthError', 'status': 401}, channel)
+                return
+            self.channels.setdefault(channel, set()).add(conn)
+            conn.channels.add(channel)
+            self.stats['subscriptions'] += 1
+            conn.send_event('pusher_internal:subscription_succeeded', {}, channel)
+        elif event == 'pusher:unsubscribe':
+            channel = data.get('channel')
+            self.channels.get(channel, set()).discard(conn)
+            conn.channels.discard(channel)
+        elif event == 'pusher:ping':
+            conn.send_event('pusher:pong', {})
+
+    async def _handle(self, reader, writer):
+        self._handlers[asyncio.current_task()] = writer
+        try:
+            while True:
+                try:
+                    first, headers = await _read_head(reader)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                path = urllib.parse.urlsplit(first.split(' ')[1]).path
+                if headers.get('upgrade', '').lower() == 'websocket' and SOCKET_PATH.match(path):
+                    if SOCKET_PATH.match(path).group(1) != self.key:
+                        # Pusher closes with 4001 for an unknown app key
+                        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                                     + f"Sec-WebSocket-Accept: {accept_key(headers['sec-websocket-key'])}\r\n\r\n".encode()
+                                     + encode_frame(struct.pack('!H', 4001) + b'App key not in this cluster', OP_CLOSE))
+                        await writer.drain()
+                        break
+                    await self._socket(reader, writer, headers)
+                    return
+                await self._http(reader, writer, first, headers)
+        except ConnectionError:
+            pass
+        finally:
+            self._handlers.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=2 ** 20, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            for conn in list(self.connections):
+                conn.sender.cancel()
+            # Idle REST keep-alive handlers would otherwise be cancelled mid-read at loop shutdown
+            for writer in list(self._handlers.values()):
+                writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+# --- clients -------------------------------------------------------------------
+
+class PusherClient:
+    """pusher.trigger() as the pusher npm package does it: a signed REST POST over keep-alive connections
+
+    latency_ms is added to every trigger, standing in for the round trip from
+    the app to the Pusher cluster that the local stand-in does not have.
+    """
+
+    def __init__(self, base_url, app_id='standin', key='standin-key', secret='standin-secret', latency_ms=0.0,
+                 concurrency=50, timeout=10.0):
+        self.engine = ProbeEngine(base_url, concurrency=concurrency, timeout=timeout)
+        self.app_id = app_id
+        self.key = key
+        self.secret = secret
+        self.latency_ms = latency_ms
+        self.statuses = Counter()
+
+    async def trigger(self, channel, event, data):
+        """POST /apps/{id}/events; returns the HTTP status"""
+        path = f"/apps/{self.app_id}/events"
+        body = json.dumps({'name': event, 'channels': [channel], 'data': json.dumps(data)}).encode()
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        response = await self.engine.request('POST', f"{path}?{sign_query(self.key, self.secret, 'POST', path, body)}",
+                                             {'Content-Type': 'application/json'}, body)
+        self.statuses[response['status']] += 1
+        return response['status']
+
+    async def close(self):
+        await self.engine.close()
+
+
+class PusherSubscriber:
+    """Minimal pusher-js stand-in: connect, subscribe, receive events
+
+    socket_buffer caps the kernel receive buffer and the reader's buffer
+    (asyncio stops reading the socket at twice the limit), so a slow reader
+    pushes back on the server instead of buffering everything it is sent.
+    """
+
+    def __init__(self, url, socket_buffer=None):
+        self.url = urllib.parse.urlsplit(url)
+        self.socket_buffer = socket_buffer
+        self.reader = None
+        self.writer = None
+        self.socket_id = None
+
+    async def connect(self, timeout=10):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.url.hostname, self.url.port or 80,
+                                    limit=max(self.socket_buffer or 2 ** 20, 2 ** 12)), timeout)
+        if self.socket_buffer:
+            limit_buffers(self.writer, self.socket_buffer, socket.SO_RCVBUF)
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = f"{self.url.path}?protocol=7&client=crm-load&version=8.4.0"
+        self.writer.write((f"GET {path} HTTP/1.1\r\nHost: {self.url.netloc}\r\nUpgrade: websocket\r\n"
+                           f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        first, headers = await asyncio.wait_for(_read_head(self.reader), timeout)
+        if first.split(' ')[1] != '101' or headers.get('sec-websocket-accept') != accept_key(key):
+            raise ConnectionError(f"Websocket upgrade refused: {first}")
+        established = await asyncio.wait_for(self.receive(), timeout)
+        if established.get('event') != 'pusher:connection_established':
+            raise ConnectionError(f"Unexpected first event: {established}")
+        self.socket_id = json.loads(established['data'])['socket_id']
+        return self
+
+    async def send(self, event, data):
+        self.writer.write(encode_frame(json.dumps({'event': event, 'data': data}), mask=True))
+        await self.writer.drain()
+
+    async def subscribe(self, channel):
+        await self.send('pusher:subscribe', {'channel': channel})
+
+    async def receive(self):
+        """Next Pusher message as a dict (pings are answered, not returned)"""
+        while True:
+            opcode, payload = await read_message(self.reader)
+            if opcode == OP_CLOSE:
+                raise ConnectionError(f"Closed by server: {payload[2:].decode('utf-8', 'replace')}")
+            if opcode == OP_PING:
+                self.writer.write(encode_frame(payload, OP_PONG, mask=True))
+                continue
+            if opcode == OP_TEXT:
+                return json.loads(payload)
+
+    async def close(self):
+        if self.writer:
+            try:
+                self.writer.write(encode_frame(struct.pack('!H', 1000), OP_CLOSE, mask=True))
+                await self.writer.drain()
+            except ConnectionError:
+                pass
+            self.writer.close()
@@ -0,0 +1,145 @@
+"""
+Resend API Stand-in
+A local sink that answers the Resend REST calls send-campaign makes, so a
+campaign can be load-tested without mailing anyone:
+
+  POST /emails        one message  -> {"id": ...}
+  POST /emails/batch  up to 100    -> {"data": [{"id": ...}, ...]}
+
+with Resend's error shapes ({statusCode, name, message}) for a missing or
+invalid API key (401/403), validation errors (422), the per-key rate limit
+(429 with ratelimit-* and retry-after headers; Resend's default is 2 requests
+per second) and injected application errors (500).
+
+The Next.js app reaches it with RESEND_BASE_URL=http://127.0.0.1:<port> and
+any RESEND_API_KEY starting with re_. Latency and jitter come from the
+StandinServer plumbing it is built on.
+"""
+
+import json
+import time
+import uuid
+from collections import Counter
+
+from crm_standin import StandinServer, json_response
+
+MAX_BATCH = 100
+
+
+def resend_error(status, name, message, headers=None):
+    response = json_response({'statusCode': status, 'name': name, 'message': message}, status)
+    response.headers.update(headers or {})
+    return response
+
+
+class ResendStandin(StandinServer):
+    """Resend-compatible sink with a token-bucket rate limit and error injection"""
+
+    def __init__(self, host='127.0.0.1', port=3030, latency_ms=0.0, jitter_ms=0.0, rate_limit=2.0,
+                 error_rate=0.0, seed=None):
+        super().__init__(host, port, latency_ms=latency_ms, jitter_ms=jitter_ms, seed=seed)
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.stats = Counter()
+        # (monotonic arrival, messages, outcome) for every call - the driver reads stalls from the gaps
+        self.arrivals = []
+        self.messages = {}
+        self._buckets = {}
+        self.routes = {
+            ('POST', '/emails'): self.send_email,
+            ('POST', '/emails/batch'): self.send_batch,
+        }
+
+    def middleware(self, request):
+        return None
+
+    def _authorize(self, request):
+        """API key from the bearer token, or the error response Resend gives"""
+        auth = request.headers.get('authorization', '')
+        if not auth.lower().startswith('bearer '):
+            return None, resend_error(401, 'missing_api_key', 'Missing API key in the authorization header')
+        key = auth[7:].strip()
+        if not key.startswith('re_'):
+            return None, resend_error(403, 'invalid_api_key', 'API key is invalid')
+        return key, None
+
+    def _take_token(self, key):
+        """Token bucket per API key; returns the 429 response when empty"""
+        if not self.rate_limit:
+            return None
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.rate_limit, now))
+        tokens = min(self.rate_limit, tokens + (now - updated) * self.rate_limit)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            retry_after = (1 - tokens) / self.rate_limit
+            return resend_error(429, 'rate_limit_exceeded',
+                                f"Too many requests. You can only make {self.rate_limit:g} requests per second. "
+                                "See rate limit response headers for more information.",
+                                {'ratelimit-limit': f"{self.rate_limit:g}", 'ratelimit-remaining': '0',
+                                 'ratelimit-reset': str(max(1, round(retry_after))),
+                                 'retry-after': str(max(1, round(retry_after)))})
+        self._buckets[key] = (tokens - 1, now)
+        return None
+
+    def _validate(self, email):
+        for field in ('from', 'to', 'subject'):
+            if not email.get(field):
+                return f"Missing `{field}` field."
+        if not (email.get('html') or email.get('text') or email.get('react')):
+            return "Missing `html` or `text` field."
+        return None
+
+    def _admit(self, request, count):
+        """Shared checks for both routes; returns (payload, error response)"""
+        self.stats['requests'] += 1
+        key, error = self._authorize(request)
+        if error is None:
+            error = self._take_token(key)
+            if error is not None:
+                self.stats['rate_limited'] += 1
+        if error is None and self.error_rate and self.rng.random() < self.error_rate:
+            self.stats['injected_errors'] += 1
+            error = resend_error(500, 'application_error', 'An unexpected error occurred, please try again later.')
+        if error is not None:
+            self.arrivals.append((time.monotonic(), count, error.status))
+            return None, error
+        try:
+            return json.loads(request.body or b'null'), None
+        except ValueError:
+            return None, resend_error(422, 'validation_error', 'Invalid JSON body.')
+
+    def _store(self, email):
+        message_id = str(uuid.uuid4())
+        self.messages[message_id] = {'to': email['to'], 'subject': email['subject'],
+                                     'bytes': len(email.get('html') or '') + len(email.get('text') or '')}
+        self.stats['messages'] += 1
+        self.stats['html_bytes'] += len(email.get('html') or '')
+        return message_id
+
+    async def send_email(self, request):
+        email, error = self._admit(request, 1)
+        if error is not None:
+            return error
+        problem = self._validate(email or {})
+        if problem:
+            self.stats['invalid'] += 1
+            return resend_error(422, 'validation_error', problem)
+        self.arrivals.append((time.monotonic(), 1, 200))
+        return json_response({'id': self._store(email)})
+
+    async def send_batch(self, request):
+        emails, error = self._admit(request, 0)
+        if error is not None:
+            return error
+        if not isinstance(emails, list) or not emails:
+            return resend_error(422, 'validation_error', 'Expected a non-empty array of emails.')
+        if len(emails) > MAX_BATCH:
+            return resend_error(422, 'validation_error', f"Too many emails in the batch (max {MAX_BATCH}).")
+        for email in emails:
+            problem = self._validate(email)
+            if problem:
+                self.stats['invalid'] += 1
+                return resend_error(422, 'validation_error', problem)
+        self.arrivals.append((time.monotonic(), len(emails), 200))
+        return json_response({'data': [{'id': self._store(email)} for email in emails]})
@@ -0,0 +1,222 @@
+"""
+Shared Login Session Cache
+Logs in once through /api/auth/login and stores the session cookies as a
+Playwright storage_state file so every script and worker can skip the UI login.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+try:
+    import fcntl
+except ImportError:  # Windows - fall back to the in-process lock only
+    fcntl = None
+
+from crm_config import BASE_URL, USERNAME, PASSWORD
+
+# Cookies checked by src/middleware.ts
+SESSION_COOKIES = ('admin-session', 'staff-session')
+
+STATE_PATH = os.environ.get('CRM_SESSION_FILE', '.crm-session/storage-state.json')
+MAX_AGE = int(os.environ.get('CRM_SESSION_MAX_AGE', str(6 * 60 * 60)))
+
+# Treat a cookie as expired this many seconds early so a run never starts on a dying session
+EXPIRY_MARGIN = 60
+
+_thread_lock = threading.Lock()
+_async_lock = None
+
+
+def _parse_set_cookie(header, default_domain):
+    """Convert one Set-Cookie header into a Playwright cookie dict"""
+    parts = [p.strip() for p in header.split(';')]
+    name, _, value = parts[0].partition('=')
+    cookie = {
+        'name': name.strip(),
+        'value': value.strip(),
+        'domain': default_domain,
+        'path': '/',
+        'expires': -1,
+        'httpOnly': False,
+        'secure': False,
+        'sameSite': 'Lax'
+    }
+
+    for attr in parts[1:]:
+        key, _, val = attr.partition('=')
+        key = key.strip().lower()
+        if key == 'max-age':
+            cookie['expires'] = time.time() + int(val)
+        elif key == 'domain':
+            cookie['domain'] = val.strip()
+        elif key == 'path':
+            cookie['path'] = val.strip()
+        elif key == 'httponly':
+            cookie['httpOnly'] = True
+        elif key == 'secure':
+            cookie['secure'] = True
+        elif key == 'samesite':
+            cookie['sameSite'] = val.strip().capitalize()
+
+    return cookie
+
+
+def login_via_api(base_url=BASE_URL, username=USERNAME, password=PASSWORD, timeout=15):
+    """POST credentials to /api/auth/login and return (user, session cookies)"""
+    body = json.dumps({'username': username, 'password': password}).encode('utf-8')
+    request = urllib.request.Request(
+        f"{base_url}/api/auth/login",
+        data=body,
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"Login API returned {e.code}: {e.read(200).decode('utf-8', errors='ignore')}")
+
+    payload = json.loads(response.read().decode('utf-8'))
+    if not payload.get('success'):
+        raise RuntimeError(f"Login API rejected credentials: {payload}")
+
+    host = urllib.parse.urlparse(base_url).hostname
+    cookies = [
+        _parse_set_cookie(header, host)
+        for header in response.headers.get_all('Set-Cookie') or []
+    ]
+    cookies = [c for c in cookies if c['name'] in SESSION_COOKIES]
+    if not cookies:
+        raise RuntimeError("Login API succeeded but returned no session cookie")
+
+    return payload.get('user'), cookies
+
+
+def _is_fresh(state, base_url, mtime, max_age):
+    """Check that a cached state belongs to base_url and has not expired"""
+    now = time.time()
+    if now - mtime > max_age - EXPIRY_MARGIN:
+        return False
+
+    host = urllib.parse.urlparse(base_url).hostname
+    cookies = [c for c in state.get('cookies', []) if c.get('name') in SESSION_COOKIES]
+    if not cookies:
+        return False
+
+    for cookie in cookies:
+        if cookie.get('domain', '').lstrip('.') != host:
+            return False
+        expires = cookie.get('expires', -1)
+        if expires != -1 and expires - EXPIRY_MARGIN < now:
+            return False
+    return True
+
+
+def load_storage_state(base_url=BASE_URL, path=STATE_PATH, max_age=MAX_AGE):
+    """Return the cached storage_state dict, or None if missing or expired"""
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    return state if _is_fresh(state, base_url, mtime, max_age) else None
+
+
+def save_storage_state(state, path=STATE_PATH):
+    """Atomically write a storage_state dict so concurrent readers never see a partial file"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+    try:
+        os.chmod(path, 0o600)
+    except OSError:
+        pass
+
+
+def invalidate(path=STATE_PATH):
+    """Drop the cached session, e.g. after the server rejected it"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def get_storage_state(base_url=BASE_URL, username=USERNAME, password=PASSWORD,
+                      path=STATE_PATH, max_age=MAX_AGE, refresh=False):
+    """Return the path of a valid storage_state file, logging in only when needed"""
+    with _thread_lock:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        lock_file = open(f"{path}.lock", 'w')
+        try:
+            # Serialise logins across processes so parallel workers share one login
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            if not refresh and load_storage_state(base_url, path, max_age):
+                return path
+
+            user, cookies = login_via_api(base_url, username, password)
+            save_storage_state({'cookies': cookies, 'origins': []}, path)
+            print(f"🔐 New session cached for {user.get('name') if user else username} → {path}")
+            return path
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+
+async def ensure_storage_state(**kwargs):
+    """Async wrapper around get_storage_state; concurrent callers share one login"""
+    global _async_lock
+    if _async_lock is None:
+        _async_lock = asyncio.Lock()
+    async with _async_lock:
+        return await asyncio.to_thread(get_storage_state, **kwargs)
+
+
+async def new_session_context(browser, base_url=BASE_URL, **context_options):
+    """Create a BrowserContext that is already logged in"""
+    state_path = await ensure_storage_state(base_url=base_url)
+    return await browser.new_context(storage_state=state_path, **context_options)
+
+
+async def save_context_session(context, path=STATE_PATH):
+    """Store a context's cookies after a UI login so other scripts can reuse them"""
+    state = await context.storage_state()
+    if any(c.get('name') in SESSION_COOKIES for c in state.get('cookies', [])):
+        save_storage_state(state, path)
+        return True
+    return False
+
+
+def session_user(path=STATE_PATH):
+    """Decode the user stored in the cached session cookie"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    for cookie in state.get('cookies', []):
+        if cookie.get('name') in SESSION_COOKIES:
+            try:
+                return json.loads(urllib.parse.unquote(cookie['value'])).get('user')
+            except ValueError:
+                return None
+    return None
+
+
+async def is_logged_in(page, base_url=BASE_URL):
+    """Open /admin and report whether the middleware let us through"""
+    await page.goto(f"{base_url}/admin")
+    return '/login' not in page.url
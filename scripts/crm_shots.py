@@ -0,0 +1,168 @@
+"""
+Background Screenshot Pipeline
+Takes step screenshots off the flow's critical path: the page is captured
+(the only part that has to happen at that moment), and decoding, duplicate
+detection, encoding and the disk write happen on a writer thread.
+
+  - format: jpeg (encoded by the browser, no extra dependency), webp
+    (re-encoded with Pillow) or png (the old behaviour)
+  - frames whose perceptual hash (64-bit dHash, needs Pillow) is within
+    max_distance bits of the previous frame are skipped; without Pillow only
+    byte-identical frames are
+  - mode 'all' writes every kept frame, 'last' keeps only the last N frames
+    and writes them at close, 'failure' writes the last N frames only when the
+    flow failed
+
+Defaults come from CRM_SHOTS (all/last/failure/off), CRM_SHOTS_FORMAT,
+CRM_SHOTS_QUALITY and CRM_SHOTS_KEEP.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import time
+from collections import deque
+
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp', 'png': 'png'}
+
+
+def _pillow():
+    try:
+        from PIL import Image
+        return Image
+    except ImportError:
+        return None
+
+
+def dhash(image, size=8):
+    """64-bit difference hash of a Pillow image"""
+    gray = image.convert('L').resize((size + 1, size))
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            bits = (bits << 1) | (left > pixels[row * (size + 1) + col + 1])
+    return bits
+
+
+class ScreenshotPipeline:
+    """Screenshots for one flow, written to one directory by a background task"""
+
+    def __init__(self, directory, mode=None, fmt=None, quality=None, keep=None, max_distance=2, queue_size=8):
+        self.directory = directory
+        self.mode = mode or os.environ.get('CRM_SHOTS', 'all')
+        self.format = fmt or os.environ.get('CRM_SHOTS_FORMAT', 'jpeg')
+        self.quality = int(quality or os.environ.get('CRM_SHOTS_QUALITY', '70'))
+        self.keep = int(keep or os.environ.get('CRM_SHOTS_KEEP', '8'))
+        self.max_distance = max_distance
+        if self.format not in EXTENSIONS:
+            raise ValueError(f"Unknown screenshot format {self.format!r} (jpeg, webp or png)")
+        self.image = _pillow()
+        if self.format == 'webp' and self.image is None:
+            raise SystemExit("❌ WebP screenshots need Pillow: pip install Pillow")
+        self.ring = deque(maxlen=self.keep)
+        self.written = []
+        self.stats = {'captured': 0, 'duplicates': 0, 'written': 0, 'bytes': 0,
+                      'capture_ms': 0.0, 'encode_ms': 0.0}
+        self._previous = None
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._writer = None
+        if self.mode != 'off':
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def active(self):
+        """True between the first capture and close()"""
+        return self._writer is not None
+
+    async def capture(self, page, name, **options):
+        """Capture the page now and queue it; returns as soon as the browser hands over the bytes"""
+        if self.mode == 'off':
+            return
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+        started = time.perf_counter()
+        if self.format == 'png':
+            data = await page.screenshot(type='png', **options)
+        else:
+            # The browser encodes JPEG itself; WebP frames are re-encoded from a near-lossless JPEG
+            quality = self.quality if self.format == 'jpeg' else 95
+            data = await page.screenshot(type='jpeg', quality=quality, **options)
+        self.stats['capture_ms'] += (time.perf_counter() - started) * 1000
+        self.stats['captured'] += 1
+        # Bounded queue: a slow disk holds the flow back instead of piling frames up in memory
+        await self._queue.put((name, data))
+
+    async def _write_loop(self):
+        while True:
+            name, data = await self._queue.get()
+            try:
+                await asyncio.to_thread(self._process, name, data)
+            except Exception as e:
+                print(f"⚠️ Could not save screenshot {name}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _fingerprint(self, data):
+        if self.image is None:
+            return None, hashlib.sha1(data).digest()
+        image = self.image.open(io.BytesIO(data))
+        image.load()
+        return image, dhash(image)
+
+    def _is_duplicate(self, fingerprint):
+        if self._previous is None:
+            return False
+        if isinstance(fingerprint, bytes):
+            return fingerprint == self._previous
+        return bin(fingerprint ^ self._previous).count('1') <= self.max_distance
+
+    def _process(self, name, data):
+        started = time.perf_counter()
+        image, fingerprint = self._fingerprint(data)
+        if self._is_duplicate(fingerprint):
+            self.stats['duplicates'] += 1
+            self.stats['encode_ms'] += (time.perf_counter() - started) * 1000
+            return
+        self._previous = fingerprint
+        if self.format == 'webp':
+            buffer = io.BytesIO()
+            image.save(buffer, 'WEBP', quality=self.quality, method=4)
+            data = buffer.getvalue()
+        frame = (f"{name}.{EXTENSIONS[self.format]}", data)
+        if self.mode == 'all':
+            self._save(*frame)
+        else:
+            self.ring.append(frame)
+        self.stats['encode_ms'] += (time.perf_counter() - started) * 1000
+
+    def _save(self, filename, data):
+        path = os.path.join(self.directory, filename)
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.written.append(path)
+        self.stats['written'] += 1
+        self.stats['bytes'] += len(data)
+
+    async def close(self, failed=False):
+        """Drain the queue, write the ring buffer if the mode asks for it, and stop the writer"""
+        if self._writer is None:
+            return self.stats
+        await self._queue.join()
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        self._writer = None
+        if self.mode == 'last' or (self.mode == 'failure' and failed):
+            for frame in self.ring:
+                self._save(*frame)
+        self.ring.clear()
+        return self.stats
+
+    def report(self):
+        """One summary line"""
+        s = self.stats
+        return (f"📸 {s['captured']} screenshots: {s['written']} written to {self.directory}/ "
+                f"({s['bytes'] / 1024:,.0f} KB {self.format}), {s['duplicates']} duplicates skipped, "
+                f"{s['capture_ms']:,.0f}ms capturing in the flow, {s['encode_ms']:,.0f}ms encoding in the background")
@@ -0,0 +1,1123 @@
+"""
+Local CRM Stand-in Server
+Asyncio HTTP/1.1 server that emulates the routes the scripts touch, so the
+suite runs offline with repeatable numbers. It uses the same session cookies,
+middleware redirects and JSON shapes as the Next.js app, with injectable
+latency/jitter and an in-memory Enquiry store.
+
+Pages are lightweight HTML with the selectors the Playwright scripts rely on,
+not copies of the React UI.
+"""
+
+import asyncio
+import base64
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from datetime import datetime, timezone
+from http import HTTPStatus
+
+from crm_config import USERNAME, PASSWORD
+from crm_import import (parse_csv, import_rows, import_message, import_key, auto_map, prefetch_original_ids,
+                        UniqueConstraintError, VALID_STATES)
+
+# Mirrors src/lib/staff-data.ts (login credentials) and the default staff table rows
+STAFF_CREDENTIALS = [
+    {'id': 1, 'username': 'june.staff', 'password': 'Jun3@2025!', 'name': 'June'},
+    {'id': 2, 'username': 'chris.staff', 'password': 'Chr1s@2025!', 'name': 'Chris'},
+    {'id': 3, 'username': 'mike.staff', 'password': 'M1ke@2025!', 'name': 'Mike'},
+    {'id': 4, 'username': 'alison.staff', 'password': 'Al1s0n@2025!', 'name': 'Alison'},
+    {'id': 5, 'username': 'angela.staff', 'password': 'Ang3la@2025!', 'name': 'Angela'},
+    {'id': 6, 'username': 'olivia.staff', 'password': 'Ol1v1a@2025!', 'name': 'Olivia'},
+    {'id': 7, 'username': 'mark.staff', 'password': 'M@rk2025!', 'name': 'Mark'},
+    {'id': 8, 'username': 'louie.staff', 'password': 'L0u1e@2025!', 'name': 'Louie'},
+    {'id': 9, 'username': 'day.staff', 'password': 'D@y2025!', 'name': 'Day'},
+    {'id': 10, 'username': 'hendra.staff', 'password': 'H3ndr@2025!', 'name': 'Hendra'},
+]
+
+# /api/auth/login falls back to 7 days when system_settings has no sessionTimeout
+SESSION_MAX_AGE = 60 * 60 * 24 * 7
+
+# Prisma @default values on the Enquiry model
+ENQUIRY_DEFAULTS = {
+    'status': 'New',
+    'institutionName': None,
+    'phone': None,
+    'nationality': None,
+    'suburb': None,
+    'productInterest': None,
+    'source': None,
+    'eventSource': None,
+    'comments': None,
+    'others': None,
+    'submittedBy': None,
+    'customerRating': 'N/A',
+    'doNotEmail': False,
+    'followUpInfo': None,
+    'bestTimeToFollowUp': None,
+    'stepProgram': 'N/A',
+    'enquiryUpdatedBy': None,
+    'salesManagerInvolved': 'No',
+    'salesManagerExplanation': None,
+    'followUpNotes': None,
+    'inputDate': None,
+    'lastUpdate': None,
+    'fupStatus': None,
+    'originalFupDate': None,
+    'importSource': None,
+    'originalId': None,
+    'importKey': None,
+}
+
+
+def _now_iso():
+    now = datetime.now(timezone.utc)
+    return now.strftime('%Y-%m-%dT%H:%M:%S.') + f"{now.microsecond // 1000:03d}Z"
+
+
+class EnquiryStore:
+    """In-memory stand-in for the enquiries table"""
+
+    def __init__(self):
+        self.records = []
+        self.next_id = 1
+        # The @@unique([importKey, originalId]) index (rows without an importKey never conflict)
+        self._import_keys = set()
+        self._lock = threading.Lock()
+
+    def create(self, data):
+        """prisma.enquiry.create(): apply column defaults and assign an id"""
+        now = _now_iso()
+        with self._lock:
+            record = {**ENQUIRY_DEFAULTS, 'createdAt': now, **data, 'id': self.next_id, 'updatedAt': data.get('updatedAt') or now}
+            if record['importKey'] is not None and record['originalId'] is not None:
+                unique = (record['importKey'], str(record['originalId']))
+                if unique in self._import_keys:
+                    raise UniqueConstraintError('Unique constraint failed on the fields: (`importKey`,`originalId`)')
+                self._import_keys.add(unique)
+            self.next_id += 1
+            self.records.append(record)
+        return record
+
+    def original_ids(self, key, ids):
+        """Which of ids are already stored under one importKey (the idempotent import lookup)"""
+        with self._lock:
+            return {original_id for original_id in ids if (key, original_id) in self._import_keys}
+
+    def newest_first(self):
+        return sorted(self.records, key=lambda r: r['createdAt'], reverse=True)
+
+    def seed(self, count, rng=None):
+        """Add count synthetic enquiries with the value mix the forms produce"""
+        rng = rng or random.Random(0)
+        first_names = ['Ivan', 'Mei', 'Sarah', 'James', 'Hiroshi', 'Priya', 'Olivia', 'Jin', 'Tom', 'Grace']
+        last_names = ['Chan', 'Nguyen', 'Smith', 'Brown', 'Tanaka', 'Patel', 'Wilson', 'Kim', 'Lee', 'Taylor']
+        suburbs = ['St Leonards', 'Chatswood', 'Richmond', 'Box Hill', 'Parramatta', 'Carlton', None]
+        products = ['steinway', 'boston', 'essex', 'kawai', 'yamaha', 'roland', 'usedpiano']
+        for i in range(count):
+            first, last = rng.choice(first_names), rng.choice(last_names)
+            self.create({
+                'firstName': first,
+                'lastName': last,
+                'email': f"{first}.{last}.{self.next_id}@example.com".lower(),
+                'phone': f"04{rng.randrange(10 ** 8):08d}",
+                'state': rng.choice(VALID_STATES),
+                'suburb': rng.choice(suburbs),
+                'status': rng.choice(['New', 'New', 'New', 'Sold', 'Finalised']),
+                'productInterest': ', '.join(rng.sample(products, rng.randint(1, 2))),
+                'source': rng.choice(['Google', 'Teacher', 'Facebook', 'Recommended by a friend', None]),
+                'submittedBy': rng.choice([s['name'] for s in STAFF_CREDENTIALS] + ['Online Form']),
+                'customerRating': rng.choice(['N/A', 'Ready to buy', 'Cold', 'Looking for information']),
+                'doNotEmail': rng.random() < 0.8,
+                'createdAt': datetime.fromtimestamp(1_450_000_000 + rng.randrange(300_000_000), timezone.utc)
+                    .strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            })
+        return self
+
+    @staticmethod
+    def listing(record):
+        """GET /api/enquiries item shape"""
+        return {
+            'id': record['id'],
+            'status': record['status'],
+            'firstName': record['firstName'],
+            'lastName': record['lastName'],
+            'email': record['email'],
+            'phone': record['phone'],
+            'nationality': record['nationality'],
+            'state': record['state'],
+            'suburb': record['suburb'],
+            'institutionName': record['institutionName'],
+            'productInterest': record['productInterest'] or '',
+            'source': record['source'],
+            'eventSource': record['eventSource'],
+            'comments': record['comments'],
+            'submittedBy': record['submittedBy'],
+            'bestTimeToFollowUp': record['bestTimeToFollowUp'],
+            'customerRating': record['customerRating'],
+            'stepProgram': record['stepProgram'],
+            'salesManagerInvolved': record['salesManagerInvolved'],
+            'salesManagerExplanation': record['salesManagerExplanation'],
+            'followUpNotes': record['followUpNotes'],
+            'followUpInfo': record['followUpInfo'],
+            # The newsletter column stores subscription, the API exposes "do not email"
+            'doNotEmail': not record['doNotEmail'],
+            'hasFollowUp': bool(record['bestTimeToFollowUp'] or record['followUpInfo']),
+            'createdAt': record['createdAt'],
+            'created_at': record['createdAt'],
+            'inputDate': record['inputDate'],
+        }
+
+
+class TrackingStore:
+    """Stand-in for the email_tracking table the open and click routes write
+
+    In memory by default. With a path it is a SQLite file with the same
+    columns and indexes as src/app/api/admin/setup-tracking - a serial id and
+    no unique key, so every pixel hit and click is a row of its own - so
+    insert cost comes from a real engine.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.inserted = Counter()
+        self._lock = threading.Lock()
+        self._clicks = 0
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self.db.execute('PRAGMA journal_mode = WAL')
+            self.db.execute('PRAGMA synchronous = NORMAL')
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS email_tracking (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    campaign_id TEXT NOT NULL,
+                    recipient_email TEXT NOT NULL,
+                    event_type TEXT NOT NULL,
+                    target_url TEXT,
+                    link_type TEXT,
+                    user_agent TEXT,
+                    ip_address TEXT,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )""")
+            self.db.execute('CREATE INDEX IF NOT EXISTS idx_campaign_tracking ON email_tracking (campaign_id, event_type)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS idx_recipient_tracking ON email_tracking (recipient_email, event_type)')
+            self._clicks = self.db.execute("SELECT COUNT(*) FROM email_tracking WHERE event_type = 'click'").fetchone()[0]
+
+    def record_open(self, campaign_id, email, user_agent=None, ip_address=None):
+        """INSERT INTO email_tracking one 'open' row - nothing is unique, so every hit lands"""
+        with self._lock:
+            if self.db is not None:
+                self.db.execute("INSERT INTO email_tracking (campaign_id, recipient_email, event_type, user_agent, "
+                                "ip_address) VALUES (?, ?, 'open', ?, ?)", (campaign_id, email, user_agent, ip_address))
+            self.inserted['email_tracking open'] += 1
+
+    @property
+    def click_count(self):
+        return self._clicks
+
+    def record_clicks(self, rows):
+        """Insert 'click' rows [(campaign_id, email, target_url, link_type, user_agent, ip_address), ...] in one transaction"""
+        with self._lock:
+            if self.db is not None:
+                self.db.execute('BEGIN')
+                self.db.executemany("INSERT INTO email_tracking (campaign_id, recipient_email, event_type, target_url, "
+                                    "link_type, user_agent, ip_address) VALUES (?, ?, 'click', ?, ?, ?, ?)", rows)
+                self.db.execute('COMMIT')
+            self._clicks += len(rows)
+            self.inserted['email_tracking click'] += len(rows)
+            return self._clicks
+
+    def record_click(self, campaign_id, email, target_url, link_type=None, user_agent=None, ip_address=None):
+        """The click route's single INSERT INTO email_tracking; returns the click row count"""
+        return self.record_clicks([(campaign_id, email, target_url, link_type, user_agent, ip_address)])
+
+    def prefill_clicks(self, count, campaign_id='prefill', batch=10000):
+        """Add count synthetic click rows to email_tracking (for measuring inserts into a large table)"""
+        for start in range(0, count, batch):
+            self.record_clicks([(campaign_id, f"prefill+{i}@example.com", 'https://www.steinway.com.au/', 'website',
+                                 'Mozilla/5.0', '203.0.113.1') for i in range(start, min(count, start + batch))])
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        parsed = urllib.parse.urlsplit(target)
+        self.method = method
+        self.path = parsed.path
+        self.query = {k: v[0] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+        self.headers = headers
+        self.body = body
+        self.cookies = {}
+        for part in headers.get('cookie', '').split(';'):
+            name, sep, value = part.strip().partition('=')
+            if sep:
+                self.cookies[name] = urllib.parse.unquote(value)
+
+    def json(self):
+        return json.loads(self.body or b'null')
+
+    def form(self):
+        """multipart/form-data -> {name: str | (filename, bytes)}"""
+        content_type = self.headers.get('content-type', '')
+        boundary = None
+        for param in content_type.split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'boundary':
+                boundary = value.strip('"')
+        if not content_type.startswith('multipart/form-data') or not boundary:
+            raise ValueError('Content-Type was not one of "multipart/form-data"')
+
+        fields = {}
+        delimiter = b'--' + boundary.encode('latin-1')
+        for part in self.body.split(delimiter)[1:]:
+            if part.startswith(b'--'):
+                break
+            head, _, content = part[2:].partition(b'\r\n\r\n')
+            content = content[:-2] if content.endswith(b'\r\n') else content
+            disposition = {}
+            for line in head.decode('utf-8', 'replace').split('\r\n'):
+                if line.lower().startswith('content-disposition:'):
+                    for item in line.split(';')[1:]:
+                        key, _, value = item.strip().partition('=')
+                        disposition[key] = value.strip('"')
+            name = disposition.get('name')
+            if name is None:
+                continue
+            if 'filename' in disposition:
+                fields[name] = (disposition['filename'], content)
+            else:
+                fields[name] = content.decode('utf-8', 'replace')
+        return fields
+
+
+class Response:
+    def __init__(self, status=200, body=b'', content_type='text/plain; charset=utf-8', headers=None):
+        self.status = status
+        self.body = body
+        self.headers = {'Content-Type': content_type, **(headers or {})}
+        self.set_cookies = []
+
+    def set_cookie(self, name, value, max_age, path='/'):
+        # NextResponse.cookies.set() URI-encodes the value
+        self.set_cookies.append(
+            f"{name}={urllib.parse.quote(value, safe='')}; Path={path}; Max-Age={max_age}; HttpOnly; SameSite=lax"
+        )
+
+
+def json_response(data, status=200):
+    return Response(status, json.dumps(data).encode(), 'application/json')
+
+
+def html_response(html, status=200):
+    return Response(status, html.encode(), 'text/html; charset=utf-8')
+
+
+def redirect(location, status=307):
+    return Response(status, b'', headers={'Location': location})
+
+
+# 1x1 transparent GIF served by the tracking pixel route
+TRACKING_PIXEL = base64.b64decode('R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7')
+
+
+def decode_uri_component(value):
+    """JavaScript's decodeURIComponent: ValueError (URIError) on a malformed escape"""
+    if re.search(r'%(?![0-9A-Fa-f]{2})', value):
+        raise ValueError(f"URI malformed: {value[:60]}")
+    try:
+        return urllib.parse.unquote(value, errors='strict')
+    except UnicodeDecodeError as e:
+        raise ValueError(f"URI malformed: {value[:60]}") from e
+
+
+# WHATWG percent-encode sets (beyond C0 controls, space and non-ASCII) for each URL part
+_URL_ENCODE_SETS = {'path': '"#<>?`{}', 'query': '"#<>\'', 'fragment': '"<>`'}
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _url_encode(text, part):
+    extra = _URL_ENCODE_SETS[part]
+    return ''.join(
+        urllib.parse.quote(c, safe='') if c <= ' ' or c >= '\x7f' or c in extra else c
+        for c in text
+    )
+
+
+def serialize_url(value):
+    """new URL(value).href for an absolute http(s) URL, as NextResponse.redirect sends it
+
+    Lower-cases scheme and host, drops a default port, gives an empty path its
+    '/', and percent-encodes spaces and other unsafe characters (existing
+    escapes, even malformed ones, are kept). ValueError where URL() would throw.
+    """
+    value = re.sub(r'[\t\n\r]', '', re.sub(r'^[\x00-\x20]+|[\x00-\x20]+$', '', value))
+    parts = urllib.parse.urlsplit(value)
+    if parts.scheme.lower() not in _DEFAULT_PORTS or not parts.hostname:
+        raise ValueError(f"Invalid URL: {value[:60]}")
+    scheme = parts.scheme.lower()
+    try:
+        port = parts.port
+    except ValueError as e:
+        raise ValueError(f"Invalid URL: {value[:60]}") from e
+    host = parts.hostname if ':' not in parts.hostname else f"[{parts.hostname}]"
+    netloc = (parts.netloc.rpartition('@')[0] + '@' if '@' in parts.netloc else '') + host
+    if port is not None and port != _DEFAULT_PORTS[scheme]:
+        netloc += f":{port}"
+    url = f"{scheme}://{netloc}{_url_encode(parts.path or '/', 'path')}"
+    if '?' in value.split('#', 1)[0]:
+        url += '?' + _url_encode(parts.query, 'query')
+    if '#' in value:
+        url += '#' + _url_encode(parts.fragment, 'fragment')
+    return url
+
+
+def server_timing(phases):
+    """Server-Timing header value from {name: seconds}, as the import route sends it"""
+    return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in phases.items())
+
+
+def _page(title, body, script=''):
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title} | EPG CRM</title></head>
+<body class="min-h-screen bg-gray-50">
+{body}
+<script>{script}</script>
+</body></html>"""
+
+
+HOME_PAGE = _page('Home', """
+<main>
+  <h1>Steinway Galleries Australia</h1>
+  <h2>CRM System</h2>
+  <a href="/login">Staff Login</a>
+</main>""")
+
+LOGIN_PAGE = _page('Login', """
+<main>
+  <h1>Staff Login</h1>
+  <form id="login-form">
+    <div id="login-error" class="bg-red-50 border border-red-200 text-red-700" hidden></div>
+    <label for="username">Username</label>
+    <input id="username" name="username" type="text" required>
+    <label for="password">Password</label>
+    <input id="password" name="password" type="password" required>
+    <button type="submit">Sign In</button>
+  </form>
+</main>""", """
+document.getElementById('login-form').addEventListener('submit', async (event) => {
+  event.preventDefault()
+  const error = document.getElementById('login-error')
+  const response = await fetch('/api/auth/login', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ username: username.value, password: password.value })
+  })
+  const data = await response.json()
+  if (response.ok && data.success) {
+    location.href = data.user.role === 'admin' ? '/admin' : '/dashboard'
+  } else {
+    error.textContent = data.error || 'Login failed'
+    error.hidden = false
+  }
+})""")
+
+ADMIN_SECTIONS = [
+    ('Staff Management', '/admin/staff'),
+    ('Customer Email Marketing', '/admin/customer-emails'),
+    ('Data Import', '/admin/import'),
+    ('System Settings', '/admin/settings'),
+    ('Analytics', '/admin/analytics'),
+    ('Database Management', '/admin/database'),
+    ('User Management', '/admin/users'),
+]
+
+ADMIN_PAGE = _page('Admin Dashboard', """
+<main>
+  <h1>Admin Dashboard</h1>
+  <div class="grid">""" + ''.join(
+    f'\n    <a class="card" href="{href}"><h3>{title}</h3></a>' for title, href in ADMIN_SECTIONS
+) + """
+  </div>
+  <div class="quick-links">
+    <a href="/admin/import">Import Data</a>
+    <a href="/admin/staff-unified">Staff Management (Unified)</a>
+    <a href="/submitted-forms/enquiry-data">Enquiry Data</a>
+    <a href="/admin/database">Database Management</a>
+  </div>
+</main>""")
+
+STAFF_PAGE = _page('Staff Management', """
+<main>
+  <h1>Staff Management</h1>
+  <p>Manage your team members, view statistics, and handle staff operations</p>
+  <nav>
+    <button role="tab" data-tab="overview">Overview</button>
+    <button role="tab" data-tab="add">Add Staff</button>
+    <button role="tab" data-tab="manage">Manage Staff</button>
+  </nav>
+  <div id="tab-content"><div class="loading">Loading staff...</div></div>
+</main>""", """
+let staff = []
+const content = document.getElementById('tab-content')
+const cell = (tr, text) => { const td = document.createElement('td'); td.textContent = text; tr.appendChild(td) }
+function render(tab) {
+  content.replaceChildren()
+  if (tab === 'add') {
+    content.innerHTML = '<h2>Add Staff</h2><input id="new-staff" placeholder="Staff name"><button id="add-staff">Add</button>'
+    return
+  }
+  const table = document.createElement('table')
+  table.innerHTML = '<thead><tr><th>Name</th><th>Username</th><th>Status</th></tr></thead><tbody></tbody>'
+  for (const member of staff) {
+    const tr = document.createElement('tr')
+    tr.className = 'staff-item'
+    cell(tr, member.name); cell(tr, member.username); cell(tr, member.active ? 'Active' : 'Inactive')
+    table.tBodies[0].appendChild(tr)
+  }
+  const heading = document.createElement('h2')
+  heading.textContent = tab === 'manage' ? 'Manage Staff' : `Overview (${staff.length} staff)`
+  content.append(heading, table)
+}
+document.querySelectorAll('button[role="tab"]').forEach(b => b.addEventListener('click', () => render(b.dataset.tab)))
+fetch('/api/admin/staff').then(r => r.json()).then(data => { staff = data.staff || []; render('overview') })""")
+
+IMPORT_PAGE = _page('Data Import', """
+<main>
+  <h1>Data Import</h1>
+  <input type="file" id="file" accept=".csv,.json">
+  <div id="mapping"></div>
+  <div id="results"></div>
+</main>""", """
+const TARGETS = __TARGETS__
+const AUTO = __AUTO__
+let file = null
+function headersOf(text) {
+  const line = text.split(/\\r?\\n/)[0]
+  const out = []; let field = ''; let quoted = false
+  for (let i = 0; i < line.length; i++) {
+    const c = line[i]
+    if (c === '"') { if (quoted && line[i + 1] === '"') { field += '"'; i++ } else quoted = !quoted }
+    else if (c === ',' && !quoted) { out.push(field.trim()); field = '' }
+    else field += c
+  }
+  out.push(field.trim())
+  return out
+}
+document.getElementById('file').addEventListener('change', async (event) => {
+  file = event.target.files[0]
+  const headers = file.name.endsWith('.json')
+    ? Object.keys(JSON.parse(await file.text())[0] || {})
+    : headersOf(await file.slice(0, 65536).text())
+  const mapping = document.getElementById('mapping')
+  mapping.innerHTML = '<h2>Field Mapping</h2><table><tbody></tbody></table><button id="start-import">Start Import</button>'
+  for (const header of headers) {
+    const tr = document.createElement('tr')
+    const label = document.createElement('td'); label.textContent = header
+    const select = document.createElement('select'); select.dataset.source = header
+    for (const target of ['', ...TARGETS]) {
+      const option = document.createElement('option'); option.value = target; option.textContent = target || "Don't import"
+      select.appendChild(option)
+    }
+    select.value = AUTO[header.toLowerCase().replace(/\\s+/g, '').replace(/[_-]/g, '')] || ''
+    const td = document.createElement('td'); td.appendChild(select)
+    tr.append(label, td)
+    mapping.querySelector('tbody').appendChild(tr)
+  }
+  document.getElementById('start-import').addEventListener('click', startImport)
+})
+async function startImport() {
+  const mappings = [...document.querySelectorAll('select[data-source]')].map(s => ({
+    sourceField: s.dataset.source, targetField: s.value, isRequired: ['firstName', 'lastName', 'email'].includes(s.value)
+  }))
+  const form = new FormData()
+  form.append('file', file)
+  form.append('mappings', JSON.stringify(mappings))
+  form.append('customFields', '[]')
+  const results = document.getElementById('results')
+  results.textContent = 'Processing...'
+  const response = await fetch('/api/admin/import', { method: 'POST', body: form })
+  const data = await response.json()
+  results.innerHTML = ''
+  if (!response.ok) { results.innerHTML = '<h2>Import Errors</h2>'; results.append(data.error); return }
+  results.innerHTML = `<div class="success"><span>Records Imported:</span> <strong>${data.imported}</strong></div>
+    <div><span>Records with Errors:</span> <strong>${data.errors}</strong></div>`
+  if (data.errorDetails.length) {
+    const list = document.createElement('ul')
+    data.errorDetails.forEach(d => { const li = document.createElement('li'); li.textContent = d; list.appendChild(li) })
+    const heading = document.createElement('h2'); heading.textContent = 'Import Errors'
+    results.append(heading, list)
+  }
+}""")
+
+ENQUIRY_PAGE = _page('Enquiry Data', """
+<main>
+  <h1>Enquiry Data</h1>
+  <div>
+    <label>Show</label>
+    <select id="per-page"><option value="10">10</option><option value="25">25</option><option value="50">50</option><option value="100">100</option></select>
+    <label>entries</label>
+    <label>Search:</label><input type="text" id="search" placeholder="Search...">
+  </div>
+  <table>
+    <thead><tr><th>ACT</th><th>STAT</th><th>FIRST NAME</th><th>SURNAME</th><th>EMAIL</th><th>PHONE</th><th>STATE</th><th>SUBURB</th><th>PRODUCT INTEREST</th><th>DATE</th><th>CALL TAKEN BY</th></tr></thead>
+    <tbody><tr><td colspan="11">Loading enquiries...</td></tr></tbody>
+  </table>
+  <div><span id="showing"></span>
+    <button id="prev">Previous</button><button id="next">Next</button>
+  </div>
+</main>""", """
+let enquiries = [], page = 1
+const perPage = document.getElementById('per-page'), search = document.getElementById('search')
+const DATE_OPTIONS = { day: '2-digit', month: 'short', year: 'numeric', hour: '2-digit', minute: '2-digit' }
+const icon = s => ({ New: '🆕', Sold: '💰', Finalised: '✅' }[s] || '❓')
+function filtered() {
+  const term = search.value.toLowerCase()
+  return term ? enquiries.filter(e => [e.firstName, e.lastName, e.email, e.phone].some(v => (v || '').toLowerCase().includes(term))) : enquiries
+}
+function render() {
+  const rows = filtered(), size = Number(perPage.value)
+  const pages = Math.max(1, Math.ceil(rows.length / size))
+  page = Math.min(page, pages)
+  const start = (page - 1) * size, slice = rows.slice(start, start + size)
+  const body = document.querySelector('tbody')
+  body.replaceChildren()
+  for (const e of slice) {
+    const tr = document.createElement('tr')
+    // Same options as the real enquiry table, so scrapers see "15 Sept 2024, 03:45 pm"
+    const date = e.createdAt ? new Date(e.createdAt).toLocaleDateString('en-AU', DATE_OPTIONS) : ''
+    for (const value of ['👁️ 📧', icon(e.status), e.firstName, e.lastName, e.email, e.phone, e.state, e.suburb, e.productInterest, date, e.submittedBy]) {
+      const td = document.createElement('td'); td.textContent = value ?? ''; tr.appendChild(td)
+    }
+    body.appendChild(tr)
+  }
+  document.getElementById('showing').textContent = `Showing ${start + 1} to ${Math.min(start + size, rows.length)} of ${rows.length} entries`
+  document.getElementById('prev').disabled = page === 1
+  document.getElementById('next').disabled = page === pages
+}
+perPage.addEventListener('change', () => { page = 1; render() })
+search.addEventListener('input', () => { page = 1; render() })
+document.getElementById('prev').addEventListener('click', () => { page--; render() })
+document.getElementById('next').addEventListener('click', () => { page++; render() })
+fetch('/api/enquiries').then(r => r.json()).then(data => { enquiries = data; render() })""")
+
+DATABASE_PAGE = _page('Database Management', """
+<main>
+  <h1>Database Management</h1>
+  <div><span>Total Enquiries</span><span id="total-enquiries">0</span></div>
+  <h3>Backup History</h3>
+  <p>Recent database backups</p>
+  <table>
+    <thead><tr><th>Backup ID</th><th>Date &amp; Time</th><th>Size</th><th>Type</th><th>Status</th><th>Actions</th></tr></thead>
+    <tbody></tbody>
+  </table>
+</main>""", """
+fetch('/api/enquiries').then(r => r.json()).then(data => {
+  document.getElementById('total-enquiries').textContent = data.length
+})
+fetch('/api/admin/backup').then(r => r.json()).then(data => {
+  const body = document.querySelector('tbody')
+  for (const b of data.backups || []) {
+    const tr = document.createElement('tr')
+    for (const value of ['#' + b.id, b.date, b.size, b.type, b.status, 'Restore Download Delete']) {
+      const td = document.createElement('td'); td.textContent = value; tr.appendChild(td)
+    }
+    body.appendChild(tr)
+  }
+})""")
+
+NOT_FOUND_PAGE = _page('404', '<h1>404</h1><h2>This page could not be found.</h2>')
+
+IMPORT_TARGETS = [
+    'status', 'institutionName', 'firstName', 'lastName', 'email', 'phone', 'nationality', 'state',
+    'suburb', 'productInterest', 'source', 'eventSource', 'comments', 'submittedBy', 'customerRating',
+    'doNotEmail', 'createdAt', 'others', 'followUpNotes', 'inputDate', 'lastUpdate', 'fupDate',
+    'fupStatus', 'originalFupDate', 'stepProgram', 'involving', 'notInvolvingReason', 'enquiryUpdatedBy',
+]
+
+
+def _import_page():
+    # Exact-match auto-mappings, keyed by the page's normalised header
+    legacy = ['firstname', 'surname', 'email', 'phone', 'state', 'suburb', 'source', 'interest', 'others',
+              'comment', 'fup', 'calltakenby', 'enquirysource', 'inputdate', 'status', 'classification',
+              'newsletter', 'institutionname', 'nationality']
+    auto = {m['sourceField']: m['targetField'] for m in auto_map(legacy)}
+    return IMPORT_PAGE.replace('__TARGETS__', json.dumps(IMPORT_TARGETS)).replace('__AUTO__', json.dumps(auto))
+
+
+class StandinServer:
+    """Offline stand-in for the CRM routes the scripts touch"""
+
+    def __init__(self, host='127.0.0.1', port=3000, latency_ms=0.0, jitter_ms=0.0, route_latency=None,
+                 row_cost_ms=0.0, backup_ms=0.0, seed=None, store=None, tracking=None, click_record='deferred',
+                 pusher=None):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.route_latency = dict(route_latency or {})
+        self.row_cost_ms = row_cost_ms
+        self.backup_ms = backup_ms
+        self.rng = random.Random(seed)
+        self.store = store or EnquiryStore()
+        self.tracking = tracking or TrackingStore()
+        # crm_pusher.PusherClient the tracking routes broadcast through (None: no broadcast)
+        self.pusher = pusher
+        # 'deferred' is what the click route does today: answer the 302 at once and run
+        # the insert and broadcast from a setImmediate callback. 'sync' (hypothetical)
+        # awaits the same work before answering.
+        self.click_record = click_record
+        self.click_backlog_max = 0
+        self._click_tasks = set()
+        self.staff = [{'id': s['id'], 'name': s['name'], 'email': f"{s['name'].lower()}@epgpianos.com.au", 'isActive': True}
+                      for s in STAFF_CREDENTIALS]
+        self.backups = []
+        self.request_counts = Counter()
+        self._server = None
+        self._connections = {}
+        self.routes = {
+            ('GET', '/'): lambda r: html_response(HOME_PAGE),
+            ('GET', '/login'): lambda r: html_response(LOGIN_PAGE),
+            ('GET', '/admin'): lambda r: html_response(ADMIN_PAGE),
+            ('GET', '/admin/staff-unified'): lambda r: html_response(STAFF_PAGE),
+            ('GET', '/admin/import'): lambda r: html_response(_import_page()),
+            ('GET', '/admin/database'): lambda r: html_response(DATABASE_PAGE),
+            ('GET', '/submitted-forms/enquiry-data'): lambda r: html_response(ENQUIRY_PAGE),
+            ('POST', '/api/auth/login'): self.auth_login,
+            ('GET', '/api/admin/staff'): self.staff_list,
+            ('POST', '/api/admin/staff'): self.staff_create,
+            ('PUT', '/api/admin/staff'): self.staff_update,
+            ('DELETE', '/api/admin/staff'): self.staff_delete,
+            ('POST', '/api/admin/import'): self.admin_import,
+            ('GET', '/api/admin/backup'): self.backup_list,
+            ('GET', '/api/enquiries'): self.enquiries_list,
+            ('POST', '/api/enquiries'): self.enquiries_create,
+            ('GET', '/api/email/tracking/open'): self.tracking_open,
+            ('GET', '/api/email/tracking/click'): self.tracking_click,
+        }
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    # --- middleware (src/middleware.ts) -------------------------------------
+
+    def _session_ok(self, request, name):
+        try:
+            session = json.loads(request.cookies[name])
+            return bool(session.get('user') and session.get('authenticated'))
+        except (KeyError, ValueError, AttributeError):
+            return False
+
+    def middleware(self, request):
+        if request.path.startswith('/admin') and not self._session_ok(request, 'admin-session'):
+            return redirect('/login')
+        if request.path.startswith(('/dashboard', '/submitted-forms')):
+            if not (self._session_ok(request, 'admin-session') or self._session_ok(request, 'staff-session')):
+                return redirect('/login')
+        return None
+
+    # --- API routes ---------------------------------------------------------
+
+    async def auth_login(self, request):
+        try:
+            data = request.json() or {}
+        except ValueError:
+            return json_response({'error': 'Login failed'}, 500)
+        username, password = data.get('username'), data.get('password')
+        if not username or not password:
+            return json_response({'error': 'Username and password are required'}, 400)
+
+        if username == USERNAME and password == PASSWORD:
+            user = {'id': 'admin', 'username': USERNAME, 'name': 'Administrator', 'role': 'admin'}
+        else:
+            staff = next((s for s in STAFF_CREDENTIALS if s['username'] == username and s['password'] == password), None)
+            if not staff:
+                return json_response({'error': 'Invalid credentials'}, 401)
+            user = {'id': staff['id'], 'username': staff['username'], 'name': staff['name'], 'role': 'staff'}
+
+        session = {'user': user, 'authenticated': True, 'timestamp': int(time.time() * 1000)}
+        response = json_response({'success': True, 'user': user})
+        cookie = 'admin-session' if user['role'] == 'admin' else 'staff-session'
+        response.set_cookie(cookie, json.dumps(session, separators=(',', ':')), SESSION_MAX_AGE)
+        return response
+
+    @staticmethod
+    def _staff_username(name):
+        return '.'.join(name.lower().split()) + '.staff'
+
+    async def staff_list(self, request):
+        if request.query.get('email_format') == 'true':
+            staff = [{'id': s['id'], 'name': s['name'], 'email': s['email'] or '', 'role': 'staff',
+                      'active': s['isActive'], 'phone': '', 'position': '', 'department': ''} for s in self.staff]
+        else:
+            staff = [{'id': s['id'], 'username': self._staff_username(s['name']), 'password': '••••••••••••',
+                      'name': s['name'], 'role': 'staff', 'active': s['isActive']} for s in self.staff]
+        return json_response({'success': True, 'staff': staff})
+
+    async def staff_create(self, request):
+        name = ((request.json() or {}).get('name') or '').strip()
+        if not name:
+            return json_response({'error': 'Staff name is required'}, 400)
+        email = '.'.join(name.lower().split()) + '@epgpianos.com.au'
+        if any(s['name'] == name or s['email'] == email for s in self.staff):
+            return json_response({'error': 'Staff member with this name already exists'}, 400)
+        member = {'id': max((s['id'] for s in self.staff), default=0) + 1, 'name': name, 'email': email, 'isActive': True}
+        self.staff.append(member)
+        password = ''.join(self.rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz23456789!@#$%&*') for _ in range(12))
+        return json_response({'success': True, 'message': 'Staff member created successfully', 'staff': {
+            'id': member['id'], 'username': self._staff_username(name), 'password': password,
+            'name': name, 'role': 'staff', 'active': True}})
+
+    async def staff_update(self, request):
+        data = request.json() or {}
+        if not data.get('id'):
+            return json_response({'error': 'Staff ID is required'}, 400)
+        name = (data.get('name') or '').strip()
+        if data.get('active') is None and not name:
+            return json_response({'error': 'No fields to update'}, 400)
+        member = next((s for s in self.staff if s['id'] == data['id']), None)
+        if not member:
+            return json_response({'error': 'Staff member not found'}, 404)
+        if data.get('active') is not None:
+            member['isActive'] = data['active']
+        if name:
+            member['name'] = name
+            member['email'] = '.'.join(name.lower().split()) + '@epgpianos.com.au'
+        return json_response({'success': True, 'message': 'Staff member updated successfully', 'staff': {
+            'id': member['id'], 'username': self._staff_username(member['name']), 'name': member['name'],
+            'role': 'staff', 'active': member['isActive']}})
+
+    async def staff_delete(self, request):
+        try:
+            staff_id = int(request.query.get('id', ''))
+        except ValueError:
+            return json_response({'error': 'Valid staff ID is required'}, 400)
+        member = next((s for s in self.staff if s['id'] == staff_id), None)
+        if not member:
+            return json_response({'error': 'Staff member not found'}, 404)
+        if request.query.get('permanent') == 'true':
+            self.staff.remove(member)
+            return json_response({'success': True, 'message': 'Staff member permanently deleted',
+                                  'staff': {'id': member['id'], 'name': member['name']}})
+        member['isActive'] = False
+        return json_response({'success': True, 'message': 'Staff member deactivated',
+                              'staff': {'id': member['id'], 'name': member['name'], 'isActive': False}})
+
+    async def admin_import(self, request):
+        started = time.perf_counter()
+        try:
+            form = request.form()
+            upload, mappings_json = form.get('file'), form.get('mappings')
+            if not isinstance(upload, tuple) or not mappings_json:
+                return json_response({'error': 'File and mappings are required'}, 400)
+
+            file_name, content = upload
+            import_id = form.get('importId')
+            if import_id and not re.fullmatch(r'[\w.:-]{8,128}', import_id, re.ASCII):
+                return json_response({'error': 'importId must be 8-128 letters, digits, ".", ":", "_" or "-"'}, 400)
+            mappings = json.loads(mappings_json)
+            custom_fields = json.loads(form['customFields']) if form.get('customFields') else []
+            # File.text() is a UTF-8 decode, which drops a leading BOM
+            text = content.decode('utf-8-sig', 'replace')
+
+            if file_name.endswith('.csv'):
+                raw = await asyncio.to_thread(parse_csv, text)
+            elif file_name.endswith('.json'):
+                parsed = json.loads(text)
+                raw = parsed if isinstance(parsed, list) else [parsed]
+            else:
+                return json_response({'error': 'Unsupported file format. Please use CSV or JSON.'}, 400)
+            parsed_at = time.perf_counter()
+
+            key = imported_ids = None
+            if form.get('idempotent') == 'true':
+                key = import_key(import_id, text)
+                imported_ids = self.store.original_ids(key, prefetch_original_ids(raw, mappings, custom_fields))
+            results = await asyncio.to_thread(import_rows, raw, mappings, custom_fields, file_name,
+                                              self.store.create, imported_ids, key)
+            # One prisma.enquiry.create() round trip per imported row
+            if self.row_cost_ms and results['imported']:
+                await asyncio.sleep(self.row_cost_ms * results['imported'] / 1000)
+            rows_done_at = time.perf_counter()
+            if results['imported'] > 0:
+                await self.create_auto_backup(f"CSV import: {results['imported']} records from {file_name}")
+            finished = time.perf_counter()
+
+            response = json_response({**results, 'message': import_message(results, custom_fields), 'totalRecords': len(raw)})
+            response.headers['Server-Timing'] = server_timing({
+                'parse': parsed_at - started,
+                'rows': rows_done_at - parsed_at,
+                'backup': finished - rows_done_at,
+                'total': finished - started,
+            })
+            return response
+        except Exception as e:
+            return json_response({'error': f"Import failed: {e}"}, 500)
+
+    async def create_auto_backup(self, trigger):
+        """createAutoBackup(): snapshot every enquiry as JSON and keep the last 20"""
+        def snapshot():
+            data = {'enquiries': self.store.newest_first(), 'staff': STAFF_CREDENTIALS,
+                    'timestamp': _now_iso(), 'version': '1.0', 'trigger': trigger}
+            return len(json.dumps(data))
+
+        size = await asyncio.to_thread(snapshot)
+        if self.backup_ms:
+            await asyncio.sleep(self.backup_ms / 1000)
+        now = datetime.now(timezone.utc)
+        size_kb = round(size / 1024)
+        self.backups = (self.backups + [{
+            # getBackups() item shape
+            'id': (self.backups[-1]['id'] + 1) if self.backups else 1,
+            'date': now.strftime('%Y-%m-%d %H:%M'),
+            'size': f"{size_kb / 1024:.1f} MB" if size_kb > 1024 else f"{size_kb} KB",
+            'type': 'Auto',
+            'status': 'Complete',
+            'enquiryCount': len(self.store.records),
+            'trigger': trigger,
+        }])[-20:]
+
+    async def backup_list(self, request):
+        return json_response({'success': True, 'backups': self.backups[::-1]})
+
+    async def enquiries_list(self, request):
+        return json_response([EnquiryStore.listing(r) for r in self.store.newest_first()])
+
+    async def enquiries_create(self, request):
+        try:
+            data = request.json() or {}
+        except ValueError as e:
+            return json_response({'error': f"Failed to create enquiry: {e}"}, 500)
+        if not data.get('firstName') or not data.get('email') or not data.get('state'):
+            return json_response({'error': f'Missing required fields. Received: firstName="{data.get("firstName")}", '
+                                           f'email="{data.get("email")}", state="{data.get("state")}"'}, 400)
+        event_source = data.get('eventSource')
+        if event_source == 'Other' and data.get('eventSourceOther'):
+            event_source = f"Other: {data['eventSourceOther']}"
+        interest = data.get('productInterest')
+        record = self.store.create({
+            'status': data.get('status') or 'New',
+            'institutionName': data.get('institutionName') or None,
+            'firstName': data['firstName'],
+            'lastName': data.get('lastName') or data.get('surname') or '',
+            'email': data['email'],
+            'phone': data.get('phone') or None,
+            'nationality': data.get('nationality') or 'English',
+            'state': data['state'],
+            'suburb': data.get('suburb') or None,
+            'productInterest': ', '.join(interest) if isinstance(interest, list) else (interest or ''),
+            'source': data.get('source') or None,
+            'eventSource': event_source or None,
+            'comments': data.get('comments') or None,
+            'submittedBy': data.get('submittedBy') or 'Online Form',
+            'customerRating': data.get('customerRating') or 'N/A',
+            'stepProgram': data.get('stepProgram') or 'N/A',
+            'salesManagerInvolved': data.get('salesManagerInvolved') or 'No',
+            'doNotEmail': data.get('doNotEmail') or False,
+            'inputDate': _now_iso(),
+        })
+        await self.create_auto_backup('New enquiry form submission')
+        listing = EnquiryStore.listing(record)
+        keys = ('id', 'status', 'firstName', 'lastName', 'email', 'phone', 'nationality', 'state', 'suburb',
+                'institutionName', 'productInterest', 'source', 'eventSource', 'comments', 'submittedBy',
+                'createdAt', 'created_at')
+        return json_response({k: listing[k] for k in keys}, 201)
+
+    async def broadcast_analytics_update(self, campaign_id):
+        """broadcastAnalyticsUpdate(): pusher.trigger() on analytics-updates; errors are logged, never raised"""
+        if self.pusher is None:
+            return 'off'
+        try:
+            status = await self.pusher.trigger('analytics-updates', 'analytics-updated', {
+                'campaignId': campaign_id, 'analytics': {'refresh': True},
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            })
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            return 'failed'
+        return 'sent' if status == 200 else 'failed'
+
+    async def tracking_open(self, request):
+        """Pixel hit: INSERT INTO email_tracking, await the Pusher broadcast, then return the GIF whatever happened"""
+        campaign_id, recipient = request.query.get('c'), request.query.get('e')
+        result = broadcast = 'skipped'
+        if campaign_id and recipient:
+            try:
+                email = decode_uri_component(recipient)
+            except ValueError:
+                email = None
+            # A URIError inside the route's try skips the insert and the broadcast; the GIF is still served
+            if email is not None:
+                if self.row_cost_ms:
+                    await asyncio.sleep(self.row_cost_ms / 1000)
+                ip_address = request.headers.get('x-forwarded-for') or request.headers.get('x-real-ip') or ''
+                self.tracking.record_open(campaign_id, email, request.headers.get('user-agent', ''), ip_address)
+                result = 'inserted'
+                broadcast = await self.broadcast_analytics_update(campaign_id)
+            else:
+                result = 'error'
+        return Response(200, TRACKING_PIXEL, 'image/gif', headers={
+            'Cache-Control': 'no-store, no-cache, must-revalidate, max-age=0',
+            'Pragma': 'no-cache',
+            'Expires': '0',
+            # Stand-in only: whether the row was written and how the awaited broadcast went
+            'X-Tracking-Result': result,
+            'X-Tracking-Broadcast': broadcast,
+        })
+
+    async def tracking_click(self, request):
+        """Link click: 302 to the decoded target, recording an email_tracking row off (or, with sync, on) the response path"""
+        campaign_id, recipient, target = request.query.get('c'), request.query.get('e'), request.query.get('url')
+        # searchParams.get() has already decoded once; the route's decodeURIComponent decodes again
+        try:
+            location = decode_uri_component(target) if target else 'https://crm.steinway.com.au'
+            email = decode_uri_component(recipient) if recipient else None
+        except ValueError:
+            # The catch block decodes the same value again, so the URIError escapes as a 500
+            return Response(500, b'Internal Server Error')
+        result = 'skipped'
+        if campaign_id and recipient and target:
+            ip_address = request.headers.get('x-forwarded-for') or request.headers.get('x-real-ip') or ''
+            row = (campaign_id, email, location, request.query.get('type') or 'link',
+                   request.headers.get('user-agent', ''), ip_address)
+            if self.click_record == 'deferred':
+                task = asyncio.ensure_future(self._record_click(row))
+                self._click_tasks.add(task)
+                task.add_done_callback(self._click_tasks.discard)
+                self.click_backlog_max = max(self.click_backlog_max, len(self._click_tasks))
+                result = 'queued'
+            else:
+                await self._record_click(row)
+                result = 'inserted'
+        try:
+            # NextResponse.redirect sends new URL(location).href: spaces become %20, a bare host gains '/'
+            href = serialize_url(location)
+        except ValueError:
+            # URL() throws, and so does the catch block's second redirect
+            return Response(500, b'Internal Server Error')
+        return Response(302, b'', headers={
+            'Location': href,
+            'Cache-Control': 'no-store, no-cache, must-revalidate, max-age=0',
+            'Pragma': 'no-cache',
+            'Expires': '0',
+            # Stand-in only: what happened to the row, the click rows stored and the callbacks still pending
+            'X-Tracking-Result': result,
+            'X-Tracking-Rows': str(self.tracking.click_count),
+            'X-Tracking-Backlog': str(len(self._click_tasks)),
+        })
+
+    async def _record_click(self, row):
+        """The route's setImmediate callback: one INSERT INTO email_tracking, then the awaited broadcast"""
+        if self.row_cost_ms:
+            await asyncio.sleep(self.row_cost_ms / 1000)
+        self.tracking.record_click(*row)
+        await self.broadcast_analytics_update(row[0])
+
+    async def drain_clicks(self):
+        """Wait until every deferred click is written and broadcast"""
+        while self._click_tasks:
+            await asyncio.gather(*self._click_tasks, return_exceptions=True)
+
+    # --- HTTP plumbing ------------------------------------------------------
+
+    def _delay(self, path):
+        base = self.route_latency.get(path, self.latency_ms)
+        return max(0.0, base + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)) / 1000
+
+    async def dispatch(self, request):
+        self.request_counts[f"{request.method} {request.path}"] += 1
+        delay = self._delay(request.path)
+        if delay:
+            await asyncio.sleep(delay)
+
+        blocked = self.middleware(request)
+        if blocked:
+            return blocked
+        method = 'GET' if request.method == 'HEAD' else request.method
+        handler = self.routes.get((method, request.path))
+        if handler:
+            response = handler(request)
+            return await response if asyncio.iscoroutine(response) else response
+        if any(path == request.path for _, path in self.routes):
+            return Response(405, b'', headers={'Allow': ', '.join(m for m, p in self.routes if p == request.path)})
+        if request.path.startswith('/api/'):
+            return json_response({'error': 'Not found'}, 404)
+        return html_response(NOT_FOUND_PAGE, 404)
+
+    async def _read_request(self, reader):
+        head = await reader.readuntil(b'\r\n\r\n')
+        request_line, *lines = head.decode('latin-1').split('\r\n')
+        method, target, _ = request_line.split(' ', 2)
+        headers = {}
+        for line in lines:
+            if line:
+                key, _, value = line.partition(':')
+                headers[key.strip().lower()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    while await reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    break
+                chunks.append((await reader.readexactly(size + 2))[:-2])
+            body = b''.join(chunks)
+        else:
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+        return Request(method, target, headers, body)
+
+    async def _handle(self, reader, writer):
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    break
+                response = await self.dispatch(request)
+                keep_alive = request.headers.get('connection', '').lower() != 'close'
+                body = b'' if request.method == 'HEAD' else response.body
+                lines = [f"HTTP/1.1 {response.status} {HTTPStatus(response.status).phrase}"]
+                lines += [f"{k}: {v}" for k, v in response.headers.items()]
+                lines += [f"Set-Cookie: {c}" for c in response.set_cookies]
+                lines.append(f"Content-Length: {len(response.body)}")
+                lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=2 ** 20)
+        # Port 0 binds an ephemeral port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        for task in list(self._click_tasks):
+            task.cancel()
+        await asyncio.gather(*self._click_tasks, return_exceptions=True)
+        if self._server:
+            self._server.close()
+            # Idle keep-alive connections would otherwise be cancelled mid-read at loop shutdown
+            for writer in list(self._connections.values()):
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,97 @@
+"""
+Latency Statistics
+HDR-style log-linear latency histogram: fixed memory, constant-time recording
+and percentiles accurate to ~0.1% across microseconds to minutes. Shared by
+the load generators so their JSON reports line up.
+"""
+
+import math
+
+
+class LatencyHistogram:
+    """Records latencies in microseconds; reports percentiles in milliseconds"""
+
+    def __init__(self, significant_digits=3, max_ms=3_600_000):
+        # Each power-of-two range is split into sub_buckets linear slots, so the
+        # recorded value is never off by more than 1 part in 10**significant_digits
+        self.sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.sub_buckets = 1 << self.sub_bucket_bits
+        self.half = self.sub_buckets // 2
+        self.max_us = int(max_ms * 1000)
+        self.bucket_count = max(1, (self.max_us // self.sub_buckets).bit_length() + 1)
+        self.counts = [0] * ((self.bucket_count + 1) * self.half)
+        self.total = 0
+        self.min_us = None
+        self.max_seen_us = 0
+        self.sum_us = 0
+        self.sum_sq_us = 0
+
+    def _index(self, value):
+        bucket = max(0, value.bit_length() - self.sub_bucket_bits)
+        sub = value >> bucket
+        return (bucket + 1) * self.half + (sub - self.half) if bucket else sub
+
+    def _value_at(self, index):
+        if index < self.sub_buckets:
+            return index
+        bucket = index // self.half - 1
+        sub = index % self.half + self.half
+        # Report the upper edge of the slot, as HdrHistogram does
+        return ((sub + 1) << bucket) - 1
+
+    def record(self, ms):
+        value = min(max(int(round(ms * 1000)), 0), self.max_us)
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.sum_us += value
+        self.sum_sq_us += value * value
+        self.min_us = value if self.min_us is None else min(self.min_us, value)
+        self.max_seen_us = max(self.max_seen_us, value)
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        self.sum_sq_us += other.sum_sq_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_seen_us = max(self.max_seen_us, other.max_seen_us)
+        return self
+
+    def percentile(self, p):
+        """Latency (ms) at or below which p percent of recordings fall"""
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(p / 100 * self.total))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(self._value_at(i), self.max_seen_us) / 1000, 3)
+        return round(self.max_seen_us / 1000, 3)
+
+    def summary(self, percentiles=(50, 90, 95, 99, 99.9)):
+        if not self.total:
+            return {'count': 0}
+        mean = self.sum_us / self.total
+        variance = max(self.sum_sq_us / self.total - mean * mean, 0)
+        result = {
+            'count': self.total,
+            'min_ms': round(self.min_us / 1000, 3),
+            'mean_ms': round(mean / 1000, 3),
+            'stdev_ms': round(math.sqrt(variance) / 1000, 3),
+            'max_ms': round(self.max_seen_us / 1000, 3),
+        }
+        for p in percentiles:
+            result[f"p{p:g}".replace('.', '_') + '_ms'] = self.percentile(p)
+        return result
+
+
+def format_summary(summary):
+    """One-line rendering of LatencyHistogram.summary() for console output"""
+    if not summary.get('count'):
+        return "no samples"
+    keys = [k for k in summary if k.startswith('p')]
+    parts = [f"{k[:-3].replace('_', '.')}={summary[k]:.1f}" for k in keys]
+    return f"n={summary['count']} min={summary['min_ms']:.1f} " + " ".join(parts) + f" max={summary['max_ms']:.1f} ms"
@@ -0,0 +1,169 @@
+"""
+Single-round-trip Table Extraction
+Serializes tables in the page with one page.evaluate instead of one
+inner_text() call per header, row or cell, then turns rows into typed
+records keyed by the header text (FIRST NAME -> first_name, DATE -> a
+datetime, numbers -> int/float). Large tables are snapshotted in the page
+once and streamed to the caller in chunks.
+"""
+
+import itertools
+import re
+from datetime import datetime
+
+# Shared by both entry points: one table element -> {headers, rows, notices}
+_READ_TABLE_JS = """
+(table, mode) => {
+  const text = mode === 'textContent'
+    ? el => el.textContent.replace(/\\s+/g, ' ').trim()
+    : el => el.innerText.trim()
+  const first = table.rows[0]
+  const headRow = table.tHead && table.tHead.rows.length
+    ? table.tHead.rows[table.tHead.rows.length - 1]
+    : (first && first.cells.length && [...first.cells].every(c => c.tagName === 'TH') ? first : null)
+  const headers = headRow ? [...headRow.cells].map(text) : []
+  const rows = [], notices = []
+  for (const body of table.tBodies.length ? table.tBodies : [table]) {
+    for (const row of body.rows) {
+      if (row === headRow) continue
+      const cells = [...row.cells]
+      // "Loading enquiries..." / "No enquiries found" rows span the whole table
+      if (cells.length === 1 && cells[0].colSpan > 1 && headers.length > 1) {
+        notices.push(text(cells[0]))
+        continue
+      }
+      rows.push(cells.map(text))
+    }
+  }
+  return {
+    id: table.id || null,
+    caption: table.caption ? text(table.caption) : null,
+    headers, rows, notices
+  }
+}
+"""
+
+EXTRACT_TABLES_JS = f"""
+({{selector, mode}}) => {{
+  const read = {_READ_TABLE_JS}
+  return [...document.querySelectorAll(selector)].map((table, index) => ({{index, ...read(table, mode)}}))
+}}
+"""
+
+SNAPSHOT_TABLE_JS = f"""
+({{selector, index, mode, key}}) => {{
+  const read = {_READ_TABLE_JS}
+  const table = document.querySelectorAll(selector)[index]
+  if (!table) return null
+  const snapshot = read(table, mode)
+  window[key] = snapshot.rows
+  return {{headers: snapshot.headers, notices: snapshot.notices, total: snapshot.rows.length}}
+}}
+"""
+
+READ_CHUNK_JS = "({key, offset, limit}) => (window[key] || []).slice(offset, offset + limit)"
+DROP_SNAPSHOT_JS = "key => { delete window[key] }"
+
+_snapshot_ids = itertools.count(1)
+
+_INTEGER = re.compile(r'-?[1-9]\d{0,14}|0')
+_DECIMAL = re.compile(r'-?\d{1,15}\.\d+')
+# en-AU renderings used by the CRM pages (toLocaleDateString('en-AU'), the enquiry
+# table's long form) and getBackups()' "YYYY-MM-DD HH:MM"
+_DATE_FORMATS = (
+    ('%d %b %Y, %I:%M %p', datetime),
+    ('%Y-%m-%d %H:%M', datetime),
+    ('%d %b %Y', 'date'),
+    ('%d/%m/%Y', 'date'),
+    ('%Y-%m-%d', 'date'),
+)
+
+# en-AU (CLDR) abbreviates these months differently from strptime's %b
+_CLDR_MONTHS = re.compile(r'\b(Sept|June|July)\b')
+_STRPTIME_MONTHS = {'Sept': 'Sep', 'June': 'Jun', 'July': 'Jul'}
+
+
+def _strptime_text(text):
+    """Cell text in the spelling strptime expects: %b month names, upper-case AM/PM, plain spaces"""
+    text = text.replace('\u202f', ' ').replace('\xa0', ' ')
+    text = _CLDR_MONTHS.sub(lambda m: _STRPTIME_MONTHS[m.group(1)], text)
+    return text.replace('am', 'AM').replace('pm', 'PM')
+
+
+def column_keys(headers):
+    """Record keys from header texts: snake_case, positional for blanks, suffixed when repeated"""
+    keys, seen = [], {}
+    for index, header in enumerate(headers):
+        key = re.sub(r'[^0-9a-z]+', '_', header.lower()).strip('_') or f"col_{index + 1}"
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}_{seen[key]}")
+    return keys
+
+
+def coerce_cell(text):
+    """Typed value for one cell: None, int, float, date/datetime, or the text itself.
+
+    Digit strings with a leading zero (phone numbers, postcodes) stay text.
+    """
+    if not text:
+        return None
+    if _INTEGER.fullmatch(text):
+        return int(text)
+    if _DECIMAL.fullmatch(text):
+        return float(text)
+    if text[0].isdigit():
+        date_text = _strptime_text(text)
+        for fmt, kind in _DATE_FORMATS:
+            try:
+                value = datetime.strptime(date_text, fmt)
+            except ValueError:
+                continue
+            return value.date() if kind == 'date' else value
+    return text
+
+
+def to_records(headers, rows, converters=None, default=coerce_cell):
+    """Typed dicts for raw rows; converters maps a column key to its own callable"""
+    keys = column_keys(headers)
+    converters = converters or {}
+    records = []
+    for cells in rows:
+        if len(cells) > len(keys):
+            keys = keys + column_keys([''] * len(cells))[len(keys):]
+        records.append({
+            key: converters.get(key, default)(cells[i] if i < len(cells) else '')
+            for i, key in enumerate(keys)
+        })
+    return records
+
+
+async def extract_tables(page, selector='table', text_mode='innerText'):
+    """Every table matching selector, in one round trip.
+
+    Returns [{index, id, caption, headers, rows, notices}] with cell text as
+    strings; text_mode='textContent' skips layout for very large tables.
+    """
+    return await page.evaluate(EXTRACT_TABLES_JS, {'selector': selector, 'mode': text_mode})
+
+
+async def stream_table_records(page, index=0, selector='table', chunk_rows=500, text_mode='innerText',
+                               converters=None, default=coerce_cell, info=None):
+    """Yield lists of typed records from one table, chunk_rows at a time.
+
+    The table is read into a page-side snapshot with a single evaluate, so
+    every chunk comes from the same consistent DOM state and costs one round
+    trip regardless of its cell count. Pass an info dict to receive the
+    headers, notices and total row count.
+    """
+    key = f"__crmTable{next(_snapshot_ids)}"
+    meta = await page.evaluate(SNAPSHOT_TABLE_JS, {'selector': selector, 'index': index, 'mode': text_mode, 'key': key})
+    if meta is None:
+        return
+    if info is not None:
+        info.update(meta)
+    try:
+        for offset in range(0, meta['total'], chunk_rows):
+            rows = await page.evaluate(READ_CHUNK_JS, {'key': key, 'offset': offset, 'limit': chunk_rows})
+            yield to_records(meta['headers'], rows, converters, default)
+    finally:
+        await page.evaluate(DROP_SNAPSHOT_JS, key)
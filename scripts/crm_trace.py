@@ -0,0 +1,218 @@
+"""
+Step Spans and Trace Export
+Wraps the phases the scripts already print ("📍 Step 1: ...") in spans that
+record nested start/end times, attributes and errors, and writes them as
+Chrome trace-event JSON for chrome://tracing, Perfetto or speedscope.
+
+    with span("Step 2: import page", url=url) as s:
+        ...
+        s.set(rows=len(rows))
+
+    @traced("login")
+    async def login_to_crm(self): ...
+
+Spans nest per asyncio task (each task gets its own lane in the viewer, so
+parallel scenario jobs show side by side). Recording is always on and costs
+a perf_counter call per edge; nothing is written unless export_trace() is
+called with a path or CRM_TRACE is set.
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+_current = contextvars.ContextVar('crm_trace_span', default=None)
+
+
+class Span:
+    """One timed phase; attributes can be added while it runs"""
+
+    def __init__(self, name, cat, attrs, parent):
+        self.name = name
+        self.cat = cat
+        self.attrs = dict(attrs)
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.start = None
+        self.end = None
+        self.lane = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    @property
+    def duration_ms(self):
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+
+class _SpanScope:
+    """What span() returns: a sync/async context manager that also works as a decorator"""
+
+    def __init__(self, tracer, name, cat, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.attrs = attrs
+        self._span = None
+        self._token = None
+
+    def __enter__(self):
+        self._span = self.tracer._open(self.name, self.cat, self.attrs)
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.tracer._close(self._span, exc_type, exc)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+    def __call__(self, fn):
+        # A fresh scope per call, so the decorated function can run concurrently
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                async with _SpanScope(self.tracer, self.name, self.cat, self.attrs):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _SpanScope(self.tracer, self.name, self.cat, self.attrs):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+class Tracer:
+    """Collects finished spans and instant events for one process"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.instants = []
+        self.lanes = {}
+
+    def _lane(self):
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = ('task', id(task)) if task else ('thread', threading.get_ident())
+        if key not in self.lanes:
+            label = task.get_name() if task else threading.current_thread().name
+            self.lanes[key] = (len(self.lanes) + 1, label)
+        return self.lanes[key][0]
+
+    def _open(self, name, cat, attrs):
+        span = Span(name, cat, attrs, _current.get())
+        span.lane = self._lane()
+        span.start = time.perf_counter()
+        return span
+
+    def _close(self, span, exc_type, exc):
+        span.end = time.perf_counter()
+        if exc_type is asyncio.CancelledError:
+            span.attrs['status'] = 'cancelled'
+        elif exc_type is not None:
+            span.attrs['status'] = 'error'
+            span.attrs['error'] = f"{exc_type.__name__}: {str(exc).splitlines()[0] if str(exc) else ''}".rstrip(': ')
+        self.spans.append(span)
+
+    def span(self, name, cat='step', **attrs):
+        return _SpanScope(self, name, cat, attrs)
+
+    def instant(self, name, cat='mark', **attrs):
+        """A zero-length marker (a click, a screenshot, a retry)"""
+        self.instants.append((name, cat, attrs, self._lane(), time.perf_counter()))
+
+    def rename_lane(self, label):
+        """Give the current task's lane a readable name in the viewer"""
+        lane = self._lane()
+        for key, (number, _) in self.lanes.items():
+            if number == lane:
+                self.lanes[key] = (lane, label)
+
+    def _us(self, t):
+        return round((t - self.origin) * 1e6, 1)
+
+    def to_chrome(self):
+        """Trace-event JSON object format (complete 'X' events, instants and lane names)"""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': 'crm-scripts'}}]
+        events += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': lane, 'args': {'name': label}}
+                   for lane, label in self.lanes.values()]
+        for span in sorted(self.spans, key=lambda s: (s.start, s.depth)):
+            events.append({'name': span.name, 'cat': span.cat, 'ph': 'X', 'pid': pid, 'tid': span.lane,
+                           'ts': self._us(span.start), 'dur': round((span.end - span.start) * 1e6, 1),
+                           'args': _jsonable(span.attrs)})
+        for name, cat, attrs, lane, at in self.instants:
+            events.append({'name': name, 'cat': cat, 'ph': 'i', 's': 't', 'pid': pid, 'tid': lane,
+                           'ts': self._us(at), 'args': _jsonable(attrs)})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome(), f)
+        os.replace(tmp, path)
+        return path
+
+    def summary(self, max_depth=1):
+        """Lines of the span tree down to max_depth, with durations and any error"""
+        lines = []
+        for span in sorted(self.spans, key=lambda s: (s.lane, s.start)):
+            if span.depth > max_depth:
+                continue
+            flag = f"  ❌ {span.attrs['error']}" if 'error' in span.attrs else ''
+            lines.append(f"{'   ' * (span.depth + 1)}{span.name:<{44 - 3 * span.depth}} {span.duration_ms:>9.1f} ms{flag}")
+        return lines
+
+
+def _jsonable(attrs):
+    return {k: v if isinstance(v, (str, int, float, bool, type(None))) else str(v) for k, v in attrs.items()}
+
+
+TRACER = Tracer()
+
+
+def span(name, cat='step', **attrs):
+    """Context manager (sync or async) or decorator timing one phase"""
+    return TRACER.span(name, cat, **attrs)
+
+
+def traced(name=None, cat='step', **attrs):
+    """Decorator form; the span is named after the function unless name is given"""
+    def decorate(fn):
+        return TRACER.span(name or fn.__name__, cat, **attrs)(fn)
+    return decorate
+
+
+def current_span():
+    return _current.get()
+
+
+def export_trace(path=None, title="TRACE"):
+    """Write the trace to path (or $CRM_TRACE) and print the top-level phases; no-op without a path"""
+    path = path or os.environ.get('CRM_TRACE')
+    if not path or not TRACER.spans:
+        return None
+    TRACER.export(path)
+    print(f"\n🧵 {title}")
+    print("=" * 60)
+    for line in TRACER.summary():
+        print(line)
+    print(f"💾 Trace written to {path} (open in chrome://tracing or ui.perfetto.dev)")
+    return path
@@ -0,0 +1,121 @@
+"""
+Import Pre-flight Rules
+Decides, without building the full Prisma record, what /api/admin/import
+will do with each parsed CSV row: skip it as empty, reject it (missing
+required mapping or a null Prisma-required column), or accept it - and
+which values it will silently coerce on the way in (unknown states, products,
+nationalities, ratings and statuses, unparseable dates).
+"""
+
+import functools
+import json
+import re
+
+from crm_import import (
+    DATE_FIELDS, PRISMA_REQUIRED, VALID_NATIONALITIES, VALID_PRODUCTS, VALID_RATINGS, VALID_STATES, VALID_STATUSES,
+    js_trim, process_field_value,
+)
+
+COERCED_FIELDS = {'state', 'productInterest', 'nationality', 'customerRating', 'status', *DATE_FIELDS}
+_RATINGS = {r.lower() for r in VALID_RATINGS}
+_STATUSES = {s.lower() for s in VALID_STATUSES}
+# The legacy export's timestamp shape, which _parse_date always accepts when month and day are in range
+_TIMESTAMP = re.compile(r'(\d{4})-(\d\d)-(\d\d) \d\d:\d\d:\d\d')
+
+
+def is_null(value):
+    """processFieldValue's "no value" test for a CSV string"""
+    return not value or not js_trim(value) or value.upper() == 'NULL'
+
+
+def _product_tokens(value):
+    if value.startswith('[') and value.endswith(']'):
+        try:
+            parsed = json.loads(value)
+            return [str(p).lower() for p in parsed] if isinstance(parsed, list) else []
+        except ValueError:
+            return []
+    return [js_trim(p).lower() for p in value.split(',') if js_trim(p)]
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def coercion(field, value):
+    """(stored value, warning or None) for one non-null value of a coerced field.
+
+    Cached: states, statuses, ratings and products repeat across millions of rows.
+    """
+    stored = process_field_value(field, value)
+    if field == 'state' and stored not in VALID_STATES:
+        return stored, f"'{value}' is not a recognised state (stored as-is)"
+    if field == 'productInterest':
+        tokens = _product_tokens(value)
+        unknown = [t for t in tokens if t not in VALID_PRODUCTS]
+        if len(unknown) == len(tokens):
+            return stored, f"no recognised product in '{value}' (stored as {stored!r})"
+        if unknown:
+            return stored, f"unrecognised products dropped: {', '.join(unknown)}"
+    if field == 'nationality' and stored not in VALID_NATIONALITIES:
+        return stored, f"'{value}' is not a recognised nationality (stored as-is)"
+    if field == 'customerRating' and value.lower() not in _RATINGS:
+        return stored, f"'{value}' is not a valid rating (stored as N/A)"
+    if field == 'status' and value.lower() not in _STATUSES:
+        return stored, f"'{value}' is not a valid status (stored as New)"
+    if field in DATE_FIELDS and stored is None and '0000-00-00' not in value and '1000-01-01' not in value:
+        fallback = ' - createdAt falls back to the import time' if field == 'createdAt' else ''
+        return stored, f"unparseable date '{value}' dropped{fallback}"
+    return stored, None
+
+
+class RowValidator:
+    """The route's verdict for parsed rows of one file, given its headers and mappings"""
+
+    def __init__(self, headers, mappings, custom_fields=()):
+        # Later duplicate headers win, as they do in parseCSV's row objects
+        columns = {header: index for index, header in enumerate(headers)}
+        custom_keys = {field['key'] for field in custom_fields}
+        self.width = len(headers)
+        # Only mappings that can reject a row or be coerced; free-text columns cannot change the verdict
+        self.checks = [
+            (columns.get(m['sourceField']), m['sourceField'], m['targetField'], bool(m.get('isRequired')),
+             m['targetField'] in custom_keys)
+            for m in mappings
+            if m.get('targetField') and (m.get('isRequired') or m['targetField'] in PRISMA_REQUIRED
+                                         or m['targetField'] in COERCED_FIELDS)
+        ]
+
+    def check(self, values):
+        """('empty' | 'error' | 'ok', error message or None, [warning dicts]) for one parsed row.
+
+        values come from parseCSV (crm_csv), so they are already trimmed.
+        """
+        if not any(values[:self.width]):
+            return 'empty', None, []
+
+        missing, warnings, present = [], [], set()
+        for index, column, target, required, custom in self.checks:
+            value = values[index] if index is not None and index < len(values) else None
+            if required and not value:
+                missing.append(target)
+                continue
+            if custom or not value or (len(value) == 4 and value.upper() == 'NULL'):
+                continue
+            if target not in COERCED_FIELDS:
+                present.add(target)
+                continue
+            if target in DATE_FIELDS:
+                match = _TIMESTAMP.fullmatch(value)
+                if match and match.group(1) != '0000' and '01' <= match.group(2) <= '12' and '01' <= match.group(3) <= '31':
+                    present.add(target)
+                    continue
+            stored, warning = coercion(target, value)
+            if stored is not None:
+                present.add(target)
+            if warning:
+                warnings.append({'column': column, 'field': target, 'value': value, 'message': warning})
+
+        if missing:
+            return 'error', f"Missing required fields: {', '.join(missing)}", warnings
+        absent = next((field for field in PRISMA_REQUIRED if field not in present), None)
+        if absent:
+            return 'error', f"Database error - Argument `{absent}` is missing.", warnings
+        return 'ok', None, warnings
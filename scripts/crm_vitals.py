@@ -0,0 +1,183 @@
+"""
+Core Web Vitals Capture
+Collects TTFB, FCP, LCP, CLS, long tasks and total blocking time from
+PerformanceObserver, plus JS heap size and DOM node count from CDP
+Performance.getMetrics, for whatever page a flow has just visited.
+
+install_vitals() registers the observers as an init script, so every later
+navigation is measured from its first byte at no extra cost; capture_vitals()
+also works on a page that was never set up (observers read the buffered
+entries, only long tasks before that point are missed). Each capture is kept
+on the page, so pooled jobs can attach them to their result dicts.
+"""
+
+# Idempotent: safe as an init script and as a late page.evaluate
+VITALS_JS = """
+(() => {
+  if (window.__crmVitals) return
+  const state = { fcp: null, lcp: null, lcpElement: null, cls: 0, longTasks: [] }
+  let session = 0, sessionStart = 0, lastShift = 0
+  const observe = (type, callback) => {
+    try {
+      new PerformanceObserver(list => list.getEntries().forEach(callback)).observe({ type, buffered: true })
+    } catch (e) {}
+  }
+  observe('paint', entry => { if (entry.name === 'first-contentful-paint') state.fcp = entry.startTime })
+  observe('largest-contentful-paint', entry => {
+    state.lcp = entry.startTime
+    const el = entry.element
+    state.lcpElement = el ? el.tagName.toLowerCase() + (el.id ? '#' + el.id : '') : null
+  })
+  // CLS is the largest session window: shifts less than 1s apart, at most 5s long
+  observe('layout-shift', entry => {
+    if (entry.hadRecentInput) return
+    if (entry.startTime - lastShift > 1000 || entry.startTime - sessionStart > 5000) {
+      session = 0
+      sessionStart = entry.startTime
+    }
+    session += entry.value
+    lastShift = entry.startTime
+    state.cls = Math.max(state.cls, session)
+  })
+  observe('longtask', entry => state.longTasks.push([entry.startTime, entry.duration]))
+  window.__crmVitals = () => {
+    const nav = performance.getEntriesByType('navigation')[0]
+    const fcp = state.fcp ?? 0
+    return {
+      url: location.href,
+      ttfb_ms: nav ? nav.responseStart : null,
+      fcp_ms: state.fcp,
+      lcp_ms: state.lcp,
+      lcp_element: state.lcpElement,
+      cls: state.cls,
+      long_tasks: state.longTasks.length,
+      long_task_ms: state.longTasks.reduce((sum, [, d]) => sum + d, 0),
+      // Blocking part of each long task after first paint (the lab stand-in for INP)
+      tbt_ms: state.longTasks.reduce((sum, [start, d]) => sum + (start + d > fcp ? Math.max(0, d - 50) : 0), 0),
+      dom_content_loaded_ms: nav && nav.domContentLoadedEventEnd ? nav.domContentLoadedEventEnd : null,
+      load_ms: nav && nav.loadEventEnd ? nav.loadEventEnd : null,
+      dom_nodes: document.getElementsByTagName('*').length
+    }
+  }
+})()
+"""
+
+# Let buffered observer callbacks run before reading
+SNAPSHOT_JS = """
+() => new Promise(resolve => setTimeout(() => resolve(window.__crmVitals ? window.__crmVitals() : null), 0))
+"""
+
+# (good up to, poor above) - web.dev thresholds; TBT per Lighthouse
+THRESHOLDS = {
+    'ttfb_ms': (800, 1800),
+    'fcp_ms': (1800, 3000),
+    'lcp_ms': (2500, 4000),
+    'cls': (0.1, 0.25),
+    'tbt_ms': (200, 600),
+}
+
+# page -> VitalsProbe, dropped when the page closes
+_probes = {}
+
+
+def rate(metric, value):
+    """'good', 'needs-improvement' or 'poor' for a metric with published thresholds"""
+    if value is None or metric not in THRESHOLDS:
+        return None
+    good, poor = THRESHOLDS[metric]
+    return 'good' if value <= good else 'poor' if value > poor else 'needs-improvement'
+
+
+class VitalsProbe:
+    """Observers plus an optional CDP session for one page"""
+
+    def __init__(self, page):
+        self.page = page
+        self.cdp = None
+        self.captures = []
+        self._last_cdp = {}
+
+    async def start(self):
+        await self.page.add_init_script(VITALS_JS)
+        try:
+            self.cdp = await self.page.context.new_cdp_session(self.page)
+            await self.cdp.send('Performance.enable')
+        except Exception:
+            # Not Chromium: heap and script time are simply left out
+            self.cdp = None
+        return self
+
+    async def _cdp_metrics(self):
+        if self.cdp is None:
+            return {}
+        try:
+            metrics = {m['name']: m['value'] for m in (await self.cdp.send('Performance.getMetrics'))['metrics']}
+        except Exception:
+            return {}
+        # Script and task time are cumulative for the page; report the part since the last capture
+        delta = {name: metrics.get(name, 0) - self._last_cdp.get(name, 0) for name in ('ScriptDuration', 'TaskDuration')}
+        self._last_cdp = metrics
+        return {
+            'js_heap_used_mb': round(metrics.get('JSHeapUsedSize', 0) / 2 ** 20, 1),
+            'js_heap_total_mb': round(metrics.get('JSHeapTotalSize', 0) / 2 ** 20, 1),
+            'script_ms': round(delta['ScriptDuration'] * 1000, 1),
+            'task_ms': round(delta['TaskDuration'] * 1000, 1),
+            'layouts': int(metrics.get('LayoutCount', 0)),
+        }
+
+    async def capture(self, route=None):
+        """Snapshot the current document's vitals; kept in self.captures"""
+        await self.page.evaluate(VITALS_JS)
+        snapshot = await self.page.evaluate(SNAPSHOT_JS) or {}
+        snapshot = {k: round(v, 4 if k == 'cls' else 1) if isinstance(v, float) else v for k, v in snapshot.items()}
+        snapshot.update(await self._cdp_metrics())
+        snapshot['route'] = route or snapshot.get('url')
+        snapshot['ratings'] = {metric: rate(metric, snapshot.get(metric)) for metric in THRESHOLDS
+                               if snapshot.get(metric) is not None}
+        self.captures.append(snapshot)
+        return snapshot
+
+
+async def install_vitals(page):
+    """Set up the observers before a page's first navigation"""
+    if page not in _probes:
+        _probes[page] = await VitalsProbe(page).start()
+        page.on('close', lambda _: _probes.pop(page, None))
+    return _probes[page]
+
+
+async def capture_vitals(page, route=None):
+    """Vitals of the page's current document; never raises, returns None on failure"""
+    try:
+        probe = _probes.get(page) or await install_vitals(page)
+        return await probe.capture(route)
+    except Exception as e:
+        print(f"⚠️ Could not capture web vitals: {e}")
+        return None
+
+
+def captured_vitals(page):
+    """Every capture taken on a page so far"""
+    probe = _probes.get(page)
+    return list(probe.captures) if probe else []
+
+
+def format_vitals(snapshot):
+    """One summary line, with the poor metrics flagged"""
+    def ms(key, label):
+        value = snapshot.get(key)
+        if value is None:
+            return None
+        flag = ' 🔴' if snapshot.get('ratings', {}).get(key) == 'poor' else ''
+        return f"{label} {value:,.0f}ms{flag}"
+
+    parts = [ms('ttfb_ms', 'TTFB'), ms('fcp_ms', 'FCP'), ms('lcp_ms', 'LCP')]
+    if snapshot.get('cls') is not None:
+        flag = ' 🔴' if snapshot.get('ratings', {}).get('cls') == 'poor' else ''
+        parts.append(f"CLS {snapshot['cls']:.3f}{flag}")
+    parts.append(f"long tasks {snapshot.get('long_tasks', 0)} ({snapshot.get('long_task_ms', 0):,.0f}ms, "
+                 f"TBT {snapshot.get('tbt_ms', 0):,.0f}ms)")
+    if 'js_heap_used_mb' in snapshot:
+        parts.append(f"heap {snapshot['js_heap_used_mb']}MB")
+    parts.append(f"{snapshot.get('dom_nodes', 0):,} nodes")
+    return ' | '.join(p for p in parts if p)
@@ -0,0 +1,216 @@
+"""
+Shared Event-Driven Wait Layer
+Resolves browser steps on concrete conditions (API responses, DOM mutations,
+scoped network idle) instead of fixed sleeps, and reports the time each step
+saved compared to the sleep it replaced.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+
+from crm_trace import span
+
+# Fast mode: headless, no slow_mo, with a per-step timing report.
+# Enable with CRM_RUN_MODE=fast or by passing --fast to any script.
+FAST_MODE = os.environ.get('CRM_RUN_MODE', '').lower() == 'fast' or '--fast' in sys.argv
+RUN_MODE = 'fast' if FAST_MODE else 'headed'
+
+
+def launch_options(slow_mo=1000):
+    """Chromium launch options for the current run mode"""
+    if FAST_MODE:
+        return {'headless': True, 'slow_mo': 0}
+    return {'headless': False, 'slow_mo': slow_mo}
+
+
+async def wait_for_api_response(page, action, url_part, method=None, timeout=30000):
+    """Run action() and return the first response whose URL contains url_part"""
+    def matches(response):
+        if url_part not in response.url:
+            return False
+        return method is None or response.request.method == method
+
+    async with page.expect_response(matches, timeout=timeout) as response_info:
+        await action()
+    return await response_info.value
+
+
+# Installs a MutationObserver under `selector` and resolves once mutations have
+# stopped for `quietMs` (or immediately after `timeoutMs` if nothing changed).
+_ARM_DOM_WAIT_JS = """
+([selector, quietMs, timeoutMs]) => {
+  const root = document.querySelector(selector) || document.body
+  const started = performance.now()
+  window.__crmDomWait = new Promise(resolve => {
+    let mutations = 0
+    let quietTimer = null
+    const finish = (timedOut) => {
+      observer.disconnect()
+      clearTimeout(quietTimer)
+      clearTimeout(deadline)
+      resolve({ mutations, timedOut, elapsedMs: performance.now() - started })
+    }
+    const observer = new MutationObserver(records => {
+      mutations += records.length
+      clearTimeout(quietTimer)
+      quietTimer = setTimeout(() => finish(false), quietMs)
+    })
+    observer.observe(root, { childList: true, subtree: true, attributes: true, characterData: true })
+    const deadline = setTimeout(() => finish(mutations === 0), timeoutMs)
+  })
+}
+"""
+
+
+async def wait_for_dom_change(page, action, selector='body', quiet_ms=150, timeout=5000):
+    """Run action() and wait until the DOM under selector has changed and settled"""
+    await page.evaluate(_ARM_DOM_WAIT_JS, [selector, quiet_ms, timeout])
+    await action()
+    return await page.evaluate('() => window.__crmDomWait')
+
+
+# True when the tab element already looks selected: ARIA state, Radix-style
+# data-state, an "active"/"selected" class, or the staff pages' Tailwind accent.
+_TAB_SELECTED_JS = """
+el => el.getAttribute('aria-selected') === 'true'
+  || el.hasAttribute('aria-current')
+  || el.getAttribute('data-state') === 'active'
+  || /(^|[\\s-])(active|selected)(\\s|$)/.test(el.className || '')
+  || /\\bborder-blue-500\\b/.test(el.className || '')
+"""
+
+
+async def wait_for_tab_switch(page, tab, quiet_ms=150, timeout=5000, selected_fallback_ms=300):
+    """Click a tab and wait for its panel to render
+
+    Clicking the tab that is already active changes nothing in the DOM, so a
+    mutation wait would sit out its whole timeout; in that case only wait a
+    short fallback in case the page re-renders anyway.
+    """
+    already_selected = await tab.evaluate(_TAB_SELECTED_JS)
+    limit = selected_fallback_ms if already_selected else timeout
+    result = await wait_for_dom_change(page, tab.click, quiet_ms=quiet_ms, timeout=limit)
+    result['alreadySelected'] = already_selected
+    return result
+
+
+async def wait_until_gone(page, selector, timeout=15000):
+    """Wait until no element matches selector (e.g. loading spinners)"""
+    await page.wait_for_function(
+        'selector => !document.querySelector(selector)', arg=selector, timeout=timeout
+    )
+
+
+async def wait_for_any(*awaitables, timeout=30000):
+    """Resolve as soon as the first condition completes; cancel the rest"""
+    tasks = [asyncio.ensure_future(a) for a in awaitables]
+    done, pending = await asyncio.wait(tasks, timeout=timeout / 1000, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    if not done:
+        raise TimeoutError(f"No condition met within {timeout} ms")
+    return tasks.index(next(iter(done)))
+
+
+class ScopedNetworkIdle:
+    """Network-idle that only counts requests whose URL contains one of url_parts"""
+
+    def __init__(self, page, url_parts):
+        self.page = page
+        self.url_parts = list(url_parts)
+        self.inflight = set()
+        self.seen = 0
+        self._changed = asyncio.Event()
+
+    def _matches(self, request):
+        return any(part in request.url for part in self.url_parts)
+
+    def _on_request(self, request):
+        if self._matches(request):
+            self.inflight.add(request)
+            self.seen += 1
+            self._changed.set()
+
+    def _on_done(self, request):
+        if request in self.inflight:
+            self.inflight.discard(request)
+            self._changed.set()
+
+    def start(self):
+        self.page.on('request', self._on_request)
+        self.page.on('requestfinished', self._on_done)
+        self.page.on('requestfailed', self._on_done)
+        return self
+
+    def stop(self):
+        self.page.remove_listener('request', self._on_request)
+        self.page.remove_listener('requestfinished', self._on_done)
+        self.page.remove_listener('requestfailed', self._on_done)
+
+    async def wait(self, idle_ms=500, timeout=30000):
+        """Wait until at least one matching request ran and none have been in flight for idle_ms"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout / 1000
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"Requests to {self.url_parts} still busy after {timeout} ms")
+
+            self._changed.clear()
+            if self.seen and not self.inflight:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), min(idle_ms / 1000, remaining))
+                except asyncio.TimeoutError:
+                    return
+            else:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *exc):
+        self.stop()
+
+
+class StepTimer:
+    """Times each wait step and compares it with the fixed sleep it replaced"""
+
+    def __init__(self, name):
+        self.name = name
+        self.steps = []
+
+    @asynccontextmanager
+    async def step(self, label, legacy_ms=0):
+        started = time.perf_counter()
+        try:
+            # Each wait also shows up in the trace, nested under the phase that awaited it
+            with span(label, cat='wait', timer=self.name, legacy_ms=legacy_ms):
+                yield
+        finally:
+            actual_ms = (time.perf_counter() - started) * 1000
+            self.steps.append({
+                'step': label,
+                'legacy_ms': legacy_ms,
+                'actual_ms': round(actual_ms, 1),
+                'saved_ms': round(legacy_ms - actual_ms, 1)
+            })
+
+    def report(self):
+        """Print the per-step comparison and return the totals"""
+        legacy = sum(s['legacy_ms'] for s in self.steps)
+        actual = sum(s['actual_ms'] for s in self.steps)
+
+        print(f"\n⏱️ WAIT TIMING: {self.name}")
+        print("=" * 60)
+        for s in self.steps:
+            print(f"   {s['step']:<32} fixed {s['legacy_ms']:>7.0f} ms → {s['actual_ms']:>8.1f} ms  (saved {s['saved_ms']:>8.1f} ms)")
+        print(f"   {'TOTAL':<32} fixed {legacy:>7.0f} ms → {actual:>8.1f} ms  (saved {legacy - actual:>8.1f} ms)")
+
+        return {'legacy_ms': legacy, 'actual_ms': round(actual, 1), 'saved_ms': round(legacy - actual, 1), 'steps': self.steps}
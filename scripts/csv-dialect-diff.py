@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+CSV Dialect Differential Check
+Compares the import route's parseCSV dialect with Python's csv module.
+
+Fuzz mode (default) generates seeded inputs, from character soup to mutated
+legacy export rows, and checks that the streaming parser (crm_csv) and the
+exact port (crm_import.parse_csv) agree with each other - and, with --node,
+with the route's own parseCSV run under Node - then reports every way the
+csv module reads the same text differently, each shrunk to a minimal example.
+
+File mode (--file) walks a real export record by record and shows where the
+route would split or merge rows that the csv module reads differently, or
+produce rows of the wrong width, before anything is uploaded.
+
+Usage: python3 scripts/csv-dialect-diff.py [--cases 20000] [--seed 1] [--node]
+       python3 scripts/csv-dialect-diff.py --file enquiries.csv [--show 20]
+"""
+
+import argparse
+import base64
+import csv
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+
+from crm_csv import as_records, iter_records, iter_rows, open_mapped, parse_rows
+from crm_import import js_trim, parse_csv
+
+ROUTE_FILE = os.path.join(os.path.dirname(__file__), '..', 'src', 'app', 'api', 'admin', 'import', 'route.ts')
+
+SOUP = ['"', '"', '"', ',', ',', '\r', '\n', '\r\n', ' ', '\t', 'a', 'b', 'x y', '\u00a0', '\ufeff', '\u00e9']
+FIELDS = ['Ivan', 'Chan', 'NULL', '', ' VIC ', 'St Leonards', 'ivan.chan@live.com.au', '0412 345 678',
+          'Looking at HP603\nfor children', 'Line one\r\nLine two\r\n', 'He said ""hi""', 'a,b', '<p>&nbsp;</p>',
+          '\u00a0Boston\u00a0', '5\'7" grand']
+MUTATIONS = ['"', '""', ',', '\r', '\n', ' ', '\u00a0', '\ufeff', '\t']
+
+
+def soup_case(rng):
+    return ''.join(rng.choice(SOUP) for _ in range(rng.randint(0, 30)))
+
+
+def legacy_case(rng):
+    """A small export in the legacy quoting style, then a few random mutations"""
+    width = rng.randint(2, 4)
+    lines = [','.join(f'"col{i}"' for i in range(width))]
+    for _ in range(rng.randint(1, 4)):
+        values = []
+        for _ in range(width):
+            value = rng.choice(FIELDS)
+            if value == 'NULL' or (value and rng.random() < 0.2):
+                values.append(value if '"' not in value and ',' not in value and '\n' not in value else f'"{value}"')
+            elif value:
+                values.append('"' + value.replace('"', '""') + '"')
+            else:
+                values.append('')
+        lines.append(','.join(values))
+    text = rng.choice(['\n', '\r\n']).join(lines) + rng.choice(['', '\n', '\r\n'])
+    for _ in range(rng.randint(0, 3)):
+        at = rng.randint(0, len(text))
+        text = text[:at] + rng.choice(MUTATIONS) + text[at:]
+    return text
+
+
+def file_text(raw):
+    """What File.text() hands parseCSV: the same text minus one leading BOM"""
+    return raw[1:] if raw.startswith('\ufeff') else raw
+
+
+def stream_records(raw):
+    """crm_csv over the encoded upload, in tiny blocks to exercise the block cuts"""
+    rows = list(iter_rows(raw.encode('utf-8'), block_size=16))
+    return list(as_records(rows)) if len(rows) >= 2 else []
+
+
+def stream_mismatch(raw):
+    return stream_records(raw) != parse_csv(file_text(raw))
+
+
+def csv_rows(text):
+    """The csv module's rows, put through the route's trim and empty-row rules"""
+    rows = (list(map(js_trim, row)) for row in csv.reader(io.StringIO(text, newline='')))
+    return [row for row in rows if any(row)]
+
+
+def classify(text):
+    """How the csv module's reading of text differs from the route's, or None"""
+    route = parse_rows(text)
+    try:
+        other = csv_rows(text)
+    except csv.Error:
+        return 'csv-error'
+    if len(route) > len(other):
+        return 'route-splits'
+    if len(route) < len(other):
+        return 'route-merges'
+    if route != other:
+        return 'field-values'
+    return None
+
+
+def shrink(text, predicate):
+    """Greedily drop characters while predicate(text) still holds"""
+    step = max(1, len(text) // 2)
+    while step:
+        i = 0
+        while i < len(text):
+            candidate = text[:i] + text[i + step:]
+            if predicate(candidate):
+                text = candidate
+            else:
+                i += step
+        step //= 2
+    return text
+
+
+def node_parser_source():
+    """The route's parseCSV with its TypeScript annotations stripped"""
+    with open(ROUTE_FILE, 'r', encoding='utf-8') as f:
+        source = f.read()
+    start = source.index('function parseCSV(')
+    end = source.index('\n}\n', start) + 3
+    body = source[start:end]
+    body = re.sub(r'\(text: string\): any\[\]', '(text)', body)
+    body = re.sub(r'\b((?:const|let) \w+): [\w\[\]]+ =', r'\1 =', body)
+    return body
+
+
+def run_node(texts):
+    """parseCSV results from Node for a batch of UTF-8 inputs, decoded the way File.text() does"""
+    script = node_parser_source() + '''
+const inputs = JSON.parse(require('fs').readFileSync(0, 'utf8'))
+const decoder = new TextDecoder()
+process.stdout.write(JSON.stringify(inputs.map(b64 => parseCSV(decoder.decode(Buffer.from(b64, 'base64'))))))
+'''
+    payload = json.dumps([base64.b64encode(t.encode('utf-8')).decode('ascii') for t in texts])
+    done = subprocess.run(['node', '-e', script], input=payload, capture_output=True, text=True, check=True)
+    return json.loads(done.stdout)
+
+
+def fuzz(args):
+    rng = random.Random(args.seed)
+    cases = [soup_case(rng) if rng.random() < 0.5 else legacy_case(rng) for _ in range(args.cases)]
+    decoded = [file_text(c) for c in cases]
+
+    print("🧪 CSV Dialect Fuzz")
+    print("=" * 60)
+    print(f"🎲 {len(cases):,} cases, seed {args.seed}")
+
+    bugs = []
+    started = time.perf_counter()
+    for case in cases:
+        if stream_mismatch(case):
+            bugs.append(('crm_csv != parse_csv port', shrink(case, stream_mismatch)))
+    print(f"✅ crm_csv vs port: {len(cases) - len(bugs):,}/{len(cases):,} identical "
+          f"({time.perf_counter() - started:.1f}s)")
+
+    if args.node:
+        node_bugs = 0
+        for offset in range(0, len(cases), 2000):
+            batch = cases[offset:offset + 2000]
+            for case, text, result in zip(batch, decoded[offset:offset + 2000], run_node(batch)):
+                if result != parse_csv(text):
+                    bugs.append(('port != route.ts parseCSV', case))
+                    node_bugs += 1
+        print(f"✅ port vs route.ts under Node: {len(cases) - node_bugs:,}/{len(cases):,} identical")
+
+    findings = {}
+    for text in decoded:
+        category = classify(text)
+        if category:
+            findings.setdefault(category, []).append(text)
+
+    print("\n🔍 WHERE THE CSV MODULE DISAGREES WITH THE ROUTE")
+    print("=" * 60)
+    if not findings:
+        print("   No disagreements found")
+    for category, texts in sorted(findings.items(), key=lambda item: -len(item[1])):
+        example = shrink(min(texts, key=len), lambda t, c=category: classify(t) == c)
+        print(f"\n{category}: {len(texts):,} cases ({len(texts) / len(cases):.1%})")
+        print(f"   minimal input: {example!r}")
+        print(f"   route rows:    {parse_rows(example)!r}")
+        try:
+            print(f"   csv rows:      {csv_rows(example)!r}")
+        except csv.Error as e:
+            print(f"   csv error:     {e}")
+
+    if bugs:
+        print("\n❌ PARSER MISMATCHES (bugs - these should never happen)")
+        for label, case in bugs[:args.show]:
+            print(f"   {label}: {case!r}")
+    return not bugs
+
+
+def check_file(args):
+    print("📄 CSV Dialect Check")
+    print("=" * 60)
+    print(f"📁 {args.file} ({os.path.getsize(args.file) / 1e6:.1f} MB)")
+
+    started = time.perf_counter()
+    with open_mapped(args.file) as mapped:
+        rows = sum(1 for _ in iter_rows(mapped))
+    parse_seconds = time.perf_counter() - started
+    print(f"⚡ Route parse: {rows:,} rows in {parse_seconds:.2f}s "
+          f"({os.path.getsize(args.file) / 1e6 / max(parse_seconds, 1e-9):,.0f} MB/s)")
+
+    counts = {}
+    shown = 0
+    width = None
+    line = 1
+    with open(args.file, 'rb') as f:
+        try:
+            for offset, record in iter_records(f):
+                text = record.decode('utf-8-sig' if offset == 0 else 'utf-8', 'replace')
+                route = parse_rows(text)
+                if width is None and route:
+                    width = len(route[0])
+                    line += text.count('\n')
+                    continue
+                problems = []
+                category = classify(text)
+                if category:
+                    problems.append(category)
+                if any(len(row) != width for row in route):
+                    problems.append('wrong-width')
+                for problem in problems:
+                    counts[problem] = counts.get(problem, 0) + 1
+                if problems and shown < args.show:
+                    shown += 1
+                    print(f"\n⚠️ Line {line} (byte {offset:,}): {', '.join(problems)}")
+                    print(f"   record:     {text[:160]!r}{'…' if len(text) > 160 else ''}")
+                    print(f"   route rows: {[len(r) for r in route]} fields (header has {width})")
+                    try:
+                        print(f"   csv rows:   {[len(r) for r in csv_rows(text)]} fields")
+                    except csv.Error as e:
+                        print(f"   csv error:  {e}")
+                line += text.count('\n')
+        except ValueError as e:
+            counts['unterminated-quote'] = 1
+            print(f"\n❌ {e} - the route would read the rest of the file as one field")
+
+    print("\n📊 SUMMARY")
+    print("=" * 60)
+    if not counts:
+        print("✅ The route and the csv module agree on every record, and every row matches the header width")
+    for problem, count in sorted(counts.items()):
+        print(f"   {problem}: {count:,} records")
+    return not counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Differential check of the import route's CSV dialect")
+    parser.add_argument('--cases', type=int, default=20000, help="fuzz cases to generate")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--node', action='store_true', help="also run the route's parseCSV under Node")
+    parser.add_argument('--file', default='', help="check a real CSV record by record instead of fuzzing")
+    parser.add_argument('--show', type=int, default=10, help="examples to print")
+    args = parser.parse_args()
+    return check_file(args) if args.file else fuzz(args)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -7,27 +7,31 @@ import asyncio
 import json
 from playwright.async_api import async_playwright
 
+from crm_config import BASE_URL, USERNAME, PASSWORD
+from crm_netrec import NetworkRecorder, critical_path, format_critical_path, format_waterfall, to_har
+from crm_waits import launch_options, wait_for_any, StepTimer, FAST_MODE
+
 async def debug_login_detailed():
     print("🔍 DETAILED LOGIN DEBUG")
     print("=" * 50)
     
     playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False, slow_mo=1000)
+    browser = await playwright.chromium.launch(**launch_options(slow_mo=1000))
     page = await browser.new_page()
+    timer = StepTimer("login debug")
     
     # Capture console messages
     console_messages = []
     page.on('console', lambda msg: console_messages.append(f"Console: {msg.text}"))
     
-    # Capture network requests
-    network_logs = []
-    page.on('request', lambda request: network_logs.append(f"Request: {request.method} {request.url}"))
-    page.on('response', lambda response: network_logs.append(f"Response: {response.status} {response.url}"))
+    # Capture network requests with timing phases, sizes, cache status and initiator
+    network = NetworkRecorder(page).attach()
+    await network.attach_cdp()
     
     try:
-        base_url = "https://epg-crm.vercel.app"
-        username = "MarkandLouie2025@"
-        password = "ySz7JY^4tj@GmUqK"
+        base_url = BASE_URL
+        username = USERNAME
+        password = PASSWORD
         
         print(f"🌐 Testing credentials: {username}")
         print(f"🔐 Password length: {len(password)}")
@@ -53,9 +57,6 @@ async def debug_login_detailed():
         password_value = await page.input_value('#password')
         print(f"✅ Password field filled ({len(password_value)} chars)")
         
-        # Clear any previous errors
-        await page.wait_for_timeout(1000)
-        
         # Submit form
         print("🚀 Step 4: Submit login form...")
         
@@ -74,8 +75,16 @@ async def debug_login_detailed():
             response_text = await response.text()
             print(f"📊 Response text: {response_text}")
         
-        # Wait for any DOM changes
-        await page.wait_for_timeout(2000)
+        # Wait for the outcome: either the redirect away from /login or the error box
+        async with timer.step("login outcome", legacy_ms=3000):
+            try:
+                await wait_for_any(
+                    page.wait_for_url(lambda url: '/login' not in url, timeout=10000),
+                    page.wait_for_selector('.bg-red-50', timeout=10000),
+                    timeout=10000
+                )
+            except Exception:
+                print("⏳ No redirect or error message within 10s, checking current state...")
         
         # Check for error messages in the page
         print("🔍 Step 5: Check for error messages...")
@@ -108,6 +117,15 @@ async def debug_login_detailed():
                 print("🤔 No visible error messages found")
         else:
             print("✅ Redirected away from login page - login may have succeeded")
+            
+            # Time the staff page until its list replaces the loading placeholder
+            print("📍 Step 6: Open /admin/staff-unified and wait until it is usable...")
+            await page.goto(f"{base_url}/admin/staff-unified")
+            ready = await page.wait_for_function(
+                "() => !document.body.innerText.includes('Loading staff') && performance.timeOrigin + performance.now()",
+                timeout=30000
+            )
+            network.mark('usable', await ready.json_value())
         
         # Print console messages
         if console_messages:
@@ -115,16 +133,27 @@ async def debug_login_detailed():
             for msg in console_messages:
                 print(f"   {msg}")
         
-        # Print network activity
-        if network_logs:
-            print("\n🌐 Network activity:")
-            for log in network_logs:
-                print(f"   {log}")
+        # Print network activity: a waterfall and critical path per navigation
+        await network.settle()
+        for navigation in network.navigations:
+            report = network.navigation_report(navigation['index'])
+            print(f"\n🌐 Network waterfall: {navigation['url']} ({len(report['entries'])} requests)")
+            for line in format_waterfall(report):
+                print(line)
+            print("🧭 Critical path:")
+            for line in format_critical_path(critical_path(report)):
+                print(line)
+        with open("debug-login-detailed.har.json", 'w', encoding='utf-8') as f:
+            json.dump(to_har(network), f, indent=1)
+        print("💾 Network log saved: debug-login-detailed.har.json")
         
         # Final screenshot
         await page.screenshot(path="debug-login-detailed.png")
         print("📸 Screenshot saved: debug-login-detailed.png")
         
+        if FAST_MODE:
+            timer.report()
+        
     except Exception as e:
         print(f"❌ Debug failed: {e}")
         await page.screenshot(path="debug-login-error.png")
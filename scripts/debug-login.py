@@ -9,6 +9,9 @@ import sys
 from datetime import datetime
 from playwright.async_api import async_playwright
 
+from crm_config import BASE_URL, USERNAME, PASSWORD
+from crm_session import save_context_session
+
 async def debug_login():
     print("🔍 Debug Login Investigation")
     print("=" * 40)
@@ -18,9 +21,9 @@ async def debug_login():
     page = await browser.new_page()
     
     try:
-        base_url = "https://epg-crm.vercel.app"
-        username = "MarkandLouie2025@"
-        password = "ySz7JY^4tj@GmUqK"
+        base_url = BASE_URL
+        username = USERNAME
+        password = PASSWORD
         
         # Navigate to admin
         print("📍 Navigating to /admin...")
@@ -158,6 +161,10 @@ async def debug_login():
             else:
                 print("✅ Login appears successful - redirected away from login")
                 
+                # This script exercises the login form itself, so share the result instead of reusing a cache
+                if await save_context_session(page.context):
+                    print("💾 Session cached for the other scripts")
+                
         else:
             print("❌ Could not find submit button")
             
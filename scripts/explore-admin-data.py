@@ -7,93 +7,58 @@ Explores the admin panel to find where imported customer data is stored
 import asyncio
 import os
 import sys
+import time
 from datetime import datetime
 from playwright.async_api import async_playwright
 
-async def explore_admin_data():
-    print("🔍 Admin Panel Data Exploration")
-    print("=" * 50)
-    
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False, slow_mo=1000)
-    context = await browser.new_context()
-    page = await context.new_page()
+from crm_config import BASE_URL
+from crm_session import new_session_context, is_logged_in, invalidate
+from crm_shots import ScreenshotPipeline
+from crm_tables import extract_tables, stream_table_records
+from crm_vitals import capture_vitals, install_vitals
+from crm_waits import launch_options
+
+async def run_admin_exploration(page, screenshots_dir="admin-exploration"):
+    """Explore the admin panel on a page whose context already holds the session"""
+    # Screenshots are encoded and written in the background (see crm_shots)
+    shots = ScreenshotPipeline(screenshots_dir)
+    success = False
     
     # Enable console logging
     page.on("console", lambda msg: print(f"🖥️ Console: {msg.text}"))
     page.on("pageerror", lambda err: print(f"🚨 Page Error: {err}"))
     
     try:
-        print("📍 Step 1: Login to admin panel...")
-        await page.goto("https://epg-crm.vercel.app/login")
-        await page.screenshot(path="admin-exploration/01-login-page.png")
-        
-        # Login with credentials
-        try:
-            # Fill username field
-            username_input = await page.query_selector('input[id="username"]')
-            if not username_input:
-                username_input = await page.query_selector('input[name="username"]')
-            if not username_input:
-                username_input = await page.query_selector('input[type="text"]')
-            
-            if username_input:
-                await username_input.fill('MarkandLouie2025@')
-                print("✅ Username filled successfully")
-            else:
-                print("❌ Could not find username input")
-                
-            # Fill password field
-            password_input = await page.query_selector('input[id="password"]')
-            if not password_input:
-                password_input = await page.query_selector('input[type="password"]')
-                
-            if password_input:
-                await password_input.fill('ySz7JY^4tj@GmUqK')
-                print("✅ Password filled successfully")
-            else:
-                print("❌ Could not find password input")
-                
-            # Click submit button
-            submit_button = await page.query_selector('button[type="submit"]')
-            if not submit_button:
-                submit_button = await page.query_selector('button:has-text("Sign In")')
-                
-            if submit_button:
-                await submit_button.click()
-                print("✅ Login button clicked")
-            else:
-                print("❌ Could not find login button")
-                
-        except Exception as e:
-            print(f"❌ Login error: {e}")
-        
-        try:
-            await page.wait_for_url("**/admin**", timeout=10000)
+        print("📍 Step 1: Open admin panel with cached session...")
+        if await is_logged_in(page, BASE_URL):
             print("✅ Successfully logged in to admin panel")
-        except:
-            print("⏳ Checking current state after login...")
+            await capture_vitals(page, '/admin')
+        else:
+            print("❌ Cached session was rejected by the server")
+            invalidate()
+            return False
         
-        await page.screenshot(path="admin-exploration/02-admin-dashboard.png")
+        await shots.capture(page, "02-admin-dashboard")
         
         print("📍 Step 2: Exploring admin dashboard...")
         current_url = page.url
         print(f"🌐 Current URL: {current_url}")
         
-        # Get all navigation links
-        nav_links = await page.query_selector_all('a[href*="/admin"]')
+        # Get all navigation links in one round trip
+        nav_links = await page.eval_on_selector_all(
+            'a[href*="/admin"]', 'links => links.map(a => ({href: a.getAttribute("href"), text: a.innerText.trim()}))')
         print(f"📋 Found {len(nav_links)} admin navigation links:")
         
         admin_sections = []
+        seen_hrefs = set()
         for i, link in enumerate(nav_links):
-            try:
-                href = await link.get_attribute('href')
-                text = await link.inner_text()
-                if href and text:
-                    admin_sections.append({'text': text.strip(), 'href': href})
-                    print(f"  {i+1}. {text.strip()} → {href}")
-            except:
-                pass
+            if link['href'] and link['text']:
+                print(f"  {i+1}. {link['text']} → {link['href']}")
+                # Links that point to the same section are visited once
+                href = link['href'].split('#')[0].rstrip('/') or '/'
+                if href not in seen_hrefs:
+                    seen_hrefs.add(href)
+                    admin_sections.append({**link, 'href': href})
         
         print("📍 Step 3: Checking Database Management...")
         database_link = None
@@ -104,8 +69,8 @@ async def explore_admin_data():
         
         if database_link:
             print(f"🎯 Found Database Management: {database_link}")
-            await page.goto(f"https://epg-crm.vercel.app{database_link}")
-            await page.screenshot(path="admin-exploration/03-database-management.png")
+            await page.goto(f"{BASE_URL}{database_link}")
+            await shots.capture(page, "03-database-management")
             
             # Check what's available in database management
             page_text = await page.text_content('body')
@@ -133,44 +98,30 @@ async def explore_admin_data():
         for i, section in enumerate(customer_sections):
             print(f"\n📍 Step 5.{i+1}: Exploring '{section['text']}'...")
             try:
-                await page.goto(f"https://epg-crm.vercel.app{section['href']}")
-                await page.screenshot(path=f"admin-exploration/04-{i+1}-{section['text'].lower().replace(' ', '-')}.png")
+                await page.goto(f"{BASE_URL}{section['href']}")
+                await capture_vitals(page, section['href'])
+                await shots.capture(page, f"04-{i+1}-{section['text'].lower().replace(' ', '-')}")
                 
-                # Check for data tables or lists
-                tables = await page.query_selector_all('table')
+                # Check for data tables or lists - every table on the page in one evaluate
+                tables = await extract_tables(page)
                 if tables:
                     print(f"  📊 Found {len(tables)} table(s)")
                     
-                    # Get table headers and row count
                     for j, table in enumerate(tables):
-                        try:
-                            headers = await table.query_selector_all('th')
-                            rows = await table.query_selector_all('tr')
-                            
-                            if headers:
-                                header_texts = []
-                                for header in headers:
-                                    header_text = await header.inner_text()
-                                    header_texts.append(header_text.strip())
-                                print(f"    Table {j+1} Headers: {', '.join(header_texts)}")
-                            
-                            print(f"    Table {j+1} Rows: {len(rows)} total")
-                            
-                            # Check if this looks like customer data
-                            table_text = await table.inner_text()
-                            if any(keyword in table_text.lower() for keyword in ['email', 'phone', 'name', 'firstname', 'lastname']):
-                                print(f"    🎯 This table appears to contain customer data!")
-                                
-                                # Get first few rows of data
-                                data_rows = await table.query_selector_all('tbody tr')
-                                if data_rows:
-                                    print(f"    📋 Sample data (first 3 rows):")
-                                    for k, row in enumerate(data_rows[:3]):
-                                        row_text = await row.inner_text()
-                                        cells = row_text.split('\t')
-                                        print(f"      Row {k+1}: {' | '.join(cells[:5])}...")  # First 5 cells
-                        except Exception as e:
-                            print(f"    ⚠️ Error reading table {j+1}: {e}")
+                        if table['headers']:
+                            print(f"    Table {j+1} Headers: {', '.join(table['headers'])}")
+                        print(f"    Table {j+1} Rows: {len(table['rows'])} total")
+                        for notice in table['notices']:
+                            print(f"    ℹ️ {notice}")
+                        
+                        # Check if this looks like customer data
+                        table_text = ' '.join(table['headers'] + [cell for row in table['rows'] for cell in row]).lower()
+                        if any(keyword in table_text for keyword in ['email', 'phone', 'name', 'firstname', 'lastname']):
+                            print(f"    🎯 This table appears to contain customer data!")
+                            if table['rows']:
+                                print(f"    📋 Sample data (first 3 rows):")
+                                for k, cells in enumerate(table['rows'][:3]):
+                                    print(f"      Row {k+1}: {' | '.join(cells[:5])}...")  # First 5 cells
                 
                 # Check for cards or other data displays
                 cards = await page.query_selector_all('[class*="card"], [class*="item"], [class*="record"]')
@@ -193,42 +144,39 @@ async def explore_admin_data():
         
         # Check if there's a specific enquiry data section
         try:
-            await page.goto("https://epg-crm.vercel.app/submitted-forms/enquiry-data")
-            await page.screenshot(path="admin-exploration/05-enquiry-data.png")
+            await page.goto(f"{BASE_URL}/submitted-forms/enquiry-data")
+            await shots.capture(page, "05-enquiry-data")
             
             print("🎯 Found enquiry data section!")
             
-            # Check for data in this section
-            tables = await page.query_selector_all('table')
-            if tables:
-                print(f"📊 Found {len(tables)} table(s) in enquiry data section")
+            # Stream the enquiry table as typed records: one snapshot, then one round trip per chunk
+            table_count = await page.eval_on_selector_all('table', 'tables => tables.length')
+            if table_count:
+                print(f"📊 Found {table_count} table(s) in enquiry data section")
                 
-                for j, table in enumerate(tables):
+                for j in range(table_count):
+                    info = {}
+                    rows = 0
+                    sample = []
+                    started = time.perf_counter()
                     try:
-                        rows = await table.query_selector_all('tr')
-                        print(f"  Table {j+1}: {len(rows)} rows")
-                        
-                        # Get headers
-                        headers = await table.query_selector_all('th')
-                        if headers:
-                            header_texts = []
-                            for header in headers:
-                                header_text = await header.inner_text()
-                                header_texts.append(header_text.strip())
-                            print(f"  Headers: {', '.join(header_texts)}")
-                        
-                        # Get sample data
-                        data_rows = await table.query_selector_all('tbody tr')
-                        if data_rows:
-                            print(f"  📋 Data rows: {len(data_rows)}")
-                            
-                            # Show first few rows
-                            for k, row in enumerate(data_rows[:5]):
-                                row_text = await row.inner_text()
-                                cells = row_text.split('\t')
-                                print(f"    Row {k+1}: {' | '.join(cells[:4])}...")
+                        async for records in stream_table_records(page, index=j, info=info):
+                            rows += len(records)
+                            sample.extend(records[:5 - len(sample)])
                     except Exception as e:
                         print(f"  ⚠️ Error reading table {j+1}: {e}")
+                        continue
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    print(f"  Table {j+1}: {rows} rows in {elapsed_ms:.0f}ms")
+                    if info.get('headers'):
+                        print(f"  Headers: {', '.join(info['headers'])}")
+                    for notice in info.get('notices', []):
+                        print(f"  ℹ️ {notice}")
+                    
+                    # Show first few rows
+                    for k, record in enumerate(sample):
+                        cells = [str(value) for value in record.values() if value is not None]
+                        print(f"    Row {k+1}: {' | '.join(cells[:4])}...")
             
             # Check for any import-related information
             page_text = await page.text_content('body')
@@ -243,12 +191,30 @@ async def explore_admin_data():
         print("=" * 30)
         
         # Final summary screenshot
-        await page.screenshot(path="admin-exploration/06-final-summary.png")
+        await shots.capture(page, "06-final-summary")
+        success = True
+        return True
         
     except Exception as e:
         print(f"❌ Error during exploration: {e}")
-        await page.screenshot(path="admin-exploration/error-screenshot.png")
+        await shots.capture(page, "error-screenshot")
+        return False
+    finally:
+        await shots.close(failed=not success)
+        print(shots.report())
+
+async def explore_admin_data():
+    print("🔍 Admin Panel Data Exploration")
+    print("=" * 50)
     
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(**launch_options(slow_mo=1000))
+    
+    try:
+        context = await new_session_context(browser)
+        page = await context.new_page()
+        await install_vitals(page)
+        return await run_admin_exploration(page)
     finally:
         await browser.close()
         await playwright.stop()
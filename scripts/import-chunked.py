@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Chunked Resumable CSV Import
+Uploads a large enquiry CSV to /api/admin/import in row-safe chunks (never
+split inside a multi-line quoted field), several at a time, with retries.
+
+Every chunk is sent with idempotent=true and the same importId, a SHA-256 of
+the whole file, so the route skips rows whose originalId (the column mapped to
+originalId, else the id column) was already imported from this file's
+content - not from any file that happens to share its name. Progress is
+checkpointed after each chunk; re-running the same command resumes, and a
+chunk that was in flight when the run died is simply re-sent without creating
+duplicates.
+
+A retry of a chunk that timed out while the server was still working on it is
+safe too: the database's unique (importKey, originalId) index turns rows the
+first attempt wrote into skips, whichever instance served either request.
+
+Usage: python3 scripts/import-chunked.py enquiries.csv [--chunk-rows 500] [--window 4] [--retries 5]
+                                         [--mappings mappings.json] [--checkpoint enquiries.csv.import.json]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+
+from crm_config import BASE_URL
+from crm_csv import header_fields, plan_chunks
+from crm_import import auto_map
+from crm_probe import ProbeEngine, multipart_body
+
+IMPORT_PATH = '/api/admin/import'
+# 409: older deployments answer it while an earlier attempt at the same rows is still running
+RETRY_STATUSES = {409, 429, 500, 502, 503, 504}
+MAX_STORED_ERRORS = 20
+
+
+class FatalImportError(Exception):
+    """The target rejected a chunk in a way retrying cannot fix"""
+
+
+def load_checkpoint(path, fingerprint):
+    """Completed chunks from an earlier run of the same file and chunk plan"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    if saved.get('fingerprint') != fingerprint:
+        print(f"⚠️ {path} belongs to a different file or chunk size - starting over "
+              f"(rows already imported from the same content are still skipped by id)")
+        return {}
+    return {int(index): result for index, result in saved.get('chunks', {}).items()}
+
+
+def save_checkpoint(path, fingerprint, completed):
+    """Write atomically so an interrupted run never leaves a half-written checkpoint"""
+    temp = f"{path}.tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint, 'chunks': {str(i): r for i, r in sorted(completed.items())}}, f)
+    os.replace(temp, path)
+
+
+def absolute_errors(details, first_row):
+    """Rewrite the route's chunk-relative "Row N:" prefixes as rows of the whole file"""
+    return [re.sub(r'^Row (\d+):', lambda m: f"Row {first_row + int(m.group(1)) - 1}:", d) for d in details]
+
+
+class ChunkedImporter:
+    def __init__(self, engine, path, header, file_name, import_id, mappings, custom_fields, retries=5, backoff=1.0):
+        self.engine = engine
+        self.path = path
+        self.header = header
+        self.file_name = file_name
+        self.import_id = import_id
+        self.mappings = json.dumps(mappings)
+        self.custom_fields = json.dumps(custom_fields)
+        self.retries = retries
+        self.backoff = backoff
+        self.retried = 0
+        self.idempotency_confirmed = None
+
+    def read_chunk(self, chunk):
+        with open(self.path, 'rb') as f:
+            f.seek(chunk['offset'])
+            return self.header + f.read(chunk['length'])
+
+    async def upload(self, chunk, total_chunks):
+        content_type, body = multipart_body({
+            # The original name keeps importSource ("Import from <name>") identical across chunks and runs
+            'file': (self.file_name, self.read_chunk(chunk), 'text/csv'),
+            'mappings': self.mappings,
+            'customFields': self.custom_fields,
+            'idempotent': 'true',
+            # One idempotency key for every chunk of this file's content
+            'importId': self.import_id,
+            'isChunk': 'true',
+            'chunkInfo': json.dumps({
+                'chunkIndex': chunk['index'], 'totalChunks': total_chunks,
+                'startRow': chunk['first_row'], 'endRow': chunk['first_row'] + chunk['rows'] - 1,
+            }),
+        })
+
+        for attempt in range(1, self.retries + 2):
+            started = time.perf_counter()
+            try:
+                response = await self.engine.request('POST', IMPORT_PATH, {'Content-Type': content_type}, body)
+                status = response['status']
+                if status == 200:
+                    result = json.loads(response['body'])
+                    self.idempotency_confirmed = 'alreadyImported' in result
+                    return {
+                        'rows': chunk['rows'],
+                        'imported': result.get('imported', 0),
+                        'skipped': result.get('skipped', 0),
+                        'alreadyImported': result.get('alreadyImported', 0),
+                        'errors': result.get('errors', 0),
+                        'errorDetails': absolute_errors(result.get('errorDetails', []), chunk['first_row'])[:MAX_STORED_ERRORS],
+                        'attempts': attempt,
+                        'ms': round((time.perf_counter() - started) * 1000),
+                    }
+                if status not in RETRY_STATUSES:
+                    error = json.loads(response['body'] or b'{}').get('error', response['reason'])
+                    raise FatalImportError(f"HTTP {status}: {error}")
+                failure = f"HTTP {status}"
+            except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                failure = f"{type(e).__name__}: {e}"
+
+            if attempt > self.retries:
+                raise RuntimeError(f"gave up after {attempt} attempts ({failure})")
+            self.retried += 1
+            delay = min(self.backoff * 2 ** (attempt - 1), 30) * random.uniform(0.5, 1.5)
+            print(f"   🔁 chunk {chunk['index'] + 1}: {failure}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Chunked, resumable CSV import into /api/admin/import")
+    parser.add_argument('csv', help="CSV file to import")
+    parser.add_argument('--chunk-rows', type=int, default=500, help="records per chunk (the import page uses 500)")
+    parser.add_argument('--max-chunk-mb', type=float, default=4, help="also cap each chunk's size")
+    parser.add_argument('--window', type=int, default=4, help="chunks in flight at once")
+    parser.add_argument('--retries', type=int, default=5, help="retries per chunk on 5xx/429/network errors")
+    parser.add_argument('--timeout', type=float, default=300, help="per-request timeout in seconds")
+    parser.add_argument('--mappings', default='', help="JSON mappings file (default: the page's auto-mapping)")
+    parser.add_argument('--custom-fields', default='', help="JSON customFields file")
+    parser.add_argument('--checkpoint', default='', help="progress file (default: <csv>.import.json)")
+    parser.add_argument('--allow-duplicates', action='store_true',
+                        help="import even without an id column (a resumed run can then duplicate rows)")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or f"{args.csv}.import.json"
+    file_name = os.path.basename(args.csv)
+    if not file_name.lower().endswith('.csv'):
+        file_name += '.csv'
+
+    print("📦 Chunked CSV Import")
+    print("=" * 60)
+    print(f"🌐 Target: {BASE_URL}{IMPORT_PATH}")
+
+    max_bytes = int(args.max_chunk_mb * 1024 * 1024)
+    with open(args.csv, 'rb') as f:
+        try:
+            header, chunks = plan_chunks(f, args.chunk_rows, max_bytes)
+        except ValueError as e:
+            print(f"❌ {args.csv}: {e}")
+            return False
+    if not chunks:
+        print(f"❌ {args.csv} has no data rows")
+        return False
+
+    headers = header_fields(header)
+    if args.mappings:
+        with open(args.mappings, 'r', encoding='utf-8') as f:
+            mappings = json.load(f)
+    else:
+        mappings = auto_map(headers)
+    custom_fields = []
+    if args.custom_fields:
+        with open(args.custom_fields, 'r', encoding='utf-8') as f:
+            custom_fields = json.load(f)
+
+    # The route's originalId: the column mapped to originalId, else an id/ID column
+    has_id = 'id' in headers or 'ID' in headers or any(
+        m.get('targetField') == 'originalId' and m.get('sourceField') in headers for m in mappings)
+    if not has_id and not args.allow_duplicates:
+        print("❌ No id column: rows would get generated originalIds and a retried chunk could duplicate them. "
+              "Add an id column, map a CSV column to originalId, or pass --allow-duplicates.")
+        return False
+
+    with open(args.csv, 'rb') as f:
+        import_id = hashlib.file_digest(f, 'sha256').hexdigest()
+    stat = os.stat(args.csv)
+    fingerprint = {'file': file_name, 'size': stat.st_size, 'mtime': int(stat.st_mtime), 'sha256': import_id,
+                   'chunk_rows': args.chunk_rows, 'max_chunk_bytes': max_bytes, 'target': BASE_URL}
+    completed = load_checkpoint(checkpoint_path, fingerprint)
+    pending = [c for c in chunks if c['index'] not in completed]
+    total_rows = sum(c['rows'] for c in chunks)
+
+    print(f"📄 {args.csv}: {total_rows:,} records in {len(chunks)} chunks (≤{args.chunk_rows} rows each)")
+    if completed:
+        print(f"⏩ Resuming: {len(completed)} chunks already done, {len(pending)} to go")
+    print(f"🚚 Window: {args.window} chunks in flight, {args.retries} retries each")
+
+    failed = {}
+    fatal = []
+    started = time.perf_counter()
+    async with ProbeEngine(BASE_URL, concurrency=args.window, timeout=args.timeout) as engine:
+        importer = ChunkedImporter(engine, args.csv, header, file_name, import_id, mappings, custom_fields, args.retries)
+        queue = iter(pending)
+
+        async def worker():
+            for chunk in queue:
+                if fatal:
+                    return
+                try:
+                    result = await importer.upload(chunk, len(chunks))
+                except FatalImportError as e:
+                    fatal.append(str(e))
+                    return
+                except RuntimeError as e:
+                    failed[chunk['index']] = str(e)
+                    print(f"   ❌ chunk {chunk['index'] + 1}/{len(chunks)}: {e}")
+                    continue
+                completed[chunk['index']] = result
+                save_checkpoint(checkpoint_path, fingerprint, completed)
+                last_row = chunk['first_row'] + chunk['rows'] - 1
+                print(f"   ✅ chunk {chunk['index'] + 1}/{len(chunks)} rows {chunk['first_row']:,}-{last_row:,}: "
+                      f"{result['imported']} imported, {result['alreadyImported']} already there, "
+                      f"{result['errors']} errors ({result['ms']} ms"
+                      f"{', attempt ' + str(result['attempts']) if result['attempts'] > 1 else ''})")
+
+        await asyncio.gather(*(worker() for _ in range(max(1, args.window))))
+    elapsed = time.perf_counter() - started
+
+    totals = {key: sum(r[key] for r in completed.values()) for key in ('imported', 'skipped', 'alreadyImported', 'errors')}
+    print("\n📊 IMPORT SUMMARY")
+    print("=" * 60)
+    print(f"✅ Chunks done: {len(completed)}/{len(chunks)}")
+    print(f"📥 Imported: {totals['imported']:,}")
+    print(f"⏭️ Skipped: {totals['skipped']:,} ({totals['alreadyImported']:,} already imported)")
+    print(f"⚠️ Row errors: {totals['errors']:,}")
+    print(f"🔁 Retries: {importer.retried}")
+    uploaded_rows = sum(completed[c['index']]['rows'] for c in pending if c['index'] in completed)
+    if elapsed > 0:
+        print(f"⏱️ {elapsed:.1f}s this run - {uploaded_rows / elapsed:,.0f} rows/sec")
+    if importer.idempotency_confirmed is False:
+        print("⚠️ The target ignored idempotent=true (older deployment) - a resumed run may have duplicated rows")
+
+    error_details = [d for i in sorted(completed) for d in completed[i]['errorDetails']]
+    if error_details:
+        print(f"\n🔍 First row errors (full list per chunk in {checkpoint_path}):")
+        for detail in error_details[:10]:
+            print(f"   - {detail}")
+
+    if fatal:
+        print(f"\n❌ Stopped: {fatal[0]}")
+    if failed or fatal:
+        print(f"💾 Progress saved to {checkpoint_path} - re-run the same command to resume")
+        return False
+    print(f"🎉 Import complete (checkpoint kept at {checkpoint_path})")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        ok = asyncio.run(main())
+        sys.exit(0 if ok else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Import interrupted - re-run the same command to resume")
+        sys.exit(1)
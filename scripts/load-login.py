@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Open-Loop Login Load Generator
+Drives POST /api/auth/login at fixed arrival rates. Requests are sent on a
+precomputed schedule whether or not earlier ones have returned, and latency is
+measured from the scheduled send time, so a slow server shows up as queueing
+rather than as a lower request rate.
+
+Each rate step runs a warm-up (discarded) followed by a measured window.
+Stepping the rate up (--rates 2,5,10,20) shows where the endpoint saturates.
+
+Usage: python3 scripts/load-login.py --rates 2,5,10 --duration 30 [--warmup 5] [--output login-load.json]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+from collections import Counter
+from datetime import datetime
+
+from crm_config import BASE_URL, USERNAME, PASSWORD
+from crm_probe import ProbeEngine
+from crm_stats import LatencyHistogram, format_summary
+
+LOGIN_PATH = '/api/auth/login'
+
+
+def arrival_offsets(rate, seconds, poisson=False, seed=None):
+    """Send offsets (seconds from step start) for a constant or Poisson arrival process"""
+    rng = random.Random(seed)
+    offsets, t = [], 0.0
+    while True:
+        t = t + rng.expovariate(rate) if poisson else len(offsets) / rate
+        if t >= seconds:
+            return offsets
+        offsets.append(t)
+
+
+class StepStats:
+    """Outcome of every request sent inside one measured window"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()   # scheduled send -> response complete
+        self.service = LatencyHistogram()   # connection slot acquired -> response complete (no pool queueing)
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.dropped = 0
+        self.max_send_lag_ms = 0.0
+        self.last_completion = 0.0
+
+    def report(self, rate, seconds, started):
+        completed = sum(self.statuses.values())
+        ok = self.statuses.get('200', 0)
+        offered = completed + sum(self.errors.values()) + self.dropped
+        # Throughput over the window, stretched if the tail finished after it closed
+        elapsed = max(seconds, self.last_completion - started)
+        return {
+            'target_rps': rate,
+            'offered': offered,
+            'offered_rps': round(offered / seconds, 2) if seconds else 0,
+            'completed': completed,
+            'succeeded': ok,
+            'achieved_rps': round(completed / elapsed, 2) if elapsed else 0,
+            'success_rps': round(ok / elapsed, 2) if elapsed else 0,
+            'error_rate': round((offered - ok) / offered, 4) if offered else 0,
+            'dropped': self.dropped,
+            'max_send_lag_ms': round(self.max_send_lag_ms, 2),
+            'latency_ms': self.latency.summary(),
+            'service_ms': self.service.summary(),
+            'status_counts': dict(sorted(self.statuses.items())),
+            'errors': dict(self.errors),
+        }
+
+
+async def run_step(engine, body, rate, warmup, duration, max_inflight, poisson, seed):
+    """Warm up, then measure one fixed-rate window; returns the step report"""
+    offsets = arrival_offsets(rate, warmup + duration, poisson, seed)
+    stats = StepStats()
+    inflight = set()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    measure_from = started + warmup
+
+    async def fire(scheduled, measured):
+        try:
+            response = await engine.request('POST', LOGIN_PATH, {'Content-Type': 'application/json'}, body)
+        except Exception as e:
+            if measured:
+                stats.errors[type(e).__name__] += 1
+            return
+        done = loop.time()
+        # The engine times from the moment it has a connection slot, after any wait in its pool
+        service_ms = response['timing']['total_ms']
+        sent = done - service_ms / 1000
+        if measured:
+            stats.latency.record((done - scheduled) * 1000)
+            stats.service.record(service_ms)
+            stats.statuses[str(response['status'])] += 1
+            stats.max_send_lag_ms = max(stats.max_send_lag_ms, (sent - scheduled) * 1000)
+            stats.last_completion = max(stats.last_completion, done)
+
+    for offset in offsets:
+        scheduled = started + offset
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        measured = scheduled >= measure_from
+        if len(inflight) >= max_inflight:
+            # The client itself is saturated - count it instead of silently slowing the schedule
+            if measured:
+                stats.dropped += 1
+            continue
+        task = asyncio.ensure_future(fire(scheduled, measured))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+
+    if inflight:
+        await asyncio.gather(*inflight)
+    return stats.report(rate, duration, measure_from)
+
+
+def find_saturation(steps, max_error_rate=0.01, min_throughput_ratio=0.95):
+    """First rate at which throughput stops keeping up or errors start"""
+    for step in steps:
+        reasons = []
+        if step['offered_rps'] and step['success_rps'] < step['offered_rps'] * min_throughput_ratio:
+            reasons.append(f"success throughput {step['success_rps']}/s below {min_throughput_ratio:.0%} of offered {step['offered_rps']}/s")
+        if step['error_rate'] > max_error_rate:
+            reasons.append(f"error rate {step['error_rate']:.1%}")
+        if reasons:
+            return {'saturated_at_rps': step['target_rps'], 'reasons': reasons}
+    return {'saturated_at_rps': None, 'reasons': []}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test for /api/auth/login")
+    parser.add_argument('--rates', default='5', help="comma-separated arrival rates (requests/second) to step through")
+    parser.add_argument('--duration', type=float, default=30, help="measured seconds per rate")
+    parser.add_argument('--warmup', type=float, default=5, help="discarded seconds before each measured window")
+    parser.add_argument('--poisson', action='store_true', help="Poisson arrivals instead of evenly spaced")
+    parser.add_argument('--max-inflight', type=int, default=500, help="client-side cap on outstanding requests")
+    parser.add_argument('--connections', type=int, default=100, help="keep-alive connection pool size")
+    parser.add_argument('--timeout', type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument('--username', default=USERNAME)
+    parser.add_argument('--password', default=PASSWORD)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default='', help="write the JSON report here (default: stdout only)")
+    args = parser.parse_args()
+
+    rates = [float(r) for r in args.rates.split(',') if r]
+    body = json.dumps({'username': args.username, 'password': args.password}).encode()
+
+    print("🚀 Login Load Test (open loop)", file=sys.stderr)
+    print("=" * 60, file=sys.stderr)
+    print(f"🌐 Target: {BASE_URL}{LOGIN_PATH}", file=sys.stderr)
+    print(f"📈 Rates: {', '.join(f'{r:g}/s' for r in rates)} | warm-up {args.warmup:g}s + {args.duration:g}s each", file=sys.stderr)
+
+    steps = []
+    async with ProbeEngine(BASE_URL, concurrency=args.connections, timeout=args.timeout) as engine:
+        for rate in rates:
+            step = await run_step(engine, body, rate, args.warmup, args.duration,
+                                  args.max_inflight, args.poisson, args.seed)
+            steps.append(step)
+            print(f"   {rate:>7g}/s → {step['achieved_rps']:>7.2f}/s ok={step['succeeded']} "
+                  f"err={step['error_rate']:.1%} | {format_summary(step['latency_ms'])}", file=sys.stderr)
+        connections = engine.connections_opened
+
+    report = {
+        'target': f"{BASE_URL}{LOGIN_PATH}",
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'rates': rates,
+            'warmup_s': args.warmup,
+            'duration_s': args.duration,
+            'arrival': 'poisson' if args.poisson else 'constant',
+            'max_inflight': args.max_inflight,
+            'connections': args.connections,
+        },
+        'connections_opened': connections,
+        'steps': steps,
+        'saturation': find_saturation(steps),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"💾 Report written to {args.output}", file=sys.stderr)
+    print(output)
+    return report
+
+
+if __name__ == "__main__":
+    try:
+        report = asyncio.run(main())
+        sys.exit(0 if report['saturation']['saturated_at_rps'] is None else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Load test interrupted by user", file=sys.stderr)
+        sys.exit(1)
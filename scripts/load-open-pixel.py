@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Open-Pixel Load Test
+Replays one campaign's opens against GET /api/email/tracking/open. Every hit
+runs INSERT INTO email_tracking and then awaits broadcastAnalyticsUpdate()
+(a Pusher REST trigger) before the GIF is returned, so the pixel's latency is
+the insert plus the Pusher round trip - and a mail client waits on it while
+rendering the message. email_tracking has no unique key: every hit is a row,
+and every row a broadcast.
+
+The open schedule is built from the recipient list:
+  - first opens: most in the first hour after send, then a long tail
+  - Apple Mail Privacy Protection: Apple's proxy prefetches the pixel for
+    --mpp-share of the recipients shortly after send, in storms of
+    --storm-size recipients hitting within a couple of seconds
+  - repeat opens: Poisson(--repeat-mean) more opens per opener
+  - double loads: clients that fetch the image twice within a few milliseconds
+
+The campaign's --window hours are compressed into --duration seconds; the
+spacing inside a storm or a double load is kept at real time, because that
+spacing is what the database sees. Latency is measured from the scheduled send
+time (open loop, as load-login.py).
+
+The report counts rows written per opening recipient (what MPP, repeat opens
+and double loads do to the stored open count) and the broadcasts' outcome.
+
+Only local targets are accepted (the stand-in, optionally on a SQLite file with
+the same table and indexes and a Pusher round trip:
+standin-server.py --tracking-db tracking.sqlite --pusher-latency-ms 40).
+
+Usage: CRM_BASE_URL=http://127.0.0.1:3000 python3 scripts/load-open-pixel.py --recipients 20000 --duration 60 [--output pixel-load.json]
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import math
+import random
+import sys
+import urllib.parse
+from collections import Counter
+from datetime import datetime
+
+from crm_config import BASE_URL
+from crm_probe import ProbeEngine
+from crm_stats import LatencyHistogram, format_summary
+
+PIXEL_PATH = '/api/email/tracking/open'
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+KINDS = ('first', 'mpp', 'repeat', 'double')
+
+USER_AGENTS = {
+    # Apple's prefetch proxy deliberately sends a bare, generic UA
+    'mpp': 'Mozilla/5.0',
+    'gmail': 'Mozilla/5.0 (Windows NT 5.1; rv:11.0) Gecko Firefox/11.0 (via ggpht.com GoogleImageProxy)',
+    'outlook': 'Microsoft Office/16.0 (Windows NT 10.0; Microsoft Outlook 16.0.17029; Pro)',
+    'iphone': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148',
+}
+CLIENT_MIX = (('gmail', 0.45), ('iphone', 0.3), ('outlook', 0.25))
+
+
+class Open:
+    """One scheduled pixel hit"""
+    __slots__ = ('at', 'kind', 'email', 'user_agent', 'ip')
+
+    def __init__(self, at, kind, email, user_agent, ip):
+        self.at = at
+        self.kind = kind
+        self.email = email
+        self.user_agent = user_agent
+        self.ip = ip
+
+
+def load_recipients(count, csv_path=None):
+    """Emails from a CSV with an 'email' column, or `count` synthetic ones"""
+    if not csv_path:
+        return [f"loadtest+{i:06d}@example.com" for i in range(count)]
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        column = next((c for c in reader.fieldnames or [] if c.strip().lower() == 'email'), None)
+        if column is None:
+            raise SystemExit(f"❌ {csv_path} has no 'email' column")
+        emails = [row[column].strip() for row in reader if (row[column] or '').strip()]
+    return emails[:count] if count else emails
+
+
+def _first_open_at(rng, window, first_hour_share):
+    """Seconds after send: exponential inside the first hour, log-normal tail after it"""
+    if rng.random() < first_hour_share:
+        return min(rng.expovariate(1 / 900), 3600.0)
+    # Median about 5 hours after send
+    return min(3600 + rng.lognormvariate(math.log(4 * 3600), 1.0), window)
+
+
+def _poisson(rng, mean):
+    limit, k, p = math.exp(-mean), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def build_schedule(recipients, args, seed=None):
+    """Scheduled opens, sorted by send offset (seconds from the start of the run)"""
+    rng = random.Random(seed)
+    window = args.window * 3600
+    scale = args.duration / window
+    opens = []
+
+    def client():
+        name = rng.choices([c for c, _ in CLIENT_MIX], [w for _, w in CLIENT_MIX])[0]
+        return USER_AGENTS[name], f"203.0.113.{rng.randrange(1, 255)}"
+
+    mpp = [email for email in recipients if rng.random() < args.mpp_share]
+    rng.shuffle(mpp)
+    for start in range(0, len(mpp), args.storm_size):
+        # Apple prefetches soon after delivery; a storm lands within storm_seconds of real time
+        anchor = rng.expovariate(1 / 600) * scale
+        for email in mpp[start:start + args.storm_size]:
+            ip = f"17.{rng.randrange(56, 60)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+            opens.append(Open(anchor + rng.uniform(0, args.storm_seconds), 'mpp', email, USER_AGENTS['mpp'], ip))
+
+    for email in recipients:
+        if rng.random() >= args.open_rate:
+            continue
+        user_agent, ip = client()
+        first = _first_open_at(rng, window, args.first_hour_share)
+        opens.append(Open(first * scale, 'first', email, user_agent, ip))
+        if rng.random() < args.double_load:
+            opens.append(Open(first * scale + rng.uniform(0, 0.005), 'double', email, user_agent, ip))
+        for _ in range(_poisson(rng, args.repeat_mean)):
+            again = min(first + rng.expovariate(1 / (6 * 3600)), window)
+            opens.append(Open(again * scale, 'repeat', email, user_agent, ip))
+
+    opens.sort(key=lambda o: o.at)
+    return opens
+
+
+def schedule_profile(opens):
+    """Counts per kind and the busiest scheduled second"""
+    per_second = Counter(int(o.at) for o in opens)
+    peak_second, peak = per_second.most_common(1)[0] if per_second else (0, 0)
+    return {
+        'opens': len(opens),
+        'by_kind': {kind: sum(1 for o in opens if o.kind == kind) for kind in KINDS},
+        'recipients_opening': len({o.email for o in opens}),
+        'peak_scheduled_per_s': peak,
+        'peak_scheduled_at_s': peak_second,
+    }
+
+
+class PixelStats:
+    """Outcome of every pixel hit, overall and per kind of open"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.by_kind = {kind: LatencyHistogram() for kind in KINDS}
+        self.statuses = Counter()
+        self.results = Counter()
+        self.broadcasts = Counter()
+        self.recipients = set()
+        self.errors = Counter()
+        self.not_gif = 0
+        self.dropped = 0
+        self.max_send_lag_ms = 0.0
+        self.completed_per_second = Counter()
+
+    def report(self, started, finished):
+        completed = sum(self.statuses.values())
+        ok = self.statuses.get('200', 0)
+        offered = completed + sum(self.errors.values()) + self.dropped
+        elapsed = finished - started
+        written = self.results['inserted']
+        peak_second, peak = self.completed_per_second.most_common(1)[0] if self.completed_per_second else (0, 0)
+        return {
+            'offered': offered,
+            'completed': completed,
+            'succeeded': ok,
+            'error_rate': round((offered - ok) / offered, 4) if offered else 0,
+            'dropped': self.dropped,
+            'non_gif_responses': self.not_gif,
+            'elapsed_s': round(elapsed, 2),
+            'throughput_rps': round(completed / elapsed, 2) if elapsed else 0,
+            'peak_completed_per_s': peak,
+            'peak_at_s': peak_second,
+            'max_send_lag_ms': round(self.max_send_lag_ms, 2),
+            'rows': dict(self.results),
+            # None when the target does not say (X-Tracking-Result is a stand-in header)
+            'rows_per_recipient': round(written / len(self.recipients), 3) if written and self.recipients else None,
+            'broadcasts': dict(self.broadcasts),
+            'latency_ms': self.latency.summary(),
+            'latency_by_kind_ms': {kind: h.summary() for kind, h in self.by_kind.items() if h.total},
+            'status_counts': dict(sorted(self.statuses.items())),
+            'errors': dict(self.errors),
+        }
+
+
+async def replay(engine, campaign_id, opens, max_inflight):
+    """Send every scheduled open on time, whatever the earlier ones are doing"""
+    stats = PixelStats()
+    inflight = set()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async def fire(scheduled, hit):
+        sent = loop.time()
+        path = f"{PIXEL_PATH}?c={urllib.parse.quote(campaign_id)}&e={urllib.parse.quote(hit.email)}"
+        headers = {'User-Agent': hit.user_agent, 'X-Forwarded-For': hit.ip, 'Accept': 'image/*'}
+        try:
+            response = await engine.request('GET', path, headers)
+        except Exception as e:
+            stats.errors[type(e).__name__] += 1
+            return
+        done = loop.time()
+        ms = (done - scheduled) * 1000
+        stats.latency.record(ms)
+        stats.by_kind[hit.kind].record(ms)
+        stats.statuses[str(response['status'])] += 1
+        stats.results[response['headers'].get('x-tracking-result', 'unreported')] += 1
+        stats.broadcasts[response['headers'].get('x-tracking-broadcast', 'unreported')] += 1
+        stats.recipients.add(hit.email)
+        if not response['headers'].get('content-type', '').startswith('image/gif'):
+            stats.not_gif += 1
+        stats.max_send_lag_ms = max(stats.max_send_lag_ms, (sent - scheduled) * 1000)
+        stats.completed_per_second[int(done - started)] += 1
+
+    for hit in opens:
+        scheduled = started + hit.at
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(inflight) >= max_inflight:
+            stats.dropped += 1
+            continue
+        task = asyncio.ensure_future(fire(scheduled, hit))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+
+    if inflight:
+        await asyncio.gather(*inflight)
+    return stats.report(started, loop.time())
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay a campaign's opens against the tracking pixel")
+    parser.add_argument('--recipients', type=int, default=20000, help="synthetic recipients (or a cap on --recipient-csv)")
+    parser.add_argument('--recipient-csv', default='', help="CSV with an 'email' column to take recipients from")
+    parser.add_argument('--campaign', default='loadtest-campaign', help="campaign id sent as ?c=")
+    parser.add_argument('--open-rate', type=float, default=0.35, help="share of recipients who really open")
+    parser.add_argument('--first-hour-share', type=float, default=0.6, help="share of first opens inside the first hour")
+    parser.add_argument('--mpp-share', type=float, default=0.4, help="share of recipients behind Apple Mail Privacy Protection")
+    parser.add_argument('--storm-size', type=int, default=250, help="recipients per MPP prefetch storm")
+    parser.add_argument('--storm-seconds', type=float, default=2.0, help="real seconds one storm is spread over")
+    parser.add_argument('--repeat-mean', type=float, default=0.8, help="mean repeat opens per opener (Poisson)")
+    parser.add_argument('--double-load', type=float, default=0.03, help="share of opens fetched twice within 5ms")
+    parser.add_argument('--window', type=float, default=48, help="campaign hours to replay")
+    parser.add_argument('--duration', type=float, default=60, help="seconds the window is compressed into")
+    parser.add_argument('--max-inflight', type=int, default=1000, help="client-side cap on outstanding requests")
+    parser.add_argument('--connections', type=int, default=100, help="keep-alive connection pool size")
+    parser.add_argument('--timeout', type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument('--p99-budget-ms', type=float, default=250, help="fail when pixel p99 exceeds this")
+    parser.add_argument('--allow-remote', action='store_true', help="allow a non-local target (writes real tracking rows)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default='', help="write the JSON report here (default: stdout only)")
+    args = parser.parse_args()
+
+    host = urllib.parse.urlparse(BASE_URL).hostname
+    if host not in LOCAL_HOSTS and not args.allow_remote:
+        raise SystemExit(f"❌ {BASE_URL} is not local - every hit writes an email_tracking row and a Pusher event. "
+                         "Point CRM_BASE_URL at standin-server.py, or pass --allow-remote")
+
+    recipients = load_recipients(args.recipients, args.recipient_csv)
+    opens = build_schedule(recipients, args, args.seed)
+    profile = schedule_profile(opens)
+
+    print("📬 Open-Pixel Load Test (open loop)", file=sys.stderr)
+    print("=" * 60, file=sys.stderr)
+    print(f"🌐 Target: {BASE_URL}{PIXEL_PATH}", file=sys.stderr)
+    print(f"👥 {len(recipients):,} recipients → {profile['opens']:,} opens over {args.window:g}h "
+          f"compressed into {args.duration:g}s", file=sys.stderr)
+    print("   " + ', '.join(f"{n:,} {kind}" for kind, n in profile['by_kind'].items()) +
+          f" | peak {profile['peak_scheduled_per_s']:,}/s scheduled", file=sys.stderr)
+
+    async with ProbeEngine(BASE_URL, concurrency=args.connections, timeout=args.timeout) as engine:
+        result = await replay(engine, args.campaign, opens, args.max_inflight)
+        connections = engine.connections_opened
+
+    p99 = result['latency_ms'].get('p99_ms')
+    print(f"\n📊 {result['completed']:,} hits, {result['throughput_rps']:,.1f}/s "
+          f"(peak {result['peak_completed_per_s']:,}/s), err={result['error_rate']:.1%}", file=sys.stderr)
+    print(f"   all     | {format_summary(result['latency_ms'])}", file=sys.stderr)
+    for kind, summary in result['latency_by_kind_ms'].items():
+        print(f"   {kind:<7} | {format_summary(summary)}", file=sys.stderr)
+    if result['rows_per_recipient'] is None:
+        print("   🗃️ Rows written: not reported by this target", file=sys.stderr)
+    else:
+        print(f"   🗃️ Rows written: {result['rows'].get('inserted', 0):,} "
+              f"({result['rows_per_recipient']:.2f} per opening recipient)", file=sys.stderr)
+        print("   📡 Broadcasts: " + ', '.join(f"{n:,} {outcome}" for outcome, n in sorted(result['broadcasts'].items())),
+              file=sys.stderr)
+
+    failures = []
+    if p99 is not None and p99 > args.p99_budget_ms:
+        failures.append(f"p99 {p99:.1f}ms over the {args.p99_budget_ms:g}ms budget")
+    if result['error_rate'] > 0.01:
+        failures.append(f"error rate {result['error_rate']:.1%}")
+    if result['non_gif_responses']:
+        failures.append(f"{result['non_gif_responses']} responses were not the GIF")
+    for reason in failures:
+        print(f"❌ {reason}", file=sys.stderr)
+    if not failures:
+        print(f"✅ Pixel p99 within {args.p99_budget_ms:g}ms", file=sys.stderr)
+
+    report = {
+        'target': f"{BASE_URL}{PIXEL_PATH}",
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'schedule': profile,
+        'connections_opened': connections,
+        'result': result,
+        'failures': failures,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"💾 Report written to {args.output}", file=sys.stderr)
+    print(output)
+    return report
+
+
+if __name__ == "__main__":
+    try:
+        report = asyncio.run(main())
+        sys.exit(0 if not report['failures'] else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Load test interrupted by user", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Realtime Analytics Fan-out Load Simulator
+Starts the local Pusher stand-in (crm_pusher), connects hundreds of simulated
+admin dashboards to it the way useRealTimeAnalytics does (subscribe to
+analytics-updates and campaign-updates), and triggers the analytics-updated
+events the open/click tracking routes publish, through the signed REST API.
+
+Every event carries a probe number, so each delivery's end-to-end latency
+(trigger call started -> subscriber has the message) is measured. Per event,
+the fan-out time is when its last subscriber received it. --slow-fraction
+makes some dashboards take --slow-ms per event (a refetch); once their socket
+buffers (--socket-buffer, both ends) are full, the server's per-connection
+send queue fills and events are dropped.
+
+Deliveries that did not arrive are split in two:
+  - dropped: the stand-in's own dropped_slow_subscriber counter
+  - still pending when --grace ran out (late, not lost)
+and deliveries slower than --late-ms are counted as late.
+
+The simulator and the stand-in share one event loop unless --url points at a
+stand-in started with --serve in another process (or any Pusher-compatible
+server with --app-id/--key/--secret).
+
+Usage: python3 scripts/load-realtime.py --subscribers 300 --rate 20 --duration 30 [--slow-fraction 0.05 --slow-ms 200]
+       python3 scripts/load-realtime.py --serve --port 6001
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from crm_probe import ProbeEngine
+from crm_pusher import PusherStandin, PusherSubscriber, sign_query
+from crm_stats import LatencyHistogram, format_summary
+
+# Mirrors src/lib/pusher.ts
+CHANNELS = {'ANALYTICS': 'analytics-updates', 'CAMPAIGNS': 'campaign-updates'}
+EVENTS = {'ANALYTICS_UPDATED': 'analytics-updated', 'CAMPAIGN_UPDATED': 'campaign-updated'}
+
+
+class FanoutStats:
+    """Per-event send times and delivery counts across all subscribers"""
+
+    def __init__(self):
+        self.subscribed = 0
+        self.sent = {}            # probe -> (perf_counter at trigger, subscribers expected)
+        self.received = Counter() # probe -> deliveries
+        self.last = {}            # probe -> perf_counter of the latest delivery
+        self.late = 0
+        self.delivery = LatencyHistogram()
+        self.trigger = LatencyHistogram()
+        self.errors = Counter()
+        self.unexpected = 0
+
+    def delivered(self, probe, now, late_ms):
+        sent = self.sent.get(probe)
+        if sent is None:
+            self.unexpected += 1
+            return
+        self.received[probe] += 1
+        self.last[probe] = now
+        ms = (now - sent[0]) * 1000
+        self.delivery.record(ms)
+        if ms > late_ms:
+            self.late += 1
+
+    def report(self, dropped=None):
+        """dropped: the server's dropped_slow_subscriber count, None when the server does not say"""
+        expected = sum(count for _, count in self.sent.values())
+        received = sum(self.received[probe] for probe in self.sent)
+        missing = expected - received
+        fanout = LatencyHistogram()
+        complete = 0
+        for probe, (started, count) in self.sent.items():
+            if count and self.received[probe] >= count:
+                complete += 1
+                fanout.record((self.last[probe] - started) * 1000)
+        return {
+            'events': len(self.sent),
+            'expected_deliveries': expected,
+            'deliveries': received,
+            'missing': missing,
+            'dropped': dropped,
+            'drop_rate': round(dropped / expected, 6) if expected and dropped is not None else None,
+            'pending_at_cutoff': missing - dropped if dropped is not None else None,
+            'late_deliveries': self.late,
+            'events_fully_delivered': complete,
+            'delivery_latency_ms': self.delivery.summary(),
+            'fanout_complete_ms': fanout.summary(),
+            'trigger_ms': self.trigger.summary(),
+            'errors': dict(self.errors),
+        }
+
+
+async def dashboard(url, stats, slow_ms, started_event, socket_buffer, late_ms):
+    """One simulated admin dashboard; runs until cancelled"""
+    sub = PusherSubscriber(url, socket_buffer)
+    try:
+        await sub.connect()
+    except Exception as e:
+        stats.errors[f"connect {type(e).__name__}"] += 1
+        started_event.set()
+        return
+    pending = set(CHANNELS.values())
+    try:
+        for channel in pending:
+            await sub.subscribe(channel)
+        while True:
+            message = await sub.receive()
+            event = message.get('event')
+            if event == 'pusher_internal:subscription_succeeded':
+                pending.discard(message.get('channel'))
+                if not pending:
+                    stats.subscribed += 1
+                    started_event.set()
+            elif event in EVENTS.values():
+                data = json.loads(message['data'])
+                stats.delivered(data.get('analytics', data.get('campaign', {})).get('probe'), time.perf_counter(), late_ms)
+                if slow_ms:
+                    # The dashboard refetches its analytics before it reads the socket again
+                    await asyncio.sleep(slow_ms / 1000)
+            elif event == 'pusher:subscription_error':
+                stats.errors['subscription_error'] += 1
+                started_event.set()
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        stats.errors[f"disconnected {type(e).__name__}"] += 1
+    finally:
+        await sub.close()
+
+
+async def connect_dashboards(url, count, ramp, slow_fraction, slow_ms, stats, rng, socket_buffer, late_ms):
+    """Open count dashboards spread over ramp seconds; returns their tasks once all have subscribed"""
+    tasks = []
+    for i in range(count):
+        ready = asyncio.Event()
+        slow = slow_ms if rng.random() < slow_fraction else 0
+        tasks.append(asyncio.ensure_future(dashboard(url, stats, slow, ready, socket_buffer, late_ms)))
+        await asyncio.wait_for(ready.wait(), 30)
+        if ramp:
+            await asyncio.sleep(ramp / count)
+    return tasks
+
+
+async def publish(engine, app_id, key, secret, stats, rate, duration, campaigns, campaign_ratio, rng):
+    """Trigger events open-loop at rate/s for duration seconds, like tracking routes under a send"""
+    loop = asyncio.get_running_loop()
+    inflight = set()
+    path = f"/apps/{app_id}/events"
+    started = loop.time()
+
+    async def fire(probe):
+        campaign_id = f"campaign-{rng.randrange(campaigns)}"
+        timestamp = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        if rng.random() < campaign_ratio:
+            name, channel = EVENTS['CAMPAIGN_UPDATED'], CHANNELS['CAMPAIGNS']
+            data = {'campaign': {'id': campaign_id, 'status': 'sending', 'probe': probe}, 'timestamp': timestamp}
+        else:
+            # broadcastAnalyticsUpdate(campaignId, { refresh: true }) from the open/click routes
+            name, channel = EVENTS['ANALYTICS_UPDATED'], CHANNELS['ANALYTICS']
+            data = {'campaignId': campaign_id, 'analytics': {'refresh': True, 'probe': probe}, 'timestamp': timestamp}
+        body = json.dumps({'name': name, 'channels': [channel], 'data': json.dumps(data)}).encode()
+        sent = time.perf_counter()
+        stats.sent[probe] = (sent, stats.subscribed)
+        try:
+            response = await engine.request('POST', f"{path}?{sign_query(key, secret, 'POST', path, body)}",
+                                            {'Content-Type': 'application/json'}, body)
+        except Exception as e:
+            stats.errors[f"trigger {type(e).__name__}"] += 1
+            stats.sent[probe] = (sent, 0)
+            return
+        stats.trigger.record((time.perf_counter() - sent) * 1000)
+        if response['status'] != 200:
+            stats.errors[f"trigger HTTP {response['status']}"] += 1
+            stats.sent[probe] = (sent, 0)
+
+    for probe in range(int(rate * duration)):
+        delay = started + probe / rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.ensure_future(fire(probe))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    if inflight:
+        await asyncio.gather(*inflight)
+
+
+async def serve(args):
+    async with PusherStandin(args.host, args.port, args.app_id, args.key, args.secret,
+                             send_queue=args.send_queue, socket_buffer=args.socket_buffer or None) as server:
+        print("📡 Pusher stand-in running")
+        print("=" * 50)
+        print(f"🌐 REST {server.base_url}/apps/{server.app_id}/events | socket {server.socket_url}")
+        print(f"🔑 app_id={server.app_id} key={server.key} secret={server.secret}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            print(f"\n📊 {dict(server.stats)}")
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    server = None
+    if args.url:
+        base_url, socket_url = args.url.rstrip('/'), args.url.replace('http', 'ws', 1).rstrip('/') + f"/app/{args.key}"
+    else:
+        server = await PusherStandin(args.host, 0, args.app_id, args.key, args.secret,
+                                     send_queue=args.send_queue, socket_buffer=args.socket_buffer or None).start()
+        base_url, socket_url = server.base_url, server.socket_url
+
+    print("🚀 Realtime Fan-out Load Test", file=sys.stderr)
+    print("=" * 60, file=sys.stderr)
+    print(f"📡 Pusher endpoint: {base_url} ({'local stand-in' if server else 'external'})", file=sys.stderr)
+    print(f"👥 {args.subscribers} dashboards ({args.slow_fraction:.0%} taking {args.slow_ms:g}ms per event) | "
+          f"{args.rate:g} events/s for {args.duration:g}s", file=sys.stderr)
+
+    stats = FanoutStats()
+    tasks = []
+    try:
+        connect_started = time.perf_counter()
+        tasks = await connect_dashboards(socket_url, args.subscribers, args.ramp, args.slow_fraction,
+                                         args.slow_ms, stats, rng, args.socket_buffer or None, args.late_ms)
+        connect_seconds = time.perf_counter() - connect_started
+        print(f"   🔌 {stats.subscribed}/{args.subscribers} subscribed in {connect_seconds:.1f}s", file=sys.stderr)
+
+        async with ProbeEngine(base_url, concurrency=args.connections, timeout=args.timeout) as engine:
+            await publish(engine, args.app_id, args.key, args.secret, stats, args.rate, args.duration,
+                          args.campaigns, args.campaign_ratio, rng)
+        # Give slow dashboards time to catch up before counting what has not arrived
+        await asyncio.sleep(args.grace)
+        # Read before closing: the subscribers' own teardown must not count
+        dropped = server.stats['dropped_slow_subscriber'] if server else None
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if server:
+            await server.close()
+
+    result = stats.report(dropped)
+    print(f"   📨 {result['deliveries']:,}/{result['expected_deliveries']:,} deliveries, "
+          f"{result['late_deliveries']:,} later than {args.late_ms:g}ms", file=sys.stderr)
+    if result['dropped'] is None:
+        print(f"   🕳️ {result['missing']:,} not delivered after {args.grace:g}s grace "
+              f"(an external server does not report drops)", file=sys.stderr)
+    else:
+        print(f"   🕳️ {result['dropped']:,} dropped by the server (drop rate {result['drop_rate']:.3%}), "
+              f"{result['pending_at_cutoff']:,} still pending after {args.grace:g}s grace", file=sys.stderr)
+    print(f"   ⏱️ delivery {format_summary(result['delivery_latency_ms'])}", file=sys.stderr)
+    print(f"   ⏱️ full fan-out {format_summary(result['fanout_complete_ms'])}", file=sys.stderr)
+    print(f"   ⏱️ trigger call {format_summary(result['trigger_ms'])}", file=sys.stderr)
+    if result['errors']:
+        print(f"   ⚠️ {result['errors']}", file=sys.stderr)
+
+    report = {
+        'target': base_url,
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'subscribers': args.subscribers,
+            'rate': args.rate,
+            'duration_s': args.duration,
+            'slow_fraction': args.slow_fraction,
+            'slow_ms': args.slow_ms,
+            'send_queue': args.send_queue if server else None,
+            'socket_buffer': args.socket_buffer or None,
+            'campaigns': args.campaigns,
+        },
+        'subscribed': stats.subscribed,
+        'connect_seconds': round(connect_seconds, 2),
+        'server': dict(server.stats) if server else None,
+        **result,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"💾 Report written to {args.output}", file=sys.stderr)
+    print(output)
+    # Without the server's counter, everything missing counts against the budget
+    expected = result['expected_deliveries']
+    drop_rate = result['drop_rate'] if result['drop_rate'] is not None else \
+        (result['missing'] / expected if expected else 0)
+    return drop_rate <= args.max_drop_rate and stats.subscribed == args.subscribers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fan-out load test for the realtime analytics channel")
+    parser.add_argument('--subscribers', type=int, default=300, help="simulated admin dashboards")
+    parser.add_argument('--ramp', type=float, default=5, help="seconds over which dashboards connect")
+    parser.add_argument('--rate', type=float, default=20, help="events triggered per second")
+    parser.add_argument('--duration', type=float, default=30, help="seconds of triggering")
+    parser.add_argument('--grace', type=float, default=2, help="seconds to wait for late deliveries")
+    parser.add_argument('--late-ms', type=float, default=1000, help="deliveries slower than this count as late")
+    parser.add_argument('--campaigns', type=int, default=5, help="distinct campaign ids in the events")
+    parser.add_argument('--campaign-ratio', type=float, default=0.0, help="share of campaign-updated events")
+    parser.add_argument('--slow-fraction', type=float, default=0.0, help="share of dashboards that are slow readers")
+    parser.add_argument('--slow-ms', type=float, default=200, help="handling time per event on a slow dashboard")
+    parser.add_argument('--send-queue', type=int, default=100, help="stand-in's per-connection queue (events)")
+    parser.add_argument('--socket-buffer', type=int, default=4096,
+                        help="bytes of socket and stream buffering per side, so slow readers push back (0: OS defaults)")
+    parser.add_argument('--connections', type=int, default=20, help="keep-alive connections for trigger calls")
+    parser.add_argument('--timeout', type=float, default=10, help="per-trigger timeout in seconds")
+    parser.add_argument('--max-drop-rate', type=float, default=0.001, help="fail above this drop rate")
+    parser.add_argument('--url', default='', help="use this Pusher-compatible server instead of starting one")
+    parser.add_argument('--serve', action='store_true', help="only run the stand-in (for --url from another process)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6001, help="port for --serve")
+    parser.add_argument('--app-id', default='standin')
+    parser.add_argument('--key', default='standin-key')
+    parser.add_argument('--secret', default='standin-secret')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default='', help="write the JSON report here (default: stdout only)")
+    args = parser.parse_args()
+    if args.serve:
+        return asyncio.run(serve(args))
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(0 if main() else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Load test interrupted by user", file=sys.stderr)
+        sys.exit(1)
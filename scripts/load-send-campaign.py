@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Send-Campaign Throughput Simulator
+Runs /api/email/send-campaign's sending loop against the local Resend
+stand-in (crm_resend.py) for 1k-100k synthetic recipients, without mailing
+anyone. Each batch of --batch-size customers is rendered the way the route
+renders it - personalizeContent, addEmailTracking's link rewriting and pixel,
+appendFooterAsync (one footer-settings query per recipient) and the social
+link pass - and is then sent by one of:
+
+  route      the route as written: windows of min(concurrency, rate) sends
+             under Promise.all, a 1 s delay after each window, 1 s/2 s
+             backoff on 429s (sendWithRateLimitedConcurrency)
+  paced      the same calls started on a rate-paced schedule with a
+             concurrency cap, rendering the next batch while this one sends
+  batch-api  POST /emails/batch with a whole batch per call, paced to the rate
+
+Reports messages/sec, how the sender's wall time splits between HTML
+generation, API wait, pacing sleeps and retry backoff, and the stalls: every
+stretch with no request in flight longer than --stall-ms, attributed to the
+phase the loop was in. Rendering runs in Python, so its cost is indicative of
+the route's, not equal to it.
+
+--app instead POSTs the campaign to CRM_BASE_URL's real route (start it with
+RESEND_BASE_URL=http://127.0.0.1:<sink-port> RESEND_API_KEY=re_test); the
+route refuses more than 1000 recipients, and only the sink's view (rate,
+gaps) is available. --serve only runs the sink.
+
+Usage: python3 scripts/load-send-campaign.py --recipients 1000,10000 --mode route [--rate 5] [--sink-rate-limit 2]
+       python3 scripts/load-send-campaign.py --serve --sink-port 3030
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+import urllib.parse
+from collections import Counter
+from datetime import datetime
+
+from crm_config import BASE_URL
+from crm_probe import ProbeEngine
+from crm_resend import ResendStandin
+from crm_stats import LatencyHistogram, format_summary
+
+APP_BASE_URL = 'https://crm.steinway.com.au'
+API_KEY = 're_standin_load_test'
+SOCIAL_LINKS = {
+    'social-facebook': 'https://www.facebook.com/steinwayaustralia',
+    'social-instagram': 'https://www.instagram.com/steinwaygalleriesaustralia/?hl=en',
+    'social-youtube': 'https://www.youtube.com/@steinwaygalleriesaustralia8733/featured',
+}
+
+
+def template_html(blocks=12):
+    """A newsletter of the size the editor produces: image blocks, copy, buttons and links"""
+    rows = []
+    for i in range(blocks):
+        rows.append(
+            f'<tr><td style="padding:12px 24px;font-family:Arial, sans-serif;font-size:15px;color:#111827;">'
+            f'<img src="https://crm.steinway.com.au/uploads/campaign/block-{i}.jpg" width="552" alt="" style="display:block;border:0;" />'
+            f'<p style="margin:12px 0;">Dear {{{{firstName}}}}, discover the Steinway Model {"BDOMSAK"[i % 7]} at our '
+            f'Sydney and Melbourne galleries. {"Private viewings are available every weekday. " * 3}</p>'
+            f'<table role="presentation"><tr><td style="padding:10px 18px;border-radius:6px;background:#111827;">'
+            f'<a href="https://www.steinway.com.au/pianos/steinway/grand/model-{i}?utm_source=epg-crm&amp;utm_medium=email" '
+            f'style="color:#fff;text-decoration:none;">Book a viewing</a></td></tr></table>'
+            f'<a href="https://www.youtube.com/watch?v=demo{i}">Watch the performance</a></td></tr>'
+        )
+    return ('<!DOCTYPE html><html><body style="margin:0;background:#f3f4f6;"><table role="presentation" width="600" '
+            'align="center" style="background:#fff;">' + ''.join(rows) + '</table></body></html>')
+
+
+def encode_component(value):
+    return urllib.parse.quote(value, safe="-_.!~*'()")
+
+
+def personalize(content, customer):
+    return (content.replace('{{firstName}}', customer['firstName']).replace('{{lastName}}', customer['lastName'])
+            .replace('{{fullName}}', f"{customer['firstName']} {customer['lastName']}")
+            .replace('{{email}}', customer['email']))
+
+
+HREF = re.compile(r'''href=["']([^"']+)["']''', re.IGNORECASE)
+
+
+def add_email_tracking(html, campaign_id, email):
+    """addEmailTracking(): wrap every link in the click redirect and add the open pixel"""
+    encoded_email = encode_component(email)
+    pixel = (f'<img src="{APP_BASE_URL}/api/email/tracking/open?c={campaign_id}&e={encoded_email}" alt="" width="1" '
+             'height="1" style="display:block;border:none;outline:none;text-decoration:none;" />')
+
+    def wrap(match):
+        url = match.group(1)
+        if '/api/email/tracking/' in url or 'mailto:' in url or url.startswith('#'):
+            return match.group(0)
+        around = html[max(0, match.start() - 200):match.start() + 200]
+        if any(s in url for s in ('youtube.com', 'youtu.be', 'vimeo.com', 'video')):
+            link_type = 'video'
+        elif any(s in url for s in ('.com.au', 'steinway.com', 'website', 'home')):
+            link_type = 'website'
+        elif '<table' in around and 'padding' in around and 'border-radius' in around:
+            link_type = 'button'
+        else:
+            link_type = 'link'
+        return (f'href="{APP_BASE_URL}/api/email/tracking/click?c={campaign_id}&e={encoded_email}'
+                f'&url={encode_component(url)}&type={link_type}"')
+
+    tracked = HREF.sub(wrap, html)
+    return tracked.replace('</body>', f'{pixel}</body>') if '</body>' in tracked else tracked + pixel
+
+
+def append_footer(html, email):
+    """appendFooterAsync() after its settings query: social row and unsubscribe block before the last </table>"""
+    unsubscribe = f"{APP_BASE_URL}/api/email/unsubscribe?e={encode_component(email)}"
+    socials = ''.join(f'<a href="{url}" data-social-label="{label[7:]}" style="text-decoration:none;margin-right:8px" '
+                      f'target="_blank" rel="noopener">{label[7:9].upper()}</a>' for label, url in SOCIAL_LINKS.items())
+    footer = (f'<tr><td align="center" style="padding:4px 10px 8px 10px;">{socials}</td></tr>'
+              f'<tr><td align="center" style="padding:16px 10px 24px 10px;font-family:Arial, sans-serif;font-size:12px;">'
+              f'<p style="margin:0;">If you prefer not to receive these emails, you can '
+              f'<a href="{unsubscribe}" style="color:#111827;">unsubscribe here</a>.</p></td></tr>')
+    last = html.rfind('</table>')
+    return html[:last] + footer + html[last:] if last >= 0 else html + footer
+
+
+def add_social_tracking(html, campaign_id, email):
+    """addSocialTrackingPostFooter(): wrap the footer's social links that are not tracked yet"""
+    encoded_email = encode_component(email)
+    for link_type, url in SOCIAL_LINKS.items():
+        tracked = (f'{APP_BASE_URL}/api/email/tracking/click?c={campaign_id}&e={encoded_email}'
+                   f'&url={encode_component(url)}&type={link_type}')
+        html = html.replace(f'href="{url}"', f'href="{tracked}"')
+    return html
+
+
+def synthetic_customers(count):
+    return [{'firstName': f"Pianist{i}", 'lastName': 'Loadtest', 'email': f"loadtest+{i:06d}@example.com"}
+            for i in range(count)]
+
+
+class SendRun:
+    """Wall-time accounting and stall detection for one campaign"""
+
+    def __init__(self, stall_ms):
+        self.stall_ms = stall_ms
+        self.phase = 'start'
+        self.batch = 0
+        self.split = Counter()          # seconds on the sender's critical path, by phase
+        self.html_cpu_s = 0.0
+        self.settings_wait_s = 0.0
+        self.api = LatencyHistogram()   # one HTTP call to the sink
+        self.outcomes = Counter()
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.backoff_s = 0.0            # summed over messages; overlaps when several back off at once
+        self.stalls = []
+        self._inflight = 0
+        self._idle_since = self._phase_since = time.perf_counter()
+        self._idle_phases = Counter()   # time per phase while nothing is in flight
+
+    def enter(self, phase):
+        now = time.perf_counter()
+        if self._inflight == 0:
+            self._idle_phases[self.phase] += now - self._phase_since
+        self.phase, self._phase_since = phase, now
+
+    def call_started(self):
+        if self._inflight == 0:
+            now = time.perf_counter()
+            self._idle_phases[self.phase] += now - self._phase_since
+            self._phase_since = now
+            idle = now - self._idle_since
+            if idle * 1000 >= self.stall_ms:
+                # Blame the phase the loop spent most of the gap in
+                phase = max(self._idle_phases, key=self._idle_phases.get)
+                self.stalls.append({'batch': self.batch, 'phase': phase, 'ms': round(idle * 1000, 1)})
+            self._idle_phases.clear()
+        self._inflight += 1
+
+    def call_finished(self):
+        self._inflight -= 1
+        if self._inflight == 0:
+            self._idle_since = self._phase_since = time.perf_counter()
+
+    def stall_summary(self):
+        by_phase = Counter()
+        for stall in self.stalls:
+            by_phase[stall['phase']] += stall['ms']
+        return {
+            'count': len(self.stalls),
+            'total_ms': round(sum(s['ms'] for s in self.stalls), 1),
+            'by_phase_ms': {phase: round(ms, 1) for phase, ms in by_phase.most_common()},
+            'longest': sorted(self.stalls, key=lambda s: -s['ms'])[:5],
+        }
+
+
+class CampaignSender:
+    """The route's render-and-send loop, in one of the three sending modes"""
+
+    def __init__(self, engine, args, run):
+        self.engine = engine
+        self.args = args
+        self.run = run
+        self.template = template_html(args.blocks)
+        self.db_pool = asyncio.Semaphore(args.db_pool)
+        self.headers = {'Authorization': f"Bearer {API_KEY}", 'Content-Type': 'application/json'}
+
+    async def _footer_settings(self):
+        """getFooterSettings(): a systemSetting query per recipient, through a small connection pool"""
+        started = time.perf_counter()
+        async with self.db_pool:
+            if self.args.settings_ms:
+                await asyncio.sleep(self.args.settings_ms / 1000)
+        self.run.settings_wait_s += time.perf_counter() - started
+
+    async def _render(self, customer, campaign_id):
+        started = time.perf_counter()
+        html = add_email_tracking(personalize(self.template, customer), campaign_id, customer['email'])
+        cpu = time.perf_counter() - started
+        await self._footer_settings()
+        started = time.perf_counter()
+        html = add_social_tracking(append_footer(html, customer['email']), campaign_id, customer['email'])
+        self.run.html_cpu_s += cpu + time.perf_counter() - started
+        return {'from': 'Steinway Galleries Australia <noreply@steinway.com.au>', 'to': customer['email'],
+                'subject': 'Load test campaign', 'html': html,
+                'text': personalize('Dear {{firstName}}, view this email online.', customer),
+                'reply_to': 'info@steinway.com.au'}
+
+    async def render_batch(self, batch, campaign_id):
+        """Promise.all over the batch's HTML generation"""
+        return await asyncio.gather(*(self._render(customer, campaign_id) for customer in batch))
+
+    async def _call(self, path, payload):
+        """One SDK call; returns (ok, rate_limited)"""
+        self.run.call_started()
+        started = time.perf_counter()
+        try:
+            response = await self.engine.request('POST', path, self.headers, json.dumps(payload).encode())
+        except Exception as e:
+            self.run.outcomes[type(e).__name__] += 1
+            return False, False
+        finally:
+            self.run.api.record((time.perf_counter() - started) * 1000)
+            self.run.call_finished()
+        self.run.outcomes[str(response['status'])] += 1
+        if response['status'] == 200:
+            return True, False
+        try:
+            error = json.loads(response['body'] or b'{}')
+        except ValueError:
+            error = {}
+        message = str(error.get('message', '')).lower()
+        return False, 'too many requests' in message or 'rate' in message or response['status'] == 429
+
+    async def send_with_retry(self, path, payload, count=1):
+        """sendEmailWithRetry(): back off 1 s, 2 s on rate limits, give up after max_attempts"""
+        for attempt in range(1, self.args.max_attempts + 1):
+            ok, rate_limited = await self._call(path, payload)
+            if ok:
+                self.run.sent += count
+                return True
+            if not rate_limited or attempt == self.args.max_attempts:
+                break
+            self.run.retries += 1
+            self.run.enter('backoff')
+            self.run.backoff_s += 2 ** (attempt - 1)
+            await asyncio.sleep(2 ** (attempt - 1))
+        self.run.failed += count
+        return False
+
+    async def send_route(self, emails):
+        """sendWithRateLimitedConcurrency(): Promise.all per window, then delay(1000)"""
+        window = int(max(1, min(self.args.concurrency, self.args.rate)))
+        for index in range(0, len(emails), window):
+            self.run.enter('sending')
+            await asyncio.gather(*(self.send_with_retry('/emails', email) for email in emails[index:index + window]))
+            if index + window < len(emails):
+                self.run.enter('pacing')
+                started = time.perf_counter()
+                await asyncio.sleep(1)
+                self.run.split['pacing'] += time.perf_counter() - started
+
+    async def send_paced(self, payloads, path, count):
+        """Start calls on a rate-paced schedule with at most `concurrency` in flight"""
+        slots = asyncio.Semaphore(self.args.concurrency)
+        loop = asyncio.get_running_loop()
+        tasks = []
+
+        async def one(payload):
+            try:
+                await self.send_with_retry(path, payload, count(payload))
+            finally:
+                slots.release()
+
+        for payload in payloads:
+            delay = self._next_slot - loop.time()
+            if delay > 0:
+                self.run.enter('pacing')
+                await asyncio.sleep(delay)
+                self.run.split['pacing'] += delay
+            self.run.enter('sending')
+            await slots.acquire()
+            self._next_slot = max(self._next_slot, loop.time()) + 1 / self.args.rate
+            tasks.append(asyncio.ensure_future(one(payload)))
+        return tasks
+
+    async def send_campaign(self, customers, campaign_id):
+        batches = [customers[i:i + self.args.batch_size] for i in range(0, len(customers), self.args.batch_size)]
+        self._next_slot = asyncio.get_running_loop().time()
+        pending = []
+        next_render = None
+        for number, batch in enumerate(batches, 1):
+            self.run.batch = number
+            started = time.perf_counter()
+            self.run.enter('html')
+            if next_render is None:
+                emails = await self.render_batch(batch, campaign_id)
+            else:
+                # Rendered while the previous batch was sending; only the wait for it is on the critical path
+                emails = await next_render
+            self.run.split['html'] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            if self.args.mode == 'route':
+                await self.send_route(emails)
+            else:
+                if number < len(batches):
+                    next_render = asyncio.ensure_future(self.render_batch(batches[number], campaign_id))
+                if self.args.mode == 'paced':
+                    pending += await self.send_paced(emails, '/emails', lambda payload: 1)
+                else:
+                    pending += await self.send_paced([emails], '/emails/batch', len)
+            self.run.split['api_wait'] += time.perf_counter() - started
+        started = time.perf_counter()
+        self.run.enter('sending')
+        await asyncio.gather(*pending)
+        self.run.split['api_wait'] += time.perf_counter() - started
+
+
+async def simulate(args, size, sink):
+    """One campaign of `size` recipients through the chosen mode; returns its report"""
+    run = SendRun(args.stall_ms)
+    sink_before = dict(sink.stats)
+    async with ProbeEngine(sink.base_url, concurrency=max(args.concurrency, 1) + 4, timeout=args.timeout) as engine:
+        sender = CampaignSender(engine, args, run)
+        started = time.perf_counter()
+        await sender.send_campaign(synthetic_customers(size), f"cmloadtest{size:08d}")
+        elapsed = time.perf_counter() - started
+
+    pacing = run.split['pacing']
+    api_wait = run.split['api_wait'] - pacing
+    split = {'html_generation_s': round(run.split['html'], 3), 'api_wait_s': round(api_wait, 3),
+             'pacing_sleep_s': round(pacing, 3)}
+    other = elapsed - sum(split.values())
+    return {
+        'recipients': size,
+        'mode': args.mode,
+        'elapsed_s': round(elapsed, 2),
+        'sent': run.sent,
+        'failed': run.failed,
+        'retries': run.retries,
+        'messages_per_s': round(run.sent / elapsed, 2) if elapsed else 0,
+        'split': {**split, 'other_s': round(other, 3), 'retry_backoff_s': round(run.backoff_s, 3),
+                  'html_cpu_s': round(run.html_cpu_s, 3), 'footer_settings_wait_s': round(run.settings_wait_s, 3)},
+        'html_cpu_ms_per_message': round(run.html_cpu_s * 1000 / size, 3) if size else None,
+        'api_call_ms': run.api.summary(),
+        'outcomes': dict(run.outcomes),
+        'stalls': run.stall_summary(),
+        'sink': {k: v - sink_before.get(k, 0) for k, v in sink.stats.items()},
+    }
+
+
+def sink_view(sink, since, stall_ms):
+    """What the sink saw: accepted messages per second and the gaps between calls"""
+    arrivals = [a for a in sink.arrivals if a[0] >= since]
+    accepted = sum(count for _, count, status in arrivals if status == 200)
+    span = (arrivals[-1][0] - arrivals[0][0]) if len(arrivals) > 1 else 0
+    gaps = [round((b[0] - a[0]) * 1000, 1) for a, b in zip(arrivals, arrivals[1:])]
+    return {
+        'calls': len(arrivals),
+        'accepted_messages': accepted,
+        'messages_per_s': round(accepted / span, 2) if span else None,
+        'statuses': dict(Counter(str(status) for _, _, status in arrivals)),
+        'gaps_over_stall_ms': sum(1 for g in gaps if g >= stall_ms),
+        'longest_gaps_ms': sorted(gaps, reverse=True)[:5],
+    }
+
+
+async def run_app(args, sink, size):
+    """POST one campaign to the real route and read its pace off the sink"""
+    emails = '\n'.join(c['email'] for c in synthetic_customers(size))
+    body = json.dumps({'name': f"Load test {size}", 'templateId': 'loadtest', 'campaignId': 'loadtest',
+                       'subject': 'Load test campaign', 'htmlContent': template_html(args.blocks),
+                       'textContent': 'Dear {{firstName}}', 'recipientType': 'custom', 'customEmails': emails}).encode()
+    since = time.monotonic()
+    started = time.perf_counter()
+    async with ProbeEngine(BASE_URL, concurrency=1, timeout=args.timeout) as engine:
+        response = await engine.request('POST', '/api/email/send-campaign', {'Content-Type': 'application/json'}, body)
+    elapsed = time.perf_counter() - started
+    try:
+        result = json.loads(response['body'] or b'{}')
+    except ValueError:
+        result = {}
+    view = sink_view(sink, since, args.stall_ms)
+    return {
+        'recipients': size,
+        'mode': 'app',
+        'status': response['status'],
+        'elapsed_s': round(elapsed, 2),
+        'messages_per_s': view['messages_per_s'],
+        'route_result': result.get('results') or result.get('error'),
+        'sink_view': view,
+    }
+
+
+def print_run(run):
+    print(f"\n📨 {run['recipients']:,} recipients ({run['mode']}): {run.get('messages_per_s') or 0:,.1f} msg/s "
+          f"in {run['elapsed_s']:,.1f}s")
+    if run['mode'] == 'app':
+        view = run['sink_view']
+        print(f"   HTTP {run['status']} | sink: {view['accepted_messages']:,} accepted, "
+              f"{view['messages_per_s'] or 0:,.1f}/s, statuses {view['statuses']}")
+        print(f"   {view['gaps_over_stall_ms']} gaps ≥ stall threshold, longest {view['longest_gaps_ms']} ms")
+        return
+    split = run['split']
+    total = run['elapsed_s'] or 1
+    print(f"   ✅ {run['sent']:,} sent, ❌ {run['failed']:,} failed, 🔁 {run['retries']:,} retries | outcomes {run['outcomes']}")
+    print(f"   ⏱️ HTML generation {split['html_generation_s']:,.2f}s ({split['html_generation_s'] / total:.0%}) "
+          f"| API wait {split['api_wait_s']:,.2f}s ({split['api_wait_s'] / total:.0%}) "
+          f"| pacing sleeps {split['pacing_sleep_s']:,.2f}s ({split['pacing_sleep_s'] / total:.0%})")
+    if split['retry_backoff_s']:
+        print(f"   🐢 Retry backoff {split['retry_backoff_s']:,.1f}s summed over messages (inside the API wait)")
+    print(f"   🧮 Rendering {run['html_cpu_ms_per_message']:.2f} ms CPU/message, "
+          f"footer-settings queries waited {split['footer_settings_wait_s']:,.2f}s summed over recipients")
+    print(f"   🌐 API calls | {format_summary(run['api_call_ms'])}")
+    stalls = run['stalls']
+    if stalls['count']:
+        phases = ', '.join(f"{phase} {ms / 1000:,.1f}s" for phase, ms in stalls['by_phase_ms'].items())
+        print(f"   🧊 {stalls['count']} stalls with nothing in flight, {stalls['total_ms'] / 1000:,.1f}s total: {phases}")
+        for stall in stalls['longest'][:3]:
+            print(f"      batch {stall['batch']}: {stall['ms']:,.0f} ms in {stall['phase']}")
+
+
+async def serve(args):
+    async with ResendStandin(args.host, args.sink_port, args.sink_latency_ms, args.sink_jitter_ms,
+                             args.sink_rate_limit, args.sink_error_rate, args.seed) as sink:
+        print("📮 Resend stand-in running")
+        print("=" * 50)
+        print(f"🌐 {sink.base_url} (rate limit {args.sink_rate_limit:g}/s, {args.sink_error_rate:.1%} injected errors)")
+        print(f"👉 RESEND_BASE_URL={sink.base_url} RESEND_API_KEY={API_KEY}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            print(f"\n📊 {dict(sink.stats)}")
+
+
+async def main(args):
+    sizes = [int(s) for s in args.recipients.split(',') if s]
+    host = urllib.parse.urlparse(BASE_URL).hostname
+    if args.app and any(size > 1000 for size in sizes):
+        print("⚠️ The route rejects campaigns over 1000 recipients; larger sizes will come back 400")
+
+    print("🚀 Send-Campaign Throughput Simulator")
+    print("=" * 60)
+    runs = []
+    sink = ResendStandin(args.host, args.sink_port if args.app else 0, args.sink_latency_ms, args.sink_jitter_ms,
+                         args.sink_rate_limit, args.sink_error_rate, args.seed)
+    async with sink:
+        print(f"📮 Resend stand-in at {sink.base_url}: {args.sink_latency_ms:g}+0..{args.sink_jitter_ms:g} ms, "
+              f"limit {args.sink_rate_limit:g} req/s, {args.sink_error_rate:.1%} errors")
+        if args.app:
+            print(f"🌐 Route: {BASE_URL}/api/email/send-campaign (started with RESEND_BASE_URL={sink.base_url})")
+            if host not in ('localhost', '127.0.0.1', '::1'):
+                print("⚠️ Not a local app - make sure it really sends through this stand-in")
+        else:
+            print(f"⚙️ Mode {args.mode}: rate {args.rate:g}/s, concurrency {args.concurrency}, batches of "
+                  f"{args.batch_size}, footer settings {args.settings_ms:g} ms via {args.db_pool} connections")
+        for size in sizes:
+            run = await (run_app(args, sink, size) if args.app else simulate(args, size, sink))
+            runs.append(run)
+            print_run(run)
+
+    measured = [r for r in runs if r.get('messages_per_s')]
+    if measured:
+        rate = measured[-1]['messages_per_s']
+        print("\n📈 PROJECTED CAMPAIGN TIME at the last measured rate")
+        print("=" * 60)
+        for target in (1_000, 10_000, 100_000):
+            print(f"   {target:>7,} recipients: {target / rate / 60:,.1f} min")
+
+    report = {
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'serve')},
+        'runs': runs,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.output}")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulate send-campaign against a local Resend stand-in")
+    parser.add_argument('--recipients', default='1000', help="comma-separated campaign sizes")
+    parser.add_argument('--mode', choices=('route', 'paced', 'batch-api'), default='route')
+    parser.add_argument('--rate', type=float, default=5, help="EMAIL_RATE_PER_SEC (messages or batch calls per second)")
+    parser.add_argument('--concurrency', type=int, default=5, help="sends in flight (the route uses min(rate, 5))")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--blocks', type=int, default=12, help="content blocks in the synthetic template")
+    parser.add_argument('--settings-ms', type=float, default=3, help="footer-settings query time per recipient")
+    parser.add_argument('--db-pool', type=int, default=5, help="connections the settings queries share")
+    parser.add_argument('--stall-ms', type=float, default=250, help="report gaps with nothing in flight at least this long")
+    parser.add_argument('--sink-latency-ms', type=float, default=80, help="stand-in base latency per call")
+    parser.add_argument('--sink-jitter-ms', type=float, default=40)
+    parser.add_argument('--sink-rate-limit', type=float, default=2, help="stand-in requests/second per key (0 = off)")
+    parser.add_argument('--sink-error-rate', type=float, default=0, help="share of calls answered with a 500")
+    parser.add_argument('--sink-port', type=int, default=3030, help="fixed stand-in port for --app and --serve")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--app', action='store_true', help="drive CRM_BASE_URL's real route instead of simulating it")
+    parser.add_argument('--serve', action='store_true', help="only run the Resend stand-in")
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='', help="write the JSON report here")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        if args.serve:
+            asyncio.run(serve(args))
+            sys.exit(0)
+        report = asyncio.run(main(args))
+        sys.exit(0 if all(not r.get('failed') for r in report['runs']) else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Simulation interrupted by user")
+        sys.exit(1)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Performance Baseline Browser
+Lists the runs kept by crm_baseline, re-compares a run against the rolling
+baseline before it, and shows one metric's history across runs.
+
+Usage: python3 scripts/perf-baseline.py runs [--suite browser]
+       python3 scripts/perf-baseline.py compare [RUN_ID] [--window 20]
+       python3 scripts/perf-baseline.py history "step loading indicators cleared actual_ms"
+"""
+
+import argparse
+import sys
+
+from crm_baseline import DEFAULT_PATH, BaselineStore, print_comparison
+
+
+def show_runs(store, args):
+    print(f"{'run':>5} {'suite':<12} {'environment':<36} {'git':<14} {'started':<26} status")
+    for run in store.runs(args.suite, args.limit):
+        sha = (run['git_sha'] or '-') + ('*' if run['git_dirty'] else '')
+        print(f"{run['id']:>5} {run['suite']:<12} {run['environment']:<36} {sha:<14} {run['started_at']:<26} {run['status']}")
+    return True
+
+
+def show_compare(store, args):
+    run = store.run(args.run_id, args.suite)
+    if run is None:
+        print("❌ No such run")
+        return False
+    rows = store.compare(run['id'], args.window)
+    slower = print_comparison(run, rows, show=args.limit)
+    if args.all:
+        print(f"\n{'metric':<60} {'baseline':>10} {'run':>10} {'ratio':>6} verdict")
+        for r in rows:
+            base = f"{r['baseline']:>10,.1f}" if 'baseline' in r else f"{'-':>10}"
+            ratio = f"{r['ratio']:>6.2f}" if 'ratio' in r else f"{'-':>6}"
+            print(f"{r['metric'][:60]:<60} {base} {r['current']:>10,.1f} {ratio} {r['verdict']}")
+    return not slower
+
+
+def show_history(store, args):
+    rows = store.history(args.metric, args.suite, args.limit)
+    if not rows:
+        print(f"❌ No samples of {args.metric}")
+        return False
+    peak = max(value for *_, value in rows) or 1
+    for run_id, sha, started, status, value in reversed(rows):
+        bar = '█' * max(1, round(value / peak * 30))
+        flag = ' 🐢' if status == 'regressed' else ''
+        print(f"{run_id:>5} {sha or '-':<12} {started[:16]} {value:>10,.1f} {bar}{flag}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the CRM performance baseline store")
+    parser.add_argument('--db', default=DEFAULT_PATH, help="SQLite file written by the test scripts")
+    parser.add_argument('--suite', default=None, help="limit to one suite (http-smoke, http-sweep, browser, scenarios, ...)")
+    parser.add_argument('--limit', type=int, default=20, help="runs or rows to show")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('runs', help="list recorded runs")
+    compare = commands.add_parser('compare', help="compare a run (default: the latest) with its baseline")
+    compare.add_argument('run_id', type=int, nargs='?')
+    compare.add_argument('--window', type=int, default=20, help="earlier runs in the baseline")
+    compare.add_argument('--all', action='store_true', help="list every metric, not just the changed ones")
+    history = commands.add_parser('history', help="one metric across runs")
+    history.add_argument('metric')
+    args = parser.parse_args()
+
+    store = BaselineStore(args.db)
+    try:
+        return {'runs': show_runs, 'compare': show_compare, 'history': show_history}[args.command](store, args)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(0 if main() else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrupted by user")
+        sys.exit(1)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Parallel Scenario Runner
+Runs the browser scenarios (login, staff-unified, staff-management comparison,
+CSV import, admin exploration) as concurrent jobs in one Chromium process and
+prints a single merged summary.
+
+Usage: python3 scripts/run-scenarios.py [--concurrency N] [--only name,...] [--fast]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+from datetime import datetime
+
+from crm_config import BASE_URL, USERNAME, PASSWORD
+from crm_intercept import PROFILES, InterceptionProfile
+from crm_pool import run_jobs, merge_results, print_timing
+from crm_session import ensure_storage_state
+from crm_trace import export_trace
+from crm_vitals import captured_vitals
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# One subdirectory per job, so jobs running side by side never overwrite each other's screenshots
+SCREENSHOTS_DIR = 'scenario-screenshots'
+
+
+def load_script(filename):
+    """Import one of the hyphenated scripts in this directory as a module"""
+    name = filename[:-3].replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+with_login = load_script('test-crm-with-login.py')
+csv_import = load_script('test-csv-import.py')
+explore = load_script('explore-admin-data.py')
+
+
+def job_screenshots(job):
+    return os.path.join(SCREENSHOTS_DIR, job)
+
+
+def make_tester(page, job, uses_cached_session=True):
+    tester = with_login.CRMAuthenticatedTester(BASE_URL, USERNAME, PASSWORD)
+    tester.attach(page, uses_cached_session, screenshots_dir=job_screenshots(job))
+    return tester
+
+
+async def login_job(page):
+    # Starts from an empty cookie jar so the login form itself is exercised
+    tester = make_tester(page, 'login', uses_cached_session=False)
+    success = await tester.login_to_crm()
+    await tester.close_screenshots(failed=not success)
+    # The admin area is only reachable when the login went through
+    return [{'page': 'login', 'accessible': success, 'vitals': captured_vitals(page), 'success': success}]
+
+
+async def staff_unified_job(page):
+    tester = make_tester(page, 'staff-unified')
+    try:
+        return [await tester.test_staff_unified_page()]
+    finally:
+        await tester.close_screenshots()
+
+
+async def staff_management_job(page):
+    tester = make_tester(page, 'staff-management')
+    try:
+        return [await tester.test_staff_management_comparison()]
+    finally:
+        await tester.close_screenshots()
+
+
+async def csv_import_job(page):
+    success = await csv_import.run_csv_import(page, screenshots_dir=job_screenshots('csv-import'))
+    return [{'page': 'csv-import', 'accessible': success, 'vitals': captured_vitals(page), 'success': success}]
+
+
+async def admin_exploration_job(page):
+    success = await explore.run_admin_exploration(page, screenshots_dir=job_screenshots('admin-exploration'))
+    return [{'page': 'admin-exploration', 'accessible': success, 'vitals': captured_vitals(page), 'success': success}]
+
+
+SCENARIOS = [
+    {'name': 'login', 'run': login_job, 'authenticated': False},
+    {'name': 'staff-unified', 'run': staff_unified_job},
+    {'name': 'staff-management', 'run': staff_management_job},
+    {'name': 'csv-import', 'run': csv_import_job},
+    {'name': 'admin-exploration', 'run': admin_exploration_job},
+]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run CRM browser scenarios in parallel")
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('CRM_POOL_SIZE', '3')),
+                        help="number of browser contexts running at once")
+    parser.add_argument('--only', default='', help="comma-separated scenario names")
+    parser.add_argument('--fast', action='store_true', help="headless, no slow_mo (see crm_waits)")
+    parser.add_argument('--profile', choices=list(PROFILES), default=os.environ.get('CRM_PROFILE', 'full'),
+                        help="request-interception profile (see crm_intercept)")
+    parser.add_argument('--trace', default=os.environ.get('CRM_TRACE', ''),
+                        help="write a Chrome trace-event JSON of every job's steps to this file")
+    args = parser.parse_args()
+
+    jobs = SCENARIOS
+    if args.only:
+        wanted = set(args.only.split(','))
+        jobs = [job for job in SCENARIOS if job['name'] in wanted]
+
+    print("🚀 Parallel CRM Scenario Run")
+    print("=" * 60)
+    print(f"🌐 Testing: {BASE_URL}")
+    print(f"🧵 Contexts: {args.concurrency} | Jobs: {', '.join(job['name'] for job in jobs)} | Profile: {args.profile}")
+    print(f"📅 Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 60)
+
+    # One API login shared by every authenticated context
+    state_path = await ensure_storage_state()
+    profile = InterceptionProfile(args.profile)
+    run = await run_jobs(jobs, concurrency=args.concurrency, storage_state=state_path, profile=profile)
+
+    summary_tester = with_login.CRMAuthenticatedTester(BASE_URL, USERNAME, PASSWORD)
+    summary_tester.results = merge_results(run)
+    summary_tester.suite = 'scenarios' + profile.suffix
+    summary_tester.screenshots_dir = SCREENSHOTS_DIR
+    summary = await summary_tester.generate_summary()
+    print_timing(run)
+    await profile.report({**{f"job {record['job']}": record['seconds'] for record in run['jobs']},
+                          'all jobs (wall)': run['wall_seconds']})
+    export_trace(args.trace, "SCENARIO TRACE")
+
+    return summary
+
+
+if __name__ == "__main__":
+    try:
+        summary = asyncio.run(main())
+        sys.exit(0 if summary['failed'] == 0 and not summary['regressions'] else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Run interrupted by user")
+        sys.exit(1)
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Paginated Admin Data Scraper
+Walks every page of /submitted-forms/enquiry-data (and the backup table on
+/admin/database) through the UI, the way staff see it, and writes typed
+records incrementally to JSONL or Parquet for the nightly ERP reconciliation.
+
+Only one page of rows is held at a time (plus one Parquet part buffer), so
+tens of thousands of enquiries scrape in bounded memory. A cursor file next to
+each output records how many rows are safely on disk; re-running the same
+command truncates anything written after that point and carries on from the
+next page. A finished cursor starts the next run from scratch.
+
+Usage: python3 scripts/scrape-admin-data.py [enquiry-data] [database] [--format jsonl|parquet]
+                                            [--out-dir scrapes] [--per-page 100] [--fast]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import time
+from datetime import date, datetime
+from playwright.async_api import async_playwright
+
+from crm_config import BASE_URL
+from crm_session import new_session_context, is_logged_in, invalidate
+from crm_tables import coerce_cell, stream_table_records
+from crm_waits import launch_options
+
+VIEWS = {
+    'enquiry-data': {
+        'path': '/submitted-forms/enquiry-data',
+        # The action buttons carry no data
+        'drop': {'act'},
+        'types': {'date': 'timestamp'},
+    },
+    'database': {
+        'path': '/admin/database',
+        'drop': {'actions'},
+        'types': {'backup_id': 'int', 'date_time': 'timestamp'},
+    },
+}
+
+SHOWING = r'Showing (\d+) to (\d+) of (\d+) entries'
+
+# Where the view is: one round trip per page instead of separate locator calls
+PAGE_STATE_JS = """
+pattern => {
+  const table = document.querySelector('table')
+  const match = document.body.innerText.match(new RegExp(pattern))
+  const next = [...document.querySelectorAll('button')].find(b => b.textContent.trim() === 'Next')
+  return {
+    showing: match ? match[0] : null,
+    start: match ? Number(match[1]) : null,
+    end: match ? Number(match[2]) : null,
+    total: match ? Number(match[3]) : null,
+    hasNext: !!next && !next.disabled,
+    loading: !table || /Loading/i.test(table.tBodies[0] ? table.tBodies[0].innerText : '')
+  }
+}
+"""
+
+SHOWING_CHANGED_JS = """
+([pattern, previous]) => {
+  const match = document.body.innerText.match(new RegExp(pattern))
+  return !!match && match[0] !== previous
+}
+"""
+
+READY_JS = """
+() => {
+  const table = document.querySelector('table')
+  return !!table && !/Loading/i.test(table.tBodies[0] ? table.tBodies[0].innerText : '')
+}
+"""
+
+PAGE_SIZE_SELECT = 'select:has(option[value="100"])'
+NEXT_BUTTON = 'button:text-is("Next")'
+
+
+def json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def load_cursor(path, fingerprint, output):
+    """The committed position of an unfinished run of the same scrape, or None"""
+    if not os.path.exists(path) or not os.path.exists(output):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    if saved.get('fingerprint') != fingerprint:
+        print(f"⚠️ {path} belongs to a different scrape - starting over")
+        return None
+    if saved.get('complete'):
+        return None
+    return saved
+
+
+def save_cursor(path, cursor):
+    """Write atomically so an interrupted run never leaves a half-written cursor"""
+    temp = f"{path}.tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(cursor, f)
+    os.replace(temp, path)
+
+
+def typed_converters(types, problems):
+    """Cell converters for a view's typed columns; everything else stays text.
+
+    Fixed column types keep the Parquet schema stable from page to page;
+    values that do not parse are stored as null and counted in problems.
+    """
+    def timestamp(text):
+        value = coerce_cell(text)
+        if isinstance(value, datetime) or value is None:
+            return value
+        if isinstance(value, date):
+            return datetime(value.year, value.month, value.day)
+        problems['unparsed timestamps'] = problems.get('unparsed timestamps', 0) + 1
+        return None
+
+    def integer(text):
+        digits = re.sub(r'[^\d-]', '', text)
+        if digits.lstrip('-').isdigit():
+            return int(digits)
+        if text:
+            problems['unparsed integers'] = problems.get('unparsed integers', 0) + 1
+        return None
+
+    kinds = {'timestamp': timestamp, 'int': integer}
+    return {key: kinds[kind] for key, kind in types.items()}
+
+
+def text_cell(text):
+    return text or None
+
+
+class JsonlSink:
+    """One JSON object per line; the committed state is the file length"""
+
+    def __init__(self, path, state=None):
+        self.path = path
+        self.file = open(path, 'r+b' if state else 'wb')
+        if state:
+            self.file.truncate(state['bytes'])
+            self.file.seek(state['bytes'])
+
+    def write(self, records):
+        self.file.write(''.join(json.dumps(r, default=json_value, ensure_ascii=False) + '\n'
+                                for r in records).encode('utf-8'))
+
+    def ready(self):
+        return True
+
+    def commit(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {'bytes': self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """A directory of part files, each written whole once flush_rows records are buffered.
+
+    Parquet files cannot be appended to, so the committed state is the number
+    of finished parts; parts past it (from a run that died before saving its
+    cursor) are deleted on resume.
+    """
+
+    def __init__(self, path, types, flush_rows, state=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow: pip install pyarrow")
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        self.path = path
+        self.types = types
+        self.flush_rows = flush_rows
+        self.parts = state['parts'] if state else 0
+        self.buffer = []
+        self.schema = None
+        os.makedirs(path, exist_ok=True)
+        for part in glob.glob(os.path.join(path, 'part-*.parquet')):
+            if int(os.path.basename(part)[5:10]) >= self.parts:
+                os.remove(part)
+
+    def write(self, records):
+        self.buffer.extend(records)
+
+    def ready(self):
+        return len(self.buffer) >= self.flush_rows
+
+    def commit(self):
+        if self.buffer:
+            if self.schema is None:
+                kinds = {'timestamp': self.pa.timestamp('s'), 'int': self.pa.int64()}
+                self.schema = self.pa.schema([(key, kinds.get(self.types.get(key), self.pa.string()))
+                                              for key in self.buffer[0]])
+            target = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+            self.pq.write_table(self.pa.Table.from_pylist(self.buffer, schema=self.schema), f"{target}.tmp")
+            os.replace(f"{target}.tmp", target)
+            self.parts += 1
+            self.buffer = []
+        return {'parts': self.parts}
+
+    def close(self):
+        pass
+
+
+async def page_state(page):
+    return await page.evaluate(PAGE_STATE_JS, SHOWING)
+
+
+async def wait_for_page_change(page, state, timeout):
+    await page.wait_for_function(SHOWING_CHANGED_JS, arg=[SHOWING, state['showing']], timeout=timeout)
+    await page.wait_for_function(READY_JS, timeout=timeout)
+    return await page_state(page)
+
+
+async def scrape_view(page, name, args):
+    view = VIEWS[name]
+    ext = 'parquet' if args.format == 'parquet' else 'jsonl'
+    output = os.path.join(args.out_dir, f"{name}.{ext}")
+    cursor_path = f"{output}.cursor.json"
+    fingerprint = {'view': name, 'base_url': BASE_URL, 'format': args.format, 'per_page': args.per_page}
+
+    print(f"\n📍 {name}: {BASE_URL}{view['path']}")
+    cursor = load_cursor(cursor_path, fingerprint, output)
+    if args.format == 'parquet':
+        sink = ParquetSink(output, view['types'], args.flush_rows, cursor and cursor['sink'])
+    else:
+        sink = JsonlSink(output, cursor and cursor['sink'])
+    committed = cursor['rows'] if cursor else 0
+    if cursor:
+        print(f"⏩ Resuming after {committed:,} committed rows (page {cursor['page'] + 1})")
+
+    problems = {}
+    converters = typed_converters(view['types'], problems)
+    started = time.perf_counter()
+    try:
+        await page.goto(f"{BASE_URL}{view['path']}", wait_until='networkidle')
+        await page.wait_for_function(READY_JS, timeout=args.timeout)
+        state = await page_state(page)
+        if await page.locator(PAGE_SIZE_SELECT).count():
+            await page.locator(PAGE_SIZE_SELECT).first.select_option(str(args.per_page))
+            if state['total'] is not None and state['end'] < min(state['total'], args.per_page):
+                state = await wait_for_page_change(page, state, args.timeout)
+        total_at_start = state['total']
+        if total_at_start is not None:
+            print(f"📋 {state['showing']}")
+
+        # Skip the pages already on disk without reading their rows
+        page_number, skipped = 0, 0
+        while skipped < committed and state['hasNext']:
+            await page.click(NEXT_BUTTON)
+            state = await wait_for_page_change(page, state, args.timeout)
+            page_number += 1
+            skipped = (state['start'] - 1) if state['start'] else skipped + args.per_page
+        if cursor and skipped != committed:
+            print(f"⚠️ Page {page_number + 1} starts at row {skipped + 1:,}, not {committed + 1:,} - "
+                  f"the view changed since the last run")
+
+        rows, pending, scrape_rows = committed, 0, 0
+        while True:
+            page_rows = 0
+            async for records in stream_table_records(page, converters=converters, default=text_cell):
+                for record in records:
+                    for key in view['drop']:
+                        record.pop(key, None)
+                sink.write(records)
+                page_rows += len(records)
+            pending += page_rows
+            scrape_rows += page_rows
+            elapsed = time.perf_counter() - started
+            print(f"   📄 page {page_number + 1}: {page_rows} rows - {rows + pending:,} total, "
+                  f"{scrape_rows / max(elapsed, 1e-9):,.0f} rows/sec", file=sys.stderr)
+
+            last = not state['hasNext'] or (state['total'] is not None and state['end'] >= state['total'])
+            if last or sink.ready():
+                save_cursor(cursor_path, {'fingerprint': fingerprint, 'rows': rows + pending,
+                                          'page': page_number + 1, 'sink': sink.commit(), 'complete': last})
+                rows, pending = rows + pending, 0
+            if last:
+                break
+            await page.click(NEXT_BUTTON)
+            state = await wait_for_page_change(page, state, args.timeout)
+            page_number += 1
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {rows:,} rows on {page_number + 1} pages → {output}")
+    print(f"⚡ {scrape_rows:,} rows scraped in {elapsed:.1f}s - {scrape_rows / max(elapsed, 1e-9):,.0f} rows/sec")
+    if total_at_start is not None and state['total'] != total_at_start:
+        print(f"⚠️ The view changed during the scrape ({total_at_start:,} → {state['total']:,} entries); "
+              f"re-run for an exact snapshot")
+    elif total_at_start is not None and rows != total_at_start:
+        print(f"⚠️ Wrote {rows:,} rows but the view reports {total_at_start:,} entries")
+    for problem, count in problems.items():
+        print(f"⚠️ {count:,} {problem} stored as null")
+    return {'view': name, 'rows': rows, 'seconds': elapsed, 'scraped': scrape_rows}
+
+
+async def scrape(args):
+    print("🗂️ Paginated Admin Data Scraper")
+    print("=" * 50)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(**launch_options(slow_mo=0))
+    try:
+        context = await new_session_context(browser)
+        page = await context.new_page()
+        if not await is_logged_in(page, BASE_URL):
+            print("❌ Cached session was rejected by the server")
+            invalidate()
+            return False
+
+        results = [await scrape_view(page, name, args) for name in args.views]
+    finally:
+        await browser.close()
+        await playwright.stop()
+
+    print("\n📊 SCRAPE SUMMARY")
+    print("=" * 50)
+    for result in results:
+        print(f"   {result['view']}: {result['rows']:,} rows, "
+              f"{result['scraped'] / max(result['seconds'], 1e-9):,.0f} rows/sec")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape every page of the CRM's data views to JSONL or Parquet")
+    parser.add_argument('views', nargs='*', choices=sorted(VIEWS), default=['enquiry-data', 'database'],
+                        help="views to scrape (default: both)")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--out-dir', default='scrapes', help="directory for outputs and their cursor files")
+    parser.add_argument('--per-page', type=int, choices=[10, 25, 50, 100], default=100,
+                        help="the view's page size to select")
+    parser.add_argument('--flush-rows', type=int, default=10000, help="rows per Parquet part file")
+    parser.add_argument('--timeout', type=int, default=30000, help="ms to wait for a page to render")
+    parser.add_argument('--fast', action='store_true', help="headless, no slow_mo")
+    args = parser.parse_args()
+    return asyncio.run(scrape(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(0 if main() else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Scrape interrupted - re-run the same command to resume")
+        sys.exit(1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Local CRM Stand-in
+Serves the login, admin, staff, import and enquiry routes from memory so the
+scripts can run offline. Point them at it with CRM_BASE_URL.
+
+A Pusher stand-in (crm_pusher) runs alongside on --pusher-port; the tracking
+routes await their analytics broadcast through it, as the app awaits
+pusher.trigger(). Dashboards can subscribe at ws://<host>:<pusher-port>/app/standin-key.
+
+Usage: python3 scripts/standin-server.py [--port 3000] [--latency-ms 40 --jitter-ms 20]
+                                         [--route-latency /api/auth/login=120] [--seed-enquiries 500]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+
+from crm_import import parse_csv, import_rows, auto_map
+from crm_pusher import PusherClient, PusherStandin
+from crm_standin import StandinServer, EnquiryStore, TrackingStore
+
+
+def parse_route_latency(values):
+    routes = {}
+    for value in values:
+        path, _, ms = value.partition('=')
+        routes[path] = float(ms)
+    return routes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the EPG CRM routes")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--latency-ms', type=float, default=0, help="added to every request")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="uniform random extra delay, 0..N ms")
+    parser.add_argument('--route-latency', action='append', default=[], metavar='PATH=MS',
+                        help="base latency override for one path (repeatable)")
+    parser.add_argument('--row-cost-ms', type=float, default=0, help="simulated insert cost per imported row")
+    parser.add_argument('--backup-ms', type=float, default=0, help="simulated createAutoBackup cost")
+    parser.add_argument('--seed-enquiries', type=int, default=0, help="synthetic enquiries to preload")
+    parser.add_argument('--seed-csv', default='', help="legacy CSV to preload through the import rules")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for jitter and synthetic data")
+    parser.add_argument('--tracking-db', default='', help="SQLite file for email tracking rows (default: in memory)")
+    parser.add_argument('--click-record', choices=('deferred', 'sync'), default='deferred',
+                        help="write the click's email_tracking row after the 302 (deferred, the route's current "
+                             "behaviour) or before it (sync, hypothetical)")
+    parser.add_argument('--pusher-port', type=int, default=6001, help="port of the Pusher stand-in run alongside")
+    parser.add_argument('--pusher-latency-ms', type=float, default=0,
+                        help="added to every trigger (the app's round trip to its Pusher cluster)")
+    parser.add_argument('--no-pusher', action='store_true', help="skip the analytics broadcasts")
+    args = parser.parse_args()
+
+    store = EnquiryStore().seed(args.seed_enquiries, random.Random(args.seed))
+    if args.seed_csv:
+        with open(args.seed_csv, 'r', encoding='utf-8-sig') as f:
+            rows = parse_csv(f.read())
+        results = import_rows(rows, auto_map(list(rows[0]) if rows else []), [], args.seed_csv, store.create)
+        print(f"📥 Seeded {results['imported']} enquiries from {args.seed_csv} ({results['errors']} rejected)")
+
+    pusher_server = pusher = None
+    if not args.no_pusher:
+        pusher_server = await PusherStandin(args.host, args.pusher_port).start()
+        pusher = PusherClient(pusher_server.base_url, pusher_server.app_id, pusher_server.key, pusher_server.secret,
+                              latency_ms=args.pusher_latency_ms)
+
+    server = StandinServer(
+        args.host, args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        route_latency=parse_route_latency(args.route_latency), row_cost_ms=args.row_cost_ms,
+        backup_ms=args.backup_ms, seed=args.seed, store=store,
+        tracking=TrackingStore(args.tracking_db or None), click_record=args.click_record, pusher=pusher,
+    )
+    try:
+        async with server:
+            print("🎭 CRM stand-in running")
+            print("=" * 50)
+            print(f"🌐 {server.base_url} ({len(store.records)} enquiries)")
+            print(f"⏱️ Latency {args.latency_ms:g} ms + 0..{args.jitter_ms:g} ms jitter")
+            if pusher_server:
+                print(f"📡 Pusher stand-in {pusher_server.socket_url} (+{args.pusher_latency_ms:g} ms per trigger)")
+            print(f"👉 export CRM_BASE_URL={server.base_url}")
+            await asyncio.Event().wait()
+    finally:
+        if pusher:
+            await pusher.close()
+        if pusher_server:
+            await pusher_server.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n👋 Stand-in stopped")
+        sys.exit(0)
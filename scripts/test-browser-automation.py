@@ -7,16 +7,31 @@ Tests CRM system URLs and authentication flows
 import urllib.request
 import urllib.error
 import urllib.parse
+import asyncio
 import json
-import time
+import os
 import sys
 from datetime import datetime
 
+from crm_baseline import record_and_compare, result_samples
+from crm_config import BASE_URL
+from crm_probe import ProbeEngine, ValidatorCache, run_checks, run_lean_checks, discover_routes
+
+# Resolved from this file so the sweep finds the same routes from any working directory
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'app')
+
+class NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Surface 3xx responses as HTTPError instead of downloading the redirect target"""
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
 class CRMTester:
     def __init__(self, base_url):
         self.base_url = base_url
         self.session_cookies = {}
         self.results = []
+        self.suite = 'http-smoke'
+        self.no_redirect_opener = urllib.request.build_opener(NoRedirectHandler)
         
     def test_url(self, path, expected_status=200, description=""):
         """Test a URL and return detailed results"""
@@ -91,7 +106,6 @@ class CRMTester:
             print(f"❌ {path} - ERROR - {str(e)}")
             
         self.results.append(result)
-        time.sleep(0.5)  # Small delay between requests
         return result
     
     def test_admin_redirect(self, path):
@@ -105,7 +119,7 @@ class CRMTester:
             request = urllib.request.Request(full_url)
             
             # Try to open - this will raise exception for redirects
-            response = urllib.request.urlopen(request)
+            response = self.no_redirect_opener.open(request)
             
             # If we get here, no redirect happened
             status = response.status
@@ -158,34 +172,95 @@ class CRMTester:
             print(f"❌ {path} - ERROR - {str(e)}")
             
         self.results.append(result)
-        time.sleep(0.5)
         return result
     
+    def probe_checks(self, checks, concurrency=20, lean=False):
+        """Probe checks concurrently over pooled keep-alive connections"""
+        async def sweep():
+            if lean:
+                cache = ValidatorCache()
+                async with ProbeEngine(self.base_url, concurrency=concurrency, cookies=self.session_cookies) as engine:
+                    results = await run_lean_checks(engine, checks, cache)
+                cache.save()
+            else:
+                async with ProbeEngine(self.base_url, concurrency=concurrency, cookies=self.session_cookies) as engine:
+                    results = await run_checks(engine, checks)
+            return results, engine
+        
+        results, engine = asyncio.run(sweep())
+        
+        for check, result in zip(checks, results):
+            path = check['path']
+            timing = result.get('timing', {})
+            timing_text = f"{timing.get('total_ms', 0):.0f} ms (ttfb {timing.get('ttfb_ms', 0):.0f} ms)" if timing else ""
+            if result['status'] == 'ERROR':
+                print(f"❌ {path} - ERROR - {result['content_preview']}")
+            elif check.get('kind') == 'redirect':
+                if result.get('redirect'):
+                    print(f"✅ {path} - PROTECTED ({result['status']}) - Redirects to login - {timing_text}")
+                elif result['success']:
+                    print(f"✅ {path} - ACCESSIBLE ({result['status']}) - No authentication required - {timing_text}")
+                else:
+                    print(f"❌ {path} - ERROR ({result['status']}) - {timing_text}")
+            elif result['success']:
+                print(f"✅ {path} - OK ({result['status']}) - {result['content_type']} - {timing_text}")
+            else:
+                print(f"❌ {path} - ISSUE ({result['status']}) - {result['content_type']} - {timing_text}")
+                if result.get('is_404_page'):
+                    print(f"   📄 Contains 404 content")
+        
+        not_modified = len([r for r in results if r.get('not_modified')])
+        print(f"🔌 {len(checks)} checks over {engine.connections_opened} connection(s)")
+        print(f"📦 Transferred: {engine.bytes_sent + engine.bytes_received:,} HTTP bytes "
+              f"(sent {engine.bytes_sent:,}, received {engine.bytes_received:,}) - {not_modified} unchanged (304)")
+        if engine.bodies_cut_off:
+            print(f"   ✂️ {engine.bodies_cut_off} large bodies cut off with {engine.bytes_unread:,} bytes unread "
+                  f"- the server was already sending them, so most still crossed the wire")
+        if engine.tls:
+            print(f"   🔐 Not counted: TLS record overhead and {engine.connections_opened} handshake(s) (a few KB each)")
+        if lean:
+            range_ignored = len([r for r in results if r.get('range_ignored')])
+            print(f"   ℹ️ {range_ignored} page(s) ignored Range and sent their whole body - "
+                  f"lean mode only saves on 206/304 answers")
+        self.results.extend(results)
+        return results
+    
     def run_comprehensive_test(self):
         """Run comprehensive CRM system test"""
         print("🚀 Starting Comprehensive CRM System Test")
         print("=" * 50)
+        self.suite = 'http-smoke'
         
-        # Test public pages
-        print("\n📋 Testing Public Pages:")
-        self.test_url("/", 200, "Home page")
-        self.test_url("/login", 200, "Login page")
+        print("\n📋 Testing Public Pages, API Endpoints and Protected Admin Pages:")
+        self.probe_checks([
+            {'path': "/", 'kind': 'url', 'expected_status': 200, 'description': "Home page"},
+            {'path': "/login", 'kind': 'url', 'expected_status': 200, 'description': "Login page"},
+            {'path': "/api/admin/staff", 'kind': 'url', 'expected_status': 200, 'description': "Staff API endpoint"},
+            # Protected admin pages (should redirect)
+            {'path': "/admin", 'kind': 'redirect'},
+            {'path': "/admin/staff-management", 'kind': 'redirect'},
+            # The problematic staff-unified page
+            {'path': "/admin/staff-unified", 'kind': 'redirect'},
+        ])
         
-        # Test API endpoints
-        print("\n📋 Testing API Endpoints:")
-        self.test_url("/api/admin/staff", 200, "Staff API endpoint")
-        
-        # Test protected admin pages (should redirect)
-        print("\n📋 Testing Protected Admin Pages:")
-        self.test_admin_redirect("/admin")
-        self.test_admin_redirect("/admin/staff-management")
+        # Generate summary
+        return self.generate_summary()
+    
+    def run_route_sweep(self, app_dir=APP_DIR, concurrency=20, lean=False):
+        """Probe every static page and safe API GET route under src/app"""
+        print(f"🚀 Starting Full Route Sweep{' (bandwidth-minimal)' if lean else ''}")
+        print("=" * 50)
         
-        # Test the problematic staff-unified page
-        print("\n📋 Testing Problematic Pages:")
-        self.test_admin_redirect("/admin/staff-unified")
+        self.suite = 'http-lean' if lean else 'http-sweep'
+        if not os.path.isdir(app_dir):
+            raise SystemExit(f"❌ {os.path.normpath(app_dir)} not found - run from a CRM checkout")
+        checks = discover_routes(app_dir)
+        print(f"📋 Discovered {len(checks)} routes in {os.path.normpath(app_dir)}")
+        if not checks:
+            raise SystemExit("❌ No routes discovered - nothing to sweep")
+        self.probe_checks(checks, concurrency, lean)
         
-        # Generate summary
-        self.generate_summary()
+        return self.generate_summary()
     
     def generate_summary(self):
         """Generate test summary"""
@@ -208,25 +283,32 @@ class CRMTester:
                     if result.get('is_404_page'):
                         print(f"      📄 Contains 404 content")
         
+        # Per-endpoint timings go to the baseline store and are checked against earlier runs
+        regressions = record_and_compare(self.suite, result_samples(self.results))
+        
         print(f"\n📅 Test completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
         return {
             'total': total_tests,
             'passed': passed_tests,
             'failed': failed_tests,
+            'regressions': regressions,
             'results': self.results
         }
 
 def main():
     """Main test execution"""
-    base_url = "https://epg-crm.vercel.app"
+    base_url = BASE_URL
     
     print("🔧 CRM Browser Automation Test")
     print(f"🌐 Testing: {base_url}")
     print(f"📅 Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     tester = CRMTester(base_url)
-    summary = tester.run_comprehensive_test()
+    if '--sweep' in sys.argv or '--lean' in sys.argv:
+        summary = tester.run_route_sweep(lean='--lean' in sys.argv)
+    else:
+        summary = tester.run_comprehensive_test()
     
     # Return results for analysis
     return summary
@@ -234,7 +316,7 @@ def main():
 if __name__ == "__main__":
     try:
         results = main()
-        sys.exit(0 if results['failed'] == 0 else 1)
+        sys.exit(0 if results['failed'] == 0 and not results['regressions'] else 1)
     except KeyboardInterrupt:
         print("\n⚠️ Test interrupted by user")
         sys.exit(1)
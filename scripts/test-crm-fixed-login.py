@@ -9,18 +9,22 @@ import sys
 from datetime import datetime
 from playwright.async_api import async_playwright
 
+from crm_config import BASE_URL, USERNAME, PASSWORD
+from crm_waits import launch_options, wait_for_tab_switch, StepTimer, FAST_MODE
+
 async def test_crm_with_fixed_login():
     print("🚀 CRM Test with Fixed Login")
     print("=" * 50)
     
     playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False, slow_mo=800)
+    browser = await playwright.chromium.launch(**launch_options(slow_mo=800))
     page = await browser.new_page()
+    timer = StepTimer("staff-unified tabs")
     
     try:
-        base_url = "https://epg-crm.vercel.app"
-        username = "MarkandLouie2025@"
-        password = "ySz7JY^4tj@GmUqK"
+        base_url = BASE_URL
+        username = USERNAME
+        password = PASSWORD
         
         # Create screenshots directory
         os.makedirs("test-screenshots-fixed", exist_ok=True)
@@ -105,8 +109,8 @@ async def test_crm_with_fixed_login():
                             for i, tab in enumerate(tabs[:4]):
                                 tab_text = await tab.inner_text()
                                 print(f"🔄 Testing tab: {tab_text}")
-                                await tab.click()
-                                await page.wait_for_timeout(1000)
+                                async with timer.step(f"tab {i+1}: {tab_text}", legacy_ms=1000):
+                                    await wait_for_tab_switch(page, tab)
                                 await page.screenshot(path=f"test-screenshots-fixed/04-tab-{i+1}-{tab_text.replace(' ', '-').lower()}.png")
                             
                             # Final test - check for staff data
@@ -124,6 +128,9 @@ async def test_crm_with_fixed_login():
                                 print("✅ Staff data: LOADING")
                                 print("\n🎯 CONCLUSION: Agent #29's unified staff management system is WORKING PERFECTLY!")
                                 
+                                if FAST_MODE:
+                                    timer.report()
+                                
                                 return True
                             else:
                                 print("⚠️ No staff data elements found")
@@ -7,107 +7,114 @@ Tests the complete CSV import workflow that the user is experiencing
 import asyncio
 import os
 import sys
+import time
 from datetime import datetime
 from playwright.async_api import async_playwright
 
-async def test_csv_import():
-    print("🚀 CSV Import Test - Browser Automation")
-    print("=" * 50)
-    
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False, slow_mo=1000)
-    context = await browser.new_context()
-    page = await context.new_page()
+from crm_config import BASE_URL
+from crm_intercept import InterceptionProfile
+from crm_session import new_session_context, is_logged_in, invalidate
+from crm_shots import ScreenshotPipeline
+from crm_trace import export_trace, span, traced
+from crm_vitals import capture_vitals, install_vitals
+from crm_waits import launch_options, wait_for_api_response, wait_for_dom_change, ScopedNetworkIdle, StepTimer, FAST_MODE
+
+@traced("CSV import")
+async def run_csv_import(page, base_url=BASE_URL, screenshots_dir="csv-import-test"):
+    """Run the import workflow on a page whose context already holds the session"""
+    timer = StepTimer("CSV import")
+    # Screenshots are encoded and written in the background (see crm_shots)
+    shots = ScreenshotPipeline(screenshots_dir)
+    success = False
     
     # Enable console logging
     page.on("console", lambda msg: print(f"🖥️ Console: {msg.text}"))
     page.on("pageerror", lambda err: print(f"🚨 Page Error: {err}"))
     
     try:
-        base_url = "https://epg-crm.vercel.app"
-        username = "MarkandLouie2025@"
-        password = "ySz7JY^4tj@GmUqK"
-        
-        # Create screenshots directory
-        os.makedirs("csv-import-test", exist_ok=True)
+        print("📍 Step 1: Navigate to admin with cached session...")
+        async with span("Step 1: admin with cached session", url=f"{base_url}/admin") as step:
+            if not await is_logged_in(page, base_url):
+                print("❌ Cached session was rejected by the server")
+                invalidate()
+                step.set(status='session rejected')
+                return False
         
-        print("📍 Step 1: Navigate to admin and login...")
-        await page.goto(f"{base_url}/admin")
-        await page.wait_for_load_state('networkidle')
-        
-        # Login
-        await page.fill('#username', username)
-        await page.fill('#password', password)
-        await page.click('button[type="submit"]')
-        
-        try:
-            await page.wait_for_url("**/admin**", timeout=10000)
-        except:
-            print("⏳ No navigation detected, checking current state...")
-        
-        await page.wait_for_load_state('networkidle')
-        await page.screenshot(path="csv-import-test/01-logged-in.png")
+            await page.wait_for_load_state('networkidle')
+            await capture_vitals(page, '/admin')
+            await shots.capture(page, "01-logged-in")
         
         print("📍 Step 2: Navigate to import page...")
-        await page.goto(f"{base_url}/admin/import")
-        await page.wait_for_load_state('networkidle')
-        await page.screenshot(path="csv-import-test/02-import-page.png")
+        async with span("Step 2: import page", url=f"{base_url}/admin/import") as step:
+            response = await page.goto(f"{base_url}/admin/import")
+            step.set(http_status=response.status if response else None)
+            await page.wait_for_load_state('networkidle')
+            await capture_vitals(page, '/admin/import')
+            await shots.capture(page, "02-import-page")
         
         print("📍 Step 3: Upload CSV file...")
+        async with span("Step 3: upload CSV", file="10 rows.csv") as step:
         
-        # Upload the 10 rows CSV file
-        file_input = await page.query_selector('input[type="file"]')
-        if file_input:
-            await file_input.set_input_files("10 rows.csv")
-            print("✅ CSV file uploaded")
-            await page.wait_for_timeout(2000)
-            await page.screenshot(path="csv-import-test/03-file-uploaded.png")
-        else:
-            print("❌ File input not found")
-            return False
+            # Upload the 10 rows CSV file
+            file_input = await page.query_selector('input[type="file"]')
+            if file_input:
+                # The page parses the file client-side and re-renders the preview
+                async with timer.step("file parsed", legacy_ms=2000):
+                    await wait_for_dom_change(page, lambda: file_input.set_input_files("10 rows.csv"))
+                print("✅ CSV file uploaded")
+                await shots.capture(page, "03-file-uploaded")
+            else:
+                print("❌ File input not found")
+                step.set(status='no file input')
+                return False
         
         print("📍 Step 4: Set up field mappings...")
+        async with span("Step 4: field mappings") as step:
         
-        # Wait for the mapping interface to appear
-        await page.wait_for_timeout(3000)
+            # Wait for the mapping interface to appear
+            async with timer.step("mapping interface", legacy_ms=3000):
+                await page.wait_for_selector('select', timeout=15000)
         
-        # Take screenshot of mapping interface
-        await page.screenshot(path="csv-import-test/04-mapping-interface.png")
+            # Take screenshot of mapping interface
+            await shots.capture(page, "04-mapping-interface")
         
-        # Set up mappings as user described
-        mappings = {
-            "firstname": "First Name",
-            "surname": "Last Name", 
-            "email": "Email",
-            "phone": "Phone",
-            "suburb": "Suburb",
-            "postcode": "Postcode",
-            "state": "State"
-        }
+            # Set up mappings as user described
+            mappings = {
+                "firstname": "First Name",
+                "surname": "Last Name", 
+                "email": "Email",
+                "phone": "Phone",
+                "suburb": "Suburb",
+                "postcode": "Postcode",
+                "state": "State"
+            }
         
-        print("🔄 Setting up field mappings...")
+            print("🔄 Setting up field mappings...")
         
-        # Get all field mapping dropdowns
-        selects = await page.query_selector_all('select')
-        print(f"📋 Found {len(selects)} select dropdowns")
+            # Get all field mapping dropdowns
+            selects = await page.query_selector_all('select')
+            print(f"📋 Found {len(selects)} select dropdowns")
+            step.set(selects=len(selects))
         
-        # Try a simpler approach - just see what field names are on the page
-        page_text = await page.text_content('body')
-        print("🔍 Checking what CSV fields are detected...")
-        if page_text:
-            for csv_field in mappings.keys():
-                if csv_field in page_text:
-                    print(f"✅ Found CSV field '{csv_field}' on page")
-                else:
-                    print(f"❌ CSV field '{csv_field}' not found on page")
-        else:
-            print("⚠️ Could not get page text content")
+            # Try a simpler approach - just see what field names are on the page
+            page_text = await page.text_content('body')
+            print("🔍 Checking what CSV fields are detected...")
+            if page_text:
+                for csv_field in mappings.keys():
+                    if csv_field in page_text:
+                        print(f"✅ Found CSV field '{csv_field}' on page")
+                    else:
+                        print(f"❌ CSV field '{csv_field}' not found on page")
+            else:
+                print("⚠️ Could not get page text content")
         
-        # Just proceed with import without mapping for now to see what happens
-        print("⏩ Proceeding with import to see network traffic...")
+            # Just proceed with import without mapping for now to see what happens
+            print("⏩ Proceeding with import to see network traffic...")
         
-        await page.wait_for_timeout(2000)
-        await page.screenshot(path="csv-import-test/05-mappings-set.png")
+            # Nothing is pending here - the old fixed sleep is dropped entirely
+            async with timer.step("mappings set", legacy_ms=2000):
+                pass
+            await shots.capture(page, "05-mappings-set")
         
         print("📍 Step 5: Start import and capture network traffic...")
         
@@ -144,103 +151,118 @@ async def test_csv_import():
         page.on("request", handle_request)
         page.on("response", handle_response)
         
-        # Look for import button more thoroughly
-        print("🔍 Looking for import button...")
-        await page.screenshot(path="csv-import-test/05b-before-import-search.png")
-        buttons = await page.query_selector_all('button')
-        print(f"📋 Found {len(buttons)} buttons on page")
+        async with span("find import button") as button_span:
+            # Look for import button more thoroughly
+            print("🔍 Looking for import button...")
+            await shots.capture(page, "05b-before-import-search")
+            buttons = await page.query_selector_all('button')
+            print(f"📋 Found {len(buttons)} buttons on page")
         
-        import_button = None
-        for i, button in enumerate(buttons):
-            try:
-                button_text = await button.inner_text()
-                print(f"📋 Button {i}: '{button_text}'")
-                # Look specifically for "Start Import" button
-                if 'start import' in button_text.lower():
-                    import_button = button
-                    print(f"🎯 Found START IMPORT button: '{button_text}'")
-                    break
-            except Exception as e:
-                print(f"⚠️ Error reading button {i}: {e}")
-        
-        # If Start Import not found, look for other import-related buttons
-        if not import_button:
-            print("🔍 Start Import button not found, looking for alternatives...")
+            import_button = None
             for i, button in enumerate(buttons):
                 try:
                     button_text = await button.inner_text()
-                    if any(keyword in button_text.lower() for keyword in ['import', 'process', 'upload data']):
+                    print(f"📋 Button {i}: '{button_text}'")
+                    # Look specifically for "Start Import" button
+                    if 'start import' in button_text.lower():
                         import_button = button
-                        print(f"🎯 Found alternative import button: '{button_text}'")
+                        print(f"🎯 Found START IMPORT button: '{button_text}'")
                         break
                 except Exception as e:
                     print(f"⚠️ Error reading button {i}: {e}")
         
+            # If Start Import not found, look for other import-related buttons
+            if not import_button:
+                print("🔍 Start Import button not found, looking for alternatives...")
+                for i, button in enumerate(buttons):
+                    try:
+                        button_text = await button.inner_text()
+                        if any(keyword in button_text.lower() for keyword in ['import', 'process', 'upload data']):
+                            import_button = button
+                            print(f"🎯 Found alternative import button: '{button_text}'")
+                            break
+                    except Exception as e:
+                        print(f"⚠️ Error reading button {i}: {e}")
+            button_span.set(buttons=len(buttons), found=import_button is not None)
+        
         if import_button:
-            print("🖱️ Clicking import button...")
-            await import_button.click()
+            async with span("Step 5: run import", file="10 rows.csv") as import_span:
+                print("🖱️ Clicking import button...")
             
-            # Wait for import to complete
-            await page.wait_for_timeout(5000)
-            await page.screenshot(path="csv-import-test/06-import-started.png")
+                # Large files are uploaded in several chunks, so also wait for the import API to go quiet
+                async with ScopedNetworkIdle(page, ['/api/admin/import']) as import_traffic:
+                    async with timer.step("first import response", legacy_ms=5000):
+                        await wait_for_api_response(page, import_button.click, '/api/admin/import', method='POST', timeout=120000)
+                    await shots.capture(page, "06-import-started")
+                
+                    # Wait for results
+                    print("⏳ Waiting for import results...")
+                    async with timer.step("results rendered", legacy_ms=10000):
+                        await import_traffic.wait(idle_ms=500, timeout=300000)
+                        await page.wait_for_selector('span:has-text("Records Imported:"), h2:has-text("Import Errors")', timeout=30000)
+                import_span.set(import_requests=import_traffic.seen,
+                                http_status=import_response['status'] if import_response else None)
+                await shots.capture(page, "07-import-results")
             
-            # Wait for results
-            print("⏳ Waiting for import results...")
-            await page.wait_for_timeout(10000)
-            await page.screenshot(path="csv-import-test/07-import-results.png")
+            async with span("Step 6: read import results") as step:
+                # Look for results text
+                results_text = await page.text_content('body')
             
-            # Look for results text
-            results_text = await page.text_content('body')
+                print("\n📊 IMPORT RESULTS:")
+                print("=" * 30)
             
-            print("\n📊 IMPORT RESULTS:")
-            print("=" * 30)
+                # Extract import statistics
+                if results_text and "Records Imported:" in results_text:
+                    lines = results_text.split('\n')
+                    for line in lines:
+                        if "Records Imported:" in line or "Records with Errors:" in line:
+                            print(f"📋 {line.strip()}")
+                            label, _, value = line.strip().partition(':')
+                            step.set(**{label.lower().replace(' ', '_'): value.strip()})
             
-            # Extract import statistics
-            if results_text and "Records Imported:" in results_text:
-                lines = results_text.split('\n')
-                for line in lines:
-                    if "Records Imported:" in line or "Records with Errors:" in line:
-                        print(f"📋 {line.strip()}")
+                # Print captured network data
+                print("\n🌐 NETWORK ANALYSIS:")
+                print("=" * 30)
             
-            # Print captured network data
-            print("\n🌐 NETWORK ANALYSIS:")
-            print("=" * 30)
+                if import_request:
+                    print(f"📤 Request: {import_request['method']} {import_request['url']}")
+                    if import_request["post_data"]:
+                        print(f"📦 Data size: {len(import_request['post_data'])} bytes")
+                else:
+                    print("⚠️ No import request captured")
             
-            if import_request:
-                print(f"📤 Request: {import_request['method']} {import_request['url']}")
-                if import_request["post_data"]:
-                    print(f"📦 Data size: {len(import_request['post_data'])} bytes")
-            else:
-                print("⚠️ No import request captured")
+                if import_response:
+                    print(f"📥 Response: {import_response['status']} {import_response['status_text']}")
+                    print(f"📋 Response Body:")
+                    print("-" * 40)
+                    print(import_response['body'])
+                    print("-" * 40)
+                else:
+                    print("⚠️ No import response captured")
             
-            if import_response:
-                print(f"📥 Response: {import_response['status']} {import_response['status_text']}")
-                print(f"📋 Response Body:")
-                print("-" * 40)
-                print(import_response['body'])
-                print("-" * 40)
-            else:
-                print("⚠️ No import response captured")
+                print("\n🔍 PAGE CONTENT ANALYSIS:")
+                print("=" * 30)
             
-            print("\n🔍 PAGE CONTENT ANALYSIS:")
-            print("=" * 30)
+                # Look for error messages
+                error_elements = await page.query_selector_all('.error, .alert-error, [class*="error"], [class*="danger"]')
+                for error in error_elements:
+                    error_text = await error.inner_text()
+                    if error_text.strip():
+                        print(f"🚨 Error found: {error_text}")
             
-            # Look for error messages
-            error_elements = await page.query_selector_all('.error, .alert-error, [class*="error"], [class*="danger"]')
-            for error in error_elements:
-                error_text = await error.inner_text()
-                if error_text.strip():
-                    print(f"🚨 Error found: {error_text}")
+                # Look for success messages
+                success_elements = await page.query_selector_all('.success, .alert-success, [class*="success"]')
+                for success in success_elements:
+                    success_text = await success.inner_text()
+                    if success_text.strip():
+                        print(f"✅ Success message: {success_text}")
             
-            # Look for success messages
-            success_elements = await page.query_selector_all('.success, .alert-success, [class*="success"]')
-            for success in success_elements:
-                success_text = await success.inner_text()
-                if success_text.strip():
-                    print(f"✅ Success message: {success_text}")
+                await shots.capture(page, "08-final-state")
             
-            await page.screenshot(path="csv-import-test/08-final-state.png")
+            if FAST_MODE:
+                timer.report()
             
+            success = True
             return True
         else:
             print("❌ Import button not found")
@@ -248,9 +270,32 @@ async def test_csv_import():
             
     except Exception as e:
         print(f"❌ Test failed: {e}")
-        await page.screenshot(path="csv-import-test/error.png")
+        await shots.capture(page, "error")
         return False
     finally:
+        await shots.close(failed=not success)
+        print(shots.report())
+
+async def test_csv_import():
+    print("🚀 CSV Import Test - Browser Automation")
+    print("=" * 50)
+    
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(**launch_options(slow_mo=1000))
+    
+    try:
+        context = await new_session_context(browser)
+        # CRM_PROFILE=no-media|api-only keeps assets the import never looks at off the network
+        profile = await InterceptionProfile().apply(context)
+        page = await context.new_page()
+        await install_vitals(page)
+        started = time.perf_counter()
+        try:
+            return await run_csv_import(page)
+        finally:
+            await profile.report({'CSV import': time.perf_counter() - started})
+    finally:
+        export_trace(os.environ.get('CRM_TRACE') or "csv-import-test/trace.json", "CSV IMPORT TRACE")
         await browser.close()
         await playwright.stop()
 
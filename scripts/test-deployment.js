@@ -6,7 +6,7 @@ async function testDeployment() {
   const browser = await chromium.launch({ headless: true });
   const page = await browser.newPage();
   
-  const baseUrl = 'https://epg-crm.vercel.app';
+  const baseUrl = process.env.CRM_BASE_URL || 'https://epg-crm.vercel.app';
   const testUrls = [
     '/',
     '/admin',
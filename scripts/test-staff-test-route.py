@@ -7,18 +7,21 @@ import asyncio
 import json
 from playwright.async_api import async_playwright
 
+from crm_config import BASE_URL, USERNAME, PASSWORD
+from crm_waits import launch_options
+
 async def test_staff_test_route():
     print("🎯 TESTING: staff-test route")
     print("=" * 50)
     
     playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False, slow_mo=800)
+    browser = await playwright.chromium.launch(**launch_options(slow_mo=800))
     page = await browser.new_page()
     
     try:
-        base_url = "https://epg-crm.vercel.app"
-        username = "MarkandLouie2025@"
-        password = "ySz7JY^4tj@GmUqK"
+        base_url = BASE_URL
+        username = USERNAME
+        password = PASSWORD
         
         # Step 1: Login
         print("🔐 Step 1: Login to CRM...")
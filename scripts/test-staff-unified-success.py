@@ -7,40 +7,34 @@ import asyncio
 import json
 from playwright.async_api import async_playwright
 
+from crm_config import BASE_URL
+from crm_session import new_session_context, session_user, is_logged_in
+from crm_waits import launch_options, wait_for_tab_switch, StepTimer, FAST_MODE
+
 async def test_staff_unified_success():
     print("🎯 FINAL TEST: Staff Unified Page")
     print("=" * 50)
     
     playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False, slow_mo=800)
-    page = await browser.new_page()
+    browser = await playwright.chromium.launch(**launch_options(slow_mo=800))
+    page = None
+    timer = StepTimer("staff-unified tabs")
     
     try:
-        base_url = "https://epg-crm.vercel.app"
-        username = "MarkandLouie2025@"
-        password = "ySz7JY^4tj@GmUqK"
+        base_url = BASE_URL
         
-        # Step 1: Login
+        # Step 1: Login (reuses the cached session, logging in via the API only when it expired)
         print("🔐 Step 1: Login to CRM...")
-        await page.goto(f"{base_url}/login")
-        await page.wait_for_load_state('networkidle')
-        
-        await page.fill('#username', username)
-        await page.fill('#password', password)
+        context = await new_session_context(browser, base_url=base_url)
+        page = await context.new_page()
+        user = session_user()
         
-        # Wait for login response
-        async with page.expect_response(lambda response: '/api/auth/login' in response.url) as response_info:
-            await page.click('button[type="submit"]')
-            response = await response_info.value
-            
-        response_data = await response.json()
-        
-        if response.status == 200 and response_data.get('success'):
+        if await is_logged_in(page, base_url):
             print("✅ Login successful!")
-            print(f"   User: {response_data['user']['name']}")
-            print(f"   Role: {response_data['user']['role']}")
+            if user:
+                print(f"   User: {user['name']}")
+                print(f"   Role: {user['role']}")
             
-            # Wait for redirect to admin
             await page.wait_for_load_state('networkidle')
             await page.screenshot(path="test-final-01-admin-dashboard.png")
             
@@ -78,8 +72,8 @@ async def test_staff_unified_success():
                             tab_text = await tab.inner_text()
                             print(f"🔄 Testing tab {i+1}: {tab_text}")
                             
-                            await tab.click()
-                            await page.wait_for_timeout(1000)
+                            async with timer.step(f"tab {i+1}: {tab_text}", legacy_ms=1000):
+                                await wait_for_tab_switch(page, tab)
                             await page.screenshot(path=f"test-final-03-tab-{i+1}-{tab_text.replace(' ', '-').lower()}.png")
                             
                             # Check for active state
@@ -122,6 +116,9 @@ async def test_staff_unified_success():
                         print("🎯 The user's 404 error was likely a temporary caching issue.")
                         print("🚀 The system is fully functional and ready for use.")
                         
+                        if FAST_MODE:
+                            timer.report()
+                        
                         return True
                     else:
                         print("❌ Expected tabs not found")
@@ -137,7 +134,8 @@ async def test_staff_unified_success():
         
     except Exception as e:
         print(f"❌ Test failed: {e}")
-        await page.screenshot(path="test-final-error.png")
+        if page:
+            await page.screenshot(path="test-final-error.png")
         return False
     finally:
         await browser.close()
@@ -3,7 +3,7 @@
 echo "🚀 Testing EPG CRM Deployment..."
 echo "=================================="
 
-BASE_URL="https://epg-crm.vercel.app"
+BASE_URL="${CRM_BASE_URL:-https://epg-crm.vercel.app}"
 
 # URLs to test - different types
 PUBLIC_URLS=(
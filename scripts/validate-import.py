@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Pre-flight Import Validator
+Applies /api/admin/import's row rules to a CSV before it is uploaded. The file
+is memory-mapped and cut into byte-range shards on record boundaries; a
+process pool parses and checks the shards in parallel with the route's exact
+CSV dialect. Results stream out in file order as shards finish:
+
+  - an error report (JSONL): every row the server would reject, with the same
+    "Row N" numbering and message it would return, plus every value it would
+    silently coerce (unknown state/product/nationality/rating/status, bad dates)
+  - a cleaned CSV holding only the rows the server will accept
+
+Usage: python3 scripts/validate-import.py enquiries.csv [--workers 8] [--mappings mappings.json]
+                                          [--report enquiries.errors.jsonl] [--clean enquiries.clean.csv] [--strict]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from crm_csv import iter_rows, open_mapped, shard_ranges
+from crm_import import auto_map
+from crm_validate import RowValidator
+
+
+def csv_line(values):
+    """One row, every field quoted, in a form parseCSV reads back to the same values"""
+    joined = '\x00'.join(values)
+    if joined.count('\x00') != len(values) - 1:
+        return ','.join('"' + v.replace('"', '""') + '"' for v in values) + '\n'
+    # Escape and quote the whole row at once; the sentinel marks the field boundaries
+    return '"' + joined.replace('"', '""').replace('\x00', '","') + '"\n'
+
+
+def validate_shard(job):
+    """Pool worker: check one byte range, writing its cleaned rows and report lines to temp files.
+
+    Rows are numbered from 1 within the shard; the parent adds the offset.
+    """
+    validator = RowValidator(job['headers'], job['mappings'], job['custom_fields'])
+    width = len(job['headers'])
+    stats = {'shard': job['index'], 'rows': 0, 'accepted': 0, 'rejected': 0, 'empty': 0,
+             'warned_rows': 0, 'errors': {}, 'warnings': {}}
+
+    with open_mapped(job['path']) as mapped, \
+            open(job['clean'], 'w', encoding='utf-8', newline='', buffering=1 << 20) as clean, \
+            open(job['report'], 'w', encoding='utf-8', buffering=1 << 20) as report:
+        rows = iter_rows(mapped, start=job['start'], end=job['end'])
+        if job['index'] == 0:
+            next(rows, None)
+        row = 0
+        for row, values in enumerate(rows, 1):
+            status, message, warnings = validator.check(values)
+            if status == 'empty':
+                stats['empty'] += 1
+                continue
+            if status == 'error':
+                stats['rejected'] += 1
+                stats['errors'][message] = stats['errors'].get(message, 0) + 1
+                report.write(json.dumps({'row': row, 'severity': 'error', 'message': message}) + '\n')
+            for warning in warnings:
+                key = f"{warning['field']} ({warning['column']})"
+                stats['warnings'][key] = stats['warnings'].get(key, 0) + 1
+                report.write(json.dumps({'row': row, 'severity': 'warning', **warning}) + '\n')
+            if warnings:
+                stats['warned_rows'] += 1
+            if status == 'ok' and not (warnings and job['strict']):
+                stats['accepted'] += 1
+                clean.write(csv_line(values[:width]))
+        stats['rows'] = row
+    return stats
+
+
+def merge_counts(total, counts):
+    for key, count in counts.items():
+        total[key] = total.get(key, 0) + count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate a CSV against /api/admin/import's rules before uploading")
+    parser.add_argument('csv', help="CSV file to validate")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--shards', type=int, default=0, help="byte-range shards (default: 4 per worker)")
+    parser.add_argument('--mappings', default='', help="JSON mappings file (default: the page's auto-mapping)")
+    parser.add_argument('--custom-fields', default='', help="JSON customFields file")
+    parser.add_argument('--report', default='', help="JSONL error report (default: <csv>.errors.jsonl)")
+    parser.add_argument('--clean', default='', help="CSV of accepted rows (default: <csv>.clean.csv)")
+    parser.add_argument('--strict', action='store_true', help="also leave rows with coerced values out of the cleaned file")
+    args = parser.parse_args()
+
+    stem = args.csv[:-4] if args.csv.lower().endswith('.csv') else args.csv
+    report_path = args.report or f"{stem}.errors.jsonl"
+    clean_path = args.clean or f"{stem}.clean.csv"
+    size = os.path.getsize(args.csv)
+
+    print("🔎 Pre-flight Import Validator")
+    print("=" * 60)
+    print(f"📄 {args.csv} ({size / 1e6:,.1f} MB)")
+
+    started = time.perf_counter()
+    with open_mapped(args.csv) as mapped:
+        headers = next(iter_rows(mapped), None)
+        shards = shard_ranges(mapped, args.shards or args.workers * 4)
+    if not headers:
+        print("❌ The file has no header row")
+        return False
+
+    if args.mappings:
+        with open(args.mappings, 'r', encoding='utf-8') as f:
+            mappings = json.load(f)
+    else:
+        mappings = auto_map(headers)
+    custom_fields = []
+    if args.custom_fields:
+        with open(args.custom_fields, 'r', encoding='utf-8') as f:
+            custom_fields = json.load(f)
+    mapped_count = sum(1 for m in mappings if m.get('targetField'))
+    print(f"🗺️ {len(headers)} columns, {mapped_count} mapped; {len(shards)} shards on {args.workers} workers")
+
+    totals = {'rows': 0, 'accepted': 0, 'rejected': 0, 'empty': 0, 'warned_rows': 0}
+    errors, warnings = {}, {}
+    out_dir = os.path.dirname(os.path.abspath(clean_path))
+    with tempfile.TemporaryDirectory(prefix='.validate-', dir=out_dir) as tmp, \
+            open(clean_path, 'w', encoding='utf-8', newline='') as clean, \
+            open(report_path, 'w', encoding='utf-8') as report:
+        clean.write(csv_line(headers))
+        jobs = [{
+            'index': i, 'path': args.csv, 'start': start, 'end': end, 'headers': headers,
+            'mappings': mappings, 'custom_fields': custom_fields, 'strict': args.strict,
+            'clean': os.path.join(tmp, f"{i}.csv"), 'report': os.path.join(tmp, f"{i}.jsonl"),
+        } for i, (start, end) in enumerate(shards)]
+
+        with multiprocessing.Pool(max(1, args.workers)) as pool:
+            # imap keeps file order, so both outputs are appended as soon as the next shard is ready
+            for job, stats in zip(jobs, pool.imap(validate_shard, jobs)):
+                offset = totals['rows']
+                with open(job['clean'], 'r', encoding='utf-8', newline='') as part:
+                    shutil.copyfileobj(part, clean, 1 << 20)
+                with open(job['report'], 'r', encoding='utf-8') as part:
+                    for line in part:
+                        entry = json.loads(line)
+                        entry['row'] += offset
+                        report.write(json.dumps(entry) + '\n')
+                os.remove(job['clean'])
+                os.remove(job['report'])
+                for key in totals:
+                    totals[key] += stats[key]
+                merge_counts(errors, stats['errors'])
+                merge_counts(warnings, stats['warnings'])
+                print(f"   ✅ shard {job['index'] + 1}/{len(jobs)}: {stats['rows']:,} rows, "
+                      f"{stats['rejected']:,} rejected", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    print("\n📊 VALIDATION SUMMARY")
+    print("=" * 60)
+    print(f"📋 Rows: {totals['rows']:,}")
+    print(f"✅ Accepted: {totals['accepted']:,}")
+    print(f"❌ Rejected by the server: {totals['rejected']:,}")
+    for message, count in sorted(errors.items(), key=lambda item: -item[1])[:10]:
+        print(f"   - {message}: {count:,}")
+    if totals['empty']:
+        print(f"⏭️ Empty (skipped by the server): {totals['empty']:,}")
+    print(f"⚠️ Rows with coerced values: {totals['warned_rows']:,}"
+          f"{' (left out of the cleaned file)' if args.strict else ''}")
+    for key, count in sorted(warnings.items(), key=lambda item: -item[1])[:10]:
+        print(f"   - {key}: {count:,}")
+    print(f"⚡ {elapsed:.2f}s - {totals['rows'] / elapsed:,.0f} rows/sec, {size / 1e6 / elapsed:,.1f} MB/s")
+    print(f"💾 Report: {report_path}")
+    print(f"💾 Cleaned file: {clean_path}")
+    print(f"👉 Upload it with: python3 scripts/import-chunked.py {clean_path}")
+    return totals['rejected'] == 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(0 if main() else 1)
+    except KeyboardInterrupt:
+        print("\n⚠️ Validation interrupted by user")
+        sys.exit(1)
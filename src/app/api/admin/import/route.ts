@@ -1,5 +1,6 @@
+import { createHash } from 'crypto'
 import { NextRequest, NextResponse } from 'next/server'
-import { PrismaClient } from '@prisma/client'
+import { Prisma, PrismaClient } from '@prisma/client'
 import { createAutoBackup } from '@/lib/backup-utils'
 
 const prisma = new PrismaClient()
@@ -51,16 +52,37 @@ const VALID_CLASSIFICATIONS = [
 // Temporary in-memory storage (replace with database in production)
 let importedData: any[] = []
 
+// Idempotent imports tag their rows with an import key: the client's importId (a chunked upload sends
+// the same one with every chunk) or else a hash of the uploaded file. Two different exports that share
+// a file name are different imports. The (importKey, originalId) unique index makes the database the
+// guard, so a retry racing its first attempt - on this instance or another - skips the rows it wrote.
+const IMPORT_ID_PATTERN = /^[\w.:-]{8,128}$/
+
+// originalIds per query when looking up rows already imported, so a large upload never sends one huge IN list
+const ID_LOOKUP_BATCH = 1000
+
+// Server-Timing entry (durations in ms) so clients can separate the row loop from the backup
+function serverTiming(phases: { [name: string]: number }): string {
+  return Object.entries(phases).map(([name, dur]) => `${name};dur=${dur.toFixed(1)}`).join(', ')
+}
+
 export async function POST(request: NextRequest) {
+  const startedAt = performance.now()
   try {
     const formData = await request.formData()
     const file = formData.get('file') as File
     const mappingsString = formData.get('mappings') as string
     const customFieldsString = formData.get('customFields') as string
+    // Opt-in: skip rows whose originalId was already imported under the same import key (safe retries/resumes)
+    const idempotent = formData.get('idempotent') === 'true'
+    const importId = formData.get('importId') as string | null
     
     if (!file || !mappingsString) {
       return NextResponse.json({ error: 'File and mappings are required' }, { status: 400 })
     }
+    if (importId && !IMPORT_ID_PATTERN.test(importId)) {
+      return NextResponse.json({ error: 'importId must be 8-128 letters, digits, ".", ":", "_" or "-"' }, { status: 400 })
+    }
 
     const mappings: FieldMapping[] = JSON.parse(mappingsString)
     const customFields = customFieldsString ? JSON.parse(customFieldsString) : []
@@ -86,6 +108,26 @@ export async function POST(request: NextRequest) {
     } else {
       return NextResponse.json({ error: 'Unsupported file format. Please use CSV or JSON.' }, { status: 400 })
     }
+    const defaultImportSource = `Import from ${file.name}`
+    const importKey = idempotent ? (importId || createHash('sha256').update(text).digest('hex')) : null
+    // Keys already stored under this import key, fetched in batches instead of one lookup per row
+    const importedIds = new Set<string>()
+    let alreadyImported = 0
+    if (importKey) {
+      // Same originalId as the row loop builds below: the mapped column first, then the id column
+      const originalIdMapping = customFieldMap.originalId ? undefined : activeMappings.filter(m => m.targetField === 'originalId').pop()
+      const ids: string[] = Array.from(new Set(rawData.map(row => row && (
+        (originalIdMapping && processFieldValue('originalId', row[originalIdMapping.sourceField])) || row.id || row.ID
+      )).filter(Boolean).map(String)))
+      for (let start = 0; start < ids.length; start += ID_LOOKUP_BATCH) {
+        const existing = await prisma.enquiry.findMany({
+          where: { importKey, originalId: { in: ids.slice(start, start + ID_LOOKUP_BATCH) } },
+          select: { originalId: true }
+        })
+        existing.forEach(e => e.originalId && importedIds.add(e.originalId))
+      }
+    }
+    const parsedAt = performance.now()
 
     // Process and validate data
     const results = {
@@ -166,7 +208,7 @@ export async function POST(request: NextRequest) {
             // Always set these system fields
             createdAt: mappedData.createdAt ? new Date(mappedData.createdAt) : new Date(),
             updatedAt: new Date(),
-            importSource: mappedData.importSource || `Import from ${file.name}`,
+            importSource: mappedData.importSource || defaultImportSource,
             originalId: mappedData.originalId || row.id || row.ID || `import_${Date.now()}_${i}`,
           }
 
@@ -208,11 +250,27 @@ export async function POST(request: NextRequest) {
             prismaData.followUpInfo = JSON.stringify(customFieldData)
           }
 
+          if (importKey) {
+            if (importedIds.has(String(prismaData.originalId))) {
+              results.skipped++
+              alreadyImported++
+              continue
+            }
+            prismaData.importKey = importKey
+          }
+
           await prisma.enquiry.create({
             data: prismaData
           })
           results.imported++
+          if (importKey) importedIds.add(String(prismaData.originalId))
         } catch (dbError) {
+          if (importKey && dbError instanceof Prisma.PrismaClientKnownRequestError && dbError.code === 'P2002') {
+            // Written since the lookup by a concurrent attempt at the same rows
+            results.skipped++
+            alreadyImported++
+            continue
+          }
           results.errors++
           results.errorDetails.push(`Row ${rowIndex}: Database error - ${dbError instanceof Error ? dbError.message : 'Unknown database error'}`)
         }
@@ -223,6 +281,8 @@ export async function POST(request: NextRequest) {
       }
     }
 
+    const rowsDoneAt = performance.now()
+
     // Log import results
     console.log(`Import completed: ${results.imported} imported, ${results.skipped} skipped, ${results.errors} errors`)
     console.log(`Custom fields processed: ${JSON.stringify(customFields)}`)
@@ -237,10 +297,22 @@ export async function POST(request: NextRequest) {
       }
     }
 
+    const finishedAt = performance.now()
+
     return NextResponse.json({
       ...results,
       message: `Import completed. ${results.imported} records imported successfully.${customFields.length > 0 ? ` Custom fields: ${customFields.map((f: any) => f.label).join(', ')}` : ''}`,
-      totalRecords: rawData.length
+      totalRecords: rawData.length,
+      ...(idempotent ? { alreadyImported } : {})
+    }, {
+      headers: {
+        'Server-Timing': serverTiming({
+          parse: parsedAt - startedAt,
+          rows: rowsDoneAt - parsedAt,
+          backup: finishedAt - rowsDoneAt,
+          total: finishedAt - startedAt
+        })
+      }
     })
 
   } catch (error) {